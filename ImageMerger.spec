@@ -0,0 +1,50 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Сборка в каталог (onedir): при запуске ничего не распаковывается во
+# временную папку, поэтому окно появляется так же быстро, как из исходников.
+# Сборка: pyinstaller ImageMerger.spec -> dist/ImageMerger/ImageMerger.exe
+
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('resources/icon.ico', '.')],
+    # Модули обработки импортируются после показа окна (см. PRELOAD_MODULES)
+    hiddenimports=['src.core.image_manager', 'src.utils.image_converter'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='ImageMerger',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['resources/icon.ico'],
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='ImageMerger',
+)
@@ -0,0 +1,83 @@
+"""Сравнение совмещённого прохода обработки с последовательным.
+
+Пример запуска:
+    python benchmarks/bench_fused_merge.py --size 7680x4320 --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.image_processor import ImageProcessor
+
+
+def make_triplet(width: int, height: int, seed: int = 0):
+    """
+    Создает синтетическую тройку: шумовой цвет, редкие линии, красный блок.
+    
+    Args:
+        width: Ширина изображения
+        height: Высота изображения
+        seed: Зерно генератора случайных чисел
+    
+    Returns:
+        Кортеж (color, outline, highlight) в формате BGR
+    """
+    rng = np.random.default_rng(seed)
+    color = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    outline = np.full((height, width, 3), 255, dtype=np.uint8)
+    outline[::9] = 0
+    outline[:, ::13] = 0
+    highlight = np.full((height, width, 3), 255, dtype=np.uint8)
+    highlight[height // 4:height // 2, width // 4:width // 2] = (20, 20, 230)
+    return color, outline, highlight
+
+
+def sequential_merge(color, outline, highlight):
+    """Прежний путь: apply_highlight, затем apply_outline."""
+    result = ImageProcessor.apply_highlight(color.copy(), highlight)
+    return ImageProcessor.apply_outline(result, outline)
+
+
+def best_time(func, repeat: int, *args) -> float:
+    """Возвращает лучшее время из repeat запусков."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    """Главная функция бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", default="7680x4320", help="Размер ШxВ")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество повторов")
+    args = parser.parse_args()
+    
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    triplet = make_triplet(width, height)
+    
+    if not np.array_equal(sequential_merge(*triplet), ImageProcessor.process_images(*triplet)):
+        sys.exit("Результаты совмещённого и последовательного прохода различаются")
+    
+    old = best_time(sequential_merge, args.repeat, *triplet)
+    new = best_time(ImageProcessor.process_images, args.repeat, *triplet)
+    megapixels = width * height / 1e6
+    print(f"{width}x{height} ({megapixels:.1f} MP), лучшее из {args.repeat}")
+    print(f"  последовательно: {old * 1000:8.1f} мс")
+    print(f"  совмещённо:      {new * 1000:8.1f} мс")
+    print(f"  ускорение:       {old / new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Замер конвейера пакетной обработки (чтение и запись в потоках).
+
+Создает синтетические тройки 12 MP в PNG и обрабатывает их
+python -m src.batch с конвейером и с --no-pipeline. Цветной слой
+покрыт шумом, как рендер с зерном, поэтому файлы почти не сжимаются и
+чтение занимает заметное время.
+
+Если файлы в кэше страниц, чтение ничего не стоит и конвейеру нечего
+перекрывать. С --cold входные файлы вытесняются из кэша перед каждым
+запуском (posix_fadvise, Linux); модули Python и библиотеки остаются в
+кэше, поэтому запуск интерпретатора не входит в разницу. Медленный диск
+или сетевой ресурс можно имитировать ограничением скорости чтения,
+например группой blkio (cgroup v1; 254:0 - номер устройства из
+/sys/block/<диск>/dev):
+
+    mkdir /sys/fs/cgroup/blkio/slow
+    echo "254:0 31457280" > /sys/fs/cgroup/blkio/slow/blkio.throttle.read_bps_device
+    echo $$ > /sys/fs/cgroup/blkio/slow/cgroup.procs
+
+Пример запуска:
+    python benchmarks/bench_pipeline.py --count 6 --repeat 3 --cold
+    python benchmarks/bench_pipeline.py --input exports/ -w 2 -o pipeline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bench_suite import SIZES, make_xvl_triplet
+
+# Режимы пакетной обработки и их аргументы
+MODES = {
+    "pipeline": [],
+    "no-pipeline": ["--no-pipeline"],
+}
+
+
+def make_inputs(root: Path, count: int) -> None:
+    """
+    Сохраняет count троек 12 MP с зашумленным цветным слоем.
+    
+    Args:
+        root: Каталог для файлов
+        count: Количество троек
+    """
+    color, outline, highlight = make_xvl_triplet(*SIZES[12])
+    noise = np.random.default_rng(0).integers(-20, 21, color.shape, dtype=np.int16)
+    color = np.clip(color + noise, 0, 255).astype(np.uint8)
+    for index in range(count):
+        for suffix, layer in (("", color), ("_outline", outline), ("_highlight", highlight)):
+            Image.fromarray(layer).save(root / f"t{index}{suffix}.png", compress_level=1)
+
+
+def evict(root: Path) -> None:
+    """Вытесняет файлы каталога из кэша страниц, чтобы они читались с диска."""
+    os.sync()
+    for path in root.rglob("*"):
+        if path.is_file():
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def run_batch(
+    input_dir: Path,
+    output_dir: Path,
+    args: Sequence[str],
+    workers: int,
+    format_name: str,
+    cold: bool
+) -> float:
+    """
+    Запускает пакетную обработку в отдельном процессе.
+    
+    Returns:
+        Время запуска в секундах
+    """
+    shutil.rmtree(output_dir, ignore_errors=True)
+    if cold:
+        evict(input_dir)
+    start = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable, "-m", "src.batch", str(input_dir), "-o", str(output_dir),
+            "--no-index", "-w", str(workers), "-f", format_name, *args
+        ],
+        cwd=PROJECT_ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - start
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция замера."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, help="Каталог с тройками (по умолчанию - синтетические)")
+    parser.add_argument("--count", type=int, default=6, help="Количество синтетических троек")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Количество процессов")
+    parser.add_argument(
+        "-f", "--format", choices=("JPEG", "PNG"), default="JPEG",
+        type=str.upper, help="Формат результата"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов")
+    parser.add_argument("--cold", action="store_true", help="Читать входные файлы с диска, а не из кэша страниц")
+    parser.add_argument("-o", "--output", type=Path, help="Файл JSON для результатов")
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        input_dir = args.input
+        if input_dir is None:
+            input_dir = Path(tmp) / "input"
+            input_dir.mkdir()
+            make_inputs(input_dir, args.count)
+        input_mb = sum(path.stat().st_size for path in input_dir.rglob("*") if path.is_file()) / 1e6
+        
+        times: Dict[str, List[float]] = {mode: [] for mode in MODES}
+        # Режимы чередуются, чтобы фоновая нагрузка делилась между ними поровну
+        for _ in range(args.repeat):
+            for mode, mode_args in MODES.items():
+                times[mode].append(run_batch(
+                    input_dir, Path(tmp) / "output", mode_args,
+                    args.workers, args.format, args.cold
+                ))
+    
+    medians = {mode: statistics.median(values) for mode, values in times.items()}
+    print(f"Входные файлы: {input_mb:.0f} МБ, процессов: {args.workers}")
+    for mode, median in medians.items():
+        print(f"{mode}: {median:.2f} с (все замеры: {', '.join(f'{t:.2f}' for t in times[mode])})")
+    print(f"Ускорение конвейера: {medians['no-pipeline'] / medians['pipeline']:.2f}x")
+    
+    if args.output:
+        args.output.write_text(json.dumps({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "format": args.format,
+            "input_mb": input_mb,
+            "cold": args.cold,
+            "times": times,
+            "medians": medians,
+        }, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
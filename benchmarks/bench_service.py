@@ -0,0 +1,301 @@
+"""Замер сервиса объединения: время одного запроса и пропускная способность.
+
+Запускает python -m src.serve на свободном порту (или использует уже
+запущенный сервис из --url), отправляет синтетическую тройку сначала
+последовательно, затем из нескольких клиентов одновременно, и сравнивает
+пропускную способность с числом процессов, умноженным на скорость
+одного объединения. Запросы, получившие 429, повторяются после
+Retry-After и считаются отдельно.
+
+Пример запуска:
+    python benchmarks/bench_service.py --workers 4 --requests 40
+    python benchmarks/bench_service.py --url http://127.0.0.1:8765 -o service.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bench_suite import SIZES, make_xvl_triplet
+
+BOUNDARY = "image-merger-bench"
+
+
+def encode_triplet(megapixels: int) -> bytes:
+    """
+    Кодирует синтетическую тройку в тело multipart/form-data.
+    
+    Args:
+        megapixels: Размер тройки (ключ SIZES из bench_suite)
+    
+    Returns:
+        Тело запроса
+    """
+    body = BytesIO()
+    for kind, array in zip(("color", "outline", "highlight"), make_xvl_triplet(*SIZES[megapixels])):
+        image = BytesIO()
+        Image.fromarray(array).save(image, format="PNG", compress_level=1)
+        body.write(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{kind}"; '
+            f'filename="{kind}.png"\r\nContent-Type: image/png\r\n\r\n'.encode()
+        )
+        body.write(image.getvalue())
+        body.write(b"\r\n")
+    body.write(f"--{BOUNDARY}--\r\n".encode())
+    return body.getvalue()
+
+
+def parse_timing(header: str) -> Dict[str, float]:
+    """Разбирает заголовок Server-Timing в словарь этап -> миллисекунды."""
+    timings = {}
+    for item in header.split(","):
+        name, _, duration = item.strip().partition(";dur=")
+        if duration:
+            timings[name] = float(duration)
+    return timings
+
+
+class Client:
+    """Клиент с постоянным соединением, повторяющий запросы после 429."""
+    
+    def __init__(self, host: str, port: int, body: bytes, format_name: str):
+        """
+        Инициализация клиента.
+        
+        Args:
+            host: Адрес сервиса
+            port: Порт сервиса
+            body: Тело запроса multipart
+            format_name: Формат результата
+        """
+        self.connection = http.client.HTTPConnection(host, port, timeout=600)
+        self.body = body
+        self.path = f"/merge?format={format_name}"
+        self.rejected = 0
+    
+    def merge(self) -> Tuple[float, Dict[str, float]]:
+        """
+        Отправляет тройку, пока она не будет принята.
+        
+        Returns:
+            Кортеж (время от первой попытки в секундах, этапы из Server-Timing)
+        
+        Raises:
+            RuntimeError: Если сервис вернул ошибку
+        """
+        start = time.perf_counter()
+        while True:
+            self.connection.request("POST", self.path, self.body, {
+                "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+            })
+            response = self.connection.getresponse()
+            content = response.read()
+            if response.status == 429:
+                self.rejected += 1
+                time.sleep(float(response.getheader("Retry-After", "1")))
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"{response.status}: {content.decode(errors='replace')}")
+            return time.perf_counter() - start, parse_timing(response.getheader("Server-Timing", ""))
+
+
+def free_port() -> int:
+    """Возвращает свободный порт localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(host: str, port: int, timeout: float) -> Dict[str, int]:
+    """
+    Ждет, пока сервис начнет отвечать.
+    
+    Returns:
+        Ответ /status
+    
+    Raises:
+        RuntimeError: Если сервис не ответил за timeout секунд
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=5)
+            connection.request("GET", "/status")
+            return json.loads(connection.getresponse().read())
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Сервис не ответил за {timeout:g} с")
+
+
+def run_concurrent(
+    host: str,
+    port: int,
+    body: bytes,
+    format_name: str,
+    clients: int,
+    requests: int
+) -> Tuple[float, List[float], List[Dict[str, float]], int]:
+    """
+    Отправляет requests запросов из clients потоков.
+    
+    Returns:
+        Кортеж (общее время в секундах, задержки запросов, этапы, число ответов 429)
+    """
+    latencies: List[float] = []
+    timings: List[Dict[str, float]] = []
+    errors: List[Exception] = []
+    remaining = [requests]
+    lock = threading.Lock()
+    pool = [Client(host, port, body, format_name) for _ in range(clients)]
+    
+    def work(client: Client) -> None:
+        while True:
+            with lock:
+                if remaining[0] == 0 or errors:
+                    return
+                remaining[0] -= 1
+            try:
+                latency, timing = client.merge()
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                return
+            with lock:
+                latencies.append(latency)
+                timings.append(timing)
+    
+    threads = [threading.Thread(target=work, args=(client,)) for client in pool]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"Ошибка запроса: {errors[0]}")
+    return elapsed, latencies, timings, sum(client.rejected for client in pool)
+
+
+def median_timings(timings: Sequence[Dict[str, float]]) -> Dict[str, float]:
+    """Медианы этапов по запросам."""
+    names = {name for timing in timings for name in timing}
+    return {
+        name: statistics.median(timing[name] for timing in timings if name in timing)
+        for name in sorted(names)
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция замера."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Адрес уже запущенного сервиса (по умолчанию - запустить свой)")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count(),
+        help="Количество процессов запускаемого сервиса"
+    )
+    parser.add_argument("--queue", type=int, default=None, help="Очередь запускаемого сервиса")
+    parser.add_argument(
+        "--megapixels", type=int, default=1, choices=(1, 12, 50),
+        help="Размер синтетической тройки"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=("JPEG", "PNG"), default="JPEG",
+        type=str.upper, help="Формат результата"
+    )
+    parser.add_argument("--single", type=int, default=10, help="Количество последовательных запросов")
+    parser.add_argument("--requests", type=int, default=40, help="Количество одновременных запросов")
+    parser.add_argument(
+        "--clients", type=int, default=None,
+        help="Количество одновременных клиентов (по умолчанию - вдвое больше процессов)"
+    )
+    parser.add_argument("-o", "--output", type=Path, help="Файл JSON для результатов")
+    args = parser.parse_args(argv)
+    
+    service = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        host, port = "127.0.0.1", free_port()
+        command = [
+            sys.executable, "-m", "src.serve", "--port", str(port), "--workers", str(args.workers)
+        ]
+        if args.queue is not None:
+            command += ["--queue", str(args.queue)]
+        service = subprocess.Popen(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL)
+    
+    try:
+        status = wait_ready(host, port, timeout=120)
+        workers = status['workers']
+        clients = args.clients or workers * 2
+        body = encode_triplet(args.megapixels)
+        print(
+            f"Сервис: процессов {workers}, емкость {status['capacity']}; "
+            f"тройка {args.megapixels} MP, запрос {len(body) / 1e6:.1f} МБ"
+        )
+        
+        client = Client(host, port, body, args.format)
+        client.merge()  # Прогрев соединения и процесса
+        single = [client.merge() for _ in range(args.single)]
+        single_latency = statistics.median(latency for latency, _ in single)
+        single_rate = 1 / single_latency
+        print(f"Один запрос: {single_latency * 1000:.0f} мс ({single_rate:.2f} объединений/с)")
+        
+        elapsed, latencies, timings, rejected = run_concurrent(
+            host, port, body, args.format, clients, args.requests
+        )
+        throughput = args.requests / elapsed
+        ideal = workers * single_rate
+        print(
+            f"{clients} клиентов: {throughput:.2f} объединений/с, "
+            f"{throughput / ideal:.0%} от {workers} x {single_rate:.2f}; "
+            f"медиана задержки {statistics.median(latencies) * 1000:.0f} мс, ответов 429: {rejected}"
+        )
+        stages = median_timings(timings)
+        print("Этапы (медиана, мс): " + ", ".join(f"{name} {value:.0f}" for name, value in stages.items()))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+    
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": workers,
+            "clients": clients,
+            "megapixels": args.megapixels,
+            "format": args.format,
+            "single_latency": single_latency,
+            "single_rate": single_rate,
+            "throughput": throughput,
+            "efficiency": throughput / ideal,
+            "rejected": rejected,
+            "stages": stages,
+        }
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Замер запуска графического приложения: время до окна и до первого результата.
+
+Каждый запуск - отдельный процесс с новым интерпретатором; время
+считается от запуска процесса. Когда окно показано, в него загружается
+синтетическая тройка (как через "Открыть набор"), и замеряется время до
+готового результата полного размера. С --eager модули обработки
+импортируются до создания окна, как раньше, - для сравнения.
+
+Пример запуска:
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --repeat 5 --eager
+    python benchmarks/bench_startup.py --drop-delay 1000 -o startup.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# События, которые процесс приложения сообщает в stdout
+EVENTS = ("window", "drop", "merge")
+
+
+def run_child(paths: Dict[str, Path], eager: bool, drop_delay: int) -> int:
+    """
+    Запускает приложение и сообщает время событий (выполняется в дочернем процессе).
+    
+    Args:
+        paths: Пути к слоям тройки по типам
+        eager: Импортировать модули обработки до создания окна
+        drop_delay: Задержка загрузки тройки после показа окна в миллисекундах
+    
+    Returns:
+        Код завершения
+    """
+    if eager:
+        import importlib
+        from src.utils.constants import PRELOAD_MODULES
+        for name in PRELOAD_MODULES:
+            importlib.import_module(name)
+    
+    from PyQt6.QtCore import QTimer
+    from src.main import create_window
+    
+    def report(event: str) -> None:
+        print(f"{event} {time.time():.6f}", flush=True)
+    
+    app, window = create_window([])
+    
+    def on_finished(tag, result) -> None:
+        if tag == 'merge':
+            report("merge")
+            app.quit()
+    
+    def drop() -> None:
+        report("drop")
+        window.open_set(paths)
+    
+    def on_window() -> None:
+        report("window")
+        QTimer.singleShot(drop_delay, drop)
+    
+    window.jobs.finished.connect(on_finished)
+    window.jobs.failed.connect(lambda tag, message: (print(message, file=sys.stderr), app.exit(1)))
+    QTimer.singleShot(0, on_window)
+    return app.exec()
+
+
+def run_once(
+    paths: Dict[str, Path],
+    eager: bool,
+    drop_delay: int,
+    timeout: float
+) -> Dict[str, float]:
+    """
+    Запускает приложение в отдельном процессе.
+    
+    Args:
+        paths: Пути к слоям тройки по типам
+        eager: Импортировать модули обработки до создания окна
+        drop_delay: Задержка загрузки тройки после показа окна в миллисекундах
+        timeout: Наибольшее время запуска в секундах
+    
+    Returns:
+        Время в миллисекундах: window (до окна), merge (до результата),
+        after_drop (от загрузки тройки до результата)
+    
+    Raises:
+        RuntimeError: Если приложение завершилось с ошибкой
+    """
+    command = [sys.executable, str(Path(__file__).resolve()), "--child", "--drop-delay", str(drop_delay)]
+    if eager:
+        command.append("--eager")
+    for kind, path in paths.items():
+        command += [f"--{kind}", str(path)]
+    
+    start = time.time()
+    completed = subprocess.run(
+        command, capture_output=True, text=True, timeout=timeout, cwd=PROJECT_ROOT
+    )
+    events = {}
+    for line in completed.stdout.splitlines():
+        name, _, stamp = line.partition(" ")
+        if name in EVENTS:
+            events[name] = float(stamp)
+    if completed.returncode != 0 or events.keys() != set(EVENTS):
+        raise RuntimeError(f"Приложение завершилось с ошибкой:\n{completed.stderr}")
+    
+    return {
+        "window": (events["window"] - start) * 1000,
+        "merge": (events["merge"] - start) * 1000,
+        "after_drop": (events["merge"] - events["drop"]) * 1000,
+    }
+
+
+def make_inputs(directory: Path, megapixels: int) -> Dict[str, Path]:
+    """
+    Записывает синтетическую тройку на диск.
+    
+    Args:
+        directory: Каталог для файлов
+        megapixels: Размер тройки (ключ SIZES из bench_suite)
+    
+    Returns:
+        Пути к слоям по типам
+    """
+    from PIL import Image
+    from bench_suite import SIZES, make_xvl_triplet
+    
+    color, outline, highlight = make_xvl_triplet(*SIZES[megapixels])
+    paths = {
+        'color': directory / "view.jpg",
+        'outline': directory / "view_outline.png",
+        'highlight': directory / "view_highlight.png",
+    }
+    Image.fromarray(color).save(paths['color'], quality=95)
+    Image.fromarray(outline).save(paths['outline'])
+    Image.fromarray(highlight).save(paths['highlight'])
+    return paths
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Количество запусков")
+    parser.add_argument(
+        "--megapixels", type=int, default=12, choices=(1, 12, 50),
+        help="Размер синтетической тройки"
+    )
+    parser.add_argument(
+        "--drop-delay", type=int, default=0, metavar="MS",
+        help="Через сколько миллисекунд после показа окна загружать тройку "
+             "(0 - сразу, худший случай для фоновой загрузки)"
+    )
+    parser.add_argument(
+        "--eager", action="store_true",
+        help="Импортировать модули обработки до создания окна (прежний порядок)"
+    )
+    parser.add_argument("--timeout", type=float, default=300, help="Наибольшее время запуска в секундах")
+    parser.add_argument("-o", "--output", type=Path, help="Файл JSON для результатов")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    for kind in ("color", "outline", "highlight"):
+        parser.add_argument(f"--{kind}", type=Path, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция замера."""
+    args = parse_args(argv)
+    if args.child:
+        paths = {
+            kind: getattr(args, kind)
+            for kind in ("color", "outline", "highlight") if getattr(args, kind)
+        }
+        return run_child(paths, args.eager, args.drop_delay)
+    
+    runs: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_inputs(Path(tmp), args.megapixels)
+        for index in range(args.repeat):
+            run = run_once(paths, args.eager, args.drop_delay, args.timeout)
+            runs.append(run)
+            print(
+                f"запуск {index + 1}: окно {run['window']:.0f} мс, результат {run['merge']:.0f} мс "
+                f"(после загрузки тройки {run['after_drop']:.0f} мс)"
+            )
+    
+    median = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+    print(
+        f"Медиана: окно {median['window']:.0f} мс, результат {median['merge']:.0f} мс "
+        f"(после загрузки тройки {median['after_drop']:.0f} мс)"
+    )
+    
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "megapixels": args.megapixels,
+            "drop_delay": args.drop_delay,
+            "eager": args.eager,
+            "runs": runs,
+            "median": median,
+        }
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
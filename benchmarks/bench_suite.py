@@ -0,0 +1,353 @@
+"""Набор бенчмарков горячих путей: обработка, загрузка, превью и сохранение.
+
+Генерирует синтетические тройки в духе экспорта Corel XVL (плоская
+заливка, редкий черный контур, красные пятна подсветки), замеряет
+каждый этап отдельно и пишет результаты в JSON. С --baseline сравнивает
+медианы с прежним запуском и завершается с кодом 1 при регрессии.
+
+Пример запуска:
+    python benchmarks/bench_suite.py --sizes 1,12 -o current.json
+    python benchmarks/bench_suite.py --sizes 1,12 --baseline current.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import PIL
+from PIL import Image
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.image_manager import ImageManager
+from src.core.image_processor import ImageProcessor
+
+# Размеры для каждого числа мегапикселей (4:3, как у рендеров XVL)
+SIZES: Dict[int, Tuple[int, int]] = {
+    1: (1152, 864),
+    12: (4000, 3000),
+    50: (8192, 6144),
+    150: (14144, 10608),
+}
+
+# Размер окна превью, в которое вписывается изображение
+PREVIEW_SIZE = (800, 600)
+
+# Суммарный размер стопки для process_batch в мегапикселях
+BATCH_MEGAPIXELS = 16
+
+# Палитра плоской заливки (RGB)
+PALETTE = np.array([
+    (200, 200, 205), (150, 160, 175), (90, 110, 140), (230, 210, 160),
+    (120, 140, 100), (180, 120, 90), (60, 60, 70), (240, 240, 240),
+], dtype=np.uint8)
+
+HIGHLIGHT_RGB = (230, 20, 20)
+
+# Приложение Qt должно жить до конца замеров
+_qt_app = None
+
+
+def make_xvl_triplet(
+    width: int,
+    height: int,
+    coverage: float = 0.05,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Создает синтетическую тройку, похожую на экспорт Corel XVL.
+    
+    Цветной слой - плоско залитые грани, контур - черные линии по их
+    границам на белом фоне, подсветка - красные круги на белом фоне.
+    
+    Args:
+        width: Ширина изображения
+        height: Высота изображения
+        coverage: Доля площади, покрытая подсветкой
+        seed: Зерно генератора случайных чисел
+    
+    Returns:
+        Кортеж (color, outline, highlight) в формате RGB
+    """
+    rng = np.random.default_rng(seed)
+    cell = max(16, min(width, height) // 24)
+    
+    # Грани: случайные индексы палитры на грубой сетке, растянутые без сглаживания
+    faces = rng.integers(0, len(PALETTE), (height // cell + 1, width // cell + 1), dtype=np.uint8)
+    faces = cv2.resize(faces, (width, height), interpolation=cv2.INTER_NEAREST)
+    color = PALETTE[faces]
+    
+    outline = np.full((height, width, 3), 255, dtype=np.uint8)
+    outline[1:][faces[1:] != faces[:-1]] = 0
+    outline[:, 1:][faces[:, 1:] != faces[:, :-1]] = 0
+    del faces
+    
+    highlight = np.full((height, width, 3), 255, dtype=np.uint8)
+    radius = max(4, min(width, height) // 40)
+    blobs = int(coverage * width * height / (np.pi * radius * radius))
+    for x, y in zip(rng.integers(0, width, blobs), rng.integers(0, height, blobs)):
+        cv2.circle(highlight, (int(x), int(y)), radius, HIGHLIGHT_RGB, thickness=-1)
+    
+    return color, outline, highlight
+
+
+def measure(
+    run: Callable[..., object],
+    repeat: int,
+    setup: Optional[Callable[[], tuple]] = None
+) -> List[float]:
+    """
+    Замеряет время выполнения функции.
+    
+    Args:
+        run: Замеряемая функция
+        repeat: Количество повторов
+        setup: Подготовка аргументов для каждого повтора (не замеряется)
+    
+    Returns:
+        Время каждого повтора в секундах
+    """
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times: Sequence[float], pixels: int) -> Dict[str, float]:
+    """Сводит замеры к минимуму, медиане и пропускной способности."""
+    median = statistics.median(times)
+    return {
+        "min": min(times),
+        "median": median,
+        "mp_per_s": pixels / 1e6 / median,
+    }
+
+
+def qt_available() -> bool:
+    """
+    Создает QApplication для этапов, которым нужен Qt.
+    
+    Returns:
+        True если PyQt6 доступен
+    """
+    global _qt_app
+    
+    # Бенчмарк не показывает окон и должен работать без дисплея
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        return False
+    
+    _qt_app = QApplication.instance() or QApplication([])
+    return True
+
+
+def bench_size(
+    megapixels: int,
+    repeat: int,
+    coverage: float,
+    format_name: str,
+    cases: Optional[Sequence[str]]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Выполняет все этапы для одного размера.
+    
+    Args:
+        megapixels: Размер из SIZES
+        repeat: Количество повторов
+        coverage: Доля площади подсветки
+        format_name: Формат для save_image (PNG или JPEG)
+        cases: Этапы для запуска (None - все)
+    
+    Returns:
+        Статистика по этапам
+    """
+    width, height = SIZES[megapixels]
+    pixels = width * height
+    color, outline, highlight = make_xvl_triplet(width, height, coverage)
+    results: Dict[str, Dict[str, float]] = {}
+    
+    def run_case(name: str, run, setup=None, case_pixels: int = pixels) -> None:
+        if cases and name not in cases:
+            return
+        results[name] = summarize(measure(run, repeat, setup), case_pixels)
+        print(f"  {name:<28} {results[name]['median'] * 1000:10.1f} мс "
+              f"({results[name]['mp_per_s']:.1f} MP/с)", flush=True)
+    
+    run_case("apply_highlight", lambda: ImageProcessor.apply_highlight(color, highlight, "RGB"))
+    run_case("apply_outline", lambda: ImageProcessor.apply_outline(color, outline, "RGB"))
+    run_case(
+        "process_images",
+        lambda: ImageProcessor.process_images(color, outline, highlight, "RGB")
+    )
+    result = ImageProcessor.process_images(color, outline, highlight, "RGB")
+    
+    if not cases or "process_batch" in cases:
+        # Стопка одинаковых видов, как в экспорте одной модели
+        count = max(1, BATCH_MEGAPIXELS // megapixels)
+        stacks = [np.broadcast_to(layer, (count, *layer.shape)).copy() for layer in (color, outline, highlight)]
+        run_case(
+            "process_batch",
+            lambda: ImageProcessor.process_batch(*stacks, "RGB"),
+            case_pixels=count * pixels
+        )
+        del stacks
+    
+    with tempfile.TemporaryDirectory(prefix="image_merger_bench_") as tmp:
+        tmp_dir = Path(tmp)
+        layers = {"color": color, "outline": outline, "highlight": highlight}
+        paths = {}
+        for kind, layer in layers.items():
+            paths[kind] = tmp_dir / f"view_{kind}.png"
+            Image.fromarray(layer).save(paths[kind], compress_level=1)
+        
+        def load_triplet() -> None:
+            manager = ImageManager()
+            for kind, path in paths.items():
+                if not manager.load_image(kind, path):
+                    raise OSError(f"Не удалось загрузить файл: {path}")
+        
+        run_case("ImageManager.load_image", load_triplet)
+        
+        if qt_available():
+            from PyQt6 import QtWidgets
+            from src.core.file_manager import FileManager
+            from src.ui.preview_widget import PreviewWidget
+            
+            def new_preview() -> tuple:
+                # Новое изображение и виджет: пирамида и кэш pixmap холодные
+                view = QtWidgets.QGraphicsView()
+                view.resize(*PREVIEW_SIZE)
+                return PreviewWidget(view), result.copy()
+            
+            run_case("PreviewWidget.show_image", lambda widget, image: widget.show_image(image), new_preview)
+            
+            suffix = ".png" if format_name == "PNG" else ".jpg"
+            file_manager = FileManager(None)
+            run_case(
+                "FileManager.save_image",
+                lambda: file_manager.save_image(result, tmp_dir / f"result{suffix}", format_name)
+            )
+        else:
+            print("  PyQt6 недоступен: show_image и save_image пропущены")
+    
+    return results
+
+
+def environment() -> Dict[str, str]:
+    """Описывает окружение, в котором получены результаты."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpu_count": str(os.cpu_count()),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(
+    current: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    tolerance: float
+) -> int:
+    """
+    Сравнивает медианы с базовым запуском.
+    
+    Args:
+        current: Текущие результаты по размерам и этапам
+        baseline: Базовые результаты в том же формате
+        tolerance: Допустимое замедление (0.1 - на 10%)
+    
+    Returns:
+        Количество регрессий
+    """
+    regressions = 0
+    print(f"\nСравнение с базой (допуск {tolerance:.0%}):")
+    for size, cases in current.items():
+        for name, stats in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            ratio = stats["median"] / base["median"]
+            mark = ""
+            if ratio > 1 + tolerance:
+                regressions += 1
+                mark = "  РЕГРЕССИЯ"
+            print(f"  {size:>6} {name:<28} {base['median'] * 1000:10.1f} -> "
+                  f"{stats['median'] * 1000:10.1f} мс ({ratio:.2f}x){mark}")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--sizes", default=",".join(str(mp) for mp in SIZES),
+        help=f"Размеры в мегапикселях через запятую из {sorted(SIZES)}"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов")
+    parser.add_argument("--coverage", type=float, default=0.05, help="Доля площади подсветки")
+    parser.add_argument(
+        "-f", "--format", choices=("JPEG", "PNG"), default="JPEG",
+        type=str.upper, help="Формат для save_image"
+    )
+    parser.add_argument("--cases", help="Этапы через запятую (по умолчанию - все)")
+    parser.add_argument("-o", "--output", type=Path, help="Файл JSON для результатов")
+    parser.add_argument("--baseline", type=Path, help="Файл JSON прежнего запуска для сравнения")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.10,
+        help="Допустимое замедление медианы относительно базы"
+    )
+    args = parser.parse_args(argv)
+    
+    try:
+        sizes = [int(mp) for mp in args.sizes.split(",")]
+    except ValueError:
+        parser.error("--sizes: ожидаются целые числа через запятую")
+    unknown = [mp for mp in sizes if mp not in SIZES]
+    if unknown:
+        parser.error(f"--sizes: нет размеров {unknown}, доступны {sorted(SIZES)}")
+    cases = args.cases.split(",") if args.cases else None
+    
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for mp in sizes:
+        width, height = SIZES[mp]
+        print(f"{mp} MP ({width}x{height}), медиана из {args.repeat}:", flush=True)
+        results[f"{mp}MP"] = bench_size(mp, args.repeat, args.coverage, args.format, cases)
+    
+    report = {
+        "environment": environment(),
+        "settings": {"repeat": args.repeat, "coverage": args.coverage, "format": args.format},
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nРезультаты записаны в {args.output}")
+    
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if compare(results, baseline["results"], args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
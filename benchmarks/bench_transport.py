@@ -0,0 +1,106 @@
+"""Сравнение передачи слоев в процесс-исполнитель: pickle и общая память.
+
+Для синтетической тройки замеряет объединение в этом процессе, в
+процессе-исполнителе с передачей массивов через pickle (три слоя туда,
+результат обратно) и через SharedFrames (копия в общую память, в
+исполнитель передаются только описания сегментов). С --workers больше 1
+объединение через общую память делится на части между процессами.
+
+Пример запуска:
+    python benchmarks/bench_transport.py --sizes 12,50 --repeat 5
+    python benchmarks/bench_transport.py --sizes 12 --workers 4 -o transport.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from bench_suite import SIZES, make_xvl_triplet, measure
+from src.core.image_processor import ImageProcessor
+from src.core.parallel_merger import ParallelMerger
+from src.core.shared_frames import SharedFrames
+
+
+def bench_size(megapixels: int, workers: int, repeat: int) -> Dict[str, float]:
+    """
+    Замеряет три способа объединения тройки одного размера.
+    
+    Args:
+        megapixels: Размер тройки (ключ SIZES из bench_suite)
+        workers: Количество процессов для общей памяти
+        repeat: Количество повторов
+    
+    Returns:
+        Медианы в секундах по способам
+    """
+    color, outline, highlight = make_xvl_triplet(*SIZES[megapixels])
+    layers = {'color': color, 'outline': outline, 'highlight': highlight}
+    
+    def shared_merge(executor: ProcessPoolExecutor) -> None:
+        with SharedFrames() as shared:
+            frames = {kind: shared.share(array) for kind, array in layers.items()}
+            ParallelMerger.merge_shared(shared, frames, executor, workers)
+    
+    results = {
+        "local": measure(lambda: ImageProcessor.process_images(color, outline, highlight, "RGB"), repeat)
+    }
+    SharedFrames.prepare()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Прогрев процессов и реализаций обработки
+        executor.submit(ImageProcessor.process_images, color, outline, highlight, "RGB").result()
+        shared_merge(executor)
+        
+        results["pickle"] = measure(
+            lambda: executor.submit(
+                ImageProcessor.process_images, color, outline, highlight, "RGB"
+            ).result(),
+            repeat
+        )
+        results["shared"] = measure(lambda: shared_merge(executor), repeat)
+    return {name: statistics.median(times) for name, times in results.items()}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция замера."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="12", help="Размеры троек в MP через запятую (1, 12, 50)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Количество процессов")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество повторов")
+    parser.add_argument("-o", "--output", type=Path, help="Файл JSON для результатов")
+    args = parser.parse_args(argv)
+    
+    report = {}
+    for megapixels in (int(size) for size in args.sizes.split(",")):
+        medians = bench_size(megapixels, args.workers, args.repeat)
+        report[megapixels] = medians
+        frame_mb = SIZES[megapixels][0] * SIZES[megapixels][1] * 3 / 1e6
+        print(
+            f"{megapixels} MP (слой {frame_mb:.0f} МБ): в процессе {medians['local'] * 1000:.0f} мс, "
+            f"pickle {medians['pickle'] * 1000:.0f} мс, "
+            f"общая память {medians['shared'] * 1000:.0f} мс"
+        )
+    
+    if args.output:
+        args.output.write_text(json.dumps({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "medians": report,
+        }, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,675 @@
+"""Пакетная обработка каталогов изображений без графического интерфейса.
+
+Пример запуска:
+    python -m src.batch exports/ -o merged/ --workers 8 --format PNG
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.backends import Backends
+from src.core.banded_merger import BandedMerger
+from src.core.encoded_merger import EncodedMerger, MergeResult
+from src.core.export_profile import ExportProfile, ProfileExporter
+from src.core.image_manager import ImageManager
+from src.core.image_writer import ImageWriter
+from src.core.naming import NamingRule
+from src.core.parallel_merger import ParallelMerger
+from src.core.result_cache import ResultCache
+from src.core.shared_frames import SharedFrames
+from src.core.triplet_index import Triplet, TripletIndex
+from src.utils.constants import (
+    BACKEND_DEFAULT,
+    BACKEND_ENV_VAR,
+    EXPORT_LEVELS,
+    IMAGE_KINDS,
+    PIPELINE_DEPTH,
+    PIPELINE_IO_THREADS,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_BYTES
+)
+from src.utils.content_hash import hash_bytes, hash_file
+from src.utils.tracing import Tracer
+
+
+class MergeStats(NamedTuple):
+    """Результат обработки одной тройки."""
+    
+    output: Path
+    pixels: int
+    seconds: float
+    cached: bool = False
+    bytes_saved: int = 0
+    trace_events: Optional[List[dict]] = None
+    stages: Optional[Dict[str, float]] = None
+
+
+# Этапы конвейера в порядке выполнения и их названия в сводке
+PIPELINE_STAGES = {
+    'read': "чтение",
+    'decode': "декодирование",
+    'merge': "объединение",
+    'encode': "кодирование",
+    'write': "запись",
+}
+
+
+def _warm_up() -> None:
+    """Ничего не делает: запускает процесс-исполнитель заранее."""
+
+
+def start_workers(
+    executor: ProcessPoolExecutor,
+    workers: int,
+    task: Callable[[], None] = _warm_up
+) -> None:
+    """
+    Запускает процессы пула и дожидается их старта.
+    
+    Вызывается из главного потока до создания других потоков. Иначе
+    процессы создаются (fork) при первом submit из потока конвейера или
+    ParallelMerger, и если в этот момент другой поток держит блокировку
+    (например, импорта модулей PIL в Image.open), в исполнителе она
+    остается захваченной навсегда, и он зависает.
+    
+    Args:
+        executor: Пул процессов
+        workers: Количество процессов в пуле
+        task: Функция, отправляемая в пул workers раз (по умолчанию -
+            ничего не делает)
+    """
+    wait([executor.submit(task) for _ in range(workers)])
+
+
+def find_triplets(root: Path, rule: NamingRule, exclude: Optional[Path] = None) -> List[Triplet]:
+    """
+    Находит тройки изображений в дереве каталогов.
+    
+    Args:
+        root: Корневой каталог для поиска
+        rule: Правило именования файлов
+        exclude: Каталог, который нужно пропустить (например, выходной)
+    
+    Returns:
+        Список троек, отсортированный по имени
+    """
+    index = TripletIndex(root, rule, exclude)
+    index.refresh()
+    return list(index)
+
+
+def merge_triplet(
+    triplet: Triplet,
+    output: Path,
+    format_name: str,
+    banded: bool = False,
+    cache_dir: Optional[Path] = None,
+    cache_link: bool = False,
+    trace: bool = False,
+    profile: Optional[ExportProfile] = None,
+    split: Optional[Tuple[Executor, int]] = None
+) -> MergeStats:
+    """
+    Объединяет одну тройку и сохраняет результат.
+    
+    Выполняется в процессе-исполнителе, поэтому не должна зависеть от Qt.
+    Большие изображения (и все при banded=True) обрабатываются полосами,
+    если каждый слой тройки можно читать полосами (PNG, см. BandedMerger).
+    С split функция выполняется в родительском процессе, а тройка
+    объединяется частями в пуле процессов (ParallelMerger).
+    Если задан cache_dir, результат с теми же входами и настройками
+    выдается из кэша результатов без декодирования и обработки. С
+    профилем экспорта все файлы профиля пишутся из одного результата;
+    из кэша они выдаются, только если там есть каждый из них.
+    
+    Args:
+        triplet: Тройка изображений
+        output: Путь для сохранения результата
+        format_name: Формат файла (PNG или JPEG)
+        banded: Всегда использовать полосовую обработку
+        cache_dir: Каталог кэша результатов (None - без кэша)
+        cache_link: Связывать результаты из кэша жесткими ссылками
+        trace: Записывать трассировку этапов и вернуть ее в статистике
+        profile: Профиль экспорта (None - только файл полного размера)
+        split: Пул процессов и сколько его процессов может занять
+            тройка (None - объединять в этом процессе)
+    
+    Returns:
+        Статистика обработки
+    
+    Raises:
+        OSError: Если изображение не удалось загрузить или сохранить
+    """
+    if trace:
+        # В процессе-исполнителе трассировка включается без файла:
+        # события передаются в родительский процесс вместе со статистикой.
+        # События, унаследованные от родителя при fork, отбрасываются
+        Tracer.enabled = True
+        Tracer.drain()
+        with Tracer.span("batch.triplet", triplet=triplet.name):
+            stats = merge_triplet(
+                triplet, output, format_name, banded, cache_dir, cache_link, profile=profile
+            )
+        return stats._replace(trace_events=Tracer.drain())
+    
+    start = time.perf_counter()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    paths = profile.paths(output) if profile is not None else [output]
+
+    cache = None
+    keys: List[Optional[str]] = []
+    if cache_dir is not None:
+        # Лимит объема соблюдает родительский процесс после пакета
+        cache = ResultCache(cache_dir, link=cache_link)
+        hashes = {kind: hash_file(path) for kind, path in triplet.paths.items()}
+        variants = profile.variants() if profile is not None else [None]
+        keys = [ResultCache.make_key(hashes, format_name, variant=variant) for variant in variants]
+        if all(cache.fetch(key, path) for key, path in zip(keys, paths)):
+            width, height = BandedMerger.image_size(triplet.paths['color'])
+            return MergeStats(
+                output, width * height, time.perf_counter() - start,
+                cached=True, bytes_saved=cache.bytes_saved
+            )
+    
+    # Прежний результат мог быть жесткой ссылкой на запись кэша (--cache-link),
+    # поэтому файл заменяется, а не перезаписывается на месте
+    for path in paths:
+        path.unlink(missing_ok=True)
+    stats = _merge_uncached(triplet, output, format_name, banded, start, profile, split)
+    if cache is not None:
+        for key, path in zip(keys, paths):
+            cache.store(key, path)
+    return stats
+
+
+def _merge_uncached(
+    triplet: Triplet,
+    output: Path,
+    format_name: str,
+    banded: bool,
+    start: float,
+    profile: Optional[ExportProfile] = None,
+    split: Optional[Tuple[Executor, int]] = None
+) -> MergeStats:
+    """Объединяет тройку без кэша результатов (см. merge_triplet)."""
+    use_banded = banded or BandedMerger.should_use(triplet.paths['color'])
+    if use_banded and BandedMerger.can_stream(triplet.paths):
+        if profile is None:
+            width, height = BandedMerger.merge_to_file(triplet.paths, output, format_name)
+        else:
+            with BandedMerger.merge_to_image(triplet.paths) as image:
+                ProfileExporter.export(image, profile.paths(output), format_name, profile)
+                width, height = image.size
+        return MergeStats(output, width * height, time.perf_counter() - start)
+    
+    if split is not None:
+        executor, share = split
+        with ParallelMerger.merge(triplet.paths, executor, share) as result:
+            if profile is None:
+                ImageWriter.save(result, output, format_name)
+            else:
+                ProfileExporter.export(result, profile.paths(output), format_name, profile)
+            height, width = result.shape[:2]
+        return MergeStats(output, width * height, time.perf_counter() - start)
+
+    manager = ImageManager()
+    for kind, path in triplet.paths.items():
+        if not manager.load_image(kind, path):
+            raise OSError(f"Не удалось загрузить файл: {path}")
+    
+    result = manager.process_images()
+    if profile is None:
+        ImageWriter.save(result, output, format_name)
+    else:
+        ProfileExporter.export(result, profile.paths(output), format_name, profile)
+    
+    height, width = result.shape[:2]
+    return MergeStats(output, width * height, time.perf_counter() - start)
+
+
+class BatchPipeline:
+    """
+    Конвейер пакетной обработки с перекрытием чтения, обработки и записи.
+    
+    Файлы тройки читаются (и ищутся в кэше результатов) в потоках
+    ввода-вывода, декодирование, объединение и кодирование выполняются в
+    пуле процессов (EncodedMerger), результат записывается снова в
+    потоках. Пока процессы обрабатывают одни тройки, следующие уже
+    читаются, а готовые записываются, поэтому на медленных дисках общее
+    время стремится ко времени самого медленного этапа, а не к сумме
+    этапов. Троек между началом чтения и концом записи не больше depth
+    на процесс: прочитанные заранее и ждущие записи результаты не
+    накапливаются в памяти без предела.
+    
+    Тройки, которым нужна полосовая обработка, целиком выполняет
+    merge_triplet в пуле процессов: они читаются по частям.
+    """
+    
+    def __init__(
+        self,
+        executor: Executor,
+        workers: int,
+        format_name: str,
+        cache: Optional[ResultCache] = None,
+        trace: bool = False,
+        io_threads: int = PIPELINE_IO_THREADS,
+        depth: int = PIPELINE_DEPTH
+    ):
+        """
+        Инициализация конвейера.
+        
+        Args:
+            executor: Пул процессов для обработки
+            workers: Количество процессов в пуле
+            format_name: Формат файла (PNG или JPEG)
+            cache: Кэш результатов (None - без кэша)
+            trace: Записывать трассировку этапов в процессах
+            io_threads: Количество потоков чтения и потоков записи
+            depth: Сколько троек на процесс может находиться в конвейере
+        """
+        self._executor = executor
+        self._format_name = format_name
+        self._cache_dir = cache.root if cache is not None else None
+        self._cache_link = cache.link if cache is not None else False
+        self._trace = trace
+        self._readers = ThreadPoolExecutor(io_threads, thread_name_prefix="batch-read")
+        self._writers = ThreadPoolExecutor(io_threads, thread_name_prefix="batch-write")
+        self._limit = max(1, workers * depth)
+        self._lock = threading.Lock()
+        self._pending: Deque[Tuple[Triplet, Path, Future]] = deque()
+        self._in_flight = 0
+        self.stage_seconds: Dict[str, float] = dict.fromkeys(PIPELINE_STAGES, 0.0)
+    
+    def submit(self, triplet: Triplet, output: Path) -> Future:
+        """
+        Ставит тройку в конвейер.
+        
+        Args:
+            triplet: Тройка изображений
+            output: Путь для сохранения результата
+        
+        Returns:
+            Future со статистикой обработки (MergeStats)
+        """
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((triplet, output, future))
+        self._start_pending()
+        return future
+    
+    def close(self) -> None:
+        """Завершает потоки чтения и записи."""
+        self._readers.shutdown()
+        self._writers.shutdown()
+    
+    def _start_pending(self) -> None:
+        """Начинает чтение ожидающих троек, пока в конвейере есть место."""
+        started = []
+        with self._lock:
+            while self._in_flight < self._limit and self._pending:
+                started.append(self._pending.popleft())
+                self._in_flight += 1
+        for triplet, output, future in started:
+            self._readers.submit(self._read, triplet, output, future)
+    
+    def _finish(
+        self,
+        future: Future,
+        stats: Optional[MergeStats] = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Завершает тройку и освобождает ее место в конвейере."""
+        with self._lock:
+            self._in_flight -= 1
+            if stats is not None and stats.stages:
+                for name, seconds in stats.stages.items():
+                    self.stage_seconds[name] += seconds
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(stats)
+        self._start_pending()
+    
+    def _read(self, triplet: Triplet, output: Path, future: Future) -> None:
+        """Этап чтения: читает файлы тройки или выдает результат из кэша."""
+        try:
+            if BandedMerger.should_use(triplet.paths['color']) and BandedMerger.can_stream(triplet.paths):
+                job = self._executor.submit(
+                    merge_triplet, triplet, output, self._format_name, False,
+                    self._cache_dir, self._cache_link, self._trace
+                )
+                job.add_done_callback(lambda done: self._finish(future, *self._outcome(done)))
+                return
+            
+            start = time.perf_counter()
+            with Tracer.span("pipeline.read", triplet=triplet.name) as span:
+                data = {kind: path.read_bytes() for kind, path in triplet.paths.items()}
+                span.set(bytes=sum(len(content) for content in data.values()))
+            
+            key = None
+            if self._cache_dir is not None:
+                cache = ResultCache(self._cache_dir, link=self._cache_link)
+                hashes = {kind: hash_bytes(content) for kind, content in data.items()}
+                key = ResultCache.make_key(hashes, self._format_name)
+                if cache.fetch(key, output):
+                    width, height = BandedMerger.image_size(triplet.paths['color'])
+                    seconds = time.perf_counter() - start
+                    self._finish(future, MergeStats(
+                        output, width * height, seconds, cached=True,
+                        bytes_saved=cache.bytes_saved, stages={'read': seconds}
+                    ))
+                    return
+            read = time.perf_counter() - start
+            
+            job = self._executor.submit(
+                EncodedMerger.merge, data, self._format_name, None, None, self._trace
+            )
+            job.add_done_callback(
+                lambda done: self._writers.submit(self._write, output, key, read, done, future)
+            )
+        except Exception as e:
+            self._finish(future, error=e)
+    
+    def _write(self, output: Path, key: Optional[str], read: float, job: Future, future: Future) -> None:
+        """Этап записи: сохраняет закодированный результат и помещает его в кэш."""
+        try:
+            result: MergeResult = job.result()
+            start = time.perf_counter()
+            with Tracer.span("pipeline.write", bytes=len(result.body)):
+                output.parent.mkdir(parents=True, exist_ok=True)
+                # Прежний результат мог быть жесткой ссылкой на запись кэша
+                # (--cache-link), поэтому файл заменяется, а не перезаписывается
+                with ImageWriter.atomic_target(output) as tmp:
+                    tmp.write_bytes(result.body)
+                if key is not None:
+                    ResultCache(self._cache_dir, link=self._cache_link).store(key, output)
+            
+            stages = {
+                'read': read,
+                **{name: result.timings[name] / 1000 for name in ('decode', 'merge', 'encode')},
+                'write': time.perf_counter() - start,
+            }
+            width, height = result.size
+            self._finish(future, MergeStats(
+                output, width * height, sum(stages.values()),
+                trace_events=result.trace_events, stages=stages
+            ))
+        except Exception as e:
+            self._finish(future, error=e)
+    
+    @staticmethod
+    def _outcome(job: Future) -> Tuple[Optional[MergeStats], Optional[BaseException]]:
+        """Возвращает результат или исключение завершенной задачи."""
+        error = job.exception()
+        return (None, error) if error is not None else (job.result(), None)
+
+
+def run_batch(
+    triplets: Sequence[Triplet],
+    output_dir: Path,
+    format_name: str,
+    workers: Optional[int] = None,
+    banded: bool = False,
+    cache: Optional[ResultCache] = None,
+    profile: Optional[ExportProfile] = None,
+    pipeline: bool = True,
+    io_threads: int = PIPELINE_IO_THREADS
+) -> int:
+    """
+    Обрабатывает тройки в пуле процессов и печатает пропускную способность.
+    
+    По умолчанию тройки проходят через BatchPipeline: чтение и запись
+    файлов перекрываются с обработкой. С профилем экспорта, при
+    banded=True или pipeline=False каждая тройка целиком обрабатывается
+    в процессе (merge_triplet). Если троек меньше, чем процессов, каждая
+    тройка объединяется частями в нескольких процессах (ParallelMerger).
+    
+    Args:
+        triplets: Тройки для обработки
+        output_dir: Каталог для результатов
+        format_name: Формат файла (PNG или JPEG)
+        workers: Количество процессов (по умолчанию - число ядер)
+        banded: Всегда использовать полосовую обработку
+        cache: Кэш результатов (None - без кэша)
+        profile: Профиль экспорта (None - только файл полного размера)
+        pipeline: Перекрывать чтение и запись с обработкой
+        io_threads: Количество потоков чтения и потоков записи конвейера
+    
+    Returns:
+        Количество троек, которые не удалось обработать
+    """
+    suffix = '.png' if format_name == 'PNG' else '.jpg'
+    failed = 0
+    total_pixels = 0
+    hits = bytes_saved = 0
+    start = time.perf_counter()
+    cache_dir = cache.root if cache is not None else None
+    cache_link = cache.link if cache is not None else False
+    
+    batch_pipeline = None
+    worker_count = workers or os.cpu_count() or 1
+    share = worker_count // max(1, len(triplets))
+    splitter = None
+    if share > 1 and not banded:
+        SharedFrames.prepare()
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if share > 1 and not banded:
+            # Процессов больше, чем троек: тройки объединяются частями,
+            # а декодирование и запись выполняются в потоках этого процесса
+            start_workers(executor, worker_count)
+            splitter = ThreadPoolExecutor(max_workers=len(triplets))
+        elif pipeline and profile is None and not banded:
+            start_workers(executor, worker_count)
+            batch_pipeline = BatchPipeline(
+                executor, worker_count, format_name, cache, Tracer.enabled, io_threads
+            )
+        
+        def submit(triplet: Triplet) -> Future:
+            output = output_dir / f"{triplet.name}{suffix}"
+            if splitter is not None:
+                # Трассировка уже включена в этом процессе
+                return splitter.submit(
+                    merge_triplet, triplet, output, format_name, banded, cache_dir,
+                    cache_link, False, profile, (executor, share)
+                )
+            if batch_pipeline is not None:
+                return batch_pipeline.submit(triplet, output)
+            return executor.submit(
+                merge_triplet,
+                triplet,
+                output,
+                format_name,
+                banded,
+                cache_dir,
+                cache_link,
+                Tracer.enabled,
+                profile
+            )
+        
+        futures = {submit(triplet): triplet for triplet in triplets}
+        for future in as_completed(futures):
+            triplet = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"ОШИБКА {triplet.name}: {e}", file=sys.stderr)
+                continue
+            
+            if stats.trace_events:
+                Tracer.extend(stats.trace_events)
+            total_pixels += stats.pixels
+            megapixels = stats.pixels / 1e6
+            source = " [кэш]" if stats.cached else ""
+            hits += stats.cached
+            bytes_saved += stats.bytes_saved
+            print(
+                f"{triplet.name}: {megapixels:.1f} MP за {stats.seconds:.2f} с "
+                f"({megapixels / stats.seconds:.1f} MP/с){source}"
+            )
+    if splitter is not None:
+        splitter.shutdown()
+    if batch_pipeline is not None:
+        batch_pipeline.close()
+    
+    elapsed = time.perf_counter() - start
+    done = len(triplets) - failed
+    print(
+        f"Итого: {done} из {len(triplets)} файлов за {elapsed:.2f} с, "
+        f"{done / elapsed:.2f} файл/с, {total_pixels / 1e6 / elapsed:.1f} MP/с"
+    )
+    if batch_pipeline is not None:
+        print("Этапы (сумма по тройкам): " + ", ".join(
+            f"{title} {batch_pipeline.stage_seconds[name]:.2f} с"
+            for name, title in PIPELINE_STAGES.items()
+        ))
+    if cache is not None:
+        print(ResultCache.format_report(hits, done - hits, bytes_saved))
+        cache.evict()
+    return failed
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    
+    Args:
+        argv: Аргументы (по умолчанию - sys.argv)
+    
+    Returns:
+        Разобранные аргументы
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="Пакетное объединение изображений из Corel XVL"
+    )
+    parser.add_argument("input", type=Path, help="Каталог с исходными изображениями")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Каталог для результатов")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count(),
+        help="Количество процессов (по умолчанию - число ядер)"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=("JPEG", "PNG"), default="JPEG",
+        type=str.upper, help="Формат результата"
+    )
+    parser.add_argument(
+        "--banded", action="store_true",
+        help="Обрабатывать полосами все изображения, а не только большие"
+    )
+    parser.add_argument(
+        "--io-threads", type=int, default=PIPELINE_IO_THREADS, metavar="N",
+        help="Количество потоков чтения и потоков записи файлов"
+    )
+    parser.add_argument(
+        "--no-pipeline", action="store_true",
+        help="Читать, обрабатывать и записывать каждую тройку последовательно в одном процессе"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Записывать также уменьшенные копии (профиль экспорта: "
+             + ", ".join(f"{suffix} {side}px" for suffix, side in EXPORT_LEVELS if side) + ")"
+    )
+    parser.add_argument(
+        "--pyramid", action="store_true",
+        help="Записывать также тайловый пирамидальный TIFF (.tif) для просмотра с масштабированием"
+    )
+    parser.add_argument(
+        "--cache", type=Path, nargs="?", const=RESULT_CACHE_DIR, metavar="DIR",
+        help=f"Кэш готовых результатов (по умолчанию {RESULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=RESULT_CACHE_BYTES // 1024 // 1024, metavar="MB",
+        help="Максимальный объем кэша результатов в мегабайтах"
+    )
+    parser.add_argument(
+        "--cache-link", action="store_true",
+        help="Выдавать результаты из кэша жесткими ссылками вместо копий"
+    )
+    parser.add_argument(
+        "--no-index", action="store_true",
+        help="Не сохранять индекс файлов между запусками (обходить дерево целиком)"
+    )
+    parser.add_argument(
+        "--trace", type=Path, metavar="FILE",
+        help="Записать трассировку этапов в FILE (Chrome trace JSON) и напечатать сводку"
+    )
+    parser.add_argument(
+        "--backend", choices=("auto", *Backends.REGISTRY),
+        help=f"Реализация обработки (по умолчанию auto - самая быстрая по замеру); "
+             f"то же задает переменная {BACKEND_ENV_VAR}"
+    )
+    parser.add_argument(
+        "--calibrate", action="store_true",
+        help=f"Замерить реализации перед началом работы и сохранить выбор для auto "
+             f"(без замера auto использует {BACKEND_DEFAULT})"
+    )
+    for kind in IMAGE_KINDS:
+        parser.add_argument(
+            f"--{kind}", metavar="PATTERN",
+            help=f"Шаблон имени файла {kind} без расширения, например {{name}}_{kind}"
+        )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция пакетной обработки."""
+    args = parse_args(argv)
+    Tracer.enable_from_env()
+    if args.trace:
+        Tracer.enable(args.trace)
+    if args.backend:
+        Backends.configure(args.backend)
+    
+    patterns = {kind: getattr(args, kind) for kind in IMAGE_KINDS if getattr(args, kind)}
+    try:
+        rule = NamingRule(patterns)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    
+    if args.no_index:
+        triplets = find_triplets(args.input, rule, exclude=args.output)
+    else:
+        # Повторный запуск перечитывает только изменившиеся каталоги
+        triplets = list(TripletIndex.open(args.input, rule, exclude=args.output))
+    complete = [t for t in triplets if t.is_complete()]
+    for triplet in triplets:
+        if not triplet.is_complete():
+            print(f"ПРОПУЩЕНО {triplet.name}: нет color или outline", file=sys.stderr)
+    
+    if not complete:
+        print("Не найдено ни одной тройки изображений", file=sys.stderr)
+        return 1
+    
+    cache = None
+    if args.cache is not None:
+        cache = ResultCache(args.cache, args.cache_size * 1024 * 1024, args.cache_link)
+    
+    # Замер выполняется здесь, процессы-исполнители берут выбор из файла
+    if args.calibrate:
+        Backends.calibrate()
+    print(f"Реализация обработки: {Backends.describe()}")
+    profile = ExportProfile.from_options(args.profile, args.pyramid)
+    failed = run_batch(
+        complete, args.output, args.format, args.workers, args.banded, cache, profile,
+        pipeline=not args.no_pipeline, io_threads=args.io_threads
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,912 @@
+"""Сменные реализации этапов объединения с автоматическим выбором по замеру."""
+
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.utils.constants import (
+    BACKEND_CACHE_FILE,
+    BACKEND_CALIBRATION_IDLE,
+    BACKEND_DEFAULT,
+    BACKEND_ENV_VAR,
+    BACKEND_SIZE_CLASSES,
+    BACKEND_VERIFY_RANDOM_COLORS,
+    BLACK_THRESHOLD,
+    MERGE_BAND_BYTES,
+    RED_HSV_RANGES,
+    FADE_WEIGHT,
+    OUTLINE_DARKEN_FACTOR
+)
+from src.utils.tracing import Tracer
+
+ToneOp = Callable[[np.ndarray, np.ndarray], None]
+HsvRanges = Tuple[Tuple[Tuple[int, int, int], Tuple[int, int, int]], ...]
+
+# Коды преобразования цвета для поддерживаемых порядков каналов
+_HSV_CODES = {"BGR": cv2.COLOR_BGR2HSV, "RGB": cv2.COLOR_RGB2HSV}
+_GRAY_CODES = {"BGR": cv2.COLOR_BGR2GRAY, "RGB": cv2.COLOR_RGB2GRAY}
+_RGBA_CODES = {"BGR": cv2.COLOR_BGR2RGBA, "RGB": cv2.COLOR_RGB2RGBA}
+# Индексы каналов R, G, B
+_RGB_INDEX = {"BGR": (2, 1, 0), "RGB": (0, 1, 2)}
+
+# Рабочие буферы больше этого размера не сохраняются между вызовами
+_MAX_KEPT_BUFFER = 4 * MERGE_BAND_BYTES
+
+
+def _ranges_key(ranges: Sequence) -> HsvRanges:
+    """Приводит диапазоны HSV к хэшируемому виду."""
+    return tuple((tuple(lower), tuple(upper)) for lower, upper in ranges)
+
+
+@lru_cache(maxsize=None)
+def tone_tables(fade_weight: float, darken_factor: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Строит таблицы поиска для осветления фона и затемнения контура.
+    
+    Таблица осветления считается тем же cv2.addWeighted, что и в
+    ImageProcessor.apply_highlight, а таблица затемнения - тем же
+    выражением, что и в apply_outline. Таблицы определяют результат
+    для всех реализаций: реализации отличаются только способом их
+    применения.
+    
+    Args:
+        fade_weight: Вес смешивания с белым фоном
+        darken_factor: Коэффициент затемнения контура
+    
+    Returns:
+        Кортеж (таблица осветления, таблица затемнения) формы 1x256
+    """
+    ramp = np.arange(256, dtype=np.uint8).reshape(1, -1)
+    white = np.full_like(ramp, 255)
+    fade_lut = cv2.addWeighted(ramp, fade_weight, white, fade_weight, 0)
+    darken_lut = (ramp * darken_factor).astype(np.uint8)
+    return fade_lut, darken_lut
+
+
+def _table_op(lut: np.ndarray, alpha: float, beta: float) -> ToneOp:
+    """
+    Возвращает функцию применения таблицы поиска к изображению.
+    
+    cv2.LUT для трехканальных изображений не векторизован, поэтому, если
+    таблица совпадает с линейным преобразованием saturate(|x * alpha + beta|),
+    используется cv2.convertScaleAbs. Совпадение проверяется по всем 256
+    значениям, так что результат не меняется ни в одном байте.
+    
+    Args:
+        lut: Таблица поиска 1x256
+        alpha: Множитель линейного преобразования
+        beta: Сдвиг линейного преобразования
+    
+    Returns:
+        Функция (src, dst), записывающая результат в dst
+    """
+    # Несколько строк по 768 значений задействуют и векторный, и
+    # скалярный путь convertScaleAbs
+    ramp = np.tile(np.arange(256, dtype=np.uint8), (4, 3))
+    if np.array_equal(cv2.convertScaleAbs(ramp, alpha=alpha, beta=beta), lut.ravel()[ramp]):
+        return lambda src, dst: cv2.convertScaleAbs(src, dst, alpha, beta)
+    return lambda src, dst: cv2.LUT(src, lut, dst=dst)
+
+
+def _all_colors(start: int = 0, stop: int = 1 << 24) -> np.ndarray:
+    """
+    Создает изображение RGB из цветов с номерами [start, stop).
+    
+    Номер цвета - R | G << 8 | B << 16, строки по 4096 пикселей.
+    """
+    codes = np.arange(start, stop, dtype="<u4")
+    pixels = codes.view(np.uint8).reshape(-1, 4)[:, :3]
+    return np.ascontiguousarray(pixels).reshape(-1, 4096, 3)
+
+
+def _sample_colors(random_colors: int = BACKEND_VERIFY_RANDOM_COLORS) -> np.ndarray:
+    """
+    Создает изображение RGB из выборки цветов для сверки с эталоном.
+    
+    В выборку входят все цвета, в которых два канала равны (они дают
+    все пары максимума и размаха каналов, по которым берутся таблицы
+    обратных величин HSV), сетка с шагом 5 по каждому каналу и
+    random_colors случайных цветов с постоянным зерном.
+    """
+    a, b = (plane.ravel() for plane in np.meshgrid(np.arange(256), np.arange(256)))
+    pairs = [np.stack(channels, axis=1) for channels in ((a, a, b), (a, b, a), (b, a, a))]
+    levels = np.r_[0:256:5, 254]
+    grid = np.stack([plane.ravel() for plane in np.meshgrid(levels, levels, levels)], axis=1)
+    random = np.random.default_rng(0).integers(0, 256, (random_colors, 3))
+    colors = np.concatenate([*pairs, grid, random]).astype(np.uint8)
+    return colors.reshape(1, -1, 3)
+
+
+class MergeBackend:
+    """
+    Базовый класс реализации этапов объединения.
+    
+    Реализация строит маски подсветки и контура и применяет к полосе
+    изображения таблицы осветления и затемнения (tone_tables). Эталон -
+    OpenCVBackend, которым построены все прежние результаты; остальные
+    реализации либо совпадают с ним по построению (exact), либо
+    сверяются с ним на выборке цветов в verify() перед использованием.
+    """
+    
+    name = ""
+    # Совпадает с эталоном по построению, сверка не нужна
+    exact = False
+    
+    def __init__(self):
+        """Инициализация рабочих буферов потоков."""
+        self._local = threading.local()
+    
+    def highlight_mask(
+        self,
+        highlight: np.ndarray,
+        channel_order: str,
+        ranges: Sequence = RED_HSV_RANGES,
+        dst: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Строит маску красных областей изображения подсветки.
+        
+        Args:
+            highlight: Изображение подсветки
+            channel_order: Порядок каналов изображения (BGR или RGB)
+            ranges: Диапазоны HSV красного цвета (как в cv2.inRange)
+            dst: Буфер для маски (None - выделить новый)
+        
+        Returns:
+            Маска (255 - красная область, 0 - остальное)
+        """
+        raise NotImplementedError
+    
+    def outline_mask(
+        self,
+        outline: np.ndarray,
+        channel_order: str,
+        threshold: int = BLACK_THRESHOLD,
+        dst: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Строит маску черных линий изображения контура.
+        
+        Args:
+            outline: Изображение контура
+            channel_order: Порядок каналов изображения (BGR или RGB)
+            threshold: Наибольшая яркость линии контура
+            dst: Буфер для маски (None - выделить новый)
+        
+        Returns:
+            Маска (255 - линия контура, 0 - остальное)
+        """
+        raise NotImplementedError
+    
+    def tone_ops(
+        self,
+        fade_weight: float = FADE_WEIGHT,
+        darken_factor: float = OUTLINE_DARKEN_FACTOR
+    ) -> Tuple[ToneOp, ToneOp]:
+        """
+        Возвращает функции осветления фона и затемнения контура.
+        
+        Args:
+            fade_weight: Вес смешивания с белым фоном
+            darken_factor: Коэффициент затемнения контура
+        
+        Returns:
+            Кортеж функций (src, dst): осветление и затемнение
+        """
+        raise NotImplementedError
+    
+    def prepare(
+        self,
+        ranges: Sequence = RED_HSV_RANGES,
+        threshold: int = BLACK_THRESHOLD
+    ) -> None:
+        """
+        Заранее готовит реализацию к построению масок с этими параметрами.
+        
+        Args:
+            ranges: Диапазоны HSV красного цвета
+            threshold: Наибольшая яркость линии контура
+        """
+    
+    def verify(self) -> bool:
+        """
+        Проверяет совпадение масок с эталоном.
+        
+        Returns:
+            True если реализация дает те же результаты, что и эталон
+        """
+        return self.exact
+    
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Возвращает рабочий буфер потока формы shape (содержимое не определено)."""
+        size = int(np.prod(shape))
+        if size > _MAX_KEPT_BUFFER:
+            return np.empty(shape, dtype=np.uint8)
+        buffers = self._local.__dict__
+        buffer = buffers.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = buffers[name] = np.empty(size, dtype=np.uint8)
+        return buffer[:size].reshape(shape)
+
+
+class OpenCVBackend(MergeBackend):
+    """Эталонная реализация: преобразования цвета и cv2.inRange."""
+    
+    name = "opencv"
+    exact = True
+    
+    def highlight_mask(self, highlight, channel_order, ranges=RED_HSV_RANGES, dst=None):
+        hsv = cv2.cvtColor(highlight, _HSV_CODES[channel_order], dst=self._buffer("hsv", highlight.shape))
+        
+        red_mask = None
+        for lower, upper in ranges:
+            if red_mask is None:
+                red_mask = cv2.inRange(hsv, lower, upper, dst=dst)
+            else:
+                scratch = cv2.inRange(hsv, lower, upper, dst=self._buffer("range", hsv.shape[:2]))
+                cv2.bitwise_or(red_mask, scratch, dst=red_mask)
+        if red_mask is None:
+            red_mask = np.zeros(hsv.shape[:2], dtype=np.uint8) if dst is None else dst
+            red_mask[...] = 0
+        return red_mask
+    
+    def outline_mask(self, outline, channel_order, threshold=BLACK_THRESHOLD, dst=None):
+        gray = cv2.cvtColor(outline, _GRAY_CODES[channel_order], dst=self._buffer("gray", outline.shape[:2]))
+        return cv2.inRange(gray, 0, threshold, dst=dst)
+    
+    def tone_ops(self, fade_weight=FADE_WEIGHT, darken_factor=OUTLINE_DARKEN_FACTOR):
+        return self._linear_ops(fade_weight, darken_factor)
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _linear_ops(fade_weight: float, darken_factor: float) -> Tuple[ToneOp, ToneOp]:
+        """Строит функции тона через convertScaleAbs, где он совпадает с таблицей."""
+        fade_lut, darken_lut = tone_tables(fade_weight, darken_factor)
+        # Затемнение отбрасывает дробную часть, а convertScaleAbs округляет,
+        # поэтому сдвиг чуть меньше -0.5
+        return (
+            _table_op(fade_lut, fade_weight, 255 * fade_weight),
+            _table_op(darken_lut, darken_factor, -0.5 + 1 / 1024)
+        )
+
+
+class LutBackend(MergeBackend):
+    """
+    Реализация на таблицах поиска по 24-битному цвету.
+    
+    Маски строятся одним обращением к таблице на 2^24 значений (16 МБ),
+    которая заполняется эталонной реализацией для всех цветов, поэтому
+    результат совпадает с эталоном по построению. Выгодна на изображениях
+    с небольшим числом разных цветов, где обращения к таблице попадают в
+    кэш процессора.
+    
+    Таблица для новых параметров строится, только когда с ними обработано
+    не меньше 2^24 пикселей (или после prepare): до этого маски строит
+    эталон. Так частая смена параметров на маленьких изображениях не
+    тратит время на таблицы, которые не окупятся.
+    """
+    
+    name = "lut"
+    exact = True
+    
+    # Сколько таблиц хранится одновременно
+    MAX_TABLES = 4
+    
+    def __init__(self):
+        """Инициализация пустого набора таблиц."""
+        super().__init__()
+        self._reference = OpenCVBackend()
+        self._tables: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._pending_pixels: Dict[Tuple, int] = {}
+        self._tables_lock = threading.Lock()
+    
+    def highlight_mask(self, highlight, channel_order, ranges=RED_HSV_RANGES, dst=None):
+        key = ('highlight', _ranges_key(ranges))
+        table = self._table(key, highlight.shape[0] * highlight.shape[1])
+        if table is None:
+            return self._reference.highlight_mask(highlight, channel_order, ranges, dst)
+        return self._lookup(highlight, channel_order, table, dst)
+    
+    def outline_mask(self, outline, channel_order, threshold=BLACK_THRESHOLD, dst=None):
+        key = ('outline', int(threshold))
+        table = self._table(key, outline.shape[0] * outline.shape[1])
+        if table is None:
+            return self._reference.outline_mask(outline, channel_order, threshold, dst)
+        return self._lookup(outline, channel_order, table, dst)
+    
+    def prepare(self, ranges=RED_HSV_RANGES, threshold=BLACK_THRESHOLD):
+        self._table(('highlight', _ranges_key(ranges)), 1 << 24)
+        self._table(('outline', int(threshold)), 1 << 24)
+    
+    def tone_ops(self, fade_weight=FADE_WEIGHT, darken_factor=OUTLINE_DARKEN_FACTOR):
+        fade_lut, darken_lut = tone_tables(fade_weight, darken_factor)
+        return (
+            lambda src, dst: cv2.LUT(src, fade_lut, dst=dst),
+            lambda src, dst: cv2.LUT(src, darken_lut, dst=dst)
+        )
+    
+    def _lookup(
+        self,
+        image: np.ndarray,
+        channel_order: str,
+        table: np.ndarray,
+        dst: Optional[np.ndarray]
+    ) -> np.ndarray:
+        """Заменяет каждый пиксель значением таблицы по его 24-битному цвету."""
+        height, width = image.shape[:2]
+        rgba = cv2.cvtColor(
+            image, _RGBA_CODES[channel_order], dst=self._buffer("rgba", (height, width, 4))
+        )
+        # Байты R, G, B, A пикселя образуют число R | G << 8 | B << 16 | A << 24
+        codes = rgba.view("<u4").reshape(height, width)
+        np.bitwise_and(codes, 0xFFFFFF, out=codes)
+        if dst is None:
+            dst = np.empty((height, width), dtype=np.uint8)
+        return np.take(table, codes, out=dst, mode="clip")
+    
+    def _table(self, key: Tuple, pixels: int) -> Optional[np.ndarray]:
+        """Возвращает таблицу маски, если она построена или уже окупается."""
+        with self._tables_lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+    
+            processed = self._pending_pixels.get(key, 0) + pixels
+            if processed < 1 << 24:
+                self._pending_pixels[key] = processed
+                return None
+            self._pending_pixels.pop(key, None)
+            
+            kind, param = key
+            with Tracer.span("backend.lut_table", kind=kind):
+                colors = _all_colors()
+                if kind == 'highlight':
+                    table = self._reference.highlight_mask(colors, "RGB", param).ravel()
+                else:
+                    table = self._reference.outline_mask(colors, "RGB", param).ravel()
+            self._tables[key] = table
+            while len(self._tables) > self.MAX_TABLES:
+                self._tables.popitem(last=False)
+            return table
+
+
+class NumpyBackend(MergeBackend):
+    """
+    Переносимая реализация на целочисленной арифметике NumPy.
+    
+    Повторяет 8-битные преобразования OpenCV: HSV с делением через
+    таблицы обратных величин с 12 битами дробной части, яркость с
+    коэффициентами 9798, 19235, 3735 и 15 битами дробной части. Другие
+    сборки OpenCV могут считать иначе, поэтому перед использованием
+    реализация сверяется с эталоном на выборке цветов (verify).
+    """
+    
+    name = "numpy"
+    
+    _HSV_SHIFT = 12
+    _GRAY_SHIFT = 15
+    _GRAY_WEIGHTS = (9798, 19235, 3735)
+    
+    def __init__(self):
+        """Инициализация таблиц обратных величин для HSV."""
+        super().__init__()
+        values = np.arange(256, dtype=np.float64)
+        values[0] = 1
+        scale = 1 << self._HSV_SHIFT
+        self._sdiv = np.rint(255 * scale / values).astype(np.int32)
+        self._hdiv = np.rint(180 * scale / (6 * values)).astype(np.int32)
+        self._sdiv[0] = self._hdiv[0] = 0
+    
+    def hsv(self, image: np.ndarray, channel_order: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Переводит изображение в HSV так же, как cv2.cvtColor для 8 бит.
+        
+        Args:
+            image: Изображение
+            channel_order: Порядок каналов изображения (BGR или RGB)
+        
+        Returns:
+            Кортеж плоскостей (H, S, V) типа int32
+        """
+        r, g, b = (image[..., i].astype(np.int32) for i in _RGB_INDEX[channel_order])
+        v = np.maximum(np.maximum(r, g), b)
+        diff = v - np.minimum(np.minimum(r, g), b)
+        half = 1 << (self._HSV_SHIFT - 1)
+        
+        s = (diff * self._sdiv[v] + half) >> self._HSV_SHIFT
+        h = np.where(v == r, g - b, np.where(v == g, b - r + 2 * diff, r - g + 4 * diff))
+        h = (h * self._hdiv[diff] + half) >> self._HSV_SHIFT
+        h[h < 0] += 180
+        return h, s, v
+    
+    def gray(self, image: np.ndarray, channel_order: str) -> np.ndarray:
+        """
+        Переводит изображение в оттенки серого так же, как cv2.cvtColor для 8 бит.
+        
+        Args:
+            image: Изображение
+            channel_order: Порядок каналов изображения (BGR или RGB)
+        
+        Returns:
+            Яркость типа int32
+        """
+        weights = self._GRAY_WEIGHTS
+        r, g, b = (image[..., i] for i in _RGB_INDEX[channel_order])
+        total = r * np.int32(weights[0])
+        total += g * np.int32(weights[1])
+        total += b * np.int32(weights[2])
+        total += 1 << (self._GRAY_SHIFT - 1)
+        return total >> self._GRAY_SHIFT
+    
+    def highlight_mask(self, highlight, channel_order, ranges=RED_HSV_RANGES, dst=None):
+        planes = self.hsv(highlight, channel_order)
+        selected = np.zeros(highlight.shape[:2], dtype=bool)
+        for lower, upper in ranges:
+            inside = np.ones(highlight.shape[:2], dtype=bool)
+            for plane, low, high in zip(planes, lower, upper):
+                inside &= plane >= low
+                inside &= plane <= high
+            selected |= inside
+        return self._to_mask(selected, dst)
+    
+    def outline_mask(self, outline, channel_order, threshold=BLACK_THRESHOLD, dst=None):
+        return self._to_mask(self.gray(outline, channel_order) <= threshold, dst)
+    
+    def tone_ops(self, fade_weight=FADE_WEIGHT, darken_factor=OUTLINE_DARKEN_FACTOR):
+        fade_lut, darken_lut = (lut.ravel() for lut in tone_tables(fade_weight, darken_factor))
+        return (
+            lambda src, dst: np.take(fade_lut, src, out=dst),
+            lambda src, dst: np.take(darken_lut, src, out=dst)
+        )
+    
+    @staticmethod
+    def _to_mask(selected: np.ndarray, dst: Optional[np.ndarray]) -> np.ndarray:
+        """Переводит логическую маску в 0/255."""
+        if dst is None:
+            dst = np.empty(selected.shape, dtype=np.uint8)
+        np.multiply(selected, 255, out=dst, casting="unsafe")
+        return dst
+    
+    def verify(self) -> bool:
+        """
+        Сравнивает HSV и яркость с cv2.cvtColor на выборке цветов (_sample_colors).
+        
+        Совпадение преобразований цвета дает совпадение масок при любых
+        диапазонах и порогах. Выборка - около 4% всех цветов, но в нее
+        входят все пары максимума и размаха каналов, поэтому ошибка в
+        таблицах обратных величин не останется незамеченной.
+        
+        Returns:
+            True если все значения совпали
+        """
+        with Tracer.span("backend.verify", backend=self.name):
+            colors = _sample_colors()
+            expected_hsv = cv2.cvtColor(colors, cv2.COLOR_RGB2HSV)
+            for channel, plane in enumerate(self.hsv(colors, "RGB")):
+                if not np.array_equal(plane, expected_hsv[..., channel]):
+                    return False
+            return np.array_equal(self.gray(colors, "RGB"), cv2.cvtColor(colors, cv2.COLOR_RGB2GRAY))
+
+
+def _calibration_triplet(width: int, height: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Создает тройку RGB, похожую на экспорт Corel XVL, для замера реализаций.
+    
+    Грани залиты несколькими цветами, контур и подсветка нарисованы со
+    сглаживанием краев, как в настоящих рендерах: от числа разных цветов
+    зависит скорость табличной реализации.
+    """
+    rng = np.random.default_rng(0)
+    cell = max(16, min(width, height) // 24)
+    palette = rng.integers(40, 250, (8, 3), dtype=np.uint8)
+    faces = rng.integers(0, len(palette), (height // cell + 1, width // cell + 1), dtype=np.uint8)
+    faces = cv2.resize(faces, (width, height), interpolation=cv2.INTER_NEAREST)
+    color = cv2.GaussianBlur(palette[faces], (3, 3), 0)
+    
+    outline = np.full((height, width, 3), 255, dtype=np.uint8)
+    outline[1:][faces[1:] != faces[:-1]] = 0
+    outline[:, 1:][faces[:, 1:] != faces[:, :-1]] = 0
+    outline = cv2.GaussianBlur(outline, (3, 3), 0)
+    
+    highlight = np.full((height, width, 3), 255, dtype=np.uint8)
+    radius = max(4, min(width, height) // 40)
+    for x, y in zip(rng.integers(0, width, 40), rng.integers(0, height, 40)):
+        cv2.circle(highlight, (int(x), int(y)), radius, (230, 20, 20), -1, cv2.LINE_AA)
+    return color, outline, highlight
+
+
+class Backends:
+    """
+    Класс для выбора реализации этапов объединения.
+    
+    Реализацию можно задать явно (configure или переменная окружения
+    BACKEND_ENV_VAR: opencv, lut, numpy или auto). В режиме auto для
+    каждого класса размеров из BACKEND_SIZE_CLASSES используется самая
+    быстрая реализация по замеру (calibrate), совпадающая с эталоном.
+    Замер занимает секунды, поэтому при объединении он не выполняется:
+    пока его нет, используется BACKEND_DEFAULT, а сам замер запускают
+    явно (--calibrate в консольных режимах) или в фоне
+    (calibrate_in_background, графическое приложение; фоновый замер
+    уступает процессор объединениям, см. foreground). Выбор и
+    результаты сверки сохраняются в BACKEND_CACHE_FILE вместе с
+    описанием машины и версий библиотек и не используются, если они
+    изменились. Реализация, не прошедшая сверку, не используется даже
+    при явном выборе.
+    """
+    
+    # Увеличивается при изменении реализаций или способа замера
+    VERSION = 1
+    
+    REGISTRY = {
+        backend.name: backend for backend in (OpenCVBackend, LutBackend, NumpyBackend)
+    }
+    
+    _instances: Dict[str, MergeBackend] = {}
+    _verified: Dict[str, bool] = {}
+    _choice: Dict[str, str] = {}
+    _loaded = False
+    _warned = False
+    _lock = threading.RLock()
+    # Замер выполняется без _lock, чтобы не задерживать выбор реализации
+    _calibration_lock = threading.Lock()
+    _calibration_thread: Optional[threading.Thread] = None
+    # Идущие объединения (foreground): их число, сколько их начато и когда
+    # закончилось последнее
+    _activity = threading.Condition()
+    _foreground = 0
+    _foreground_started = 0
+    _foreground_ended = 0.0
+    
+    @staticmethod
+    def configure(name: str) -> None:
+        """
+        Задает реализацию для этого процесса и запускаемых им процессов.
+        
+        Args:
+            name: Имя реализации или auto
+        
+        Raises:
+            ValueError: Если реализация неизвестна
+        """
+        if name != "auto" and name not in Backends.REGISTRY:
+            raise ValueError(f"Неизвестная реализация обработки: {name}")
+        # Через окружение выбор наследуют процессы-исполнители
+        os.environ[BACKEND_ENV_VAR] = name
+    
+    @staticmethod
+    def get(name: str) -> MergeBackend:
+        """
+        Возвращает экземпляр реализации по имени.
+        
+        Args:
+            name: Имя реализации
+        
+        Returns:
+            Экземпляр реализации
+        """
+        with Backends._lock:
+            backend = Backends._instances.get(name)
+            if backend is None:
+                backend = Backends._instances[name] = Backends.REGISTRY[name]()
+            return backend
+    
+    @staticmethod
+    def size_class(pixels: int) -> str:
+        """
+        Определяет класс размеров изображения.
+        
+        Args:
+            pixels: Число пикселей изображения
+        
+        Returns:
+            Имя класса из BACKEND_SIZE_CLASSES
+        """
+        for name, max_pixels, _ in BACKEND_SIZE_CLASSES:
+            if max_pixels is None or pixels <= max_pixels:
+                return name
+        return BACKEND_SIZE_CLASSES[-1][0]
+    
+    @staticmethod
+    def for_pixels(pixels: int) -> MergeBackend:
+        """
+        Возвращает реализацию для изображения заданного размера.
+        
+        Args:
+            pixels: Число пикселей изображения
+        
+        Returns:
+            Заданная явно или самая быстрая на этой машине реализация;
+            BACKEND_DEFAULT, если замера еще нет
+        """
+        requested = Backends._requested()
+        if requested != "auto":
+            if requested in Backends.REGISTRY and Backends.is_verified(requested):
+                return Backends.get(requested)
+            Backends._warn(requested)
+        
+        size_class = Backends.size_class(pixels)
+        name = Backends._choice.get(size_class)
+        if name is None:
+            with Backends._lock:
+                Backends._load()
+                name = Backends._choice.get(size_class, BACKEND_DEFAULT)
+        return Backends.get(name)
+    
+    @staticmethod
+    def is_calibrated() -> bool:
+        """
+        Проверяет, есть ли замер для всех классов размеров.
+        
+        Returns:
+            True если выбор загружен из BACKEND_CACHE_FILE или замерен
+        """
+        with Backends._lock:
+            Backends._load()
+            return all(name in Backends._choice for name, _, _ in BACKEND_SIZE_CLASSES)
+    
+    @staticmethod
+    def is_verified(name: str) -> bool:
+        """
+        Проверяет (однократно), совпадает ли реализация с эталоном.
+        
+        Args:
+            name: Имя реализации
+        
+        Returns:
+            True если реализацию можно использовать
+        """
+        verdict = Backends._verified.get(name)
+        if verdict is not None:
+            return verdict
+        with Backends._lock:
+            Backends._load()
+            if name not in Backends._verified:
+                Backends._verified[name] = Backends.get(name).verify()
+                Backends._save()
+            return Backends._verified[name]
+    
+    @staticmethod
+    def describe() -> str:
+        """
+        Описывает текущий выбор реализаций (например, для вывода в консоль).
+        
+        Returns:
+            Имя реализации или строка вида "small: lut, large: opencv"
+            (с пометкой, если в режиме auto замера еще нет)
+        """
+        chosen = {
+            size_class: Backends.for_pixels(max_pixels or sys.maxsize).name
+            for size_class, max_pixels, _ in BACKEND_SIZE_CLASSES
+        }
+        if len(set(chosen.values())) == 1:
+            description = next(iter(chosen.values()))
+        else:
+            description = ", ".join(f"{size_class}: {name}" for size_class, name in chosen.items())
+        if Backends._requested() == "auto" and not Backends.is_calibrated():
+            description += " (замера нет, см. --calibrate)"
+        return description
+    
+    @staticmethod
+    @contextmanager
+    def foreground() -> Iterator[None]:
+        """
+        Отмечает объединение, которому фоновый замер уступает процессор.
+        
+        Пока идет объединение и еще BACKEND_CALIBRATION_IDLE секунд после
+        него фоновый замер не продолжается, а прерванный объединением
+        проход замера повторяется (иначе его время было бы завышено).
+        """
+        with Backends._activity:
+            Backends._foreground += 1
+            Backends._foreground_started += 1
+        try:
+            yield
+        finally:
+            with Backends._activity:
+                Backends._foreground -= 1
+                Backends._foreground_ended = time.monotonic()
+                Backends._activity.notify_all()
+    
+    @staticmethod
+    def calibrate(repeat: int = 3, background: bool = False) -> Dict[str, Dict[str, float]]:
+        """
+        Замеряет реализации на синтетических тройках каждого класса размеров.
+        
+        Замеряются только этапы, которые различаются между реализациями
+        (маски и тон), полосами того же размера, что и при объединении.
+        Выбор сохраняется в BACKEND_CACHE_FILE. Пока идет замер,
+        объединения используют прежний выбор (или BACKEND_DEFAULT).
+        
+        Args:
+            repeat: Количество повторов (берется лучшее время)
+            background: Уступать процессор объединениям (см. foreground)
+        
+        Returns:
+            Время в секундах по классам размеров и реализациям
+        """
+        timings: Dict[str, Dict[str, float]] = {}
+        with Backends._calibration_lock:
+            candidates = [name for name in Backends.REGISTRY if Backends.is_verified(name)]
+            for size_class, _, (width, height) in BACKEND_SIZE_CLASSES:
+                color, outline, highlight = _calibration_triplet(width, height)
+                timings[size_class] = {}
+                for name in candidates:
+                    with Tracer.span("backend.calibrate", backend=name, size_class=size_class):
+                        timings[size_class][name] = Backends._time_backend(
+                            Backends.get(name), color, outline, highlight, repeat, background
+                        )
+            with Backends._lock:
+                for size_class, times in timings.items():
+                    Backends._choice[size_class] = min(times, key=times.get)
+                Backends._save()
+        return timings
+    
+    @staticmethod
+    def calibrate_in_background() -> Optional[threading.Thread]:
+        """
+        Запускает замер в фоновом потоке, если выбор автоматический и замера еще нет.
+        
+        Замер идет между объединениями (см. foreground), поэтому не
+        замедляет первое объединение после запуска приложения. Повторный
+        вызов не запускает второй замер.
+        
+        Returns:
+            Поток замера или None, если замер не нужен
+        """
+        with Backends._lock:
+            if Backends._calibration_thread is not None:
+                return Backends._calibration_thread
+            if Backends._requested() != "auto" or Backends.is_calibrated():
+                return None
+            Backends._calibration_thread = threading.Thread(
+                target=Backends.calibrate, kwargs={"background": True},
+                name="backend-calibrate", daemon=True
+            )
+            Backends._calibration_thread.start()
+            return Backends._calibration_thread
+    
+    @staticmethod
+    def _time_backend(
+        backend: MergeBackend,
+        color: np.ndarray,
+        outline: np.ndarray,
+        highlight: np.ndarray,
+        repeat: int,
+        interruptible: bool = False
+    ) -> float:
+        """
+        Возвращает лучшее время построения масок и тона полосами.
+        
+        С interruptible каждый проход начинается после объединений, а
+        проход, во время которого началось объединение, повторяется.
+        """
+        height, width = color.shape[:2]
+        band = max(1, MERGE_BAND_BYTES // max(1, color.strides[0]))
+        mask = np.empty((band, width), dtype=np.uint8)
+        toned = np.empty((band, width, 3), dtype=np.uint8)
+        fade, darken = backend.tone_ops()
+        backend.prepare()
+        # Первый проход строит таблицы и прогревает кэши и не учитывается
+        best = float("inf")
+        attempt = 0
+        while attempt <= repeat:
+            started = Backends._wait_for_idle() if interruptible else 0
+            start = time.perf_counter()
+            for top in range(0, height, band):
+                if interruptible and Backends._foreground_started != started:
+                    break
+                rows = slice(top, top + band)
+                size = min(band, height - top)
+                backend.highlight_mask(highlight[rows], "RGB", dst=mask[:size])
+                backend.outline_mask(outline[rows], "RGB", dst=mask[:size])
+                fade(color[rows], toned[:size])
+                darken(toned[:size], toned[:size])
+            if interruptible and Backends._foreground_started != started:
+                continue
+            if attempt:
+                best = min(best, time.perf_counter() - start)
+            attempt += 1
+        return best
+    
+    @staticmethod
+    def _wait_for_idle() -> int:
+        """
+        Ждет, пока объединений нет уже BACKEND_CALIBRATION_IDLE секунд.
+        
+        Returns:
+            Число начатых объединений, чтобы заметить новое
+        """
+        with Backends._activity:
+            while True:
+                if Backends._foreground:
+                    Backends._activity.wait()
+                    continue
+                remaining = Backends._foreground_ended + BACKEND_CALIBRATION_IDLE - time.monotonic()
+                if remaining <= 0:
+                    return Backends._foreground_started
+                Backends._activity.wait(remaining)
+    
+    @staticmethod
+    def _fingerprint() -> Dict[str, object]:
+        """Описание машины и библиотек, от которых зависят сверка и замеры."""
+        return {
+            "version": Backends.VERSION,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "opencv_threads": cv2.getNumThreads(),
+        }
+    
+    @staticmethod
+    def _load() -> None:
+        """Однократно загружает сохраненные сверки и выбор, если машина та же."""
+        if Backends._loaded:
+            return
+        Backends._loaded = True
+        try:
+            data = json.loads(BACKEND_CACHE_FILE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("fingerprint") != Backends._fingerprint():
+            return
+        Backends._verified.update(
+            (name, bool(verdict)) for name, verdict in data.get("verified", {}).items()
+            if name in Backends.REGISTRY
+        )
+        Backends._choice.update(
+            (size_class, name) for size_class, name in data.get("choice", {}).items()
+            if Backends._verified.get(name) or Backends.REGISTRY.get(name, MergeBackend).exact
+        )
+    
+    @staticmethod
+    def _save() -> None:
+        """Сохраняет сверки и выбор; ошибки записи не мешают работе."""
+        data = {
+            "fingerprint": Backends._fingerprint(),
+            "verified": Backends._verified,
+            "choice": Backends._choice,
+        }
+        try:
+            BACKEND_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=BACKEND_CACHE_FILE.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_name, BACKEND_CACHE_FILE)
+            finally:
+                Path(tmp_name).unlink(missing_ok=True)
+        except OSError:
+            pass
+    
+    @staticmethod
+    def _requested() -> str:
+        """Имя реализации, заданное через BACKEND_ENV_VAR (по умолчанию auto)."""
+        return os.environ.get(BACKEND_ENV_VAR, "auto").strip().lower() or "auto"
+    
+    @staticmethod
+    def _warn(requested: str) -> None:
+        """Однократно сообщает, что заданная реализация не используется."""
+        if Backends._warned:
+            return
+        Backends._warned = True
+        reason = "неизвестна" if requested not in Backends.REGISTRY else "не совпала с эталоном"
+        print(
+            f"Реализация обработки {requested} {reason}, выбирается автоматически",
+            file=sys.stderr
+        )
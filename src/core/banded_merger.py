@@ -0,0 +1,238 @@
+"""Полосовая обработка очень больших изображений с ограниченной памятью."""
+
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.core.image_processor import ImageProcessor
+from src.core.image_writer import ImageWriter, PngStripWriter
+from src.core.processing_params import ProcessingParams
+from src.core.strip_reader import LayerSource, StripReader
+from src.utils.constants import BANDED_STRIP_ROWS, BANDED_MIN_PIXELS
+from src.utils.tracing import Tracer
+
+
+class BandedMerger:
+    """
+    Класс для объединения слоев горизонтальными полосами.
+    
+    Слои читаются через StripReader: декодируются только строки текущей
+    полосы, и по ним строятся маски полосы. При сохранении в PNG
+    результат полосы сразу передается потоковому кодировщику, поэтому
+    память ограничена высотой полосы, а не размером изображения.
+    
+    Полосами объединяются только тройки, все слои которых можно читать
+    потоково (PNG с 8 битами на канал без чересстрочной развертки, см.
+    can_stream). JPEG нельзя начать декодировать с произвольной строки,
+    и полосовая обработка такого слоя не ограничила бы память, поэтому
+    такие тройки объединяются обычным путем. Для JPEG нет и потокового
+    кодировщика: при сохранении в JPEG (и в merge_to_image) результат
+    собирается в изображение RGB во весь кадр.
+    
+    Слои задаются путями или сжатыми байтами файлов, уже прочитанными
+    в память (см. StripReader).
+    """
+    
+    @staticmethod
+    def image_size(source: LayerSource) -> Tuple[int, int]:
+        """
+        Читает размер изображения из заголовка без декодирования.
+        
+        Args:
+            source: Путь к файлу изображения или сжатые байты файла
+        
+        Returns:
+            Кортеж (ширина, высота)
+        """
+        with Image.open(StripReader.image_file(source)) as img:
+            return img.size
+    
+    @staticmethod
+    def should_use(path: LayerSource) -> bool:
+        """
+        Проверяет, достаточно ли велико изображение для полосовой обработки.
+        
+        Args:
+            path: Путь к цветному изображению или сжатые байты файла
+        
+        Returns:
+            True если число пикселей не меньше BANDED_MIN_PIXELS
+        """
+        width, height = BandedMerger.image_size(path)
+        return width * height >= BANDED_MIN_PIXELS
+    
+    @staticmethod
+    def can_stream(paths: Mapping[str, LayerSource]) -> bool:
+        """
+        Проверяет, что все слои тройки можно читать полосами.
+        
+        Args:
+            paths: Пути к слоям или сжатые байты файлов по типам
+        
+        Returns:
+            True если каждый слой читается потоково (см. StripReader)
+        """
+        return all(StripReader.can_stream(p) for p in paths.values() if p is not None)
+    
+    @staticmethod
+    def _strips(height: int, rows: int) -> Iterator[Tuple[int, int]]:
+        """Возвращает границы полос (верх, низ)."""
+        for top in range(0, height, rows):
+            yield top, min(top + rows, height)
+    
+    @staticmethod
+    def merge_to_file(
+        paths: Mapping[str, LayerSource],
+        output: Path,
+        format_name: str,
+        rows: int = BANDED_STRIP_ROWS,
+        params: Optional[ProcessingParams] = None
+    ) -> Tuple[int, int]:
+        """
+        Объединяет слои полосами и сразу кодирует результат в файл.
+        
+        Args:
+            paths: Пути к слоям или сжатые байты файлов по типам (color и
+                outline обязательны)
+            output: Путь для сохранения
+            format_name: Формат файла (PNG или JPEG)
+            rows: Высота полосы
+            params: Параметры обработки (по умолчанию - из constants.py)
+        
+        Returns:
+            Размер результата (ширина, высота)
+        
+        Raises:
+            ValueError: Если размеры слоев различаются или слой нельзя
+                читать полосами
+            OSError: Если файл не удалось прочитать или записать
+        """
+        size = BandedMerger.image_size(paths['color'])
+        with Tracer.span("merge.banded", pixels=size[0] * size[1], format=format_name):
+            BandedMerger._merge_to_file(
+                paths, size, output, format_name, rows, params or ProcessingParams()
+            )
+        return size
+    
+    @staticmethod
+    def merge_to_image(
+        paths: Mapping[str, LayerSource],
+        rows: int = BANDED_STRIP_ROWS,
+        params: Optional[ProcessingParams] = None
+    ) -> Image.Image:
+        """
+        Объединяет слои полосами в изображение RGB во весь кадр.
+        
+        Память - как при сохранении JPEG полосами; результат можно
+        закодировать несколькими способами (например, профилем экспорта).
+        
+        Args:
+            paths: Пути к слоям или сжатые байты файлов по типам (color и
+                outline обязательны)
+            rows: Высота полосы
+            params: Параметры обработки (по умолчанию - из constants.py)
+        
+        Returns:
+            Результат (PIL изображение RGB)
+        
+        Raises:
+            ValueError: Если размеры слоев различаются или слой нельзя
+                читать полосами
+            OSError: Если файл не удалось прочитать
+        """
+        size = BandedMerger.image_size(paths['color'])
+        params = params or ProcessingParams()
+        with Tracer.span("merge.banded", pixels=size[0] * size[1]):
+            with BandedMerger._open_layers(paths, size) as layers:
+                return BandedMerger._merge_image(layers, size, rows, params)
+    
+    @staticmethod
+    @contextmanager
+    def _open_layers(
+        paths: Mapping[str, LayerSource],
+        size: Tuple[int, int]
+    ) -> Iterator[Dict[str, StripReader]]:
+        """
+        Открывает слои для чтения полосами.
+        
+        Yields:
+            Слои по типам
+        """
+        with ExitStack() as stack:
+            yield {
+                kind: stack.enter_context(StripReader(source, size))
+                for kind, source in paths.items()
+                if source is not None
+            }
+    
+    @staticmethod
+    def _merge_image(
+        layers: Mapping[str, StripReader],
+        size: Tuple[int, int],
+        rows: int,
+        params: ProcessingParams
+    ) -> Image.Image:
+        """Собирает результат полос в изображение RGB во весь кадр."""
+        width, height = size
+        image = Image.new("RGB", size)
+        merged = np.empty((min(rows, height), width, 3), dtype=np.uint8)
+        for top, bottom in BandedMerger._strips(height, rows):
+            strip = BandedMerger._merge_strip(layers, top, bottom, merged, params)
+            image.paste(Image.fromarray(strip), (0, top))
+        return image
+    
+    @staticmethod
+    def _merge_to_file(
+        paths: Mapping[str, LayerSource],
+        size: Tuple[int, int],
+        output: Path,
+        format_name: str,
+        rows: int,
+        params: ProcessingParams
+    ) -> None:
+        """Выполняет полосовое объединение (см. merge_to_file)."""
+        width, height = size
+        
+        with BandedMerger._open_layers(paths, size) as layers:
+            if format_name == 'PNG':
+                merged = np.empty((min(rows, height), width, 3), dtype=np.uint8)
+                with PngStripWriter(output, width, height) as writer:
+                    for top, bottom in BandedMerger._strips(height, rows):
+                        writer.write(BandedMerger._merge_strip(layers, top, bottom, merged, params))
+            else:
+                # Для JPEG нет потокового кодировщика
+                with BandedMerger._merge_image(layers, size, rows, params) as image:
+                    ImageWriter.save(image, output, format_name)
+    
+    @staticmethod
+    def _merge_strip(
+        layers: Mapping[str, StripReader],
+        top: int,
+        bottom: int,
+        buffer: np.ndarray,
+        params: ProcessingParams
+    ) -> np.ndarray:
+        """
+        Читает одну полосу слоев, строит по ней маски и объединяет ее.
+        
+        Returns:
+            Полоса результата в формате RGB
+        """
+        red_mask = None
+        if 'highlight' in layers:
+            red_mask = ImageProcessor.highlight_mask(
+                layers['highlight'].read(top, bottom), "RGB", params=params
+            )
+        black_mask = ImageProcessor.outline_mask(
+            layers['outline'].read(top, bottom), "RGB", params=params
+        )
+        return ImageProcessor.merge_masked(
+            layers['color'].read(top, bottom),
+            red_mask,
+            black_mask,
+            out=buffer[:bottom - top],
+            params=params
+        )
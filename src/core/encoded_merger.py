@@ -0,0 +1,147 @@
+"""Объединение тройки из сжатых файлов в сжатый результат."""
+
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from src.core.image_manager import ImageManager
+from src.core.image_writer import ImageWriter
+from src.core.layer_store import LayerHandle
+from src.utils.tracing import Tracer
+
+# Слой: байты файла или путь к файлу
+LayerSource = Union[bytes, str]
+
+
+class MergeResult(NamedTuple):
+    """Результат объединения в процессе-исполнителе."""
+    
+    body: Optional[bytes]
+    size: Tuple[int, int]
+    timings: Dict[str, float]
+    trace_events: Optional[List[dict]] = None
+
+
+class EncodedMerger:
+    """
+    Класс для объединения тройки, переданной байтами файлов.
+    
+    Все этапы, которым нужен процессор (декодирование, объединение,
+    кодирование), выполняются одним вызовом в процессе-исполнителе, а
+    чтение и запись файлов остаются вызывающей стороне. Между процессами
+    передаются только сжатые байты, а не декодированные изображения.
+    Объединение выполняет ImageManager, как в приложении и пакетной
+    обработке; результат кодируется с качеством и DPI приложения.
+    """
+    
+    @staticmethod
+    def merge(
+        layers: Mapping[str, LayerSource],
+        format_name: str,
+        output: Optional[str] = None,
+        submitted: Optional[float] = None,
+        trace: bool = False
+    ) -> MergeResult:
+        """
+        Декодирует, объединяет и кодирует одну тройку.
+        
+        Выполняется в процессе-исполнителе, поэтому не должна зависеть от Qt.
+        
+        Args:
+            layers: Слои по типам (color и outline обязательны)
+            format_name: Формат результата (PNG или JPEG)
+            output: Путь для записи результата (None - вернуть байты)
+            submitted: Время постановки в очередь (time.time) для замера ожидания
+            trace: Записывать трассировку этапов и вернуть ее в результате
+        
+        Returns:
+            Результат с байтами файла (если output не задан), размером и
+            временем этапов в миллисекундах
+        
+        Raises:
+            OSError: Если файл не удалось прочитать, декодировать или записать
+            ValueError: Если размеры слоев не совпадают
+        """
+        if trace:
+            # В процессе-исполнителе трассировка включается без файла:
+            # события передаются в родительский процесс вместе с результатом.
+            # События, унаследованные от родителя при fork, отбрасываются
+            Tracer.enabled = True
+            Tracer.drain()
+            with Tracer.span("merge.encoded"):
+                result = EncodedMerger.merge(layers, format_name, output, submitted)
+            return result._replace(trace_events=Tracer.drain())
+        
+        timings: Dict[str, float] = {}
+        if submitted is not None:
+            timings['queue'] = max(0.0, time.time() - submitted) * 1000
+        
+        def stage(name: str, start: float) -> float:
+            now = time.perf_counter()
+            timings[name] = (now - start) * 1000
+            return now
+        
+        start = time.perf_counter()
+        data = {
+            kind: source if isinstance(source, bytes) else Path(source).read_bytes()
+            for kind, source in layers.items()
+        }
+        start = stage('read', start)
+        
+        manager = ImageManager()
+        for kind, layer in EncodedMerger.decode(data).items():
+            manager.set_layer(kind, layer)
+        start = stage('decode', start)
+        
+        result = manager.process_images()
+        start = stage('merge', start)
+        
+        body = None
+        if output is None:
+            buffer = BytesIO()
+            ImageWriter.save(result, buffer, format_name)
+            body = buffer.getvalue()
+        else:
+            target = Path(output)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with ImageWriter.atomic_target(target) as tmp:
+                ImageWriter.save(result, tmp, format_name)
+        stage('encode', start)
+        
+        height, width = result.shape[:2]
+        return MergeResult(body, (width, height), timings)
+    
+    @staticmethod
+    def decode(data: Mapping[str, bytes]) -> Dict[str, LayerHandle]:
+        """
+        Декодирует слои одного размера.
+        
+        Пиксели декодируются здесь же, чтобы поврежденный слой сообщался
+        как ошибка декодирования, а время этапа decode не входило в merge.
+        
+        Args:
+            data: Байты файлов по типам слоев
+        
+        Returns:
+            Слои по типам
+        
+        Raises:
+            OSError: Если слой не удалось декодировать
+            ValueError: Если размеры слоев не совпадают
+        """
+        layers: Dict[str, LayerHandle] = {}
+        for kind, content in data.items():
+            try:
+                layers[kind] = LayerHandle.from_bytes(Path(kind), content)
+                layers[kind].image()
+            except OSError as e:
+                raise OSError(f"Не удалось декодировать слой {kind}: {type(e).__name__}") from e
+        
+        sizes = {kind: layer.size for kind, layer in layers.items()}
+        if len(set(sizes.values())) > 1:
+            raise ValueError(
+                "Размеры слоев не совпадают: "
+                + ", ".join(f"{kind} {w}x{h}" for kind, (w, h) in sizes.items())
+            )
+        return layers
@@ -0,0 +1,192 @@
+"""Экспорт результата в нескольких размерах за один проход."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.core.image_writer import ImageWriter, PyramidTiffWriter
+from src.utils.constants import EXPORT_LEVELS, TIFF_TILE_SIZE
+from src.utils.tracing import Tracer
+
+
+class ExportLevel(NamedTuple):
+    """Уровень профиля экспорта."""
+    
+    suffix: str
+    max_side: Optional[int] = None
+
+
+class ExportProfile(NamedTuple):
+    """
+    Набор файлов, получаемых из одного результата.
+    
+    Уровень с пустым суффиксом пишется по пути результата, остальные -
+    рядом с ним с суффиксом в имени. Пирамидальный TIFF получает то же
+    имя с расширением .tif.
+    """
+    
+    levels: Tuple[ExportLevel, ...] = tuple(ExportLevel(*level) for level in EXPORT_LEVELS)
+    pyramid: bool = False
+    
+    @classmethod
+    def single(cls, pyramid: bool = False) -> "ExportProfile":
+        """
+        Возвращает профиль только с полным размером.
+        
+        Args:
+            pyramid: Записывать также пирамидальный TIFF
+        
+        Returns:
+            Профиль экспорта
+        """
+        return cls((ExportLevel(""),), pyramid)
+    
+    @classmethod
+    def from_options(cls, levels: bool, pyramid: bool) -> Optional["ExportProfile"]:
+        """
+        Строит профиль по параметрам командной строки.
+        
+        Args:
+            levels: Записывать уменьшенные копии из EXPORT_LEVELS
+            pyramid: Записывать пирамидальный TIFF
+        
+        Returns:
+            Профиль или None, если нужен только файл полного размера
+        """
+        if levels:
+            return cls(pyramid=pyramid)
+        return cls.single(pyramid=True) if pyramid else None
+    
+    def paths(self, output: Path) -> List[Path]:
+        """
+        Возвращает пути файлов профиля: уровни по порядку, затем TIFF.
+        
+        Args:
+            output: Путь результата полного размера
+        
+        Returns:
+            Список путей
+        """
+        output = Path(output)
+        paths = [
+            output.with_name(f"{output.stem}{level.suffix}{output.suffix}")
+            for level in self.levels
+        ]
+        if self.pyramid:
+            paths.append(output.with_suffix(".tif"))
+        return paths
+    
+    def variants(self) -> List[Optional[str]]:
+        """
+        Описывает файлы профиля для ключей кэша результатов (в порядке paths).
+        
+        Полный размер без суффикса описывается как None: его ключ совпадает
+        с ключом обычного сохранения.
+        
+        Returns:
+            Список описаний
+        """
+        variants: List[Optional[str]] = [
+            None if level.max_side is None else f"max_side={level.max_side}"
+            for level in self.levels
+        ]
+        if self.pyramid:
+            variants.append(f"pyramid_tiff={TIFF_TILE_SIZE}")
+        return variants
+
+
+class ProfileExporter:
+    """
+    Класс для записи всех файлов профиля из результата в памяти.
+    
+    Каждый уровень уменьшается из предыдущего (большего), а не из
+    полного изображения, и отправляется кодироваться, как только готов:
+    пока кодируется полный размер, уже уменьшается следующий. Файлы
+    кодируются параллельно в потоках (PIL и OpenCV отпускают GIL) и
+    появляются только целиком, через временные файлы.
+    """
+    
+    @staticmethod
+    def fit_size(size: Tuple[int, int], max_side: Optional[int]) -> Tuple[int, int]:
+        """
+        Вписывает размер в квадрат max_side без увеличения.
+        
+        Args:
+            size: Размер (ширина, высота)
+            max_side: Наибольшая сторона (None - без ограничения)
+        
+        Returns:
+            Размер (ширина, высота)
+        """
+        width, height = size
+        if max_side is None or max(width, height) <= max_side:
+            return width, height
+        scale = max_side / max(width, height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    
+    @staticmethod
+    def export(
+        image: Union[Image.Image, np.ndarray],
+        paths: Sequence[Path],
+        format_name: str,
+        profile: ExportProfile,
+        workers: Optional[int] = None
+    ) -> None:
+        """
+        Записывает файлы профиля.
+        
+        Args:
+            image: Результат (массив RGB или PIL изображение)
+            paths: Пути файлов в порядке ExportProfile.paths
+            format_name: Формат уровней (PNG или JPEG)
+            profile: Профиль экспорта
+            workers: Количество потоков кодирования (по умолчанию - по числу ядер)
+        
+        Raises:
+            ValueError: Если пирамидальный TIFF получается больше 4 ГБ
+            OSError: Если файл не удалось записать
+        """
+        if isinstance(image, Image.Image):
+            image = np.asarray(image if image.mode == "RGB" else image.convert("RGB"))
+        array = image
+        height, width = array.shape[:2]
+        
+        # Уровни от большего к меньшему, чтобы каждый уменьшался из предыдущего
+        order = sorted(
+            range(len(profile.levels)),
+            key=lambda index: profile.levels[index].max_side or float("inf"),
+            reverse=True
+        )
+        
+        with Tracer.span("export.profile", pixels=width * height, files=len(paths)):
+            with ThreadPoolExecutor(workers) as pool:
+                futures = []
+                if profile.pyramid:
+                    futures.append(pool.submit(
+                        ProfileExporter._save_atomic, paths[-1],
+                        lambda target: PyramidTiffWriter.save(array, target, workers=workers)
+                    ))
+                
+                level = array
+                for index in order:
+                    size = ProfileExporter.fit_size((width, height), profile.levels[index].max_side)
+                    if size != (level.shape[1], level.shape[0]):
+                        with Tracer.span("export.resize", pixels=size[0] * size[1]):
+                            level = cv2.resize(level, size, interpolation=cv2.INTER_AREA)
+                    futures.append(pool.submit(
+                        ProfileExporter._save_atomic, paths[index],
+                        lambda target, level=level: ImageWriter.save(level, target, format_name)
+                    ))
+                
+                for future in futures:
+                    future.result()
+    
+    @staticmethod
+    def _save_atomic(path: Path, save_func: Callable[[Path], None]) -> None:
+        """Записывает файл через временный (см. ImageWriter.atomic_target)."""
+        with ImageWriter.atomic_target(path) as tmp:
+            save_func(tmp)
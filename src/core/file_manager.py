@@ -1,10 +1,15 @@
 """Менеджер файлов для приложения Image Merger."""
 
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
 from PyQt6.QtWidgets import QFileDialog, QMessageBox, QWidget
 
-from src.utils.constants import SUPPORTED_FORMATS, SAVE_FORMATS, DEFAULT_QUALITY, DEFAULT_DPI
+from src.utils.constants import SUPPORTED_FORMATS, SAVE_FORMATS, SAVE_PROFILE_FILTERS
+from src.utils.tracing import Tracer
+
+# Запись изображений (numpy, OpenCV, PIL) нужна только при сохранении
+if TYPE_CHECKING:
+    from src.core.export_profile import ExportProfile
 
 
 class FileManager:
@@ -44,7 +49,10 @@ class FileManager:
         
         return None
     
-    def save_image_dialog(self, default_path: Path) -> Optional[Tuple[Path, str]]:
+    def save_image_dialog(
+        self, 
+        default_path: Path
+    ) -> Optional[Tuple[Path, str, Optional["ExportProfile"]]]:
         """
         Открывает диалог сохранения изображения.
         
@@ -52,20 +60,26 @@ class FileManager:
             default_path: Путь по умолчанию
             
         Returns:
-            Кортеж (путь, формат) или None
+            Кортеж (путь, формат, профиль экспорта или None) или None
         """
         save_path, selected_filter = QFileDialog.getSaveFileName(
             self.parent,
             "Сохранить результат",
             str(default_path),
-            SAVE_FORMATS
+            ";;".join([SAVE_FORMATS, *SAVE_PROFILE_FILTERS])
         )
         
         if save_path:
+            from src.core.export_profile import ExportProfile
+            from src.core.image_writer import ImageWriter
+            
             path = Path(save_path)
             # Определяем формат по расширению
-            format_name = 'PNG' if path.suffix.lower() == '.png' else 'JPEG'
-            return path, format_name
+            format_name = ImageWriter.format_for_path(path)
+            profile = None
+            if selected_filter in SAVE_PROFILE_FILTERS:
+                profile = ExportProfile.from_options(*SAVE_PROFILE_FILTERS[selected_filter])
+            return path, format_name, profile
         
         return None
     
@@ -74,24 +88,30 @@ class FileManager:
         Сохраняет изображение в файл.
         
         Args:
-            image: PIL изображение для сохранения
+            image: PIL изображение или массив RGB для сохранения
             path: Путь для сохранения
             format_name: Формат файла (PNG или JPEG)
             
+        Returns:
+            True если сохранение успешно, False иначе
+        """
+        from src.core.image_writer import ImageWriter
+        
+        with Tracer.span("save.image", format=format_name):
+            return self.save_with(lambda: ImageWriter.save(image, path, format_name))
+    
+    def save_with(self, save_func: Callable[[], None]) -> bool:
+        """
+        Выполняет произвольное сохранение с показом ошибки в диалоге.
+        
+        Args:
+            save_func: Функция, выполняющая сохранение
+            
         Returns:
             True если сохранение успешно, False иначе
         """
         try:
-            if format_name == 'PNG':
-                image.save(path, format=format_name, dpi=DEFAULT_DPI)
-            else:  # JPEG
-                image.save(
-                    path, 
-                    format=format_name, 
-                    quality=DEFAULT_QUALITY, 
-                    subsampling=0, 
-                    dpi=DEFAULT_DPI
-                )
+            save_func()
             return True
         except Exception as e:
             QMessageBox.critical(
@@ -0,0 +1,338 @@
+"""Наблюдение за каталогом: появление и окончание записи файлов."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from src.utils.constants import IMAGE_EXTENSIONS, WATCH_SETTLE_TIME, WATCH_POLL_INTERVAL
+
+# Флаги inotify из <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _walk_tree(root: Path, exclude: Optional[Path]) -> Iterator[Tuple[Path, List[str]]]:
+    """Перечисляет каталоги дерева с именами файлов, пропуская exclude."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        current = Path(dirpath)
+        if exclude is not None and current.resolve() == exclude:
+            dirnames.clear()
+            continue
+        dirnames.sort()
+        yield current, filenames
+
+
+class _InotifySource:
+    """Источник изменений на основе inotify (только Linux)."""
+    
+    name = "inotify"
+    
+    def __init__(self, root: Path, exclude: Optional[Path]):
+        """
+        Инициализация inotify и наблюдение за деревом каталогов.
+        
+        Args:
+            root: Корневой каталог
+            exclude: Каталог, который нужно пропустить
+        
+        Raises:
+            OSError: Если inotify недоступен
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify доступен только в Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch_func = libc.inotify_add_watch
+        self._add_watch_func.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        
+        self._exclude = exclude
+        self._dirs: Dict[int, Path] = {}
+        self.overflowed = False
+        self._watch_tree(root)
+    
+    def _watch_tree(self, root: Path) -> List[Path]:
+        """Наблюдает за каталогом и подкаталогами, возвращает найденные файлы."""
+        found = []
+        for current, filenames in _walk_tree(root, self._exclude):
+            wd = self._add_watch_func(self._fd, os.fsencode(current), _WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = current
+            found.extend(current / filename for filename in filenames)
+        return found
+    
+    def wait(self, timeout: float) -> Tuple[Set[Path], Set[Path]]:
+        """
+        Ждет событий не дольше timeout.
+        
+        Args:
+            timeout: Максимальное время ожидания в секундах
+        
+        Returns:
+            Кортеж (измененные файлы, удаленные файлы)
+        """
+        changed: Set[Path] = set()
+        removed: Set[Path] = set()
+        readable, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not readable:
+            return changed, removed
+        
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed, removed
+        
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            
+            if mask & IN_Q_OVERFLOW:
+                # Очередь событий переполнена: вызывающий пересканирует дерево
+                self.overflowed = True
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                self._dirs.pop(wd, None)
+                continue
+            
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Файлы могли появиться до начала наблюдения за каталогом
+                    changed.update(self._watch_tree(path))
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                removed.add(path)
+                changed.discard(path)
+            else:
+                changed.add(path)
+                removed.discard(path)
+        
+        return changed, removed
+    
+    def close(self) -> None:
+        """Закрывает дескриптор inotify."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingSource:
+    """Источник изменений на основе периодического обхода дерева."""
+    
+    name = "polling"
+    
+    def __init__(self, root: Path, exclude: Optional[Path], interval: float = WATCH_POLL_INTERVAL):
+        """
+        Инициализация обхода.
+        
+        Args:
+            root: Корневой каталог
+            exclude: Каталог, который нужно пропустить
+            interval: Период обхода в секундах
+        """
+        self._root = root
+        self._exclude = exclude
+        self._interval = interval
+        self._next_scan = 0.0
+        self.overflowed = False
+        self._known: Dict[Path, Tuple[int, int]] = dict(self._scan())
+    
+    def _scan(self) -> Iterator[Tuple[Path, Tuple[int, int]]]:
+        """Перечисляет файлы дерева с размером и временем изменения."""
+        for current, filenames in _walk_tree(self._root, self._exclude):
+            for filename in filenames:
+                path = current / filename
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                yield path, (stat.st_size, stat.st_mtime_ns)
+    
+    def wait(self, timeout: float) -> Tuple[Set[Path], Set[Path]]:
+        """
+        Ждет до следующего обхода (не дольше timeout) и сравнивает дерево с прежним.
+        
+        Args:
+            timeout: Максимальное время ожидания в секундах
+        
+        Returns:
+            Кортеж (измененные файлы, удаленные файлы)
+        """
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(max(timeout, 0))
+            return set(), set()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_scan = time.monotonic() + self._interval
+        
+        current = dict(self._scan())
+        changed = {path for path, state in current.items() if self._known.get(path) != state}
+        removed = set(self._known) - set(current)
+        self._known = current
+        return changed, removed
+    
+    def close(self) -> None:
+        """Ничего не освобождает."""
+
+
+class FolderWatcher:
+    """
+    Класс для отслеживания файлов изображений, появляющихся в каталоге.
+    
+    Изменения берутся из inotify, а если он недоступен - из периодического
+    обхода дерева. Файл считается готовым, когда его размер и время
+    изменения не менялись в течение settle секунд: так не читаются файлы,
+    которые экспортер еще дописывает. Повторно измененный файл снова
+    сообщается после успокоения.
+    """
+    
+    def __init__(
+        self,
+        root: Path,
+        exclude: Optional[Path] = None,
+        settle: float = WATCH_SETTLE_TIME,
+        use_inotify: bool = True
+    ):
+        """
+        Инициализация наблюдения.
+        
+        Args:
+            root: Каталог для наблюдения (вместе с подкаталогами)
+            exclude: Каталог, который нужно пропустить (например, выходной)
+            settle: Время без изменений, после которого файл готов
+            use_inotify: Пытаться использовать inotify
+        """
+        self.root = Path(root)
+        self.settle = settle
+        exclude = Path(exclude).resolve() if exclude else None
+        
+        self._source = None
+        if use_inotify:
+            try:
+                self._source = _InotifySource(self.root, exclude)
+            except (OSError, AttributeError):
+                # Не Linux, нет libc или исчерпан лимит наблюдений
+                self._source = None
+        if self._source is None:
+            self._source = _PollingSource(self.root, exclude)
+        
+        # Путь -> (размер, время изменения, момент последнего изменения)
+        self._pending: Dict[Path, Tuple[int, int, float]] = {}
+        self._exclude = exclude
+    
+    @property
+    def backend(self) -> str:
+        """Имя источника изменений: inotify или polling."""
+        return self._source.name
+    
+    def existing_files(self) -> List[Path]:
+        """
+        Возвращает файлы изображений, уже лежащие в каталоге.
+        
+        Returns:
+            Список путей, отсортированный по имени
+        """
+        found = []
+        for current, filenames in _walk_tree(self.root, self._exclude):
+            found.extend(
+                current / filename for filename in filenames
+                if Path(filename).suffix.lower() in IMAGE_EXTENSIONS
+            )
+        return sorted(found)
+    
+    def poll(self, timeout: float) -> Tuple[List[Path], List[Path]]:
+        """
+        Ждет изменений не дольше timeout и возвращает готовые файлы.
+        
+        Args:
+            timeout: Максимальное время ожидания в секундах
+        
+        Returns:
+            Кортеж (файлы, запись которых завершилась; удаленные файлы)
+        """
+        if self._pending:
+            # Не спим дольше, чем до успокоения ближайшего файла
+            now = time.monotonic()
+            nearest = min(changed_at for _, _, changed_at in self._pending.values())
+            timeout = min(timeout, max(nearest + self.settle - now, 0))
+        
+        changed, removed = self._source.wait(timeout)
+        if self._source.overflowed:
+            self._source.overflowed = False
+            changed.update(self.existing_files())
+        
+        now = time.monotonic()
+        for path in changed:
+            if path.suffix.lower() in IMAGE_EXTENSIONS and not path.name.startswith("."):
+                self._observe(path, now)
+        for path in removed:
+            self._pending.pop(path, None)
+        
+        return self._collect_ready(now), sorted(
+            path for path in removed if path.suffix.lower() in IMAGE_EXTENSIONS
+        )
+    
+    def _observe(self, path: Path, now: float) -> None:
+        """Запоминает состояние файла и момент его изменения."""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._pending.pop(path, None)
+            return
+        # Любое событие перезапускает таймер успокоения
+        self._pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+    
+    def _collect_ready(self, now: float) -> List[Path]:
+        """Возвращает файлы, не менявшиеся дольше settle."""
+        ready = []
+        for path, (size, mtime_ns, changed_at) in list(self._pending.items()):
+            if now - changed_at < self.settle:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns) or size == 0:
+                # Файл растет без событий (например, сетевой диск) или
+                # экспортер создал его, но еще не начал писать
+                self._pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+                continue
+            del self._pending[path]
+            ready.append(path)
+        return sorted(ready)
+    
+    def close(self) -> None:
+        """Прекращает наблюдение."""
+        self._source.close()
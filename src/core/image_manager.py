@@ -1,21 +1,52 @@
 """Менеджер изображений для приложения Image Merger."""
 
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+import numpy as np
 from PIL import Image
 
-from src.utils.constants import IMAGE_KINDS
+from src.utils.constants import IMAGE_KINDS, BANDED_MIN_PIXELS
 from src.core.image_processor import ImageProcessor
+from src.core.backends import Backends
+from src.core.banded_merger import BandedMerger
+from src.core.export_profile import ExportProfile, ProfileExporter
+from src.core.image_writer import ImageWriter
+from src.core.incremental_merger import IncrementalMerger
+from src.core.layer_store import LayerHandle, MemoryBudget
+from src.core.processing_params import ProcessingParams
+from src.core.proxy_merger import ProxyMerger
+from src.core.result_cache import ResultCache
+from src.utils.tracing import Tracer
 
 
 class ImageManager:
-    """Класс для управления загруженными изображениями."""
+    """
+    Класс для управления загруженными изображениями.
     
-    def __init__(self):
-        """Инициализация менеджера изображений."""
+    Слои хранятся как LayerHandle: полные пиксели декодируются по
+    требованию и вытесняются общим MemoryBudget, а для превью
+    используется постоянное уменьшенное изображение слоя. Текущие
+    параметры обработки (params) применяются к объединению и
+    сохранению; результат хранится вместе с параметрами, из которых
+    он получен.
+    """
+    
+    def __init__(self, result_cache: Optional[ResultCache] = None):
+        """
+        Инициализация менеджера изображений.
+        
+        Args:
+            result_cache: Дисковый кэш готовых результатов (опционально)
+        """
         self.image_paths: Dict[str, Optional[Path]] = {k: None for k in IMAGE_KINDS}
-        self.pil_images: Dict[str, Image.Image] = {}
-        self._last_result: Optional[Image.Image] = None
+        self.layers: Dict[str, LayerHandle] = {}
+        self._last_result: Optional[np.ndarray] = None
+        self._result_hashes: Optional[Dict[str, str]] = None
+        self._result_params: Optional[ProcessingParams] = None
+        self.result_cache = result_cache
+        self.params = ProcessingParams()
+        self._merger = IncrementalMerger()
+        self._proxy = ProxyMerger()
     
     def load_image(self, kind: str, path: Path) -> bool:
         """
@@ -32,12 +63,89 @@ class ImageManager:
             return False
         
         try:
-            img = Image.open(path).convert("RGB")
-            self.pil_images[kind] = img
-            self.image_paths[kind] = path
-            return True
+            layer = LayerHandle.open(path)
         except Exception:
             return False
+        
+        self.set_layer(kind, layer)
+        return True
+    
+    @staticmethod
+    def decode_draft(path: Path, size: Tuple[int, int]) -> Optional[Image.Image]:
+        """
+        Быстро декодирует уменьшенную копию изображения для первого превью.
+        
+        JPEG декодируется с масштабированием DCT (1/2, 1/4 или 1/8) до
+        наименьшего размера, не меньшего size. Для PNG уменьшенного
+        декодирования не существует: Image.reduce все равно распаковывает
+        файл целиком, поэтому для него черновик не строится.
+        
+        Args:
+            path: Путь к файлу изображения
+            size: Требуемый размер (ширина, высота) в пикселях экрана
+            
+        Returns:
+            Уменьшенное PIL изображение в режиме RGB или None, если
+            черновик не быстрее полного декодирования
+            
+        Raises:
+            OSError: Если файл не удалось прочитать
+        """
+        with Image.open(path) as img:
+            if img.format != "JPEG":
+                return None
+            
+            full_size = img.size
+            img.draft("RGB", size)
+            if img.size == full_size:
+                return None
+            
+            with Tracer.span("load.draft", pixels=img.width * img.height):
+                return img.convert("RGB")
+    
+    @staticmethod
+    def merge_draft(
+        images: Mapping[str, Image.Image], 
+        size: Tuple[int, int],
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Объединяет черновые слои в уменьшенный результат для превью.
+        
+        Слои разного размера (черновики и уже декодированные целиком)
+        приводятся к size ближайшим соседом, чтобы линии контура не
+        размывались ниже порога BLACK_THRESHOLD.
+        
+        Args:
+            images: Изображения по типам (color и outline обязательны)
+            size: Размер результата (ширина, высота)
+            params: Параметры обработки (по умолчанию - из constants.py)
+            
+        Returns:
+            Уменьшенный результат (массив RGB)
+        """
+        layers = {}
+        for kind, img in images.items():
+            if img.size != size:
+                img = img.resize(size, Image.Resampling.NEAREST)
+            layers[kind] = ImageProcessor.pil_to_rgb(img)
+        
+        with Backends.foreground(), Tracer.span("merge.draft", pixels=size[0] * size[1]):
+            return ImageProcessor.process_images(
+                layers['color'], layers['outline'], layers.get('highlight'), "RGB", params
+            )
+    
+    def set_layer(self, kind: str, layer: LayerHandle) -> None:
+        """
+        Устанавливает уже открытый слой указанного типа.
+        
+        Args:
+            kind: Тип изображения (color, highlight, outline)
+            layer: Слой, открытый LayerHandle.open (например, в фоне)
+        """
+        if kind in IMAGE_KINDS:
+            self.layers[kind] = layer
+            self.image_paths[kind] = layer.path
     
     def remove_image(self, kind: str) -> None:
         """
@@ -47,12 +155,14 @@ class ImageManager:
             kind: Тип изображения для удаления
         """
         if kind in IMAGE_KINDS:
-            self.pil_images.pop(kind, None)
+            self.layers.pop(kind, None)
             self.image_paths[kind] = None
     
     def get_image(self, kind: str) -> Optional[Image.Image]:
         """
-        Возвращает изображение указанного типа.
+        Возвращает полное изображение указанного типа.
+        
+        Если пиксели были вытеснены из памяти, слой декодируется заново.
         
         Args:
             kind: Тип изображения
@@ -60,7 +170,33 @@ class ImageManager:
         Returns:
             PIL изображение или None
         """
-        return self.pil_images.get(kind)
+        layer = self.layers.get(kind)
+        return layer.image() if layer is not None else None
+    
+    def get_layer(self, kind: str) -> Optional[LayerHandle]:
+        """
+        Возвращает слой указанного типа.
+        
+        Args:
+            kind: Тип изображения
+            
+        Returns:
+            Слой или None
+        """
+        return self.layers.get(kind)
+    
+    def get_preview(self, kind: str) -> Optional[Image.Image]:
+        """
+        Возвращает уменьшенное изображение слоя для превью без декодирования.
+        
+        Args:
+            kind: Тип изображения
+            
+        Returns:
+            PIL изображение или None
+        """
+        layer = self.layers.get(kind)
+        return layer.preview() if layer is not None else None
     
     def get_image_path(self, kind: str) -> Optional[Path]:
         """
@@ -86,40 +222,372 @@ class ImageManager:
             self.image_paths['outline'] is not None
         )
     
-    def process_images(self) -> Optional[Image.Image]:
+    def process_images(self) -> Optional[np.ndarray]:
         """
         Обрабатывает все загруженные изображения.
         
         Returns:
-            Обработанное изображение или None
+            Обработанное изображение (массив RGB) или None
         """
         if not self.has_required_images():
             return None
         
-        # Конвертируем в OpenCV формат
-        color_cv = ImageProcessor.pil_to_cv2(self.pil_images['color'])
-        outline_cv = ImageProcessor.pil_to_cv2(self.pil_images['outline'])
-        highlight_cv = None
+        result = self.merge_images(self.layers, self.params)
+        self.set_result(result, self.content_hashes(self.layers), self.params)
+        return result
+    
+    def set_params(self, params: ProcessingParams) -> None:
+        """
+        Устанавливает параметры для следующих объединений и сохранений.
         
-        if 'highlight' in self.pil_images:
-            highlight_cv = ImageProcessor.pil_to_cv2(self.pil_images['highlight'])
+        Args:
+            params: Параметры обработки
+        """
+        self.params = params
+    
+    def snapshot(self) -> Dict[str, LayerHandle]:
+        """
+        Возвращает копию набора загруженных слоев.
         
-        # Обрабатываем изображения
-        result_cv = ImageProcessor.process_images(color_cv, outline_cv, highlight_cv)
+        Снимок можно передать в merge_images в фоновом потоке, пока
+        основной поток продолжает менять слои.
         
-        # Конвертируем обратно в PIL
-        self._last_result = ImageProcessor.cv2_to_pil(result_cv)
-        return self._last_result
+        Returns:
+            Слои по типам
+        """
+        return dict(self.layers)
+    
+    @staticmethod
+    def content_hashes(layers: Mapping[str, LayerHandle]) -> Dict[str, str]:
+        """
+        Возвращает хэши содержимого слоев.
+        
+        Args:
+            layers: Слои по типам
+            
+        Returns:
+            Хэши содержимого по типам
+        """
+        return {kind: layer.content_hash for kind, layer in layers.items()}
     
-    def get_result(self) -> Optional[Image.Image]:
+    def memory_usage(self) -> Tuple[int, int]:
+        """
+        Возвращает использование общего бюджета памяти слоев.
+        
+        В занятый объем входят декодированные пиксели и сжатые байты слоев.
+        
+        Returns:
+            Кортеж (занято байт, бюджет в байтах)
+        """
+        return MemoryBudget.shared().usage()
+    
+    def merge_images(
+        self, 
+        layers: Mapping[str, LayerHandle],
+        params: Optional[ProcessingParams] = None,
+        checkpoint: Optional[Callable[[], None]] = None
+    ) -> np.ndarray:
+        """
+        Объединяет набор изображений, не меняя загруженные слои.
+        
+        Пересчитываются только этапы после изменившихся слоев и
+        параметров (см. IncrementalMerger), маски берутся из общего
+        MaskCache. Может вызываться из фонового потока со снимком из
+        snapshot().
+        
+        Args:
+            layers: Слои по типам (color и outline обязательны)
+            params: Параметры обработки (по умолчанию - текущие)
+            checkpoint: Функция, вызываемая между этапами; фоновая
+                задача выбрасывает из нее исключение при отмене
+            
+        Returns:
+            Обработанное изображение (массив RGB)
+        """
+        color = layers['color']
+        with Backends.foreground(), Tracer.span("merge.images", pixels=color.width * color.height):
+            # Результат остается в numpy до кодирования или отображения
+            return self._merger.merge(layers, params or self.params, checkpoint)
+    
+    def merge_proxy(
+        self,
+        layers: Mapping[str, LayerHandle],
+        viewport: Tuple[int, int],
+        params: ProcessingParams
+    ) -> np.ndarray:
+        """
+        Объединяет слои, уменьшенные до размера области превью (см. ProxyMerger).
+        
+        Может вызываться из фонового потока со снимком из snapshot().
+        
+        Args:
+            layers: Слои по типам (color и outline обязательны)
+            viewport: Размер области превью в пикселях экрана
+            params: Параметры обработки
+            
+        Returns:
+            Уменьшенный результат (массив RGB)
+        """
+        with Backends.foreground():
+            return self._proxy.merge(layers, viewport, params)
+    
+    def set_result(
+        self, 
+        result: Optional[np.ndarray], 
+        content_hashes: Optional[Mapping[str, str]] = None,
+        params: Optional[ProcessingParams] = None
+    ) -> None:
+        """
+        Устанавливает результат, посчитанный в фоне.
+        
+        Args:
+            result: Обработанное изображение (массив RGB) или None
+            content_hashes: Хэши слоев, из которых получен результат;
+                без них результат не попадает в кэш результатов
+            params: Параметры, с которыми получен результат (по
+                умолчанию - текущие)
+        """
+        self._last_result = result
+        self._result_hashes = dict(content_hashes) if result is not None and content_hashes else None
+        self._result_params = (params or self.params) if result is not None else None
+    
+    def get_result(self) -> Optional[np.ndarray]:
         """
         Возвращает последний результат обработки.
         
         Returns:
-            Обработанное изображение или None
+            Обработанное изображение (массив RGB) или None
         """
         return self._last_result
     
+    def use_banded_export(self) -> bool:
+        """
+        Проверяет, нужно ли сохранять результат полосовой обработкой.
+        
+        Returns:
+            True если цветное изображение не меньше BANDED_MIN_PIXELS
+            и все слои можно читать полосами
+        """
+        color = self.layers.get('color')
+        return (
+            color is not None
+            and color.width * color.height >= BANDED_MIN_PIXELS
+            and BandedMerger.can_stream(self._banded_sources(self.layers))
+        )
+    
+    @staticmethod
+    def _banded_sources(layers: Mapping[str, LayerHandle]) -> Dict[str, bytes]:
+        """
+        Возвращает сжатые байты слоев для полосовой обработки.
+        
+        Полосами читаются байты, сохраненные при загрузке, а не файлы
+        на диске: результат соответствует хэшам content_hashes(layers),
+        даже если файлы с тех пор изменились.
+        """
+        return {kind: layer.data for kind, layer in layers.items()}
+    
+    def export_banded(self, path: Path, format_name: str) -> None:
+        """
+        Объединяет загруженные слои полосами и сохраняет результат.
+        
+        Args:
+            path: Путь для сохранения
+            format_name: Формат файла (PNG или JPEG)
+            
+        Raises:
+            ValueError: Если нет обязательных изображений или размеры различаются
+            OSError: Если файл не удалось прочитать или записать
+        """
+        self._banded_saver(format_name)(path)
+    
+    def save_result(self, path: Path, format_name: str) -> None:
+        """
+        Сохраняет последний результат, используя кэш результатов.
+        
+        Args:
+            path: Путь для сохранения
+            format_name: Формат файла (PNG или JPEG)
+        
+        Raises:
+            ValueError: Если результата нет
+            OSError: Если файл не удалось записать
+        """
+        self._result_saver(format_name)(path)
+    
+    def prepare_save(self, format_name: str) -> Callable[[Path], None]:
+        """
+        Готовит сохранение текущего результата для выполнения в фоне.
+        
+        Функция сохранения держит ссылки на текущий результат (или сжатые
+        байты слоев для полосовой обработки) и текущие параметры,
+        поэтому дальнейшая загрузка других слоев и смена параметров на
+        нее не влияют. Если результат с текущими параметрами еще не
+        посчитан, функция сохранения сама объединяет снимок слоев.
+        
+        Args:
+            format_name: Формат файла (PNG или JPEG)
+            
+        Returns:
+            Функция, сохраняющая результат по переданному пути
+            
+        Raises:
+            ValueError: Если результата нет
+        """
+        if self.use_banded_export():
+            return self._banded_saver(format_name)
+        return self._result_saver(format_name)
+    
+    def prepare_export(
+        self, 
+        path: Path, 
+        format_name: str, 
+        profile: ExportProfile
+    ) -> Callable[[Path], None]:
+        """
+        Готовит запись всех файлов профиля экспорта для выполнения в фоне.
+        
+        Все файлы получаются из одного результата: последнего, если он
+        посчитан с текущими параметрами, иначе объединение выполняется
+        вместе с записью (для больших изображений - полосами).
+        
+        Args:
+            path: Путь результата полного размера
+            format_name: Формат файлов уровней (PNG или JPEG)
+            profile: Профиль экспорта
+            
+        Returns:
+            Функция сохранения: файл полного размера пишется по
+            переданному ей пути (например, временному), остальные
+            файлы профиля - рядом с path
+            
+        Raises:
+            ValueError: Если результата нет
+        """
+        result = self._last_result
+        params = self.params
+        merge: Callable[[], Union[np.ndarray, Image.Image]]
+        if self.use_banded_export():
+            if not self.has_required_images():
+                raise ValueError("Необходимо добавить цвет и контур")
+            layers = self.snapshot()
+            hashes = self.content_hashes(layers)
+            sources = self._banded_sources(layers)
+            merge = lambda: BandedMerger.merge_to_image(sources, params=params)
+            get_hashes = lambda: hashes
+        elif result is not None and self._result_params == params:
+            hashes = self._result_hashes or {}
+            merge = lambda: result
+            get_hashes = lambda: hashes
+        else:
+            if not self.has_required_images():
+                raise ValueError("Необходимо добавить цвет и контур")
+            layers = self.snapshot()
+            merge = lambda: self.merge_images(layers, params)
+            get_hashes = lambda: self.content_hashes(layers)
+        
+        final = Path(path)
+        
+        def save(target: Path) -> None:
+            paths = [target if p == final else p for p in profile.paths(final)]
+            self._save_all_cached(
+                get_hashes(), params, paths, profile.variants(), format_name,
+                lambda: ProfileExporter.export(merge(), paths, format_name, profile)
+            )
+        
+        return save
+    
+    def _banded_saver(self, format_name: str) -> Callable[[Path], None]:
+        """Готовит полосовое объединение загруженных слоев (см. export_banded)."""
+        if not self.has_required_images():
+            raise ValueError("Необходимо добавить цвет и контур")
+        
+        layers = self.snapshot()
+        hashes = self.content_hashes(layers)
+        sources = self._banded_sources(layers)
+        params = self.params
+        return lambda path: self._save_cached(
+            hashes, params, path, format_name,
+            lambda target: BandedMerger.merge_to_file(sources, target, format_name, params=params)
+        )
+    
+    def _result_saver(self, format_name: str) -> Callable[[Path], None]:
+        """Готовит кодирование последнего результата (см. save_result)."""
+        result = self._last_result
+        params = self.params
+        if result is not None and self._result_params == params:
+            hashes = self._result_hashes or {}
+            return lambda path: self._save_cached(
+                hashes, params, path, format_name,
+                lambda target: ImageWriter.save(result, target, format_name)
+            )
+        
+        # Результат с текущими параметрами еще считается: объединение
+        # выполняется вместе с сохранением
+        if not self.has_required_images():
+            raise ValueError("Необходимо добавить цвет и контур")
+        layers = self.snapshot()
+        return lambda path: self._save_cached(
+            self.content_hashes(layers), params, path, format_name,
+            lambda target: ImageWriter.save(self.merge_images(layers, params), target, format_name)
+        )
+    
+    def _save_cached(
+        self, 
+        content_hashes: Mapping[str, str], 
+        params: ProcessingParams,
+        path: Path, 
+        format_name: str, 
+        save_func: Callable[[Path], None]
+    ) -> None:
+        """Выдает результат из кэша или сохраняет его и помещает в кэш."""
+        self._save_all_cached(
+            content_hashes, params, [path], [None], format_name, lambda: save_func(path)
+        )
+    
+    def _save_all_cached(
+        self,
+        content_hashes: Mapping[str, str],
+        params: ProcessingParams,
+        paths: Sequence[Path],
+        variants: Sequence[Optional[str]],
+        format_name: str,
+        save_func: Callable[[], None]
+    ) -> None:
+        """
+        Выдает файлы из кэша, если там есть каждый, или записывает все и кэширует.
+        
+        Args:
+            content_hashes: Хэши содержимого слоев
+            params: Параметры обработки
+            paths: Пути файлов
+            variants: Виды файлов для ключей кэша (см. ExportProfile.variants)
+            format_name: Формат файла (PNG или JPEG)
+            save_func: Функция, записывающая все файлы
+        """
+        cache = self.result_cache
+        if cache is None:
+            save_func()
+            return
+        
+        keys: List[Optional[str]] = [
+            ResultCache.make_key(content_hashes, format_name, params, variant)
+            for variant in variants
+        ]
+        if all(cache.fetch(key, path) for key, path in zip(keys, paths)):
+            return
+        
+        # Файл мог быть жесткой ссылкой на запись кэша - заменяем его
+        for path in paths:
+            Path(path).unlink(missing_ok=True)
+        save_func()
+        try:
+            for key, path in zip(keys, paths):
+                cache.store(key, path)
+            cache.evict()
+        except OSError:
+            # Кэш - лишь ускорение, его ошибки не мешают сохранению
+            pass
+    
     def get_default_save_path(self) -> Path:
         """
         Возвращает путь по умолчанию для сохранения.
@@ -134,5 +602,9 @@ class ImageManager:
     def clear_all(self) -> None:
         """Очищает все изображения."""
         self.image_paths = {k: None for k in IMAGE_KINDS}
-        self.pil_images.clear()
+        self.layers.clear()
         self._last_result = None
+        self._result_hashes = None
+        self._result_params = None
+        self._merger.reset()
+        self._proxy.reset()
@@ -3,38 +3,101 @@
 import cv2
 import numpy as np
 from PIL import Image
-from typing import Optional
+from typing import Optional, Sequence, Tuple
 
+from src.core.backends import Backends, MergeBackend, ToneOp
+from src.core.processing_params import ProcessingParams
 from src.utils.constants import (
-    RED_HSV_RANGES, 
-    BLACK_THRESHOLD, 
     FADE_WEIGHT, 
-    OUTLINE_DARKEN_FACTOR
+    OUTLINE_DARKEN_FACTOR,
+    MERGE_BAND_BYTES
 )
+from src.utils.tracing import Tracer
 
 
 class ImageProcessor:
-    """Класс для обработки изображений с применением эффектов."""
+    """
+    Класс для обработки изображений с применением эффектов.
+    
+    Методы принимают изображения с порядком каналов BGR (формат OpenCV)
+    или RGB (формат PIL) - его задает параметр channel_order. Порядок
+    влияет только на построение масок: осветление и затемнение одинаковы
+    для всех каналов, поэтому результат совпадает побайтно с точностью до
+    порядка каналов.
+    
+    Построение масок, осветление и затемнение выполняет реализация из
+    Backends, выбранная для размера изображения; все реализации дают
+    одинаковый результат. Параметры обработки передаются в params
+    (ProcessingParams); None - значения по умолчанию из constants.py.
+    """
     
     @staticmethod
-    def apply_highlight(color: np.ndarray, highlight: np.ndarray) -> np.ndarray:
+    def highlight_mask(
+        highlight: np.ndarray, 
+        channel_order: str = "BGR",
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Строит маску красных областей изображения подсветки.
+        
+        Args:
+            highlight: Изображение подсветки
+            channel_order: Порядок каналов изображения (BGR или RGB)
+            params: Параметры обработки (по умолчанию - из constants.py)
+            
+        Returns:
+            Маска (255 - красная область, 0 - остальное)
+        """
+        pixels = highlight.shape[0] * highlight.shape[1]
+        backend = Backends.for_pixels(pixels)
+        with Tracer.span("mask.highlight", pixels=pixels, backend=backend.name):
+            return backend.highlight_mask(
+                highlight, channel_order, (params or ProcessingParams()).red_hsv_ranges
+            )
+    
+    @staticmethod
+    def outline_mask(
+        outline: np.ndarray, 
+        channel_order: str = "BGR",
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Строит маску черных линий изображения контура.
+        
+        Args:
+            outline: Изображение контура
+            channel_order: Порядок каналов изображения (BGR или RGB)
+            params: Параметры обработки (по умолчанию - из constants.py)
+            
+        Returns:
+            Маска (255 - линия контура, 0 - остальное)
+        """
+        pixels = outline.shape[0] * outline.shape[1]
+        backend = Backends.for_pixels(pixels)
+        with Tracer.span("mask.outline", pixels=pixels, backend=backend.name):
+            return backend.outline_mask(
+                outline, channel_order, (params or ProcessingParams()).black_threshold
+            )
+    
+    @staticmethod
+    def apply_highlight(
+        color: np.ndarray, 
+        highlight: np.ndarray, 
+        channel_order: str = "BGR"
+    ) -> np.ndarray:
         """
         Применяет эффект подсветки к цветному изображению.
         
         Args:
-            color: Цветное изображение в формате BGR
-            highlight: Изображение подсветки в формате BGR
+            color: Цветное изображение
+            highlight: Изображение подсветки
+            channel_order: Порядок каналов изображений (BGR или RGB)
             
         Returns:
             Обработанное изображение
         """
-        hsv = cv2.cvtColor(highlight, cv2.COLOR_BGR2HSV)
-        
         # Создаем маску для красных областей
-        red_mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
-        for lower, upper in RED_HSV_RANGES:
-            mask = cv2.inRange(hsv, lower, upper)
-            red_mask = cv2.bitwise_or(red_mask, mask)
+        red_mask = ImageProcessor.highlight_mask(highlight, channel_order)
         
         # Создаем затемненную версию
         white_bg = np.full_like(color, 255)
@@ -47,19 +110,23 @@ class ImageProcessor:
         return result
     
     @staticmethod
-    def apply_outline(image: np.ndarray, outline: np.ndarray) -> np.ndarray:
+    def apply_outline(
+        image: np.ndarray, 
+        outline: np.ndarray, 
+        channel_order: str = "BGR"
+    ) -> np.ndarray:
         """
         Применяет эффект контура к изображению.
         
         Args:
-            image: Исходное изображение в формате BGR
-            outline: Изображение контура в формате BGR
+            image: Исходное изображение
+            outline: Изображение контура
+            channel_order: Порядок каналов изображений (BGR или RGB)
             
         Returns:
             Обработанное изображение
         """
-        gray = cv2.cvtColor(outline, cv2.COLOR_BGR2GRAY)
-        black_mask = cv2.inRange(gray, 0, BLACK_THRESHOLD)
+        black_mask = ImageProcessor.outline_mask(outline, channel_order)
         
         if np.any(black_mask):
             image[black_mask > 0] = (
@@ -68,11 +135,124 @@ class ImageProcessor:
         
         return image
     
+    @staticmethod
+    def merge_masked(
+        color: np.ndarray,
+        red_mask: Optional[np.ndarray],
+        black_mask: Optional[np.ndarray],
+        out: Optional[np.ndarray] = None,
+        highlighted_out: Optional[np.ndarray] = None,
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Совмещённо применяет осветление, подсветку и контур по готовым маскам.
+        
+        Изображение проходится полосами, которые помещаются в кэш: для каждой
+        полосы осветление и затемнение выполняются таблицами поиска, а
+        восстановление подсветки и наложение контура - копированием по маске
+        прямо в выходной буфер. Результат совпадает с последовательным
+        вызовом apply_highlight и apply_outline. Порядок каналов не важен,
+        так как маски уже построены.
+        
+        Args:
+            color: Цветное изображение
+            red_mask: Маска подсветки или None, если подсветки нет
+            black_mask: Маска контура или None, чтобы не применять контур
+            out: Выходной буфер той же формы, что и color (опционально)
+            highlighted_out: Буфер для промежуточного результата после
+                подсветки, до наложения контура (опционально)
+            params: Параметры осветления и затемнения (по умолчанию -
+                из constants.py)
+            
+        Returns:
+            Обработанное изображение (out, если он передан)
+            
+        Raises:
+            ValueError: Если размеры изображений или буфера не совпадают
+        """
+        height, width = color.shape[:2]
+        for mask in (red_mask, black_mask):
+            if mask is not None and mask.shape[:2] != (height, width):
+                raise ValueError(
+                    f"Размер маски {mask.shape[1]}x{mask.shape[0]} "
+                    f"не совпадает с изображением {width}x{height}"
+                )
+        
+        if out is None:
+            out = np.empty(color.shape, dtype=np.uint8)
+        for buffer in (out, highlighted_out):
+            if buffer is not None and (buffer.shape != color.shape or not buffer.flags.c_contiguous):
+                raise ValueError("Выходной буфер должен быть непрерывным и совпадать по форме с изображением")
+        
+        params = params or ProcessingParams()
+        backend = Backends.for_pixels(height * width)
+        with Tracer.span("merge.fused", pixels=height * width, backend=backend.name):
+            ImageProcessor._merge_bands(
+                color, red_mask, black_mask, out, highlighted_out,
+                backend.tone_ops(params.fade_weight, params.darken_factor)
+            )
+        return out
+    
+    @staticmethod
+    def _merge_bands(
+        color: np.ndarray,
+        red_mask: Optional[np.ndarray],
+        black_mask: Optional[np.ndarray],
+        out: np.ndarray,
+        highlighted_out: Optional[np.ndarray],
+        tone: Tuple[ToneOp, ToneOp]
+    ) -> None:
+        """Выполняет совмещённый проход полосами (см. merge_masked)."""
+        height = color.shape[0]
+        band = max(1, MERGE_BAND_BYTES // max(1, color.strides[0]))
+        scratch = np.empty((band, *color.shape[1:]), dtype=np.uint8)
+        
+        for top in range(0, height, band):
+            rows = slice(top, top + band)
+            ImageProcessor._merge_band(
+                color[rows],
+                red_mask[rows] if red_mask is not None else None,
+                black_mask[rows] if black_mask is not None else None,
+                out[rows],
+                scratch,
+                tone,
+                highlighted_out[rows] if highlighted_out is not None else None
+            )
+    
+    @staticmethod
+    def _merge_band(
+        src: np.ndarray,
+        red_mask: Optional[np.ndarray],
+        black_mask: Optional[np.ndarray],
+        dst: np.ndarray,
+        scratch: np.ndarray,
+        tone: Tuple[ToneOp, ToneOp],
+        highlighted: Optional[np.ndarray] = None
+    ) -> None:
+        """Обрабатывает одну полосу по готовым маскам полосы и функциям тона."""
+        fade, darken = tone
+        
+        if red_mask is not None:
+            fade(src, dst)
+            cv2.copyTo(src, red_mask, dst)
+        else:
+            np.copyto(dst, src)
+        
+        if highlighted is not None:
+            np.copyto(highlighted, dst)
+        
+        if black_mask is not None:
+            darkened = scratch[:dst.shape[0]]
+            darken(dst, darkened)
+            cv2.copyTo(darkened, black_mask, dst)
+    
     @staticmethod
     def process_images(
         color: np.ndarray, 
         outline: np.ndarray, 
-        highlight: Optional[np.ndarray] = None
+        highlight: Optional[np.ndarray] = None,
+        channel_order: str = "BGR",
+        params: Optional[ProcessingParams] = None
     ) -> np.ndarray:
         """
         Обрабатывает изображения, применяя все эффекты.
@@ -81,20 +261,157 @@ class ImageProcessor:
             color: Цветное изображение
             outline: Изображение контура
             highlight: Изображение подсветки (опционально)
+            channel_order: Порядок каналов изображений (BGR или RGB)
+            params: Параметры обработки (по умолчанию - из constants.py)
             
         Returns:
             Финальное обработанное изображение
         """
-        result = color.copy()
+        return ImageProcessor.process_batch(
+            color[np.newaxis],
+            outline[np.newaxis],
+            highlight[np.newaxis] if highlight is not None else None,
+            channel_order,
+            params=params
+        )[0]
+    
+    @staticmethod
+    def process_batch(
+        colors: np.ndarray,
+        outlines: np.ndarray,
+        highlights: Optional[np.ndarray] = None,
+        channel_order: str = "BGR",
+        with_highlight: Optional[Sequence[bool]] = None,
+        out: Optional[np.ndarray] = None,
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Обрабатывает N троек одного размера за один проход.
+        
+        Непрерывные стопки (N, H, W, 3) рассматриваются как одно
+        изображение высотой N*H, которое проходится полосами размером
+        около MERGE_BAND_BYTES. Для каждой полосы маски подсветки и
+        контура строятся в заранее выделенных буферах и сразу
+        применяются, пока полоса в кэше процессора: промежуточные
+        маски во всю высоту не создаются, а вызовы OpenCV
+        выполняются на полосу, а не на каждое изображение. Результат
+        совпадает побайтно с process_images для каждой тройки.
+        
+        Args:
+            colors: Цветные изображения (N, H, W, 3)
+            outlines: Изображения контура той же формы
+            highlights: Изображения подсветки той же формы (опционально)
+            channel_order: Порядок каналов изображений (BGR или RGB)
+            with_highlight: Для каждой тройки - есть ли у нее подсветка;
+                тройки без подсветки не осветляются (по умолчанию - у
+                всех, если передан highlights)
+            out: Выходной буфер (N, H, W, 3) (опционально)
+            params: Параметры обработки (по умолчанию - из constants.py)
+            
+        Returns:
+            Обработанные изображения (N, H, W, 3)
+            
+        Raises:
+            ValueError: Если формы стопок не совпадают
+        """
+        if colors.ndim != 4 or colors.shape[-1] != 3:
+            raise ValueError(f"Ожидается стопка (N, H, W, 3), получено {colors.shape}")
+        for name, stack in (("outlines", outlines), ("highlights", highlights), ("out", out)):
+            if stack is not None and stack.shape != colors.shape:
+                raise ValueError(f"Форма {name} {stack.shape} не совпадает с colors {colors.shape}")
+        if with_highlight is not None and len(with_highlight) != colors.shape[0]:
+            raise ValueError("Длина with_highlight не совпадает с числом троек")
         
-        # Применяем подсветку если есть
-        if highlight is not None:
-            result = ImageProcessor.apply_highlight(result, highlight)
+        count, height, width = colors.shape[:3]
+        if out is None:
+            out = np.empty(colors.shape, dtype=np.uint8)
+        elif not out.flags.c_contiguous:
+            raise ValueError("Выходной буфер должен быть непрерывным")
         
-        # Применяем контур
-        result = ImageProcessor.apply_outline(result, outline)
+        # Тройки без подсветки не осветляются: их маска подсветки - вся
+        # область, а если подсветки нет ни у одной, маска не строится
+        if with_highlight is not None and not any(with_highlight):
+            highlights = None
+        elif highlights is None and with_highlight is not None:
+            raise ValueError("with_highlight требует highlights")
         
-        return result
+        def flat(stack: np.ndarray) -> np.ndarray:
+            return np.ascontiguousarray(stack).reshape(count * height, width, 3)
+        
+        unlit_rows = [
+            (i * height, (i + 1) * height)
+            for i, present in enumerate(with_highlight or ()) if not present
+        ]
+        backend = Backends.for_pixels(height * width)
+        with Tracer.span(
+            "merge.batch", pixels=count * height * width, images=count, backend=backend.name
+        ):
+            ImageProcessor._process_bands(
+                flat(colors),
+                flat(outlines),
+                flat(highlights) if highlights is not None else None,
+                channel_order,
+                unlit_rows,
+                out.reshape(count * height, width, 3),
+                backend,
+                params or ProcessingParams()
+            )
+        return out
+    
+    @staticmethod
+    def _process_bands(
+        color: np.ndarray,
+        outline: np.ndarray,
+        highlight: Optional[np.ndarray],
+        channel_order: str,
+        unlit_rows: Sequence[Tuple[int, int]],
+        out: np.ndarray,
+        backend: MergeBackend,
+        params: ProcessingParams
+    ) -> None:
+        """
+        Проходит изображение полосами, строя маски полос (см. process_batch).
+        
+        unlit_rows - диапазоны строк [начало, конец) изображений без
+        подсветки, где маска подсветки заполняется целиком.
+        """
+        height, width = color.shape[:2]
+        band = max(1, MERGE_BAND_BYTES // max(1, color.strides[0]))
+        scratch = np.empty((band, width, 3), dtype=np.uint8)
+        red_buf = np.empty((band, width), dtype=np.uint8)
+        black_buf = np.empty((band, width), dtype=np.uint8)
+        tone = backend.tone_ops(params.fade_weight, params.darken_factor)
+        
+        for top in range(0, height, band):
+            rows = slice(top, top + band)
+            size = min(band, height - top)
+            
+            red_mask = None
+            if highlight is not None:
+                red_mask = backend.highlight_mask(
+                    highlight[rows], channel_order, params.red_hsv_ranges, red_buf[:size]
+                )
+                for start, end in unlit_rows:
+                    if start < top + size and end > top:
+                        red_mask[max(start - top, 0):end - top] = 255
+            
+            black_mask = backend.outline_mask(
+                outline[rows], channel_order, params.black_threshold, black_buf[:size]
+            )
+            ImageProcessor._merge_band(color[rows], red_mask, black_mask, out[rows], scratch, tone)
+    
+    @staticmethod
+    def pil_to_rgb(pil_img: Image.Image) -> np.ndarray:
+        """
+        Возвращает пиксели PIL изображения как массив RGB без перестановки каналов.
+        
+        Args:
+            pil_img: PIL изображение в режиме RGB
+            
+        Returns:
+            Непрерывный массив в формате RGB (только для чтения)
+        """
+        return np.asarray(pil_img)
     
     @staticmethod
     def pil_to_cv2(pil_img: Image.Image) -> np.ndarray:
@@ -105,9 +422,12 @@ class ImageProcessor:
             pil_img: PIL изображение
             
         Returns:
-            OpenCV изображение в формате BGR
+            Непрерывное OpenCV изображение в формате BGR
         """
-        return np.array(pil_img)[:, :, ::-1]
+        # cvtColor дает непрерывный массив, в отличие от среза [:, :, ::-1]
+        # с отрицательным шагом, который копируется при каждом следующем вызове
+        with Tracer.span("convert.bgr", pixels=pil_img.width * pil_img.height):
+            return cv2.cvtColor(np.asarray(pil_img), cv2.COLOR_RGB2BGR)
     
     @staticmethod
     def cv2_to_pil(cv2_img: np.ndarray) -> Image.Image:
@@ -120,5 +440,17 @@ class ImageProcessor:
         Returns:
             PIL изображение
         """
-        rgb_img = cv2.cvtColor(cv2_img, cv2.COLOR_BGR2RGB)
-        return Image.fromarray(rgb_img)
+        return Image.fromarray(ImageProcessor.cv2_to_rgb(cv2_img))
+    
+    @staticmethod
+    def cv2_to_rgb(cv2_img: np.ndarray) -> np.ndarray:
+        """
+        Конвертирует OpenCV изображение (BGR) в массив RGB без участия PIL.
+        
+        Args:
+            cv2_img: OpenCV изображение в формате BGR
+            
+        Returns:
+            Непрерывный массив в формате RGB
+        """
+        return cv2.cvtColor(cv2_img, cv2.COLOR_BGR2RGB)
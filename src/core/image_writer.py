@@ -0,0 +1,401 @@
+"""Запись изображений на диск без зависимости от Qt."""
+
+import io
+import os
+import struct
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.utils.constants import DEFAULT_QUALITY, DEFAULT_DPI, PNG_COMPRESS_LEVEL, TIFF_TILE_SIZE
+from src.utils.tracing import Tracer
+
+
+class ImageWriter:
+    """Класс для кодирования и записи изображений с настройками приложения."""
+    
+    @staticmethod
+    def format_for_path(path: Path) -> str:
+        """
+        Определяет формат файла по расширению.
+        
+        Args:
+            path: Путь к файлу
+            
+        Returns:
+            Формат файла (PNG или JPEG)
+        """
+        return 'PNG' if path.suffix.lower() == '.png' else 'JPEG'
+    
+    @staticmethod
+    def save(
+        image: Union[Image.Image, np.ndarray],
+        path: Union[Path, BinaryIO],
+        format_name: str
+    ) -> None:
+        """
+        Сохраняет изображение в файл с качеством и DPI приложения.
+        
+        Args:
+            image: PIL изображение или массив RGB для сохранения
+            path: Путь для сохранения или открытый двоичный файл
+            format_name: Формат файла (PNG или JPEG)
+            
+        Raises:
+            OSError: Если файл не удалось записать
+        """
+        if isinstance(image, np.ndarray):
+            # В PIL массив переводится только в момент кодирования
+            image = Image.fromarray(image)
+        
+        with Tracer.span("save.encode", pixels=image.width * image.height, format=format_name) as span:
+            if format_name == 'PNG':
+                image.save(path, format=format_name, dpi=DEFAULT_DPI)
+            else:  # JPEG
+                image.save(
+                    path, 
+                    format=format_name, 
+                    quality=DEFAULT_QUALITY, 
+                    subsampling=0, 
+                    dpi=DEFAULT_DPI
+                )
+            if Tracer.enabled:
+                size = path.tell() if hasattr(path, "tell") else Path(path).stat().st_size
+                span.set(bytes=size)
+    
+    @staticmethod
+    @contextmanager
+    def atomic_target(path: Path) -> Iterator[Path]:
+        """
+        Дает временный путь рядом с файлом и заменяет им файл после записи.
+        
+        Файл назначения появляется (или заменяется) только целиком: при
+        ошибке записи временный файл удаляется, а прежний файл остается.
+        
+        Args:
+            path: Путь для сохранения
+            
+        Yields:
+            Временный путь в том же каталоге, куда нужно записать файл
+        """
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            yield tmp
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+
+class PngStripWriter:
+    """
+    Потоковый кодировщик PNG, принимающий изображение полосами строк.
+    
+    В памяти одновременно находится только текущая полоса и состояние
+    zlib, поэтому размер изображения не ограничен объемом памяти.
+    """
+    
+    PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+    PAETH_FILTER = 4
+    
+    def __init__(
+        self, 
+        path: Path, 
+        width: int, 
+        height: int, 
+        dpi: Tuple[int, int] = DEFAULT_DPI,
+        compress_level: int = PNG_COMPRESS_LEVEL
+    ):
+        """
+        Инициализация кодировщика и запись заголовка файла.
+        
+        Args:
+            path: Путь для сохранения
+            width: Ширина изображения
+            height: Высота изображения
+            dpi: Разрешение для блока pHYs
+            compress_level: Уровень сжатия zlib
+        """
+        self.path = Path(path)
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._prev_row = np.zeros(width * 3, dtype=np.int16)
+        self._file = open(self.path, "wb")
+        
+        self._file.write(self.PNG_SIGNATURE)
+        # 8 бит на канал, цветовой тип 2 (RGB), без чересстрочности
+        self._write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        ppm = tuple(int(d / 0.0254 + 0.5) for d in dpi)
+        self._write_chunk(b"pHYs", struct.pack(">IIB", ppm[0], ppm[1], 1))
+    
+    def _write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        """Записывает блок PNG с контрольной суммой."""
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+    
+    def write(self, rows: np.ndarray) -> None:
+        """
+        Кодирует очередную полосу строк.
+        
+        Args:
+            rows: Массив (строки, ширина, 3) в формате RGB
+            
+        Raises:
+            ValueError: Если полоса не подходит по размеру
+        """
+        count = rows.shape[0]
+        if rows.shape[1:] != (self.width, 3) or self.rows_written + count > self.height:
+            raise ValueError("Полоса не соответствует размеру изображения")
+        
+        # Фильтр Paeth векторизуется, так как использует только исходные байты
+        raw = rows.reshape(count, -1).astype(np.int16)
+        up = np.empty_like(raw)
+        up[0] = self._prev_row
+        up[1:] = raw[:-1]
+        left = np.zeros_like(raw)
+        left[:, 3:] = raw[:, :-3]
+        up_left = np.zeros_like(raw)
+        up_left[:, 3:] = up[:, :-3]
+        
+        dist_left = np.abs(up - up_left)
+        dist_up = np.abs(left - up_left)
+        dist_up_left = np.abs(left + up - 2 * up_left)
+        predictor = np.where(
+            (dist_left <= dist_up) & (dist_left <= dist_up_left),
+            left,
+            np.where(dist_up <= dist_up_left, up, up_left)
+        )
+        
+        filtered = np.empty((count, raw.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = self.PAETH_FILTER
+        filtered[:, 1:] = (raw - predictor) & 0xFF
+        
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._write_chunk(b"IDAT", data)
+        
+        self._prev_row = raw[-1].copy()
+        self.rows_written += count
+    
+    def close(self) -> None:
+        """
+        Завершает поток сжатия и закрывает файл.
+        
+        Raises:
+            ValueError: Если записаны не все строки изображения
+        """
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(
+                    f"Записано {self.rows_written} строк из {self.height}"
+                )
+            self._write_chunk(b"IDAT", self._compressor.flush())
+            self._write_chunk(b"IEND", b"")
+        finally:
+            self._file.close()
+    
+    def __enter__(self) -> "PngStripWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.close()
+                return
+        except Exception:
+            self.path.unlink(missing_ok=True)
+            raise
+        
+        # Недописанный файл не оставляем
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class PyramidTiffWriter:
+    """
+    Запись тайлового пирамидального TIFF для просмотра с масштабированием.
+    
+    Первая страница - изображение полного размера, следующие - уровни,
+    уменьшенные вдвое (NewSubfileType = 1), пока уровень не поместится в
+    одну плитку. Такую раскладку читают libtiff, vips, OpenSlide и
+    серверы плиток. Плитки кодируются JPEG с качеством приложения и без
+    прореживания цвета. PIL не записывает плитки, поэтому файл
+    собирается здесь; плитки уровня кодируются параллельно в потоках.
+    """
+    
+    # Типы полей TIFF
+    SHORT = 3
+    LONG = 4
+    RATIONAL = 5
+    
+    # Сжатие JPEG, цвет YCbCr без прореживания
+    COMPRESSION_JPEG = 7
+    PHOTOMETRIC_YCBCR = 6
+    
+    @classmethod
+    def save(
+        cls,
+        image: Union[Image.Image, np.ndarray],
+        path: Path,
+        tile_size: int = TIFF_TILE_SIZE,
+        dpi: Tuple[int, int] = DEFAULT_DPI,
+        workers: Optional[int] = None
+    ) -> None:
+        """
+        Сохраняет изображение пирамидальным TIFF.
+        
+        Args:
+            image: PIL изображение или массив RGB
+            path: Путь для сохранения
+            tile_size: Размер плитки (кратен 16)
+            dpi: Разрешение полного уровня
+            workers: Количество потоков кодирования (по умолчанию - по числу ядер)
+            
+        Raises:
+            ValueError: Если файл получается больше 4 ГБ (BigTIFF не поддерживается)
+            OSError: Если файл не удалось записать
+        """
+        if isinstance(image, Image.Image):
+            image = np.asarray(image if image.mode == "RGB" else image.convert("RGB"))
+        level = image
+        path = Path(path)
+        
+        with Tracer.span("save.pyramid", pixels=level.shape[0] * level.shape[1]):
+            try:
+                with open(path, "wb") as f, ThreadPoolExecutor(workers) as pool:
+                    # Заголовок: порядок байт, версия и смещение первого каталога
+                    f.write(b"II*\x00\x00\x00\x00\x00")
+                    link = 4
+                    subfile = 0
+                    while True:
+                        offsets: List[int] = []
+                        counts: List[int] = []
+                        for data in pool.map(cls._encode_tile, cls._tiles(level, tile_size)):
+                            offsets.append(f.tell())
+                            counts.append(len(data))
+                            f.write(data)
+                        link = cls._write_ifd(f, link, level, tile_size, offsets, counts, subfile, dpi)
+                        
+                        height, width = level.shape[:2]
+                        if max(width, height) <= tile_size:
+                            break
+                        level = cv2.resize(
+                            level, ((width + 1) // 2, (height + 1) // 2),
+                            interpolation=cv2.INTER_AREA
+                        )
+                        subfile = 1
+            except BaseException:
+                # Недописанный файл не оставляем
+                path.unlink(missing_ok=True)
+                raise
+    
+    @staticmethod
+    def _tiles(level: np.ndarray, tile_size: int) -> Iterator[np.ndarray]:
+        """Перебирает плитки слева направо и сверху вниз, дополняя крайние до полного размера."""
+        height, width = level.shape[:2]
+        for top in range(0, height, tile_size):
+            for left in range(0, width, tile_size):
+                tile = level[top:top + tile_size, left:left + tile_size]
+                rows, columns = tile.shape[:2]
+                if rows < tile_size or columns < tile_size:
+                    tile = np.pad(
+                        tile, ((0, tile_size - rows), (0, tile_size - columns), (0, 0)), mode="edge"
+                    )
+                yield tile
+    
+    @staticmethod
+    def _encode_tile(tile: np.ndarray) -> bytes:
+        """Кодирует плитку в JPEG с настройками приложения."""
+        buffer = io.BytesIO()
+        Image.fromarray(np.ascontiguousarray(tile)).save(
+            buffer, format="JPEG", quality=DEFAULT_QUALITY, subsampling=0
+        )
+        return buffer.getvalue()
+    
+    @classmethod
+    def _write_ifd(
+        cls,
+        f: BinaryIO,
+        link: int,
+        level: np.ndarray,
+        tile_size: int,
+        offsets: List[int],
+        counts: List[int],
+        subfile: int,
+        dpi: Tuple[int, int]
+    ) -> int:
+        """
+        Дописывает каталог уровня и связывает с ним предыдущий.
+        
+        Returns:
+            Позиция ссылки на следующий каталог
+            
+        Raises:
+            ValueError: Если смещения не помещаются в 32 бита
+        """
+        if offsets and offsets[-1] + counts[-1] > 0xFFFFFFFF:
+            raise ValueError("Пирамидальный TIFF больше 4 ГБ не поддерживается")
+        
+        height, width = level.shape[:2]
+        entries = [
+            (254, cls.LONG, [subfile]),
+            (256, cls.LONG, [width]),
+            (257, cls.LONG, [height]),
+            (258, cls.SHORT, [8, 8, 8]),
+            (259, cls.SHORT, [cls.COMPRESSION_JPEG]),
+            (262, cls.SHORT, [cls.PHOTOMETRIC_YCBCR]),
+            (277, cls.SHORT, [3]),
+            (284, cls.SHORT, [1]),
+            (322, cls.LONG, [tile_size]),
+            (323, cls.LONG, [tile_size]),
+            (324, cls.LONG, offsets),
+            (325, cls.LONG, counts),
+            (530, cls.SHORT, [1, 1]),
+        ]
+        if subfile == 0:
+            entries += [
+                (282, cls.RATIONAL, [(dpi[0], 1)]),
+                (283, cls.RATIONAL, [(dpi[1], 1)]),
+                (296, cls.SHORT, [2]),
+            ]
+        entries.sort()
+        
+        # Каталог начинается с четного смещения
+        f.seek(0, os.SEEK_END)
+        if f.tell() % 2:
+            f.write(b"\x00")
+        ifd = f.tell()
+        next_link = ifd + 2 + 12 * len(entries)
+        values_at = next_link + 4
+        
+        fields = bytearray(struct.pack("<H", len(entries)))
+        values = bytearray()
+        for tag, field_type, items in entries:
+            if field_type == cls.RATIONAL:
+                data = b"".join(struct.pack("<II", *item) for item in items)
+            else:
+                code = "H" if field_type == cls.SHORT else "I"
+                data = struct.pack(f"<{len(items)}{code}", *items)
+            if len(data) <= 4:
+                field = data.ljust(4, b"\x00")
+            else:
+                field = struct.pack("<I", values_at + len(values))
+                values += data + b"\x00" * (len(data) % 2)
+            fields += struct.pack("<HHI", tag, field_type, len(items)) + field
+        
+        f.write(fields + b"\x00\x00\x00\x00" + values)
+        f.seek(link)
+        f.write(struct.pack("<I", ifd))
+        f.seek(0, os.SEEK_END)
+        return next_link
@@ -0,0 +1,169 @@
+"""Инкрементальное объединение слоев с сохранением промежуточного результата."""
+
+import threading
+import weakref
+from typing import Callable, Mapping, Optional, Tuple
+
+import numpy as np
+
+from src.core.image_processor import ImageProcessor
+from src.core.layer_store import LayerHandle, MemoryBudget
+from src.core.mask_cache import MaskCache
+from src.core.processing_params import ProcessingParams
+
+
+class IncrementalMerger:
+    """
+    Класс для объединения слоев с пересчетом только измененных этапов.
+    
+    Обработка состоит из этапа подсветки (зависит от color и highlight)
+    и этапа контура (зависит от outline). Результат этапа подсветки
+    сохраняется, и если изменился только контур (слой, порог или
+    затемнение), пересчитывается лишь наложение контура. Без слоя
+    подсветки этап подсветки - это сам цветной слой, и отдельно он не
+    сохраняется: его пиксели учитывает и вытесняет LayerHandle.
+    Изменение слоя определяется по тождеству объекта слоя: менеджер
+    создает новый LayerHandle при каждой загрузке.
+    
+    Слои декодируются только для этапов, которые действительно
+    пересчитываются: если маска контура или подсветки есть в MaskCache,
+    пиксели этого слоя не нужны и освобождаются. Промежуточный
+    результат учитывается в общем MemoryBudget и освобождается при
+    нехватке памяти.
+    
+    Между этапами (декодирование, маски, наложение) вызывается
+    необязательная функция checkpoint: фоновая задача может выбросить
+    из нее исключение, чтобы не досчитывать устаревший результат.
+    """
+    
+    def __init__(self):
+        """Инициализация инкрементального объединения."""
+        self._lock = threading.Lock()
+        self._inputs: Tuple[Optional[weakref.ref], Optional[weakref.ref]] = (None, None)
+        self._highlight_params: Optional[Tuple] = None
+        self._highlighted: Optional[np.ndarray] = None
+        self.last_stages: Tuple[str, ...] = ()
+    
+    @staticmethod
+    def _mask(
+        kind: str, 
+        layers: Mapping[str, LayerHandle],
+        params: ProcessingParams,
+        checkpoint: Callable[[], None]
+    ) -> np.ndarray:
+        """Возвращает маску слоя из общего кэша масок."""
+        mask_func = (
+            ImageProcessor.highlight_mask if kind == 'highlight' 
+            else ImageProcessor.outline_mask
+        )
+        layer = layers[kind]
+        cache = MaskCache.shared()
+        
+        def compute() -> np.ndarray:
+            pixels = ImageProcessor.pil_to_rgb(layer.image())
+            checkpoint()
+            return mask_func(pixels, "RGB", params)
+        
+        mask = cache.get_or_compute(kind, layer.content_hash, compute, params)
+        if cache.contains(cache.make_key(kind, layer.content_hash, params)):
+            # Пиксели слоя понадобятся снова, только если маска будет вытеснена
+            layer.release()
+        return mask
+    
+    def _cached_highlighted(
+        self, 
+        color: LayerHandle, 
+        highlight: Optional[LayerHandle],
+        params: ProcessingParams
+    ) -> Optional[np.ndarray]:
+        """Возвращает сохраненный этап подсветки, если его входы не менялись."""
+        if highlight is None or self._highlight_params != params.highlight_params():
+            return None
+        color_ref, highlight_ref = self._inputs
+        if color_ref is None or color_ref() is not color:
+            return None
+        if highlight_ref is None or highlight_ref() is not highlight:
+            return None
+        return self._highlighted
+    
+    def merge(
+        self, 
+        layers: Mapping[str, LayerHandle],
+        params: Optional[ProcessingParams] = None,
+        checkpoint: Optional[Callable[[], None]] = None
+    ) -> np.ndarray:
+        """
+        Объединяет слои, пересчитывая только этапы после изменившихся входов.
+        
+        Безопасно вызывается из фоновых потоков.
+        
+        Args:
+            layers: Слои по типам (color и outline обязательны)
+            params: Параметры обработки (по умолчанию - из constants.py)
+            checkpoint: Функция, вызываемая между этапами; исключение из
+                нее прерывает объединение без изменения сохраненного этапа
+            
+        Returns:
+            Обработанное изображение в формате RGB
+        """
+        params = params or ProcessingParams()
+        checkpoint = checkpoint or (lambda: None)
+        color = layers['color']
+        highlight = layers.get('highlight')
+        
+        with self._lock:
+            highlighted = self._cached_highlighted(color, highlight, params)
+        
+        black_mask = self._mask('outline', layers, params, checkpoint)
+        checkpoint()
+        
+        if highlighted is not None:
+            MemoryBudget.shared().touch(self, highlighted.nbytes)
+            self.last_stages = ('outline',)
+            return ImageProcessor.merge_masked(highlighted, None, black_mask, params=params)
+        
+        # Слои обрабатываются в порядке RGB, как их хранит PIL
+        color_rgb = ImageProcessor.pil_to_rgb(color.image())
+        checkpoint()
+        red_mask = None
+        highlighted = color_rgb
+        if highlight is not None:
+            red_mask = self._mask('highlight', layers, params, checkpoint)
+            checkpoint()
+            highlighted = np.empty(color_rgb.shape, dtype=np.uint8)
+        
+        result = ImageProcessor.merge_masked(
+            color_rgb, 
+            red_mask, 
+            black_mask, 
+            highlighted_out=highlighted if red_mask is not None else None,
+            params=params
+        )
+        
+        if red_mask is None:
+            # Этап подсветки совпадает с цветным слоем, сохранять нечего
+            self.reset()
+            self.last_stages = ('outline',)
+            return result
+        
+        with self._lock:
+            self._inputs = (weakref.ref(color), weakref.ref(highlight))
+            self._highlighted = highlighted
+            self._highlight_params = params.highlight_params()
+        
+        MemoryBudget.shared().touch(self, highlighted.nbytes)
+        
+        self.last_stages = ('highlight', 'outline')
+        return result
+    
+    def reset(self) -> None:
+        """Освобождает сохраненный промежуточный результат."""
+        with self._lock:
+            self._inputs = (None, None)
+            self._highlighted = None
+            self._highlight_params = None
+        MemoryBudget.shared().forget(self)
+    
+    def release(self) -> None:
+        """Освобождает промежуточный результат (вызывается бюджетом памяти)."""
+        self.reset()
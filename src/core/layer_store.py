@@ -0,0 +1,354 @@
+"""Ленивые слои с общим бюджетом памяти для декодированных пикселей."""
+
+import threading
+import weakref
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from PIL import Image
+
+from src.utils.constants import LAYER_MEMORY_BUDGET, LAYER_PREVIEW_SIZE
+from src.utils.content_hash import hash_bytes
+from src.utils.tracing import Tracer
+
+
+class MemoryBudget:
+    """
+    Класс для учета декодированных данных, которые можно восстановить.
+    
+    Владельцы (слои, промежуточные результаты) сообщают свой объем через
+    touch() при каждом использовании. Если сумма превышает бюджет,
+    у давно не использованных владельцев вызывается release(), после
+    чего они при необходимости заново декодируют или пересчитывают
+    данные. Владельцы хранятся по слабым ссылкам.
+    
+    Данные, которые освободить нельзя (сжатые байты слоев), учитываются
+    через pin(): они входят в занятый объем и вытесняют декодированные
+    данные, но сами не вытесняются.
+    """
+    
+    _shared: Optional["MemoryBudget"] = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, max_bytes: int = LAYER_MEMORY_BUDGET):
+        """
+        Инициализация бюджета.
+        
+        Args:
+            max_bytes: Максимальный объем декодированных данных в байтах
+        """
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[int, Tuple[weakref.ref, int]]" = OrderedDict()
+        self._pinned: Dict[int, int] = {}
+        self._tracked: Set[int] = set()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls) -> "MemoryBudget":
+        """
+        Возвращает общий для процесса бюджет.
+        
+        Returns:
+            Экземпляр MemoryBudget
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def touch(self, owner, nbytes: int) -> None:
+        """
+        Отмечает использование данных владельца и вытесняет лишнее.
+        
+        Args:
+            owner: Объект с методом release(), освобождающим данные
+            nbytes: Текущий объем данных владельца
+        """
+        key = id(owner)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.used_bytes -= entry[1]
+            self._track(owner, key)
+            self._entries[key] = (weakref.ref(owner), nbytes)
+            self.used_bytes += nbytes
+            victims = self._select_victims(key)
+        
+        # release() берет блокировку владельца, поэтому вызывается вне
+        # блокировки бюджета, чтобы не допустить взаимной блокировки
+        for victim in victims:
+            victim.release()
+    
+    def pin(self, owner, nbytes: int) -> None:
+        """
+        Учитывает данные владельца, которые нельзя освободить.
+        
+        Данные снимаются с учета при удалении владельца.
+        
+        Args:
+            owner: Владелец данных
+            nbytes: Объем данных в байтах
+        """
+        key = id(owner)
+        with self._lock:
+            self._track(owner, key)
+            self.used_bytes += nbytes - self._pinned.get(key, 0)
+            self._pinned[key] = nbytes
+            victims = self._select_victims(key)
+        
+        for victim in victims:
+            victim.release()
+    
+    def forget(self, owner) -> None:
+        """
+        Снимает владельца с учета после освобождения его данных.
+        
+        Args:
+            owner: Владелец, ранее переданный в touch()
+        """
+        self._drop(id(owner))
+    
+    def usage(self) -> Tuple[int, int]:
+        """
+        Возвращает текущее использование бюджета.
+        
+        Returns:
+            Кортеж (занято байт, бюджет в байтах)
+        """
+        with self._lock:
+            return self.used_bytes, self.max_bytes
+    
+    def _select_victims(self, keep: int) -> list:
+        """Снимает с учета давно не использованных владельцев сверх бюджета."""
+        victims = []
+        for key in list(self._entries):
+            if self.used_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            ref, nbytes = self._entries.pop(key)
+            self.used_bytes -= nbytes
+            owner = ref()
+            if owner is not None:
+                victims.append(owner)
+                self.evictions += 1
+        return victims
+    
+    def _track(self, owner, key: int) -> None:
+        """Подписывается на удаление владельца (под блокировкой бюджета)."""
+        if key not in self._tracked:
+            self._tracked.add(key)
+            weakref.finalize(owner, self._finalize, key)
+    
+    def _drop(self, key: int) -> None:
+        """Снимает владельца с учета."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.used_bytes -= entry[1]
+    
+    def _finalize(self, key: int) -> None:
+        """Снимает с учета удаленного владельца."""
+        self._drop(key)
+        with self._lock:
+            self.used_bytes -= self._pinned.pop(key, 0)
+            self._tracked.discard(key)
+
+
+class LayerHandle:
+    """
+    Класс слоя, декодирующего пиксели по требованию.
+    
+    Слой хранит сжатые байты файла, хэш содержимого и размер из
+    заголовка. Пиксели декодируются только при первом вызове image()
+    или preview(): слою, маска которого уже есть в MaskCache, они могут
+    не понадобиться вовсе. Превью (не больше LAYER_PREVIEW_SIZE по
+    длинной стороне) после построения не вытесняется. Полное изображение
+    RGB учитывается в MemoryBudget и может быть освобождено; image() тогда
+    прозрачно декодирует его заново из сохраненных байтов, поэтому
+    результат не зависит от изменений файла на диске. Сами сжатые байты
+    тоже входят в бюджет (см. MemoryBudget.pin).
+    """
+    
+    def __init__(
+        self,
+        path: Path,
+        data: bytes,
+        size: Tuple[int, int],
+        budget: Optional[MemoryBudget] = None
+    ):
+        """
+        Инициализация слоя без декодирования пикселей.
+        
+        Args:
+            path: Путь к файлу изображения
+            data: Сжатые байты файла
+            size: Размер изображения (ширина, высота)
+            budget: Бюджет памяти (по умолчанию - общий)
+        """
+        self.path = Path(path)
+        with Tracer.span("load.hash", bytes=len(data)):
+            self.content_hash = hash_bytes(data)
+        self.size: Tuple[int, int] = tuple(size)
+        self._data = data
+        self._lock = threading.Lock()
+        self._budget = budget or MemoryBudget.shared()
+        self._image: Optional[Image.Image] = None
+        self._preview: Optional[Image.Image] = None
+        self._decoded = False
+        
+        # Маленькие слои совпадают со своим превью и не вытесняются
+        self._evictable = max(self.size) > LAYER_PREVIEW_SIZE
+        self._budget.pin(self, len(data))
+    
+    @classmethod
+    def open(cls, path: Path, budget: Optional[MemoryBudget] = None) -> "LayerHandle":
+        """
+        Читает файл изображения; пиксели декодируются позже, по требованию.
+        
+        Args:
+            path: Путь к файлу изображения
+            budget: Бюджет памяти (по умолчанию - общий)
+        
+        Returns:
+            Слой с прочитанным файлом
+        
+        Raises:
+            OSError: Если файл не удалось прочитать или он не является
+                изображением
+        """
+        with Tracer.span("load.read") as span:
+            data = Path(path).read_bytes()
+            span.set(bytes=len(data))
+        return cls.from_bytes(path, data, budget)
+    
+    @classmethod
+    def from_bytes(
+        cls,
+        path: Path,
+        data: bytes,
+        budget: Optional[MemoryBudget] = None
+    ) -> "LayerHandle":
+        """
+        Создает слой из уже прочитанных байтов файла изображения.
+        
+        Здесь читается только заголовок; ошибки в данных пикселей
+        обнаруживаются при первом декодировании (image() или preview()).
+        
+        Args:
+            path: Путь к файлу (используется только как имя слоя)
+            data: Сжатые байты файла
+            budget: Бюджет памяти (по умолчанию - общий)
+        
+        Returns:
+            Слой с размером из заголовка
+        
+        Raises:
+            OSError: Если байты не являются изображением
+        """
+        with Image.open(BytesIO(data)) as img:
+            size = img.size
+        return cls(path, data, size, budget)
+    
+    @staticmethod
+    def _decode(data: bytes) -> Image.Image:
+        """Декодирует сжатые байты в изображение RGB."""
+        with Image.open(BytesIO(data)) as img:
+            pixels = img.width * img.height
+            with Tracer.span("load.decode", pixels=pixels, mode=img.mode):
+                img.load()
+            with Tracer.span("load.convert_rgb", pixels=pixels):
+                return img.convert("RGB")
+    
+    @staticmethod
+    def _make_preview(image: Image.Image) -> Image.Image:
+        """Уменьшает изображение до LAYER_PREVIEW_SIZE по длинной стороне."""
+        factor = -(-max(image.size) // LAYER_PREVIEW_SIZE)
+        if factor <= 1:
+            return image
+        with Tracer.span("load.preview", pixels=image.width * image.height):
+            return image.reduce(factor)
+    
+    @property
+    def width(self) -> int:
+        """Ширина изображения."""
+        return self.size[0]
+    
+    @property
+    def height(self) -> int:
+        """Высота изображения."""
+        return self.size[1]
+    
+    @property
+    def data(self) -> bytes:
+        """Сжатые байты файла, из которых декодируется слой."""
+        return self._data
+    
+    @property
+    def nbytes(self) -> int:
+        """Объем декодированного изображения RGB в байтах."""
+        return self.size[0] * self.size[1] * 3
+    
+    def image(self) -> Image.Image:
+        """
+        Возвращает полное изображение, при необходимости декодируя его.
+        
+        Returns:
+            PIL изображение в режиме RGB
+        
+        Raises:
+            OSError: Если данные изображения повреждены
+        """
+        with self._lock:
+            image = self._image
+            if image is None:
+                if self._decoded:
+                    with Tracer.span("load.redecode", pixels=self.size[0] * self.size[1]):
+                        image = self._decode(self._data)
+                else:
+                    image = self._decode(self._data)
+                    self._decoded = True
+                self._image = image
+        
+        if self._evictable:
+            self._budget.touch(self, self.nbytes)
+        return image
+    
+    def preview(self) -> Image.Image:
+        """
+        Возвращает уменьшенное изображение для превью (не вытесняется).
+        
+        При первом вызове слой декодируется целиком.
+        
+        Returns:
+            PIL изображение в режиме RGB
+        
+        Raises:
+            OSError: Если данные изображения повреждены
+        """
+        preview = self._preview
+        if preview is None:
+            preview = self._make_preview(self.image())
+            self._preview = preview
+        return preview
+    
+    def is_loaded(self) -> bool:
+        """
+        Проверяет, находится ли полное изображение в памяти.
+        
+        Returns:
+            True если image() не потребует декодирования
+        """
+        return self._image is not None
+    
+    def release(self) -> None:
+        """Освобождает полное изображение (вызывается бюджетом памяти)."""
+        if not self._evictable:
+            return
+        with self._lock:
+            self._image = None
+        self._budget.forget(self)
@@ -0,0 +1,166 @@
+"""Кэш масок подсветки и контура с вытеснением по LRU."""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+import numpy as np
+
+from src.core.processing_params import ProcessingParams
+from src.utils.constants import MASK_CACHE_BYTES
+
+MaskKey = Tuple[Hashable, ...]
+
+
+class MaskCache:
+    """
+    Класс для хранения масок, упакованных по 1 биту на пиксель.
+    
+    Ключ включает хэш содержимого слоя и параметры построения маски,
+    поэтому изменение диапазонов красного или порога контура не приводит
+    к использованию устаревших масок. Объем ограничен бюджетом в байтах,
+    при превышении вытесняются давно не использованные маски.
+    """
+    
+    _shared: Optional["MaskCache"] = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, max_bytes: int = MASK_CACHE_BYTES):
+        """
+        Инициализация кэша.
+        
+        Args:
+            max_bytes: Максимальный объем упакованных масок в байтах
+        """
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[MaskKey, Tuple[np.ndarray, Tuple[int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls) -> "MaskCache":
+        """
+        Возвращает общий для процесса кэш.
+        
+        Returns:
+            Экземпляр MaskCache
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    @staticmethod
+    def make_key(
+        kind: str, 
+        content_hash: str, 
+        params: Optional[ProcessingParams] = None
+    ) -> MaskKey:
+        """
+        Строит ключ маски по типу слоя, его содержимому и параметрам.
+        
+        Args:
+            kind: Тип слоя (highlight или outline)
+            content_hash: Хэш содержимого слоя
+            params: Параметры обработки (по умолчанию - из constants.py)
+            
+        Returns:
+            Ключ кэша
+        """
+        return kind, content_hash, (params or ProcessingParams()).mask_params(kind)
+    
+    def get(self, key: MaskKey) -> Optional[np.ndarray]:
+        """
+        Возвращает распакованную маску из кэша.
+        
+        Args:
+            key: Ключ кэша
+            
+        Returns:
+            Маска (255 - выбранная область, 0 - остальное) или None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        
+        packed, shape = entry
+        mask = np.unpackbits(packed, count=shape[0] * shape[1]).reshape(shape)
+        np.multiply(mask, 255, out=mask)
+        return mask
+    
+    def contains(self, key: MaskKey) -> bool:
+        """
+        Проверяет наличие маски в кэше, не меняя порядок вытеснения.
+        
+        Args:
+            key: Ключ кэша
+            
+        Returns:
+            True если маска есть в кэше
+        """
+        with self._lock:
+            return key in self._entries
+    
+    def put(self, key: MaskKey, mask: np.ndarray) -> None:
+        """
+        Упаковывает маску и добавляет ее в кэш.
+        
+        Args:
+            key: Ключ кэша
+            mask: Маска (ненулевые значения - выбранная область)
+        """
+        packed = np.packbits(mask, axis=None)
+        if packed.nbytes > self.max_bytes:
+            return
+        
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.used_bytes -= old[0].nbytes
+            
+            self._entries[key] = (packed, mask.shape[:2])
+            self.used_bytes += packed.nbytes
+            while self.used_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.used_bytes -= evicted.nbytes
+    
+    def get_or_compute(
+        self, 
+        kind: str, 
+        content_hash: Optional[str], 
+        compute: Callable[[], np.ndarray],
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Возвращает маску из кэша или строит и запоминает ее.
+        
+        Args:
+            kind: Тип слоя (highlight или outline)
+            content_hash: Хэш содержимого слоя; без него маска не кэшируется
+            compute: Функция построения маски
+            params: Параметры, с которыми compute строит маску
+            
+        Returns:
+            Маска слоя
+        """
+        if content_hash is None:
+            return compute()
+        
+        key = self.make_key(kind, content_hash, params)
+        mask = self.get(key)
+        if mask is None:
+            mask = compute()
+            self.put(key, mask)
+        return mask
+    
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
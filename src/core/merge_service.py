@@ -0,0 +1,555 @@
+"""Локальный HTTP-сервис объединения троек для скриптов рендер-фермы."""
+
+import asyncio
+import json
+import os
+import re
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from src.batch import start_workers
+from src.core.encoded_merger import EncodedMerger, LayerSource, MergeResult
+from src.core.image_processor import ImageProcessor
+from src.core.image_writer import ImageWriter
+from src.utils.tracing import Tracer
+from src.utils.constants import (
+    IMAGE_KINDS,
+    SERVICE_MAX_BODY,
+    SERVICE_MAX_HEADER,
+    SERVICE_QUEUE_SIZE,
+    SERVICE_TIMEOUT
+)
+
+CONTENT_TYPES = {'PNG': "image/png", 'JPEG': "image/jpeg"}
+
+
+class HttpError(Exception):
+    """Ошибка запроса, возвращаемая клиенту с кодом статуса."""
+    
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        """
+        Инициализация ошибки.
+        
+        Args:
+            status: Код статуса HTTP
+            message: Описание ошибки для клиента
+            headers: Дополнительные заголовки ответа
+        """
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _init_worker() -> None:
+    """Настраивает процесс-исполнитель: Ctrl+C обрабатывает только родитель."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _warm_up() -> None:
+    """Объединяет маленькую тройку, чтобы процесс выбрал реализацию обработки заранее."""
+    color = np.zeros((16, 16, 3), np.uint8)
+    ImageProcessor.process_images(color, color, color, "RGB")
+
+
+class MergeService:
+    """
+    Класс HTTP-сервиса объединения троек.
+    
+    Сервис слушает localhost или Unix-сокет и принимает:
+    
+    - POST /merge с multipart/form-data: файлы в полях color, outline и
+      highlight (необязательно); в ответе - результат в формате из
+      параметра format (PNG или JPEG);
+    - POST /merge с application/json: пути к файлам в ключах color,
+      outline, highlight и необязательные format и output; если задан
+      output, результат записывается туда и в ответе - описание в JSON.
+      Пути принимаются, только если сервис запущен с каталогом root, и
+      только внутри него (иначе 403); относительные пути отсчитываются
+      от root;
+    - GET /status - состояние очереди в JSON.
+    
+    Декодирование, объединение и кодирование выполняются в заранее
+    запущенных процессах, цикл событий только разбирает HTTP. Запросов
+    в работе может быть не больше числа процессов плюс queue_size:
+    следующие получают 429 с Retry-After сразу после заголовков, до
+    чтения тела. Время этапов возвращается в заголовке Server-Timing.
+    """
+    
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: int = SERVICE_QUEUE_SIZE,
+        timeout: float = SERVICE_TIMEOUT,
+        format_name: str = "PNG",
+        root: Optional[Path] = None
+    ):
+        """
+        Инициализация сервиса.
+        
+        Args:
+            workers: Количество процессов (по умолчанию - число ядер)
+            queue_size: Сколько запросов может ждать свободного процесса
+            timeout: Наибольшее время обработки запроса в секундах
+            format_name: Формат результата по умолчанию (PNG или JPEG)
+            root: Каталог, в котором лежат файлы запросов JSON (None -
+                запросы с путями к файлам не принимаются)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue_size
+        self.timeout = timeout
+        self.format_name = format_name
+        self.root = Path(root).resolve() if root is not None else None
+        self.active = 0
+        self.merged = 0
+        self.rejected = 0
+        self.failed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def serve(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        socket_path: Optional[Path] = None
+    ) -> None:
+        """
+        Запускает процессы и обслуживает запросы до SIGTERM или отмены (Ctrl+C).
+        
+        Запросы, уже переданные процессам, завершаются до выхода.
+        
+        Args:
+            host: Адрес для TCP
+            port: Порт для TCP
+            socket_path: Путь Unix-сокета (вместо TCP)
+        """
+        self._loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            self._executor = executor
+            # Процессы запускаются заранее, до создания потоков и приема
+            # запросов, чтобы первый запрос не ждал их старта
+            start_workers(executor, self.workers, _warm_up)
+            
+            if socket_path is not None:
+                if socket_path.is_socket():
+                    socket_path.unlink()
+                server = await asyncio.start_unix_server(
+                    self._handle_connection, socket_path, limit=SERVICE_MAX_HEADER
+                )
+                address = str(socket_path)
+            else:
+                server = await asyncio.start_server(
+                    self._handle_connection, host, port, limit=SERVICE_MAX_HEADER
+                )
+                address = ", ".join(
+                    f"http://{sock.getsockname()[0]}:{sock.getsockname()[1]}"
+                    for sock in server.sockets
+                )
+            
+            print(
+                f"Сервис объединения: {address}, процессов {self.workers}, "
+                f"очередь {self.capacity - self.workers}",
+                flush=True
+            )
+            stop = asyncio.Event()
+            try:
+                self._loop.add_signal_handler(signal.SIGTERM, stop.set)
+            except NotImplementedError:
+                pass  # Windows: остановка только по Ctrl+C
+            try:
+                await stop.wait()
+            finally:
+                # Соединения не дожидаются: задачи ожидающих клиентов
+                # отменяются при завершении цикла событий
+                server.close()
+                self._executor = None
+                if socket_path is not None:
+                    socket_path.unlink(missing_ok=True)
+    
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        """Обслуживает запросы одного соединения (с keep-alive)."""
+        try:
+            while True:
+                try:
+                    head = await self._read_head(reader)
+                except HttpError as e:
+                    await self._write_error(writer, e)
+                    break
+                if head is None:
+                    break
+                
+                method, target, headers = head
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, extra, content_type, body = await self._dispatch(
+                        method, target, headers, reader, writer
+                    )
+                except HttpError as e:
+                    # Тело запроса могло остаться непрочитанным: соединение закрывается
+                    await self._write_error(writer, e)
+                    break
+                await self._write_response(writer, status, extra, content_type, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Отмена приходит только при остановке сервиса
+            pass
+        finally:
+            writer.close()
+    
+    @staticmethod
+    async def _read_head(
+        reader: asyncio.StreamReader
+    ) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        """
+        Читает строку запроса и заголовки.
+        
+        Returns:
+            Кортеж (метод, цель, заголовки в нижнем регистре) или None,
+            если клиент закрыл соединение
+        
+        Raises:
+            HttpError: Если запрос не разобран или заголовки слишком велики
+        """
+        try:
+            raw = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise HttpError(400, "Запрос оборван") from e
+        except asyncio.LimitOverrunError as e:
+            raise HttpError(431, "Слишком большие заголовки") from e
+        
+        lines = raw.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            raise HttpError(400, "Неверная строка запроса")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return parts[0], parts[1], headers
+    
+    async def _dispatch(
+        self,
+        method: str,
+        target: str,
+        headers: Mapping[str, str],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> Tuple[int, Dict[str, str], str, bytes]:
+        """
+        Выполняет запрос.
+        
+        Returns:
+            Кортеж (код статуса, заголовки, тип содержимого, тело)
+        
+        Raises:
+            HttpError: Если запрос не может быть выполнен
+        """
+        url = urlsplit(target)
+        try:
+            self._check_route(method, url.path)
+            # Место занимается до чтения тела, чтобы перегруженный сервис не
+            # принимал загрузки, которые все равно не сможет обработать
+            if url.path == "/merge" and self.active >= self.capacity:
+                self.rejected += 1
+                raise HttpError(429, "Очередь заполнена", {"Retry-After": "1"})
+        except HttpError:
+            await self._discard_body(headers, reader)
+            raise
+        if url.path == "/status":
+            return 200, {}, "application/json", self._json(self.status())
+        
+        self.active += 1
+        try:
+            start = time.perf_counter()
+            body = await self._read_body(headers, reader, writer)
+            upload = (time.perf_counter() - start) * 1000
+            
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            content_type = headers.get("content-type", "")
+            if content_type.startswith("multipart/form-data"):
+                layers = self._parse_multipart(body, content_type)
+                output = None
+            elif content_type.startswith("application/json"):
+                layers, query, output = self._parse_json(body, query, self.root)
+            else:
+                raise HttpError(415, "Ожидается multipart/form-data или application/json")
+            del body
+            
+            missing = [kind for kind in ('color', 'outline') if kind not in layers]
+            if missing:
+                raise HttpError(400, f"Нет слоев: {', '.join(missing)}")
+            format_name = self._format(query, output)
+            
+            future = self._executor.submit(
+                EncodedMerger.merge, layers, format_name, output, time.time(), Tracer.enabled
+            )
+        except BaseException:
+            self.active -= 1
+            raise
+        # Место освобождается, когда процесс закончил работу, а не когда
+        # клиент получил ответ или истекло время ожидания
+        future.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._release))
+        result = await self._wait(future)
+        if result.trace_events:
+            Tracer.extend(result.trace_events)
+        
+        self.merged += 1
+        timings = {'upload': upload, **result.timings, 'total': (time.perf_counter() - start) * 1000}
+        extra = {
+            "Server-Timing": ", ".join(f"{name};dur={value:.1f}" for name, value in timings.items()),
+            "X-Image-Size": f"{result.size[0]}x{result.size[1]}",
+        }
+        if result.body is None:
+            report = {
+                'output': output,
+                'width': result.size[0],
+                'height': result.size[1],
+                'timings': {name: round(value, 1) for name, value in timings.items()},
+            }
+            return 200, extra, "application/json", self._json(report)
+        return 200, extra, CONTENT_TYPES[format_name], result.body
+    
+    @staticmethod
+    def _check_route(method: str, path: str) -> None:
+        """Проверяет путь и метод запроса."""
+        routes = {"/status": "GET", "/merge": "POST"}
+        if path not in routes:
+            raise HttpError(404, f"Неизвестный путь: {path}")
+        if method != routes[path]:
+            raise HttpError(405, f"Ожидается {routes[path]}", {"Allow": routes[path]})
+    
+    def _release(self) -> None:
+        """Освобождает место запроса, когда процесс закончил его обработку."""
+        self.active -= 1
+    
+    async def _wait(self, future: Future) -> MergeResult:
+        """Ждет результат процесса с ограничением времени и переводит ошибки в HttpError."""
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError as e:
+            self.failed += 1
+            raise HttpError(504, f"Обработка заняла больше {self.timeout:g} с") from e
+        except (OSError, ValueError) as e:
+            self.failed += 1
+            raise HttpError(400, str(e)) from e
+        except Exception as e:
+            self.failed += 1
+            raise HttpError(500, f"{type(e).__name__}: {e}") from e
+    
+    @staticmethod
+    async def _read_body(
+        headers: Mapping[str, str],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> bytes:
+        """
+        Читает тело запроса по Content-Length.
+        
+        Клиенту, ожидающему 100 Continue (так загружает файлы curl),
+        разрешение отправляется только здесь, после проверки очереди:
+        отклоненный запрос не передает тело.
+        """
+        if "transfer-encoding" in headers:
+            raise HttpError(411, "Нужен Content-Length")
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError as e:
+            raise HttpError(411, "Нужен Content-Length") from e
+        if length < 0:
+            raise HttpError(400, "Неверный Content-Length")
+        if length > SERVICE_MAX_BODY:
+            raise HttpError(413, f"Тело запроса больше {SERVICE_MAX_BODY} байт")
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+        return await reader.readexactly(length)
+    
+    @staticmethod
+    async def _discard_body(headers: Mapping[str, str], reader: asyncio.StreamReader) -> None:
+        """
+        Пропускает тело отклоненного запроса.
+        
+        Клиент без Expect: 100-continue отправляет тело, не дожидаясь
+        ответа; если закрыть соединение, не дочитав его, клиент получит
+        сброс соединения вместо ответа. Тело читается частями и не
+        сохраняется. Клиент с Expect ждет ответа и тело не отправляет.
+        """
+        if headers.get("expect", "").lower() == "100-continue":
+            return
+        try:
+            remaining = int(headers.get("content-length", "0"))
+        except ValueError:
+            return
+        if remaining > SERVICE_MAX_BODY:
+            return
+        while remaining > 0:
+            chunk = await reader.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+    
+    @staticmethod
+    def _parse_multipart(body: bytes, content_type: str) -> Dict[str, LayerSource]:
+        """
+        Извлекает файлы слоев из тела multipart/form-data.
+        
+        Тело делится по границе поиском в байтах, без построчного
+        разбора, поэтому большие загрузки не замедляют цикл событий.
+        
+        Returns:
+            Байты файлов по типам слоев (остальные поля пропускаются)
+        """
+        match = re.search(r'boundary="?([^";]+)"?', content_type)
+        if match is None:
+            raise HttpError(400, "В Content-Type нет boundary")
+        delimiter = b"--" + match.group(1).encode("latin-1")
+        
+        layers: Dict[str, LayerSource] = {}
+        position = body.find(delimiter)
+        if position < 0:
+            raise HttpError(400, "Тело multipart не содержит границы")
+        while True:
+            start = position + len(delimiter)
+            if body.startswith(b"--", start):
+                return layers
+            end = body.find(b"\r\n" + delimiter, start)
+            if end < 0:
+                raise HttpError(400, "Тело multipart оборвано")
+            head_end = body.find(b"\r\n\r\n", start, end)
+            if head_end < 0:
+                raise HttpError(400, "Часть multipart без заголовков")
+            name = re.search(rb'\bname="([^"]*)"', body[start:head_end])
+            if name is not None and name.group(1).decode("latin-1") in IMAGE_KINDS:
+                layers[name.group(1).decode("latin-1")] = body[head_end + 4:end]
+            position = end + 2
+    
+    @staticmethod
+    def _parse_json(
+        body: bytes,
+        query: Dict[str, str],
+        root: Optional[Path]
+    ) -> Tuple[Dict[str, LayerSource], Dict[str, str], Optional[str]]:
+        """
+        Разбирает запрос с путями к файлам.
+        
+        Args:
+            body: Тело запроса
+            query: Параметры из строки запроса
+            root: Каталог, вне которого пути запрещены (None - запрещены все)
+        
+        Returns:
+            Кортеж (пути слоев по типам, параметры с format из тела, путь
+            результата); пути абсолютные и лежат внутри root
+        
+        Raises:
+            HttpError: Если запрос не разобран (400) или путь запрещен (403)
+        """
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            raise HttpError(400, f"Неверный JSON: {e}") from e
+        if not isinstance(request, dict):
+            raise HttpError(400, "Ожидается объект JSON")
+        
+        paths: Dict[str, str] = {}
+        for name in (*IMAGE_KINDS, "output"):
+            if request.get(name) is not None:
+                if not isinstance(request[name], str):
+                    raise HttpError(400, f"Путь {name} должен быть строкой")
+                paths[name] = MergeService._resolve(request[name], name, root)
+        if request.get("format") is not None:
+            query = {**query, 'format': str(request["format"])}
+        output = paths.pop("output", None)
+        return paths, query, output
+    
+    @staticmethod
+    def _resolve(value: str, name: str, root: Optional[Path]) -> str:
+        """
+        Переводит путь из запроса в абсолютный и проверяет, что он внутри root.
+        
+        Символические ссылки раскрываются до проверки, поэтому ссылка
+        внутри root на файл вне его тоже запрещена.
+        """
+        if root is None:
+            raise HttpError(403, "Пути к файлам не принимаются: сервис запущен без --root")
+        path = (root / value).resolve()
+        if not path.is_relative_to(root):
+            raise HttpError(403, f"Путь {name} вне каталога {root}")
+        return str(path)
+    
+    def _format(self, query: Mapping[str, str], output: Optional[str]) -> str:
+        """Определяет формат результата: параметр format, расширение output или по умолчанию."""
+        if 'format' in query:
+            format_name = query['format'].upper()
+            format_name = 'JPEG' if format_name == 'JPG' else format_name
+            if format_name not in CONTENT_TYPES:
+                raise HttpError(400, f"Неизвестный формат: {query['format']}")
+            return format_name
+        if output is not None:
+            return ImageWriter.format_for_path(Path(output))
+        return self.format_name
+    
+    def status(self) -> Dict[str, int]:
+        """
+        Возвращает состояние сервиса.
+        
+        Returns:
+            Словарь: процессы, емкость, запросы в работе, счетчики
+            объединенных, отклоненных (429) и неудачных запросов
+        """
+        return {
+            'workers': self.workers,
+            'capacity': self.capacity,
+            'active': self.active,
+            'merged': self.merged,
+            'rejected': self.rejected,
+            'failed': self.failed,
+        }
+    
+    @staticmethod
+    def _json(value) -> bytes:
+        """Кодирует ответ JSON."""
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+    
+    async def _write_error(self, writer: asyncio.StreamWriter, error: HttpError) -> None:
+        """Отправляет ошибку в JSON и закрывает соединение."""
+        body = self._json({'error': str(error)})
+        await self._write_response(
+            writer, error.status, error.headers, "application/json", body, keep_alive=False
+        )
+    
+    @staticmethod
+    async def _write_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        headers: Mapping[str, str],
+        content_type: str,
+        body: bytes,
+        keep_alive: bool
+    ) -> None:
+        """Отправляет ответ HTTP/1.1."""
+        lines: List[str] = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+        ]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        if not keep_alive:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        writer.write(body)
+        await writer.drain()
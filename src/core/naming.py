@@ -0,0 +1,66 @@
+"""Правила именования файлов для поиска троек изображений."""
+
+import re
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+
+from src.utils.constants import IMAGE_KINDS, DEFAULT_NAMING_PATTERNS, IMAGE_EXTENSIONS
+
+
+class NamingRule:
+    """Класс для сопоставления имён файлов с типами изображений."""
+    
+    NAME_FIELD = "{name}"
+    
+    def __init__(self, patterns: Optional[Mapping[str, str]] = None):
+        """
+        Инициализация правила именования.
+        
+        Args:
+            patterns: Шаблоны имён по типам изображений, например
+                {"outline": "{name}_outline"}; отсутствующие типы
+                берутся из DEFAULT_NAMING_PATTERNS
+            
+        Raises:
+            ValueError: Если шаблон не содержит {name} или тип неизвестен
+        """
+        self.patterns: Dict[str, str] = dict(DEFAULT_NAMING_PATTERNS)
+        if patterns:
+            for kind, pattern in patterns.items():
+                if kind not in IMAGE_KINDS:
+                    raise ValueError(f"Неизвестный тип изображения: {kind}")
+                self.patterns[kind] = pattern
+        
+        # Более специфичные шаблоны (с длинной постоянной частью) проверяем
+        # первыми, чтобы "{name}" не перехватывал "{name}_outline"
+        self._regexes = []
+        for kind, pattern in self.patterns.items():
+            if pattern.count(self.NAME_FIELD) != 1:
+                raise ValueError(f"Шаблон '{pattern}' должен содержать {self.NAME_FIELD} ровно один раз")
+            prefix, suffix = pattern.split(self.NAME_FIELD)
+            regex = re.compile(
+                f"^{re.escape(prefix)}(?P<name>.+?){re.escape(suffix)}$",
+                re.IGNORECASE
+            )
+            self._regexes.append((len(prefix) + len(suffix), kind, regex))
+        self._regexes.sort(key=lambda item: item[0], reverse=True)
+    
+    def match(self, path: Path) -> Optional[Tuple[str, str]]:
+        """
+        Определяет тип изображения и имя вида по пути к файлу.
+        
+        Args:
+            path: Путь к файлу
+            
+        Returns:
+            Кортеж (имя вида, тип изображения) или None
+        """
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            return None
+        
+        for _, kind, regex in self._regexes:
+            found = regex.match(path.stem)
+            if found:
+                return found.group('name'), kind
+        
+        return None
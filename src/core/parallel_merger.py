@@ -0,0 +1,171 @@
+"""Объединение одной тройки несколькими процессами через общую память."""
+
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Mapping, Optional
+
+import numpy as np
+from PIL import Image
+
+from src.core.image_processor import ImageProcessor
+from src.core.processing_params import ProcessingParams
+from src.core.shared_frames import SharedFrame, SharedFrames
+from src.utils.constants import PARALLEL_PART_PIXELS
+from src.utils.tracing import Tracer
+
+
+def _merge_rows(
+    layers: Mapping[str, SharedFrame],
+    out: SharedFrame,
+    top: int,
+    bottom: int,
+    params: Optional[ProcessingParams]
+) -> None:
+    """
+    Объединяет строки [top, bottom) слоев в общий буфер результата.
+    
+    Выполняется в процессе-исполнителе. Все этапы попиксельные, поэтому
+    части, обработанные разными процессами, дают тот же результат, что
+    и обработка целиком.
+    """
+    kinds = list(layers)
+    with SharedFrames.attach([*layers.values(), out]) as arrays:
+        rows = {kind: array[np.newaxis, top:bottom] for kind, array in zip(kinds, arrays)}
+        ImageProcessor.process_batch(
+            rows['color'],
+            rows['outline'],
+            rows.get('highlight'),
+            "RGB",
+            out=arrays[-1][np.newaxis, top:bottom],
+            params=params
+        )
+        rows.clear()
+
+
+class ParallelMerger:
+    """
+    Класс для объединения одной тройки несколькими процессами.
+    
+    Слои декодируются в родительском процессе прямо в общую память
+    (SharedFrames), результат процессы-исполнители пишут в общий буфер,
+    созданный родителем, каждый - в свою полосу строк. Между процессами
+    передаются только описания сегментов, а не сериализованные массивы
+    в сотни мегабайт. Полезно, когда троек меньше, чем процессов:
+    иначе исполнители простаивают.
+    """
+    
+    @staticmethod
+    def parts(pixels: int, workers: int) -> int:
+        """
+        Определяет, на сколько частей делить изображение.
+        
+        Args:
+            pixels: Число пикселей изображения
+            workers: Количество доступных процессов
+        
+        Returns:
+            Количество частей (не меньше 1)
+        """
+        return max(1, min(workers, pixels // PARALLEL_PART_PIXELS))
+    
+    @staticmethod
+    @contextmanager
+    def merge(
+        paths: Mapping[str, Path],
+        executor: Executor,
+        workers: int,
+        params: Optional[ProcessingParams] = None
+    ) -> Iterator[np.ndarray]:
+        """
+        Декодирует слои в общую память и объединяет их в пуле процессов.
+        
+        Слои декодируются одновременно в потоках. Результат доступен
+        только внутри блока with: при выходе сегменты удаляются.
+        
+        Args:
+            paths: Пути к слоям по типам (color и outline обязательны)
+            executor: Пул процессов
+            workers: Сколько процессов может занять тройка
+            params: Параметры обработки (по умолчанию - из constants.py)
+        
+        Yields:
+            Результат (массив RGB в общей памяти)
+        
+        Raises:
+            OSError: Если файл не удалось прочитать
+            ValueError: Если размеры слоев различаются
+        """
+        with SharedFrames() as shared:
+            with ThreadPoolExecutor(max_workers=len(paths)) as decoders:
+                decoded = decoders.map(
+                    lambda path: ParallelMerger._share_layer(shared, path), paths.values()
+                )
+                layers = dict(zip(paths, decoded))
+            yield ParallelMerger.merge_shared(shared, layers, executor, workers, params)
+    
+    @staticmethod
+    def merge_shared(
+        shared: SharedFrames,
+        layers: Mapping[str, SharedFrame],
+        executor: Executor,
+        workers: int,
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Объединяет слои, уже находящиеся в общей памяти.
+        
+        Изображение делится на полосы строк по числу процессов, но
+        полоса не меньше PARALLEL_PART_PIXELS.
+        
+        Args:
+            shared: Набор, в котором создается буфер результата
+            layers: Слои RGB по типам (color и outline обязательны)
+            executor: Пул процессов
+            workers: Сколько процессов может занять тройка
+            params: Параметры обработки (по умолчанию - из constants.py)
+        
+        Returns:
+            Результат (массив RGB в общей памяти набора shared)
+        
+        Raises:
+            ValueError: Если размеры слоев различаются
+        """
+        shapes = {kind: frame.shape for kind, frame in layers.items()}
+        if len(set(shapes.values())) > 1:
+            raise ValueError(
+                "Размеры слоев не совпадают: "
+                + ", ".join(f"{kind} {shape[1]}x{shape[0]}" for kind, shape in shapes.items())
+            )
+        
+        shape = layers['color'].shape
+        height, width = shape[:2]
+        out, result = shared.create(shape)
+        parts = min(ParallelMerger.parts(height * width, workers), height)
+        bounds = [height * i // parts for i in range(parts + 1)]
+        with Tracer.span("merge.parallel", pixels=height * width, parts=parts):
+            futures = [
+                executor.submit(_merge_rows, dict(layers), out, top, bottom, params)
+                for top, bottom in zip(bounds, bounds[1:])
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Сегменты удаляются только после завершения начатых частей
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                raise
+        return result
+    
+    @staticmethod
+    def _share_layer(shared: SharedFrames, path: Path) -> SharedFrame:
+        """Декодирует слой в RGB и копирует его в общую память."""
+        with Image.open(path) as img:
+            pixels = img.width * img.height
+            with Tracer.span("load.decode", pixels=pixels, mode=img.mode):
+                img.load()
+            rgb = img if img.mode == "RGB" else img.convert("RGB")
+            with Tracer.span("load.share", pixels=pixels):
+                return shared.share(rgb)
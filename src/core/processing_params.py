@@ -0,0 +1,95 @@
+"""Параметры обработки, которые можно менять без изменения кода."""
+
+from typing import Any, Dict, NamedTuple, Tuple
+
+from src.utils.constants import (
+    RED_HSV_RANGES,
+    BLACK_THRESHOLD,
+    FADE_WEIGHT,
+    OUTLINE_DARKEN_FACTOR
+)
+
+HsvRange = Tuple[Tuple[int, int, int], Tuple[int, int, int]]
+
+
+class ProcessingParams(NamedTuple):
+    """
+    Параметры объединения.
+    
+    Значения по умолчанию совпадают с константами из constants.py.
+    Кортеж неизменяем и хэшируем, поэтому его можно передавать в
+    фоновые потоки и использовать в ключах кэшей масок и результатов.
+    """
+    
+    fade_weight: float = FADE_WEIGHT
+    darken_factor: float = OUTLINE_DARKEN_FACTOR
+    black_threshold: int = BLACK_THRESHOLD
+    red_hsv_ranges: Tuple[HsvRange, ...] = tuple(
+        (tuple(lower), tuple(upper)) for lower, upper in RED_HSV_RANGES
+    )
+    
+    @classmethod
+    def from_red_bounds(
+        cls,
+        hue_tolerance: int,
+        min_saturation: int,
+        min_value: int,
+        **kwargs: Any
+    ) -> "ProcessingParams":
+        """
+        Строит параметры с красным цветом, заданным допуском оттенка.
+        
+        Оттенок красного в OpenCV близок к 0 и к 180, поэтому получаются
+        два диапазона: [0, допуск] и [180 - допуск, 180].
+        
+        Args:
+            hue_tolerance: Отклонение оттенка от красного (0-90)
+            min_saturation: Нижняя граница насыщенности (0-255)
+            min_value: Нижняя граница яркости (0-255)
+            **kwargs: Остальные параметры
+        
+        Returns:
+            Параметры обработки
+        """
+        ranges = (
+            ((0, min_saturation, min_value), (hue_tolerance, 255, 255)),
+            ((180 - hue_tolerance, min_saturation, min_value), (180, 255, 255)),
+        )
+        return cls(red_hsv_ranges=ranges, **kwargs)
+    
+    def mask_params(self, kind: str) -> Tuple:
+        """
+        Возвращает параметры, от которых зависит маска слоя.
+        
+        Args:
+            kind: Тип слоя (highlight или outline)
+        
+        Returns:
+            Кортеж параметров маски
+        """
+        if kind == 'highlight':
+            return self.red_hsv_ranges
+        return (self.black_threshold,)
+    
+    def highlight_params(self) -> Tuple:
+        """
+        Возвращает параметры этапа подсветки (до наложения контура).
+        
+        Returns:
+            Кортеж (вес осветления, диапазоны красного)
+        """
+        return self.fade_weight, self.red_hsv_ranges
+    
+    def describe(self) -> Dict[str, Any]:
+        """
+        Описывает параметры для ключа кэша результатов.
+        
+        Returns:
+            Словарь, сериализуемый в JSON
+        """
+        return {
+            'fade_weight': self.fade_weight,
+            'outline_darken_factor': self.darken_factor,
+            'black_threshold': self.black_threshold,
+            'red_hsv_ranges': self.red_hsv_ranges,
+        }
@@ -0,0 +1,148 @@
+"""Быстрое объединение уменьшенных слоев для настройки параметров."""
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.core.image_processor import ImageProcessor
+from src.core.layer_store import LayerHandle
+from src.core.processing_params import ProcessingParams
+from src.utils.constants import PROXY_MASK_CACHE_ENTRIES
+from src.utils.tracing import Tracer
+
+
+class ProxyMerger:
+    """
+    Класс для объединения слоев, уменьшенных до размера области превью.
+    
+    Пока пользователь меняет параметры, результат пересчитывается на
+    уменьшенных копиях слоев, поэтому время отклика не зависит от
+    размера исходных изображений. Цветной слой берется из постоянного
+    превью слоя, а контур и подсветка уменьшаются ближайшим соседом из
+    полного изображения: значения их пикселей не смешиваются, и пороги
+    масок срабатывают так же, как на полном размере. Такие копии
+    размером с превью слоя хранятся, пока жив слой, поэтому полное
+    изображение читается один раз. Маски уменьшенных слоев
+    запоминаются по параметрам масок: при смене осветления или
+    затемнения они не перестраиваются.
+    """
+    
+    def __init__(self):
+        """Инициализация пустого набора уменьшенных слоев."""
+        self._lock = threading.Lock()
+        self._layers: Dict[str, LayerHandle] = {}
+        self._size: Optional[Tuple[int, int]] = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._masks: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._nearest: "weakref.WeakKeyDictionary[LayerHandle, Image.Image]" = (
+            weakref.WeakKeyDictionary()
+        )
+    
+    @staticmethod
+    def proxy_size(image_size: Tuple[int, int], viewport: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Вписывает изображение в область превью без увеличения.
+        
+        Args:
+            image_size: Размер изображения (ширина, высота)
+            viewport: Размер области превью в пикселях экрана
+        
+        Returns:
+            Размер уменьшенного изображения (ширина, высота)
+        """
+        width, height = image_size
+        scale = min(viewport[0] / width, viewport[1] / height, 1.0)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    
+    def merge(
+        self,
+        layers: Mapping[str, LayerHandle],
+        viewport: Tuple[int, int],
+        params: Optional[ProcessingParams] = None
+    ) -> np.ndarray:
+        """
+        Объединяет уменьшенные слои с заданными параметрами.
+        
+        Безопасно вызывается из фоновых потоков.
+        
+        Args:
+            layers: Слои по типам (color и outline обязательны)
+            viewport: Размер области превью в пикселях экрана
+            params: Параметры обработки (по умолчанию - из constants.py)
+        
+        Returns:
+            Уменьшенный результат (массив RGB)
+        """
+        params = params or ProcessingParams()
+        size = self.proxy_size(layers['color'].size, viewport)
+        
+        with self._lock:
+            self._prepare(layers, size)
+            red_mask = self._mask('highlight', params) if 'highlight' in self._arrays else None
+            black_mask = self._mask('outline', params)
+            with Tracer.span("merge.proxy", pixels=size[0] * size[1]):
+                return ImageProcessor.merge_masked(
+                    self._arrays['color'], red_mask, black_mask, params=params
+                )
+    
+    def reset(self) -> None:
+        """Освобождает уменьшенные слои и маски."""
+        with self._lock:
+            self._layers = {}
+            self._size = None
+            self._arrays = {}
+            self._masks.clear()
+    
+    def _prepare(self, layers: Mapping[str, LayerHandle], size: Tuple[int, int]) -> None:
+        """Уменьшает слои до size, если изменились слои или размер."""
+        if (
+            size == self._size
+            and layers.keys() == self._layers.keys()
+            and all(layers[kind] is self._layers[kind] for kind in layers)
+        ):
+            return
+        
+        arrays = {}
+        with Tracer.span("proxy.prepare", pixels=size[0] * size[1]):
+            for kind, layer in layers.items():
+                if kind == 'color':
+                    img = layer.preview().resize(size, Image.Resampling.BILINEAR)
+                else:
+                    img = self._nearest_preview(layer).resize(size, Image.Resampling.NEAREST)
+                arrays[kind] = ImageProcessor.pil_to_rgb(img)
+        
+        self._layers = dict(layers)
+        self._size = size
+        self._arrays = arrays
+        self._masks.clear()
+    
+    def _nearest_preview(self, layer: LayerHandle) -> Image.Image:
+        """Уменьшает слой ближайшим соседом до размера его превью (один раз на слой)."""
+        img = self._nearest.get(layer)
+        if img is None:
+            with Tracer.span("proxy.nearest", pixels=layer.width * layer.height):
+                img = layer.image().resize(layer.preview().size, Image.Resampling.NEAREST)
+            self._nearest[layer] = img
+        return img
+    
+    def _mask(self, kind: str, params: ProcessingParams) -> np.ndarray:
+        """Возвращает маску уменьшенного слоя, строя ее при смене параметров маски."""
+        key = (kind, params.mask_params(kind))
+        mask = self._masks.get(key)
+        if mask is not None:
+            self._masks.move_to_end(key)
+            return mask
+        
+        mask_func = (
+            ImageProcessor.highlight_mask if kind == 'highlight'
+            else ImageProcessor.outline_mask
+        )
+        mask = mask_func(self._arrays[kind], "RGB", params)
+        self._masks[key] = mask
+        while len(self._masks) > PROXY_MASK_CACHE_ENTRIES:
+            self._masks.popitem(last=False)
+        return mask
@@ -0,0 +1,240 @@
+"""Дисковый кэш готовых результатов, адресуемый по содержимому входов."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Mapping, Optional
+
+from src.core.processing_params import ProcessingParams
+from src.utils.constants import (
+    IMAGE_KINDS,
+    DEFAULT_QUALITY,
+    DEFAULT_DPI,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_BYTES
+)
+
+
+class ResultCache:
+    """
+    Класс для хранения закодированных результатов объединения.
+    
+    Ключ - хэш от хэшей содержимого слоев, параметров обработки и настроек
+    кодирования, поэтому изменение любого из них дает промах, а не
+    устаревший файл. При попадании файл копируется (или связывается
+    жесткой ссылкой) в место назначения без декодирования и обработки.
+    Объем ограничен, при превышении удаляются файлы, к которым дольше
+    всего не обращались.
+    """
+    
+    # Увеличивается при изменении алгоритма обработки, чтобы сбросить кэш
+    KEY_VERSION = 1
+    
+    def __init__(
+        self,
+        root: Path = RESULT_CACHE_DIR,
+        max_bytes: int = RESULT_CACHE_BYTES,
+        link: bool = False
+    ):
+        """
+        Инициализация кэша.
+        
+        Args:
+            root: Каталог кэша
+            max_bytes: Максимальный объем кэша в байтах
+            link: Связывать результаты жесткими ссылками вместо копирования.
+                Безопасно, только если файлы результатов заменяются, а не
+                перезаписываются на месте
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+    
+    @classmethod
+    def make_key(
+        cls,
+        content_hashes: Mapping[str, str],
+        format_name: str,
+        params: Optional[ProcessingParams] = None,
+        variant: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Строит ключ результата.
+        
+        Ключ для параметров по умолчанию совпадает с прежним, когда
+        параметры задавались только константами.
+        
+        Args:
+            content_hashes: Хэши содержимого слоев по типам
+            format_name: Формат файла (PNG или JPEG)
+            params: Параметры обработки (по умолчанию - из constants.py)
+            variant: Вид файла профиля экспорта (None - полный размер),
+                см. ExportProfile.variants
+        
+        Returns:
+            Ключ кэша или None, если не известны хэши color и outline
+        """
+        if 'color' not in content_hashes or 'outline' not in content_hashes:
+            return None
+        
+        description = {
+            'version': cls.KEY_VERSION,
+            'layers': {kind: content_hashes.get(kind) for kind in IMAGE_KINDS},
+            **(params or ProcessingParams()).describe(),
+            'format': format_name,
+            'quality': DEFAULT_QUALITY if format_name == 'JPEG' else None,
+            'dpi': DEFAULT_DPI,
+        }
+        if variant is not None:
+            description['variant'] = variant
+        encoded = json.dumps(description, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+    
+    def _entry_path(self, key: str) -> Path:
+        """Возвращает путь к файлу записи кэша."""
+        return self.root / key[:2] / key
+    
+    def fetch(self, key: Optional[str], dest: Path) -> bool:
+        """
+        Выдает результат из кэша в указанный файл.
+        
+        Args:
+            key: Ключ кэша (None - всегда промах)
+            dest: Путь для результата
+        
+        Returns:
+            True при попадании, False при промахе
+        """
+        entry = self._entry_path(key) if key else None
+        if entry is None or not entry.is_file():
+            self.misses += 1
+            return False
+        
+        try:
+            self._place(entry, Path(dest))
+            # Время изменения записи служит отметкой последнего использования
+            os.utime(entry)
+        except OSError:
+            self.misses += 1
+            return False
+        
+        self.hits += 1
+        self.bytes_saved += entry.stat().st_size
+        return True
+    
+    def store(self, key: Optional[str], src: Path) -> None:
+        """
+        Помещает закодированный результат в кэш.
+        
+        Args:
+            key: Ключ кэша (None - ничего не делать)
+            src: Путь к файлу результата
+        """
+        if not key:
+            return
+        
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Запись через временный файл, чтобы параллельные процессы не
+        # увидели недописанный результат
+        fd, tmp_name = tempfile.mkstemp(dir=entry.parent, prefix=".tmp-")
+        os.close(fd)
+        tmp = Path(tmp_name)
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, entry)
+        finally:
+            tmp.unlink(missing_ok=True)
+    
+    def _place(self, entry: Path, dest: Path) -> None:
+        """Копирует или связывает запись кэша с файлом назначения."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if self.link:
+            dest.unlink(missing_ok=True)
+            try:
+                os.link(entry, dest)
+                return
+            except OSError:
+                # Другая файловая система - копируем
+                pass
+        shutil.copyfile(entry, dest)
+    
+    def size(self) -> int:
+        """
+        Возвращает текущий объем кэша в байтах.
+        
+        Returns:
+            Суммарный размер записей
+        """
+        return sum(size for _, size, _ in self._entries())
+    
+    def _entries(self):
+        """Перечисляет записи кэша как (путь, размер, время использования)."""
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.is_file() and not entry.name.startswith('.tmp-'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # Запись удалена параллельным вытеснением
+                        continue
+                    yield Path(entry.path), stat.st_size, stat.st_mtime
+    
+    def evict(self) -> int:
+        """
+        Удаляет давно не использованные записи сверх лимита объема.
+        
+        Returns:
+            Количество удаленных записей
+        """
+        entries = sorted(self._entries(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        
+        return removed
+    
+    def report(self) -> str:
+        """
+        Возвращает строку статистики кэша.
+        
+        Returns:
+            Попадания, промахи и сэкономленный объем
+        """
+        return ResultCache.format_report(self.hits, self.misses, self.bytes_saved)
+    
+    @staticmethod
+    def format_report(hits: int, misses: int, bytes_saved: int) -> str:
+        """
+        Форматирует статистику кэша, в том числе собранную из разных процессов.
+        
+        Args:
+            hits: Количество попаданий
+            misses: Количество промахов
+            bytes_saved: Объем результатов, выданных без пересчета
+        
+        Returns:
+            Строка статистики
+        """
+        total = hits + misses
+        ratio = hits / total * 100 if total else 0.0
+        return (
+            f"Кэш: {hits} попаданий, {misses} промахов ({ratio:.0f}%), "
+            f"выдано без пересчета {bytes_saved / 1024 / 1024:.1f} МБ"
+        )
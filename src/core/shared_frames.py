@@ -0,0 +1,170 @@
+"""Передача изображений между процессами через общую память."""
+
+import os
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+
+class SharedFrame(NamedTuple):
+    """Описание массива в общей памяти, которое передается другому процессу."""
+    
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str = "|u1"
+
+
+class SharedFrames:
+    """
+    Класс набора массивов в общей памяти (multiprocessing.shared_memory).
+    
+    Набор создает родительский процесс, а процессам-исполнителям
+    передаются только описания SharedFrame: attach отображает ту же
+    память как массивы numpy, без сериализации и копирования. Буферы
+    для результатов тоже создает родитель, поэтому все сегменты
+    принадлежат ему, и close() (или выход из with) удаляет их, даже
+    если исполнитель упал посреди работы. Если аварийно завершится сам
+    родитель, оставшиеся сегменты удалит resource_tracker
+    multiprocessing, когда завершатся все процессы, связанные с ним.
+    
+    Пул процессов нужно создавать после prepare(): иначе исполнители
+    запустят собственные resource_tracker, и те удалят отображенные
+    ими сегменты, когда исполнитель завершится.
+    
+    Отображение нельзя закрыть, пока на него ссылаются массивы: такое
+    отображение закрывается при следующем обращении к SharedFrames, а
+    память освобождается, когда закрыты все отображения удаленного
+    сегмента.
+    """
+    
+    # Отображения, которые не удалось закрыть из-за живых массивов
+    _unclosed: List[shared_memory.SharedMemory] = []
+    _lock = threading.Lock()
+    
+    def __init__(self):
+        """Инициализация пустого набора."""
+        self._segments: List[shared_memory.SharedMemory] = []
+        self._segments_lock = threading.Lock()
+    
+    @staticmethod
+    def prepare() -> None:
+        """Запускает resource_tracker, общий для этого процесса и его будущих исполнителей."""
+        # В Windows сегменты освобождаются системой и resource_tracker не нужен
+        if os.name == "posix":
+            resource_tracker.ensure_running()
+    
+    def __enter__(self) -> "SharedFrames":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def create(self, shape: Sequence[int], dtype=np.uint8) -> Tuple[SharedFrame, np.ndarray]:
+        """
+        Создает сегмент общей памяти под массив.
+        
+        Args:
+            shape: Форма массива
+            dtype: Тип элементов
+        
+        Returns:
+            Кортеж (описание для других процессов, массив в этом процессе);
+            содержимое массива не определено
+        """
+        SharedFrames._close_unclosed()
+        dtype = np.dtype(dtype)
+        shape = tuple(int(side) for side in shape)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        with self._segments_lock:
+            self._segments.append(segment)
+        frame = SharedFrame(segment.name, shape, dtype.str)
+        return frame, np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+    
+    def share(self, image: Union[np.ndarray, Image.Image]) -> SharedFrame:
+        """
+        Копирует изображение в новый сегмент.
+        
+        Копия одна, как и при переводе PIL изображения в массив
+        (ImageProcessor.pil_to_rgb).
+        
+        Args:
+            image: Массив или PIL изображение
+        
+        Returns:
+            Описание для других процессов
+        """
+        if isinstance(image, Image.Image):
+            shape = (image.height, image.width, len(image.getbands()))
+            if shape[2] == 1:
+                shape = shape[:2]
+        else:
+            shape = image.shape
+        frame, array = self.create(shape)
+        array[...] = image
+        return frame
+    
+    def close(self) -> None:
+        """Удаляет все сегменты набора и закрывает их отображения."""
+        with self._segments_lock:
+            segments, self._segments = self._segments, []
+        for segment in segments:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+            SharedFrames._close(segment)
+    
+    @staticmethod
+    @contextmanager
+    def attach(frames: Sequence[SharedFrame]) -> Iterator[List[np.ndarray]]:
+        """
+        Отображает массивы, созданные другим процессом.
+        
+        Список массивов очищается при выходе из with, после чего
+        отображения закрываются; ссылки на массивы (и их срезы) не должны
+        переживать блок.
+        
+        Args:
+            frames: Описания массивов
+        
+        Yields:
+            Массивы в порядке frames
+        
+        Raises:
+            FileNotFoundError: Если сегмент уже удален
+        """
+        SharedFrames._close_unclosed()
+        segments: List[shared_memory.SharedMemory] = []
+        arrays: List[np.ndarray] = []
+        try:
+            for frame in frames:
+                segment = shared_memory.SharedMemory(frame.name)
+                segments.append(segment)
+                arrays.append(np.ndarray(frame.shape, dtype=frame.dtype, buffer=segment.buf))
+            yield arrays
+        finally:
+            arrays.clear()
+            for segment in segments:
+                SharedFrames._close(segment)
+    
+    @staticmethod
+    def _close(segment: shared_memory.SharedMemory) -> None:
+        """Закрывает отображение или откладывает его, если на него ссылаются массивы."""
+        try:
+            segment.close()
+        except BufferError:
+            with SharedFrames._lock:
+                SharedFrames._unclosed.append(segment)
+    
+    @staticmethod
+    def _close_unclosed() -> None:
+        """Повторяет закрытие отложенных отображений."""
+        with SharedFrames._lock:
+            pending, SharedFrames._unclosed = SharedFrames._unclosed, []
+        for segment in pending:
+            SharedFrames._close(segment)
@@ -0,0 +1,232 @@
+"""Последовательное чтение слоев полосами строк."""
+
+import struct
+import zlib
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+# Слой: путь к файлу или уже прочитанные байты файла
+LayerSource = Union[Path, bytes]
+
+
+class StripReader:
+    """
+    Класс для чтения слоя PNG полосами строк в формате RGB.
+    
+    Читаются PNG без чересстрочной развертки с 8 битами на канал (L, LA,
+    RGB, RGBA): данные IDAT распаковываются ровно на строки полосы, и PIL
+    декодирует только их (кодеком zip через frombytes) вместе с последней
+    строкой предыдущей полосы, от которой зависят фильтры PNG. В памяти
+    находится одна полоса слоя, а полосы читаются строго сверху вниз.
+    
+    Остальные файлы, прежде всего JPEG, нельзя начать декодировать с
+    произвольной строки, и StripReader их не открывает (см. can_stream).
+    
+    Вместо пути можно передать сжатые байты файла, уже находящиеся в
+    памяти (например, байты LayerHandle): тогда файл на диске не читается.
+    """
+    
+    # Число каналов режимов PIL, которые читаются потоково
+    STREAMED_MODES = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+    # Сколько сжатых байт читается из файла за раз
+    READ_SIZE = 1 << 16
+    
+    def __init__(self, source: LayerSource, size: Optional[Tuple[int, int]] = None):
+        """
+        Открывает слой; заранее ничего не декодируется.
+        
+        Args:
+            source: Путь к слою или сжатые байты файла
+            size: Ожидаемый размер (ширина, высота) или None
+        
+        Raises:
+            OSError: Если файл не удалось прочитать
+            ValueError: Если слой нельзя читать полосами или его размер
+                не совпадает с size
+        """
+        self._source = source
+        self.name = "в памяти" if isinstance(source, bytes) else Path(source).name
+        self._file = None
+        with Image.open(self.image_file(source)) as img:
+            if not self._can_stream(img):
+                raise ValueError(
+                    f"Файл {self.name} нельзя читать полосами: нужен PNG "
+                    f"без чересстрочной развертки с 8 битами на канал"
+                )
+            self.size: Tuple[int, int] = img.size
+            self._mode = img.mode
+        if size is not None and self.size != size:
+            raise ValueError(
+                f"Размер {self.name} {self.size[0]}x{self.size[1]} "
+                f"не совпадает с цветным изображением {size[0]}x{size[1]}"
+            )
+        
+        try:
+            self._open_stream()
+        except BaseException:
+            self.close()
+            raise
+    
+    def __enter__(self) -> "StripReader":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    @staticmethod
+    def image_file(source: LayerSource) -> Union[Path, BinaryIO]:
+        """
+        Возвращает аргумент для Image.open.
+        
+        Args:
+            source: Путь к слою или сжатые байты файла
+        
+        Returns:
+            Путь или поток байтов
+        """
+        return BytesIO(source) if isinstance(source, bytes) else Path(source)
+    
+    @staticmethod
+    def can_stream(source: LayerSource) -> bool:
+        """
+        Проверяет по заголовку файла, можно ли читать слой полосами.
+        
+        Args:
+            source: Путь к слою или сжатые байты файла
+        
+        Returns:
+            True если это PNG, который StripReader читает потоково
+        
+        Raises:
+            OSError: Если файл не удалось прочитать
+        """
+        with Image.open(StripReader.image_file(source)) as img:
+            return StripReader._can_stream(img)
+    
+    @staticmethod
+    def _can_stream(img: Image.Image) -> bool:
+        """Проверяет, можно ли читать изображение потоково."""
+        if img.format != "PNG" or len(img.tile) != 1 or getattr(img, "n_frames", 1) > 1:
+            return False
+        decoder, _, _, rawmode = img.tile[0][:4]
+        # Режим совпадает с форматом строк в файле: последнюю строку полосы
+        # можно вернуть декодеру без преобразования
+        return (
+            decoder == "zip"
+            and rawmode == img.mode
+            and img.mode in StripReader.STREAMED_MODES
+            and not img.info.get("interlace")
+        )
+    
+    def read(self, top: int, bottom: int) -> np.ndarray:
+        """
+        Читает строки [top, bottom) в формате RGB.
+        
+        Args:
+            top: Первая строка полосы
+            bottom: Строка после последней
+        
+        Returns:
+            Полоса RGB (массив формы (bottom - top, ширина, 3) только для чтения)
+        
+        Raises:
+            OSError: Если файл поврежден или обрезан
+            ValueError: Если полоса не следует за предыдущей
+        """
+        strip = self._read_stream(top, bottom)
+        if strip.mode != "RGB":
+            strip = strip.convert("RGB")
+        return np.asarray(strip)
+    
+    def close(self) -> None:
+        """Закрывает файл слоя."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def _open_stream(self) -> None:
+        """Открывает файл на начале данных IDAT."""
+        width, _ = self.size
+        source = self._source
+        self._file = BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+        self._file.seek(len(b"\x89PNG\r\n\x1a\n"))
+        self._chunk_left = 0
+        self._inflater = zlib.decompressobj()
+        self._pending = b""
+        # Каждая строка - байт типа фильтра и пиксели
+        self._row_bytes = 1 + width * self.STREAMED_MODES[self._mode]
+        # Строка над первой считается нулевой; фильтр 0 - без фильтра
+        self._previous = bytes(self._row_bytes)
+        self._next_row = 0
+        if not self._next_idat(first=True):
+            raise OSError(f"В файле {self.name} нет данных изображения")
+    
+    def _next_idat(self, first: bool = False) -> bool:
+        """
+        Переходит к данным следующего блока IDAT.
+        
+        Returns:
+            True если следующий блок - IDAT
+        """
+        if not first:
+            self._file.read(4)  # CRC предыдущего блока
+        while True:
+            header = self._file.read(8)
+            if len(header) < 8:
+                return False
+            length, kind = struct.unpack(">I4s", header)
+            if kind == b"IDAT":
+                self._chunk_left = length
+                return True
+            # Блоки IDAT идут подряд; до первого пропускаются остальные блоки
+            if not first or kind == b"IEND":
+                return False
+            self._file.seek(length + 4, 1)
+    
+    def _read_compressed(self) -> bytes:
+        """Читает очередную порцию сжатых данных."""
+        while self._chunk_left == 0:
+            if not self._next_idat():
+                raise OSError(f"Файл {self.name} обрезан")
+        data = self._file.read(min(self._chunk_left, self.READ_SIZE))
+        if not data:
+            raise OSError(f"Файл {self.name} обрезан")
+        self._chunk_left -= len(data)
+        return data
+    
+    def _read_stream(self, top: int, bottom: int) -> Image.Image:
+        """Распаковывает и декодирует строки [top, bottom) потокового слоя."""
+        if top != self._next_row:
+            raise ValueError(f"Ожидалась полоса со строки {self._next_row}, запрошена {top}")
+        needed = (bottom - top) * self._row_bytes
+        parts = [self._previous]
+        received = 0
+        while received < needed:
+            if not self._pending:
+                self._pending = self._read_compressed()
+            try:
+                data = self._inflater.decompress(self._pending, needed - received)
+            except zlib.error as e:
+                raise OSError(f"Файл {self.name} поврежден: {e}") from e
+            self._pending = self._inflater.unconsumed_tail
+            if not data and not self._pending and self._inflater.eof:
+                raise OSError(f"Файл {self.name} обрезан")
+            parts.append(data)
+            received += len(data)
+        
+        # Декодер zip ожидает поток zlib; уровень 0 только копирует данные
+        rows = bottom - top + 1
+        width = self.size[0]
+        try:
+            strip = Image.frombytes(
+                self._mode, (width, rows), zlib.compress(b"".join(parts), 0), "zip", self._mode
+            )
+        except ValueError as e:
+            raise OSError(f"Файл {self.name} поврежден: {e}") from e
+        self._previous = b"\x00" + strip.crop((0, rows - 1, width, rows)).tobytes()
+        self._next_row = bottom
+        return strip.crop((0, 1, width, rows))
@@ -0,0 +1,369 @@
+"""Индекс троек изображений в дереве экспорта с инкрементальным обновлением."""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.core.naming import NamingRule
+from src.utils.constants import TRIPLET_INDEX_DIR, TRIPLET_INDEX_RACY_NS
+
+
+class Triplet(NamedTuple):
+    """Набор файлов одного вида."""
+    
+    name: str
+    paths: Dict[str, Path]
+    
+    def is_complete(self) -> bool:
+        """Проверяет наличие обязательных color и outline изображений."""
+        return 'color' in self.paths and 'outline' in self.paths
+
+
+class TripletIndex:
+    """
+    Класс для поиска троек изображений в дереве каталогов.
+    
+    Для каждого каталога хранится время его изменения, список подкаталогов
+    и подходящие под правило именования файлы (размер, время изменения,
+    имя вида и тип). Время изменения каталога меняется при добавлении,
+    удалении и переименовании файлов в нем, поэтому при повторном
+    обходе неизменившиеся каталоги не читаются: на них тратится один
+    stat. Индекс можно сохранить на диск и продолжить с него в следующем
+    запуске. Перезапись существующего файла без переименования
+    индекс не отслеживает - состав троек от нее не меняется.
+    """
+    
+    # Увеличивается при изменении формата файла индекса
+    VERSION = 1
+    
+    def __init__(
+        self,
+        root: Path,
+        rule: Optional[NamingRule] = None,
+        exclude: Optional[Path] = None,
+        recursive: bool = True,
+        index_path: Optional[Path] = None
+    ):
+        """
+        Инициализация пустого индекса.
+        
+        Args:
+            root: Корневой каталог
+            rule: Правило именования файлов (по умолчанию - стандартное)
+            exclude: Каталог, который нужно пропустить (например, выходной)
+            recursive: Обходить подкаталоги
+            index_path: Файл для сохранения индекса (None - не сохранять)
+        """
+        self.root = Path(root)
+        self.rule = rule or NamingRule()
+        self.recursive = recursive
+        self.index_path = Path(index_path) if index_path else None
+        self.rescanned_dirs = 0
+        
+        # Исключаемый каталог хранится относительно корня, чтобы при
+        # обходе сравнивать строки, а не разрешать каждый путь
+        self._exclude: Optional[str] = None
+        if exclude is not None:
+            try:
+                self._exclude = Path(exclude).resolve().relative_to(self.root.resolve()).as_posix()
+            except ValueError:
+                self._exclude = None
+        
+        # Относительный путь каталога -> {mtime_ns, subdirs, files}
+        self._dirs: Dict[str, dict] = {}
+        # (каталог, имя вида) -> имена файлов по типам; пути Path строятся
+        # только для выдаваемых троек
+        self._groups: Dict[Tuple[str, str], Dict[str, str]] = {}
+    
+    @classmethod
+    def default_index_path(cls, root: Path, rule: NamingRule, recursive: bool = True) -> Path:
+        """
+        Возвращает путь файла индекса в TRIPLET_INDEX_DIR для корня и правила.
+        
+        Args:
+            root: Корневой каталог
+            rule: Правило именования файлов
+            recursive: Обходить подкаталоги
+        
+        Returns:
+            Путь к файлу индекса
+        """
+        description = json.dumps(
+            [str(Path(root).resolve()), rule.patterns, recursive], sort_keys=True
+        ).encode()
+        return TRIPLET_INDEX_DIR / f"{hashlib.sha256(description).hexdigest()[:32]}.json"
+    
+    @classmethod
+    def open(
+        cls,
+        root: Path,
+        rule: Optional[NamingRule] = None,
+        exclude: Optional[Path] = None,
+        recursive: bool = True
+    ) -> "TripletIndex":
+        """
+        Загружает сохраненный индекс корня, обновляет его и сохраняет.
+        
+        Ошибки чтения и записи файла индекса не мешают работе: индекс
+        тогда строится заново и остается только в памяти.
+        
+        Args:
+            root: Корневой каталог
+            rule: Правило именования файлов (по умолчанию - стандартное)
+            exclude: Каталог, который нужно пропустить
+            recursive: Обходить подкаталоги
+        
+        Returns:
+            Актуальный индекс
+        """
+        rule = rule or NamingRule()
+        index = cls(root, rule, exclude, recursive, cls.default_index_path(root, rule, recursive))
+        index.load()
+        index.refresh()
+        try:
+            index.save()
+        except OSError:
+            pass
+        return index
+    
+    def load(self) -> bool:
+        """
+        Загружает индекс из index_path.
+        
+        Returns:
+            True если индекс загружен, False если файла нет или он устарел
+        """
+        if self.index_path is None:
+            return False
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != self.VERSION or data.get("exclude") != self._exclude:
+            return False
+        
+        self._dirs = data["dirs"]
+        self._groups = {}
+        for rel, entry in self._dirs.items():
+            self._add_groups(rel, entry)
+        return True
+    
+    def save(self) -> None:
+        """
+        Сохраняет индекс в index_path (атомарно, через временный файл).
+        
+        Raises:
+            OSError: Если файл не удалось записать
+        """
+        if self.index_path is None:
+            return
+        
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": self.VERSION, "exclude": self._exclude, "dirs": self._dirs}
+        fd, tmp_name = tempfile.mkstemp(dir=self.index_path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_name, self.index_path)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+    
+    def refresh(self) -> int:
+        """
+        Обновляет индекс, перечитывая только изменившиеся каталоги.
+        
+        Returns:
+            Количество перечитанных каталогов
+        """
+        now_ns = time.time_ns()
+        dirs: Dict[str, dict] = {}
+        rescanned = 0
+        pending = ["."]
+        
+        while pending:
+            rel = pending.pop()
+            if rel == self._exclude:
+                continue
+            directory = self.root / rel
+            try:
+                mtime_ns = directory.stat().st_mtime_ns
+            except OSError:
+                continue
+            
+            entry = self._dirs.get(rel)
+            if entry is None or entry["mtime_ns"] != mtime_ns:
+                try:
+                    scanned = self._scan_dir(directory, mtime_ns, now_ns)
+                except OSError:
+                    continue
+                if entry is not None:
+                    self._remove_groups(rel, entry)
+                entry = scanned
+                self._add_groups(rel, entry)
+                rescanned += 1
+            dirs[rel] = entry
+            
+            if self.recursive:
+                pending.extend(
+                    name if rel == "." else f"{rel}/{name}" for name in entry["subdirs"]
+                )
+        
+        for rel in self._dirs.keys() - dirs.keys():
+            # Каталог удален или стал исключенным
+            self._remove_groups(rel, self._dirs[rel])
+        self._dirs = dirs
+        self.rescanned_dirs = rescanned
+        return rescanned
+    
+    def _scan_dir(self, directory: Path, mtime_ns: int, now_ns: int) -> dict:
+        """Читает каталог и сопоставляет его файлы с правилом именования."""
+        subdirs: List[str] = []
+        files: Dict[str, list] = {}
+        with os.scandir(directory) as entries:
+            for item in entries:
+                if item.is_dir(follow_symlinks=False):
+                    subdirs.append(item.name)
+                    continue
+                matched = self.rule.match(Path(item.name))
+                if matched is None or not item.is_file():
+                    continue
+                stat = item.stat()
+                files[item.name] = [stat.st_size, stat.st_mtime_ns, *matched]
+        
+        # Каталог, измененный только что, мог измениться еще раз в пределах
+        # точности времени файловой системы: такой каталог перечитывается
+        # при следующем обходе
+        if now_ns - mtime_ns < TRIPLET_INDEX_RACY_NS:
+            mtime_ns = -1
+        return {"mtime_ns": mtime_ns, "subdirs": sorted(subdirs), "files": files}
+    
+    def _add_groups(self, rel: str, entry: dict) -> None:
+        """Добавляет файлы каталога в тройки."""
+        for filename, (_, _, name, kind) in entry["files"].items():
+            self._groups.setdefault((rel, name), {})[kind] = filename
+    
+    def _remove_groups(self, rel: str, entry: dict) -> None:
+        """Убирает файлы каталога из троек."""
+        for filename, (_, _, name, kind) in entry["files"].items():
+            self._discard((rel, name), kind, filename)
+    
+    def _discard(self, key: Tuple[str, str], kind: str, filename: str) -> None:
+        """Убирает файл из тройки и удаляет опустевшую тройку."""
+        files = self._groups.get(key)
+        if files is None:
+            return
+        if files.get(kind) == filename:
+            del files[kind]
+        if not files:
+            del self._groups[key]
+    
+    def _triplet(self, key: Tuple[str, str], files: Dict[str, str]) -> Triplet:
+        """Создает тройку с именем относительно корня."""
+        rel, name = key
+        directory = self.root / rel
+        return Triplet(
+            name if rel == "." else f"{rel}/{name}",
+            {kind: directory / filename for kind, filename in files.items()}
+        )
+    
+    def _key_for(self, path: Path) -> Optional[Tuple[Tuple[str, str], str]]:
+        """Определяет группу и тип изображения файла."""
+        matched = self.rule.match(path)
+        if matched is None:
+            return None
+        try:
+            rel = path.parent.relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+        name, kind = matched
+        return (rel, name), kind
+    
+    def add_file(self, path: Path) -> Optional[Triplet]:
+        """
+        Добавляет или обновляет файл без обхода каталога (например, по событию).
+        
+        Args:
+            path: Путь к файлу внутри корня
+        
+        Returns:
+            Тройка файла, если в ней есть color и outline, иначе None
+        """
+        path = Path(path)
+        located = self._key_for(path)
+        if located is None:
+            return None
+        key, kind = located
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        
+        entry = self._dirs.setdefault(key[0], {"mtime_ns": -1, "subdirs": [], "files": {}})
+        entry["files"][path.name] = [stat.st_size, stat.st_mtime_ns, key[1], kind]
+        files = self._groups.setdefault(key, {})
+        files[kind] = path.name
+        
+        triplet = self._triplet(key, files)
+        return triplet if triplet.is_complete() else None
+    
+    def remove_file(self, path: Path) -> None:
+        """
+        Убирает удаленный файл из индекса.
+        
+        Args:
+            path: Путь к файлу внутри корня
+        """
+        path = Path(path)
+        located = self._key_for(path)
+        if located is None:
+            return
+        key, kind = located
+        entry = self._dirs.get(key[0])
+        if entry is not None:
+            entry["files"].pop(path.name, None)
+        self._discard(key, kind, path.name)
+    
+    def get(self, name: str) -> Optional[Triplet]:
+        """
+        Возвращает тройку по имени (путь каталога относительно корня и имя вида).
+        
+        Args:
+            name: Имя тройки, например "sub/view"
+        
+        Returns:
+            Тройка или None
+        """
+        rel, _, view = name.rpartition("/")
+        key = (rel or ".", view)
+        files = self._groups.get(key)
+        return self._triplet(key, files) if files else None
+    
+    def find(self, path: Path) -> Optional[Triplet]:
+        """
+        Возвращает тройку, в которую входит файл.
+        
+        Args:
+            path: Путь к любому файлу тройки
+        
+        Returns:
+            Тройка или None, если файл не подходит под правило
+        """
+        located = self._key_for(Path(path))
+        if located is None:
+            return None
+        key, _ = located
+        files = self._groups.get(key)
+        return self._triplet(key, files) if files else None
+    
+    def __iter__(self) -> Iterator[Triplet]:
+        """Перебирает тройки в порядке каталогов и имен."""
+        for key in sorted(self._groups):
+            yield self._triplet(key, self._groups[key])
+    
+    def __len__(self) -> int:
+        """Количество троек (в том числе неполных)."""
+        return len(self._groups)
@@ -1,8 +1,12 @@
 """Главный файл приложения Image Merger."""
 
+import argparse
+import os
 import sys
 from pathlib import Path
+from typing import Sequence, Tuple
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
 from PyQt6 import QtGui
 
 # Обеспечиваем доступность пакета src при прямом запуске этого файла
@@ -11,12 +15,59 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.ui.main_window import MainWindow
+from src.ui.preloader import Preloader
 from src.utils.resource_loader import ResourceLoader
+from src.utils.tracing import Tracer
+from src.utils.constants import BACKEND_ENV_VAR, BACKEND_NAMES, TRACE_ENV_VAR
 
 
-def main():
-    """Главная функция приложения."""
-    app = QApplication(sys.argv)
+def parse_args(argv):
+    """
+    Разбирает собственные аргументы приложения, оставляя остальные для Qt.
+    
+    Args:
+        argv: Аргументы командной строки без имени программы
+        
+    Returns:
+        Кортеж (разобранные аргументы, аргументы для Qt)
+    """
+    parser = argparse.ArgumentParser(prog="image_merger")
+    parser.add_argument(
+        "--trace", type=Path, metavar="FILE",
+        help=f"Записать трассировку этапов в FILE (Chrome trace JSON); "
+             f"то же задает переменная {TRACE_ENV_VAR}"
+    )
+    parser.add_argument(
+        "--backend", choices=("auto", *BACKEND_NAMES),
+        help=f"Реализация обработки (по умолчанию auto - самая быстрая по замеру); "
+             f"то же задает переменная {BACKEND_ENV_VAR}"
+    )
+    return parser.parse_known_args(argv)
+
+
+def create_window(argv: Sequence[str]) -> Tuple[QApplication, MainWindow]:
+    """
+    Создает приложение и показывает главное окно.
+    
+    До показа окна загружаются только Qt и сгенерированный интерфейс;
+    numpy, OpenCV, PIL и модули обработки загружает Preloader в фоне,
+    как только заработает цикл событий.
+    
+    Args:
+        argv: Аргументы командной строки без имени программы
+        
+    Returns:
+        Кортеж (приложение, главное окно)
+    """
+    args, qt_args = parse_args(argv)
+    Tracer.enable_from_env()
+    if args.trace:
+        Tracer.enable(args.trace)
+    if args.backend:
+        # Как в Backends.configure, но без загрузки модуля обработки
+        os.environ[BACKEND_ENV_VAR] = args.backend
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # Загружаем иконку приложения
     icon_path = ResourceLoader.load_icon()
@@ -29,6 +80,13 @@ def main():
     # Создаем и показываем главное окно
     window = MainWindow()
     window.show()
+    QTimer.singleShot(0, Preloader.start)
+    return app, window
+
+
+def main():
+    """Главная функция приложения."""
+    app, window = create_window(sys.argv[1:])
     
     # Запускаем приложение
     sys.exit(app.exec())
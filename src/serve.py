@@ -0,0 +1,140 @@
+"""Локальный HTTP-сервис объединения троек для скриптов.
+
+Пример запуска:
+    python -m src.serve --port 8765 --workers 4
+    python -m src.serve --socket /tmp/image_merger.sock --root /data
+
+Пример запроса:
+    curl -F color=@view.png -F outline=@view_outline.png \\
+         -F highlight=@view_highlight.png -o merged.png \\
+         "http://127.0.0.1:8765/merge?format=PNG"
+
+Запросы JSON с путями к файлам принимаются только с --root и только
+для файлов внутри этого каталога.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.backends import Backends
+from src.core.merge_service import MergeService
+from src.utils.tracing import Tracer
+from src.utils.constants import (
+    BACKEND_DEFAULT,
+    BACKEND_ENV_VAR,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_QUEUE_SIZE,
+    SERVICE_TIMEOUT
+)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    
+    Args:
+        argv: Аргументы (по умолчанию - sys.argv)
+    
+    Returns:
+        Разобранные аргументы
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.serve",
+        description="HTTP-сервис объединения изображений из Corel XVL"
+    )
+    parser.add_argument(
+        "--host", default=SERVICE_HOST,
+        help=f"Адрес (по умолчанию {SERVICE_HOST} - только эта машина)"
+    )
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="Порт")
+    parser.add_argument(
+        "--socket", type=Path, metavar="PATH",
+        help="Слушать Unix-сокет вместо TCP"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count(),
+        help="Количество процессов (по умолчанию - число ядер)"
+    )
+    parser.add_argument(
+        "--queue", type=int, default=SERVICE_QUEUE_SIZE, metavar="N",
+        help="Сколько запросов может ждать свободного процесса; остальные получают 429"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=SERVICE_TIMEOUT, metavar="SECONDS",
+        help="Наибольшее время обработки запроса (дольше - ответ 504)"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=("JPEG", "PNG"), default="PNG",
+        type=str.upper, help="Формат результата, если он не указан в запросе"
+    )
+    parser.add_argument(
+        "--root", type=Path, metavar="DIR",
+        help="Каталог, в котором должны лежать слои и результаты запросов JSON "
+             "(без него принимаются только загрузки файлов)"
+    )
+    parser.add_argument(
+        "--trace", type=Path, metavar="FILE",
+        help="Записать трассировку этапов в FILE (Chrome trace JSON) и напечатать сводку при остановке"
+    )
+    parser.add_argument(
+        "--backend", choices=("auto", *Backends.REGISTRY),
+        help=f"Реализация обработки (по умолчанию auto - самая быстрая по замеру); "
+             f"то же задает переменная {BACKEND_ENV_VAR}"
+    )
+    parser.add_argument(
+        "--calibrate", action="store_true",
+        help=f"Замерить реализации перед началом работы и сохранить выбор для auto "
+             f"(без замера auto использует {BACKEND_DEFAULT})"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция сервиса."""
+    args = parse_args(argv)
+    Tracer.enable_from_env()
+    if args.trace:
+        Tracer.enable(args.trace)
+    if args.backend:
+        Backends.configure(args.backend)
+    if args.root is not None and not args.root.is_dir():
+        print(f"Каталог не найден: {args.root}", file=sys.stderr)
+        return 2
+    if args.socket is not None and not hasattr(asyncio, "start_unix_server"):
+        print("Unix-сокеты недоступны на этой системе", file=sys.stderr)
+        return 2
+    
+    # Замер выполняется здесь, процессы-исполнители берут выбор из файла
+    if args.calibrate:
+        Backends.calibrate()
+    print(f"Реализация обработки: {Backends.describe()}", flush=True)
+    service = MergeService(args.workers, args.queue, args.timeout, args.format, args.root)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Не удалось запустить сервис: {e}", file=sys.stderr)
+        return 1
+    
+    status = service.status()
+    print(
+        f"\nОстановлено: объединено {status['merged']}, отклонено {status['rejected']}, "
+        f"ошибок {status['failed']}",
+        flush=True
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
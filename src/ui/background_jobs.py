@@ -0,0 +1,182 @@
+"""Фоновые задачи с отменой по поколениям для приложения Image Merger."""
+
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+CancelCheck = Callable[[], bool]
+JobFunc = Callable[[CancelCheck], Any]
+
+
+class JobCancelled(Exception):
+    """Исключение, которым задача сообщает о своей отмене."""
+
+
+class _JobSignals(QObject):
+    """Сигналы задачи (QRunnable не может иметь сигналов сам)."""
+    
+    finished = pyqtSignal(object, int, object)
+    failed = pyqtSignal(object, int, str)
+    done = pyqtSignal(object)
+
+
+class _Job(QRunnable):
+    """Задача пула потоков, выполняющая функцию с проверкой отмены."""
+    
+    def __init__(self, tag: Hashable, generation: int, func: JobFunc, cancelled: CancelCheck):
+        """
+        Инициализация задачи.
+        
+        Args:
+            tag: Тег задачи (например, ('load', 'color'))
+            generation: Поколение задачи для этого тега
+            func: Функция, принимающая проверку отмены
+            cancelled: Проверка отмены
+        """
+        super().__init__()
+        self.tag = tag
+        self.generation = generation
+        self.func = func
+        self.cancelled = cancelled
+        self.signals = _JobSignals()
+        # Задачей владеет JobRunner: пул не должен удалять ее после
+        # выполнения, пока на нее есть ссылки для отмены
+        self.setAutoDelete(False)
+    
+    def run(self) -> None:
+        """Выполняет функцию задачи в потоке пула."""
+        try:
+            self._run()
+        finally:
+            self.signals.done.emit(self)
+    
+    def _run(self) -> None:
+        """Выполняет функцию и сообщает о результате."""
+        if self.cancelled():
+            return
+        
+        try:
+            result = self.func(self.cancelled)
+        except JobCancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.tag, self.generation, str(e))
+            return
+        
+        self.signals.finished.emit(self.tag, self.generation, result)
+
+
+class JobRunner(QObject):
+    """
+    Класс для запуска фоновых задач с отменой устаревших.
+    
+    У каждого тега есть счетчик поколений: новая задача с тем же тегом
+    увеличивает его, снимает с очереди еще не начатую задачу, а
+    результаты выполняющихся задач прежних поколений отбрасываются.
+    Сигналы finished и failed приходят в потоке GUI только для
+    актуальных задач. Задачи не удаляются пулом автоматически: JobRunner
+    хранит их до сигнала done, поэтому отмена никогда не обращается к
+    уже удаленной задаче.
+    """
+    
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+    
+    def __init__(self, parent: Optional[QObject] = None, pool: Optional[QThreadPool] = None):
+        """
+        Инициализация запуска задач.
+        
+        Args:
+            parent: Родительский объект
+            pool: Пул потоков (по умолчанию - глобальный)
+        """
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._generations: Dict[Hashable, int] = {}
+        self._pending: Dict[Hashable, _Job] = {}
+        self._jobs: Set[_Job] = set()
+    
+    def submit(self, tag: Hashable, func: JobFunc, priority: int = 0) -> int:
+        """
+        Запускает задачу, отменяя предыдущую задачу с тем же тегом.
+        
+        Args:
+            tag: Тег задачи
+            func: Функция, принимающая проверку отмены; может выбросить
+                JobCancelled, чтобы прерваться между этапами
+            priority: Приоритет в очереди пула (больше - раньше)
+        
+        Returns:
+            Поколение запущенной задачи
+        """
+        generation = self.cancel(tag)
+        job = _Job(tag, generation, func, lambda: not self.is_current(tag, generation))
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        job.signals.done.connect(self._on_done)
+        
+        self._jobs.add(job)
+        self._pending[tag] = job
+        self.pool.start(job, priority)
+        return generation
+    
+    def cancel(self, tag: Hashable) -> int:
+        """
+        Отменяет задачу с указанным тегом.
+        
+        Args:
+            tag: Тег задачи
+        
+        Returns:
+            Новое поколение тега
+        """
+        generation = self._generations.get(tag, 0) + 1
+        self._generations[tag] = generation
+        
+        job = self._pending.pop(tag, None)
+        if job is not None and self.pool.tryTake(job):
+            # Снятая с очереди задача не запустится и не пришлет done
+            self._jobs.discard(job)
+        
+        return generation
+    
+    def is_pending(self, tag: Hashable) -> bool:
+        """
+        Проверяет, что задача с тегом запущена и еще не завершилась.
+        
+        Args:
+            tag: Тег задачи
+        
+        Returns:
+            True если результат задачи еще не получен
+        """
+        return tag in self._pending
+    
+    def is_current(self, tag: Hashable, generation: int) -> bool:
+        """
+        Проверяет, что поколение задачи актуально.
+        
+        Args:
+            tag: Тег задачи
+            generation: Поколение задачи
+        
+        Returns:
+            True если задача не была заменена или отменена
+        """
+        return self._generations.get(tag) == generation
+    
+    def _on_finished(self, tag: Hashable, generation: int, result: Any) -> None:
+        """Передает результат актуальной задачи."""
+        if self.is_current(tag, generation):
+            self._pending.pop(tag, None)
+            self.finished.emit(tag, result)
+    
+    def _on_failed(self, tag: Hashable, generation: int, message: str) -> None:
+        """Передает ошибку актуальной задачи."""
+        if self.is_current(tag, generation):
+            self._pending.pop(tag, None)
+            self.failed.emit(tag, message)
+    
+    def _on_done(self, job: _Job) -> None:
+        """Освобождает завершившуюся задачу."""
+        self._jobs.discard(job)
@@ -2,14 +2,28 @@
 
 from PyQt6 import QtWidgets, QtGui
 from PyQt6.QtCore import Qt, QTimer
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Tuple
 
-from src.core.image_manager import ImageManager
 from src.core.file_manager import FileManager
-from src.utils.constants import IMAGE_KINDS, DEFAULT_WINDOW_SIZE, DEBOUNCE_TIME, SPLITTER_RATIOS
+from src.core.processing_params import ProcessingParams
+from src.core.result_cache import ResultCache
+from src.core.triplet_index import TripletIndex
+from src.utils.constants import (
+    IMAGE_KINDS, DEFAULT_WINDOW_SIZE, DEBOUNCE_TIME, SPLITTER_RATIOS, PARAMS_IDLE_TIME
+)
 from src.utils.resource_loader import ResourceLoader
 from src.ui.preview_widget import PreviewWidget
 from src.ui.drag_drop_handler import DragDropHandler
+from src.ui.background_jobs import JobRunner, JobCancelled
+from src.ui.params_panel import ParamsPanel
+from src.ui.save_queue import SaveQueue
+
+# Модули обработки (numpy, OpenCV, PIL) загружаются после показа окна
+# (см. Preloader) или при первой загрузке файла
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+    from src.core.image_manager import ImageManager
 
 # Импортируем UI
 import sys
@@ -38,10 +52,22 @@ class MainWindow(QtWidgets.QWidget):
         if icon_path:
             self.setWindowIcon(QtGui.QIcon(str(icon_path)))
         
-        # Инициализация менеджеров
-        self.image_manager = ImageManager()
+        # Инициализация менеджеров (менеджер изображений создается при
+        # первом обращении, см. image_manager)
+        self._image_manager: Optional["ImageManager"] = None
         self.file_manager = FileManager(self)
         self.drag_drop_handler = DragDropHandler(self)
+        self.jobs = JobRunner(self)
+        self.jobs.finished.connect(self._on_job_finished)
+        self.jobs.failed.connect(self._on_job_failed)
+        # Черновые превью слоев, пока они декодируются целиком
+        self._drafts: Dict[str, "Image.Image"] = {}
+        # Уменьшенный результат с новыми параметрами, пока полный считается
+        self._proxy_result: Optional["np.ndarray"] = None
+        self._save_status = ""
+        self.save_queue = SaveQueue(self)
+        self.save_queue.failed.connect(self._on_save_failed)
+        self.save_queue.progress.connect(self._on_save_progress)
         
         # Инициализация превью виджетов
         self.preview_widgets: Dict[str, PreviewWidget] = {}
@@ -51,10 +77,28 @@ class MainWindow(QtWidgets.QWidget):
         self._setup_ui_connections()
         self._setup_splitter()
         self._setup_debounce_timer()
+        self._setup_params_panel()
         
         # Настройка drag&drop
         self._setup_drag_drop()
     
+    @property
+    def image_manager(self) -> "ImageManager":
+        """Менеджер изображений; модули обработки импортируются при первом обращении."""
+        if self._image_manager is None:
+            from src.core.image_manager import ImageManager
+            self._image_manager = ImageManager(self._create_result_cache())
+            self._image_manager.set_params(self.params_panel.params())
+        return self._image_manager
+    
+    @staticmethod
+    def _create_result_cache():
+        """Создает кэш результатов; без доступного каталога работает без кэша."""
+        try:
+            return ResultCache()
+        except OSError:
+            return None
+    
     def _setup_preview_widgets(self):
         """Настройка виджетов превью."""
         for kind in (*IMAGE_KINDS, 'result'):
@@ -95,6 +139,17 @@ class MainWindow(QtWidgets.QWidget):
         self._debounce_timer.timeout.connect(self._render_all_previews)
         self.resize_pending = False
     
+    def _setup_params_panel(self):
+        """Добавляет ползунки параметров под превью результата."""
+        self.params_panel = ParamsPanel(self.ui.widget1)
+        self.ui.verticalLayout_2.insertWidget(1, self.params_panel)
+        self.params_panel.changed.connect(self._on_params_changed)
+        
+        # Полное объединение запускается, когда ползунки перестали двигаться
+        self._params_timer = QTimer(self)
+        self._params_timer.setSingleShot(True)
+        self._params_timer.timeout.connect(self._apply_params)
+    
     def _setup_drag_drop(self):
         """Настройка drag&drop."""
         for kind in IMAGE_KINDS:
@@ -111,54 +166,261 @@ class MainWindow(QtWidgets.QWidget):
             self._load_image_path(kind, path)
     
     def _load_image_path(self, kind: str, path):
-        """Загружает изображение по пути."""
-        if self.image_manager.load_image(kind, path):
-            self._show_preview(kind)
-            self._try_update_result()
+        """
+        Загружает изображение по пути в фоновом потоке.
+        
+        Сначала (с повышенным приоритетом) декодируется уменьшенный
+        черновик, который сразу показывается в превью; полное
+        декодирование идет следом и заменяет его.
+        """
+        self._drafts.pop(kind, None)
+        draft_size = self._preview_pixel_size(kind)
+        
+        def load_draft(cancelled):
+            # Первая загрузка импортирует модули обработки здесь, вне потока GUI
+            from src.core.image_manager import ImageManager
+            try:
+                return ImageManager.decode_draft(path, draft_size)
+            except Exception:
+                # Ошибку покажет полная загрузка
+                return None
+        
+        self.jobs.submit(('draft', kind), load_draft, priority=1)
+        
+        def load(cancelled):
+            from src.core.layer_store import LayerHandle
+            from src.utils.image_pyramid import ImagePyramid
+            try:
+                layer = LayerHandle.open(path)
+            except Exception as e:
+                raise OSError(str(path)) from e
+            if cancelled():
+                raise JobCancelled()
+            # Слой декодируется и пирамида превью строится здесь же, вне потока GUI
+            try:
+                preview = layer.preview()
+            except Exception as e:
+                raise OSError(str(path)) from e
+            ImagePyramid.for_image(preview)
+            return layer
+        
+        self.jobs.submit(('load', kind), load)
+    
+    def _on_job_finished(self, tag, result):
+        """Принимает результат актуальной фоновой задачи."""
+        if tag == 'merge':
+            result, content_hashes, params = result
+            self.image_manager.set_result(result, content_hashes, params)
+            # Результат со старыми параметрами не заменяет предпросмотр новых
+            if params == self.image_manager.params and not self._params_timer.isActive():
+                self._proxy_result = None
+            self._update_title()
+            # Пока есть черновики, результат по старым слоям не показываем
+            if not self._drafts and self._proxy_result is None:
+                self.preview_widgets['result'].show_image(result)
+            return
+        
+        if tag == 'proxy_merge':
+            self._proxy_result = result
+            if not self._drafts:
+                self.preview_widgets['result'].show_image(result)
+            self._update_title()
+            return
+        
+        if tag == 'draft_merge':
+            if self._drafts:
+                self.preview_widgets['result'].show_image(result)
+            return
+        
+        stage, kind = tag
+        if stage == 'draft':
+            # Черновик нужен, только если полное декодирование еще идет
+            if result is not None and self.jobs.is_pending(('load', kind)):
+                self._drafts[kind] = result
+                self._show_preview(kind)
+                self._update_draft_result()
+            return
+        
+        self._drafts.pop(kind, None)
+        self.image_manager.set_layer(kind, result)
+        self._update_title()
+        self._show_preview(kind)
+        self._try_update_result()
+    
+    def _on_job_failed(self, tag, message: str):
+        """Показывает ошибку актуальной фоновой задачи."""
+        if tag == 'merge':
+            self.file_manager.show_error("Ошибка", f"Не удалось обработать изображения: {message}")
+        elif tag in ('draft_merge', 'proxy_merge'):
+            # Черновой результат не обязателен, дождемся полного
+            return
         else:
-            self.file_manager.show_error(
-                "Ошибка", 
-                f"Не удалось загрузить файл: {path}"
-            )
+            _, kind = tag
+            if self._drafts.pop(kind, None) is not None:
+                # Возвращаем превью прежнего слоя вместо черновика
+                self._show_preview(kind)
+                self.preview_widgets['result'].show_image(self.image_manager.get_result())
+            self.file_manager.show_error("Ошибка", f"Не удалось загрузить файл: {message}")
     
     def _show_preview(self, kind: str):
-        """Показывает превью изображения."""
-        img = self.image_manager.get_image(kind)
+        """Показывает превью изображения (черновик, пока слой декодируется)."""
+        img = self._drafts.get(kind) or self.image_manager.get_preview(kind)
         self.preview_widgets[kind].show_image(img)
     
+    def _preview_pixel_size(self, kind: str) -> Tuple[int, int]:
+        """Возвращает размер области превью в пикселях экрана."""
+        view = self.preview_widgets[kind].view
+        dpr = view.devicePixelRatioF() or 1.0
+        viewport = view.viewport()
+        return max(1, int(viewport.width() * dpr)), max(1, int(viewport.height() * dpr))
+    
+    def _update_draft_result(self):
+        """Запускает черновое объединение из черновиков и готовых слоев."""
+        images: Dict[str, "Image.Image"] = {}
+        for kind in IMAGE_KINDS:
+            img = self._drafts.get(kind) or self.image_manager.get_preview(kind)
+            if img is not None:
+                images[kind] = img
+        if 'color' not in images or 'outline' not in images:
+            return
+        
+        # Размер результата - размер самого первого из черновиков
+        size: Optional[Tuple[int, int]] = next(
+            (self._drafts[kind].size for kind in IMAGE_KINDS if kind in self._drafts), None
+        )
+        if size is None:
+            return
+        
+        params = self.image_manager.params
+        self.jobs.submit(
+            'draft_merge', 
+            lambda cancelled: self.image_manager.merge_draft(images, size, params), 
+            priority=1
+        )
+    
     def _try_update_result(self):
         """Пытается обновить результат."""
         if self.image_manager.has_required_images():
             self._update_result()
     
     def _update_result(self):
-        """Обновляет результат обработки."""
-        result = self.image_manager.process_images()
-        if result:
-            self.preview_widgets['result'].show_image(result)
+        """Запускает обработку в фоне; устаревшая обработка отменяется."""
+        layers = self.image_manager.snapshot()
+        params = self.image_manager.params
+        
+        def merge(cancelled):
+            from src.utils.image_pyramid import ImagePyramid
+            
+            def checkpoint():
+                # Слой заменен или параметры изменились - следующие
+                # этапы (маски, наложение, пирамида превью) не нужны
+                if cancelled():
+                    raise JobCancelled()
+            
+            result = self.image_manager.merge_images(layers, params, checkpoint)
+            checkpoint()
+            ImagePyramid.for_image(result)
+            return result, self.image_manager.content_hashes(layers), params
+        
+        self.jobs.submit('merge', merge)
+    
+    def _on_params_changed(self, params: ProcessingParams):
+        """
+        Пересчитывает уменьшенный результат при движении ползунка.
+        
+        Полное объединение откладывается до тех пор, пока ползунки не
+        остановятся на PARAMS_IDLE_TIME миллисекунд.
+        """
+        if self._image_manager is None:
+            # Параметры ползунков получит созданный позже менеджер
+            return
+        self._params_timer.start(PARAMS_IDLE_TIME)
+        if not self.image_manager.has_required_images() or self._drafts:
+            return
+        
+        # Полный результат со старыми параметрами больше не нужен
+        self.jobs.cancel('merge')
+        layers = self.image_manager.snapshot()
+        viewport = self._preview_pixel_size('result')
+        self.jobs.submit(
+            'proxy_merge',
+            lambda cancelled: self.image_manager.merge_proxy(layers, viewport, params),
+            priority=1
+        )
+    
+    def _apply_params(self):
+        """Принимает параметры ползунков и запускает полное объединение."""
+        self._params_timer.stop()
+        self.image_manager.set_params(self.params_panel.params())
+        self._try_update_result()
     
     def _show_context_menu(self, pos, kind: str):
         """Показывает контекстное меню."""
         menu = QtWidgets.QMenu(self)
         action = menu.addAction("Удалить изображение")
+        open_set = menu.addAction("Открыть набор по любому файлу...")
         
-        if menu.exec(self.preview_widgets[kind].view.mapToGlobal(pos)) == action:
+        chosen = menu.exec(self.preview_widgets[kind].view.mapToGlobal(pos))
+        if chosen == action:
             self._clear_image(kind)
+        elif chosen == open_set:
+            self._open_set_dialog()
+    
+    def _open_set_dialog(self):
+        """Загружает все слои тройки, в которую входит выбранный файл."""
+        path = self.file_manager.open_image_dialog("Выбрать любой файл набора")
+        if not path:
+            return
+        
+        # Индекс каталога сохраняется, поэтому повторное открытие
+        # набора из того же каталога не перечитывает его
+        triplet = TripletIndex.open(path.parent, recursive=False).find(path)
+        if triplet is None:
+            self.file_manager.show_warning(
+                "Ошибка",
+                f"Имя файла {path.name} не подходит под шаблоны набора"
+            )
+            return
+        
+        self.open_set(triplet.paths)
+    
+    def open_set(self, paths: Mapping[str, Path]) -> None:
+        """
+        Загружает набор слоев; слои, которых нет в наборе, очищаются.
+        
+        Args:
+            paths: Пути к файлам по типам изображений
+        """
+        for kind in IMAGE_KINDS:
+            if kind in paths:
+                self._load_image_path(kind, paths[kind])
+            elif self._image_manager is not None and self.image_manager.get_layer(kind) is not None:
+                self._clear_image(kind)
     
     def _clear_image(self, kind: str):
         """Очищает изображение указанного типа."""
+        self.jobs.cancel(('draft', kind))
+        self.jobs.cancel(('load', kind))
+        self._drafts.pop(kind, None)
         self.image_manager.remove_image(kind)
         self.preview_widgets[kind].clear()
         
         if self.image_manager.has_required_images():
             self._update_result()
         else:
+            self.jobs.cancel('merge')
+            self.jobs.cancel('proxy_merge')
+            self._proxy_result = None
+            self.image_manager.set_result(None)
             self.preview_widgets['result'].clear()
+        self._update_title()
     
     def _save_result(self):
         """Сохраняет результат."""
-        result = self.image_manager.get_result()
-        if result is None:
+        if self._params_timer.isActive():
+            # Сохраняется результат с последними выбранными параметрами
+            self._apply_params()
+        if not self.image_manager.has_required_images():
             self.file_manager.show_warning(
                 "Ошибка", 
                 "Необходимо добавить цвет и контур"
@@ -169,8 +431,38 @@ class MainWindow(QtWidgets.QWidget):
         save_info = self.file_manager.save_image_dialog(default_path)
         
         if save_info:
-            path, format_name = save_info
-            self.file_manager.save_image(result, path, format_name)
+            path, format_name, profile = save_info
+            if profile is None:
+                save_func = self.image_manager.prepare_save(format_name)
+            else:
+                save_func = self.image_manager.prepare_export(path, format_name, profile)
+            # Кодирование идет в фоне, можно сразу переходить к следующей тройке
+            self.save_queue.submit(path, save_func)
+    
+    def _on_save_failed(self, path: Path, message: str):
+        """Показывает ошибку фонового сохранения."""
+        self.file_manager.show_error("Ошибка", f"Не удалось сохранить файл {path.name}: {message}")
+    
+    def _on_save_progress(self, done: int, total: int):
+        """Показывает ход фонового сохранения в заголовке окна."""
+        self._save_status = f"сохранение {done + 1} из {total}" if done < total else ""
+        self._update_title()
+    
+    def _update_title(self):
+        """Показывает в заголовке ход сохранения и занятую слоями память."""
+        used, budget = self.image_manager.memory_usage()
+        parts = [f"память {used / 2**20:.0f} из {budget / 2**20:.0f} МБ"]
+        if self._proxy_result is not None:
+            parts.insert(0, "предпросмотр")
+        if self._save_status:
+            parts.insert(0, self._save_status)
+        self.setWindowTitle("Image Merger — " + ", ".join(parts))
+    
+    def closeEvent(self, event):
+        """Дожидается фоновых сохранений перед закрытием окна."""
+        self.jobs.cancel('merge')
+        self.save_queue.wait()
+        super().closeEvent(event)
     
     def _schedule_preview_update(self):
         """Планирует обновление превью."""
@@ -181,13 +473,19 @@ class MainWindow(QtWidgets.QWidget):
     def _render_all_previews(self):
         """Обновляет все превью."""
         self.resize_pending = False
+        if self._image_manager is None:
+            # Ни один файл еще не загружался - показывать нечего
+            return
         
         for kind in IMAGE_KINDS:
-            img = self.image_manager.get_image(kind)
-            self.preview_widgets[kind].show_image(img)
+            self._show_preview(kind)
         
-        result = self.image_manager.get_result()
-        self.preview_widgets['result'].show_image(result)
+        # Черновой результат остается до прихода полного
+        if not self._drafts:
+            result = self._proxy_result
+            if result is None:
+                result = self.image_manager.get_result()
+            self.preview_widgets['result'].show_image(result)
     
     def resizeEvent(self, event):
         """Обработчик изменения размера окна."""
@@ -0,0 +1,123 @@
+"""Панель настройки параметров обработки для приложения Image Merger."""
+
+from typing import Dict, Tuple
+
+from PyQt6 import QtWidgets
+from PyQt6.QtCore import Qt, pyqtSignal
+
+from src.core.processing_params import ProcessingParams
+
+# Ползунки: имя -> (подпись, наибольшее значение, делитель для показа)
+_SLIDERS: Dict[str, Tuple[str, int, int]] = {
+    'fade_weight': ("Осветление", 100, 100),
+    'darken_factor': ("Затемнение контура", 100, 100),
+    'black_threshold': ("Порог контура", 255, 1),
+    'hue_tolerance': ("Допуск оттенка", 90, 1),
+    'min_saturation': ("Насыщенность от", 255, 1),
+    'min_value': ("Яркость от", 255, 1),
+}
+
+
+class ParamsPanel(QtWidgets.QWidget):
+    """
+    Класс панели с ползунками параметров обработки.
+    
+    Красный цвет подсветки задается допуском оттенка и нижними
+    границами насыщенности и яркости (см.
+    ProcessingParams.from_red_bounds). Начальные значения берутся из
+    параметров по умолчанию. При каждом движении ползунка испускается
+    сигнал changed с новыми параметрами.
+    """
+    
+    changed = pyqtSignal(object)
+    
+    def __init__(self, parent=None):
+        """
+        Инициализация панели.
+        
+        Args:
+            parent: Родительский виджет
+        """
+        super().__init__(parent)
+        self._sliders: Dict[str, QtWidgets.QSlider] = {}
+        self._values: Dict[str, QtWidgets.QLabel] = {}
+        
+        layout = QtWidgets.QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        for index, (name, (title, maximum, divisor)) in enumerate(_SLIDERS.items()):
+            row, column = divmod(index, 3)
+            slider = QtWidgets.QSlider(Qt.Orientation.Horizontal, self)
+            slider.setRange(0, maximum)
+            value = QtWidgets.QLabel(self)
+            value.setMinimumWidth(32)
+            slider.valueChanged.connect(
+                lambda position, label=value, d=divisor: label.setText(self._format(position, d))
+            )
+            slider.valueChanged.connect(self._emit_changed)
+            
+            layout.addWidget(QtWidgets.QLabel(title, self), row, column * 3)
+            layout.addWidget(slider, row, column * 3 + 1)
+            layout.addWidget(value, row, column * 3 + 2)
+            self._sliders[name] = slider
+            self._values[name] = value
+        
+        reset = QtWidgets.QPushButton("Сброс", self)
+        reset.clicked.connect(self.reset)
+        layout.addWidget(reset, 0, 9, 2, 1)
+        self.reset()
+    
+    @staticmethod
+    def _format(position: int, divisor: int) -> str:
+        """Форматирует значение ползунка для подписи."""
+        return f"{position / divisor:.2f}" if divisor != 1 else str(position)
+    
+    def params(self) -> ProcessingParams:
+        """
+        Возвращает параметры, заданные ползунками.
+        
+        Returns:
+            Параметры обработки
+        """
+        value = {name: slider.value() for name, slider in self._sliders.items()}
+        return ProcessingParams.from_red_bounds(
+            value['hue_tolerance'],
+            value['min_saturation'],
+            value['min_value'],
+            fade_weight=value['fade_weight'] / _SLIDERS['fade_weight'][2],
+            darken_factor=value['darken_factor'] / _SLIDERS['darken_factor'][2],
+            black_threshold=value['black_threshold']
+        )
+    
+    def set_params(self, params: ProcessingParams) -> None:
+        """
+        Устанавливает ползунки по параметрам (испускает changed один раз).
+        
+        Красный цвет берется из первого диапазона red_hsv_ranges.
+        
+        Args:
+            params: Параметры обработки
+        """
+        (lower, upper) = params.red_hsv_ranges[0]
+        positions = {
+            'fade_weight': round(params.fade_weight * _SLIDERS['fade_weight'][2]),
+            'darken_factor': round(params.darken_factor * _SLIDERS['darken_factor'][2]),
+            'black_threshold': params.black_threshold,
+            'hue_tolerance': upper[0],
+            'min_saturation': lower[1],
+            'min_value': lower[2],
+        }
+        for name, position in positions.items():
+            slider = self._sliders[name]
+            slider.blockSignals(True)
+            slider.setValue(position)
+            slider.blockSignals(False)
+            self._values[name].setText(self._format(position, _SLIDERS[name][2]))
+        self._emit_changed()
+    
+    def reset(self) -> None:
+        """Возвращает параметры по умолчанию."""
+        self.set_params(ProcessingParams())
+    
+    def _emit_changed(self, *_) -> None:
+        """Испускает changed с текущими параметрами."""
+        self.changed.emit(self.params())
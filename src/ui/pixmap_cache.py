@@ -0,0 +1,89 @@
+"""Кэш готовых QPixmap превью."""
+
+import weakref
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from PyQt6.QtGui import QPixmap
+
+from src.utils.constants import PIXMAP_CACHE_SIZE
+
+if TYPE_CHECKING:
+    from src.utils.image_pyramid import PreviewImage
+
+PixmapKey = Tuple[int, int, int, float]
+
+
+class PixmapCache:
+    """
+    LRU-кэш QPixmap по ключу (изображение, размер превью, DPR).
+    
+    Записи изображения удаляются, как только изображение уничтожено,
+    поэтому повторно использованный id() не приводит к чужому превью.
+    """
+    
+    def __init__(self, max_entries: int = PIXMAP_CACHE_SIZE):
+        """
+        Инициализация кэша.
+        
+        Args:
+            max_entries: Максимальное количество хранимых QPixmap
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[PixmapKey, QPixmap]" = OrderedDict()
+        self._tracked = set()
+    
+    @staticmethod
+    def make_key(image: "PreviewImage", size: Tuple[int, int], dpr: float) -> PixmapKey:
+        """
+        Строит ключ кэша.
+        
+        Args:
+            image: Исходное изображение
+            size: Размер превью в физических пикселях
+            dpr: Коэффициент пикселей устройства
+            
+        Returns:
+            Ключ кэша
+        """
+        return id(image), size[0], size[1], dpr
+    
+    def get(self, key: PixmapKey) -> Optional[QPixmap]:
+        """
+        Возвращает QPixmap из кэша и помечает его как недавно использованный.
+        
+        Args:
+            key: Ключ кэша
+            
+        Returns:
+            QPixmap или None
+        """
+        pixmap = self._entries.get(key)
+        if pixmap is not None:
+            self._entries.move_to_end(key)
+        return pixmap
+    
+    def put(self, image: "PreviewImage", key: PixmapKey, pixmap: QPixmap) -> None:
+        """
+        Добавляет QPixmap в кэш, вытесняя самые старые записи.
+        
+        Args:
+            image: Исходное изображение (для отслеживания его удаления)
+            key: Ключ кэша
+            pixmap: Готовое превью
+        """
+        image_id = key[0]
+        if image_id not in self._tracked:
+            self._tracked.add(image_id)
+            weakref.finalize(image, self._forget, image_id)
+        
+        self._entries[key] = pixmap
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _forget(self, image_id: int) -> None:
+        """Удаляет все записи уничтоженного изображения."""
+        self._tracked.discard(image_id)
+        for key in [k for k in self._entries if k[0] == image_id]:
+            del self._entries[key]
@@ -0,0 +1,71 @@
+"""Фоновая загрузка модулей обработки после показа окна."""
+
+import importlib
+import threading
+from typing import Optional, Sequence
+
+from src.utils.constants import PRELOAD_MODULES
+from src.utils.tracing import Tracer
+
+
+class Preloader:
+    """
+    Класс для загрузки тяжелых модулей в фоновом потоке.
+    
+    Окно показывается без numpy, OpenCV и PIL: они нужны только после
+    выбора первого файла. Пока пользователь его выбирает, модули
+    обработки импортируются в фоне, а затем читается замер реализаций
+    обработки; если его нет, замер запускается в отдельном фоновом
+    потоке и идет только между объединениями, а до его окончания
+    используется реализация по умолчанию.
+    Если файл выбран раньше, импорт в другом потоке просто дождется
+    завершения начатого: модуль не загружается дважды.
+    """
+    
+    _thread: Optional[threading.Thread] = None
+    
+    @classmethod
+    def start(cls, modules: Sequence[str] = PRELOAD_MODULES) -> None:
+        """
+        Запускает фоновую загрузку (повторный вызов ничего не делает).
+        
+        Args:
+            modules: Имена модулей для импорта
+        """
+        if cls._thread is not None:
+            return
+        cls._thread = threading.Thread(
+            target=cls._run, args=(tuple(modules),), name="preload", daemon=True
+        )
+        cls._thread.start()
+    
+    @classmethod
+    def wait(cls, timeout: Optional[float] = None) -> bool:
+        """
+        Дожидается окончания фоновой загрузки.
+        
+        Args:
+            timeout: Наибольшее время ожидания в секундах (None - без ограничения)
+        
+        Returns:
+            True если загрузка завершена или не запускалась
+        """
+        if cls._thread is None:
+            return True
+        cls._thread.join(timeout)
+        return not cls._thread.is_alive()
+    
+    @staticmethod
+    def _run(modules: Sequence[str]) -> None:
+        """Импортирует модули и выбирает реализацию обработки."""
+        for name in modules:
+            with Tracer.span("startup.preload", module=name):
+                try:
+                    importlib.import_module(name)
+                except Exception:
+                    # Ошибку с полной трассировкой покажет обычный импорт
+                    return
+        
+        with Tracer.span("startup.backends"):
+            from src.core.backends import Backends
+            Backends.calibrate_in_background()
@@ -1,16 +1,27 @@
 """Виджет превью изображений для приложения Image Merger."""
 
+import weakref
+from typing import TYPE_CHECKING
+
 from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap
-from PIL import Image
 
-from src.utils.image_converter import ImageConverter
+from src.ui.pixmap_cache import PixmapCache
+from src.utils.tracing import Tracer
+
+# numpy, OpenCV и PIL не нужны, пока в превью нечего показать
+if TYPE_CHECKING:
+    from src.utils.image_pyramid import PreviewImage
 
 
 class PreviewWidget:
     """Класс для управления превью изображений."""
     
+    # Общий для всех превью кэш: ключ включает изображение, поэтому
+    # разные виджеты не пересекаются
+    pixmap_cache = PixmapCache()
+    
     def __init__(self, graphics_view: QtWidgets.QGraphicsView):
         """
         Инициализация виджета превью.
@@ -22,41 +33,63 @@ class PreviewWidget:
         self.scene = QtWidgets.QGraphicsScene()
         self.view.setScene(self.scene)
         self.view.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._shown_key = None
+        self._shown_image = None
     
-    def show_image(self, pil_img: Image.Image) -> None:
+    def show_image(self, pil_img: "PreviewImage") -> None:
         """
-        Отображает PIL изображение в превью.
+        Отображает изображение в превью.
         
         Args:
-            pil_img: PIL изображение для отображения
+            pil_img: PIL изображение или массив RGB для отображения
         """
         if pil_img is None:
             self.clear()
             return
         
+        from src.utils.image_converter import ImageConverter
+        from src.utils.image_pyramid import ImagePyramid
+        
         # Получаем размеры viewport
-        orig_w, orig_h = pil_img.size
+        orig_w, orig_h = ImagePyramid.image_size(pil_img)
         dpr = self.view.devicePixelRatioF() or 1.0
         vw = int(self.view.viewport().width() * dpr)
         vh = int(self.view.viewport().height() * dpr)
         
         # Вычисляем масштаб
         scale = min(vw / orig_w, vh / orig_h)
-        preview_w = int(orig_w * scale)
-        preview_h = int(orig_h * scale)
+        preview_w = max(1, int(orig_w * scale))
+        preview_h = max(1, int(orig_h * scale))
+        
+        # Если вид не изменился, ничего не перерисовываем
+        key = PixmapCache.make_key(pil_img, (preview_w, preview_h), dpr)
+        if key == self._shown_key and self._shown_image() is pil_img:
+            return
         
-        # Создаем превью
-        preview = pil_img.resize((preview_w, preview_h), Image.LANCZOS)
-        pixmap = ImageConverter.pil_to_qpixmap(preview, dpr)
+        pixmap = self.pixmap_cache.get(key)
+        if pixmap is None:
+            # Создаем превью из ближайшего большего уровня пирамиды
+            with Tracer.span("preview.pyramid"):
+                level = ImagePyramid.for_image(pil_img).level_for((preview_w, preview_h))
+            level_w, level_h = ImagePyramid.image_size(level)
+            with Tracer.span("preview.resize", pixels=level_w * level_h):
+                preview = ImagePyramid.resize(level, (preview_w, preview_h))
+            with Tracer.span("preview.to_pixmap", pixels=preview_w * preview_h):
+                pixmap = ImageConverter.to_qpixmap(preview, dpr)
+            self.pixmap_cache.put(pil_img, key, pixmap)
         
         # Отображаем
         self.scene.clear()
         self.scene.addPixmap(pixmap)
         self.scene.setSceneRect(pixmap.rect().toRectF())
         self.view.resetTransform()
+        self._shown_key = key
+        self._shown_image = weakref.ref(pil_img)
     
     def clear(self) -> None:
         """Очищает превью."""
+        self._shown_key = None
+        self._shown_image = None
         self.scene.clear()
         self.view.resetTransform()
     
@@ -0,0 +1,133 @@
+"""Фоновая очередь сохранения результатов для приложения Image Merger."""
+
+from pathlib import Path
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from src.utils.constants import SAVE_QUEUE_WORKERS
+from src.utils.tracing import Tracer
+
+SaveFunc = Callable[[Path], None]
+
+
+class _SaveSignals(QObject):
+    """Сигналы задачи сохранения (QRunnable не может иметь сигналов сам)."""
+    
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+
+
+class _SaveJob(QRunnable):
+    """Задача пула потоков, записывающая один файл через временный."""
+    
+    def __init__(self, path: Path, save_func: SaveFunc):
+        """
+        Инициализация задачи.
+        
+        Args:
+            path: Путь для сохранения
+            save_func: Функция, записывающая файл по переданному пути
+        """
+        super().__init__()
+        self.path = path
+        self.save_func = save_func
+        self.signals = _SaveSignals()
+    
+    def run(self) -> None:
+        """Записывает файл во временный путь и заменяет им файл назначения."""
+        from src.core.image_writer import ImageWriter
+        try:
+            with Tracer.span("save.job", path=str(self.path)):
+                with ImageWriter.atomic_target(self.path) as tmp:
+                    self.save_func(tmp)
+        except Exception as e:
+            self.signals.failed.emit(self.path, str(e))
+            return
+        
+        self.signals.finished.emit(self.path)
+
+
+class SaveQueue(QObject):
+    """
+    Класс для сохранения результатов в фоне.
+    
+    Файлы кодируются в собственном пуле потоков (до SAVE_QUEUE_WORKERS
+    одновременно), не занимая пул обработки. Каждый файл сначала
+    пишется во временный и только потом переименовывается, поэтому при
+    ошибке или закрытии программы на месте файла не остается обрывка.
+    Сигналы приходят в потоке GUI.
+    """
+    
+    saved = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+    progress = pyqtSignal(int, int)
+    
+    def __init__(self, parent: Optional[QObject] = None, workers: int = SAVE_QUEUE_WORKERS):
+        """
+        Инициализация очереди.
+        
+        Args:
+            parent: Родительский объект
+            workers: Количество одновременно сохраняемых файлов
+        """
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(workers)
+        self._submitted = 0
+        self._done = 0
+        self._jobs = set()
+    
+    def submit(self, path: Path, save_func: SaveFunc) -> None:
+        """
+        Ставит сохранение в очередь.
+        
+        Args:
+            path: Путь для сохранения
+            save_func: Функция, записывающая файл по переданному пути;
+                выполняется в фоновом потоке и не должна обращаться к Qt
+        """
+        job = _SaveJob(Path(path), save_func)
+        job.signals.finished.connect(lambda path: self._on_done(job, path, None))
+        job.signals.failed.connect(lambda path, message: self._on_done(job, path, message))
+        
+        # Ссылка на задачу держит ее сигналы живыми до завершения
+        self._jobs.add(job)
+        self._submitted += 1
+        self.progress.emit(self._done, self._submitted)
+        self.pool.start(job)
+    
+    def pending(self) -> int:
+        """
+        Возвращает количество незавершенных сохранений.
+        
+        Returns:
+            Количество файлов в очереди и в работе
+        """
+        return self._submitted - self._done
+    
+    def wait(self, msecs: int = -1) -> bool:
+        """
+        Ждет завершения всех сохранений.
+        
+        Args:
+            msecs: Максимальное время ожидания (-1 - без ограничения)
+        
+        Returns:
+            True если все сохранения завершились
+        """
+        return self.pool.waitForDone(msecs)
+    
+    def _on_done(self, job: _SaveJob, path: Path, message: Optional[str]) -> None:
+        """Учитывает завершенное сохранение и передает результат."""
+        self._jobs.discard(job)
+        self._done += 1
+        if message is None:
+            self.saved.emit(path)
+        else:
+            self.failed.emit(path, message)
+        
+        self.progress.emit(self._done, self._submitted)
+        if self._done == self._submitted:
+            # Очередь опустела - следующий счет прогресса начинается заново
+            self._done = self._submitted = 0
@@ -1,6 +1,7 @@
 """Константы приложения Image Merger."""
 
-from typing import Tuple
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 # Типы изображений
 IMAGE_KINDS = ("color", "highlight", "outline")
@@ -15,6 +16,12 @@ DEFAULT_QUALITY = 95
 DEFAULT_DPI: Tuple[int, int] = (300, 300)
 SUPPORTED_FORMATS = "Images (*.png *.jpg *.jpeg)"
 SAVE_FORMATS = "JPEG (*.jpg);;PNG (*.png)"
+# Фильтры диалога сохранения с профилем экспорта:
+# (уменьшенные копии из EXPORT_LEVELS, пирамидальный TIFF)
+SAVE_PROFILE_FILTERS: Dict[str, Tuple[bool, bool]] = {
+    "Полный, веб и миниатюра (*.jpg *.png)": (True, False),
+    "Полный, веб, миниатюра и пирамидальный TIFF (*.jpg *.png)": (True, True),
+}
 
 # Настройки обработки изображений
 RED_HSV_RANGES = [
@@ -24,3 +31,120 @@ RED_HSV_RANGES = [
 BLACK_THRESHOLD = 10
 FADE_WEIGHT = 0.5
 OUTLINE_DARKEN_FACTOR = 0.5
+
+# Настройки пакетной обработки
+# Шаблоны имён файлов (без расширения) для каждого типа изображения,
+# {name} - общее имя вида, по которому файлы объединяются в тройку
+DEFAULT_NAMING_PATTERNS = {
+    "color": "{name}",
+    "highlight": "{name}_highlight",
+    "outline": "{name}_outline",
+}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# Высота полосы (в байтах строк) для совмещённого прохода обработки:
+# полоса помещается в кэш процессора вместе с масками и буфером затемнения
+MERGE_BAND_BYTES = 512 * 1024
+
+# Полосовая обработка больших изображений
+BANDED_STRIP_ROWS = 256
+BANDED_MIN_PIXELS = 100_000_000
+PNG_COMPRESS_LEVEL = 6
+
+# Профиль экспорта: суффикс имени файла и наибольшая сторона уровня
+# (None - полный размер); каждый уровень уменьшается из предыдущего
+EXPORT_LEVELS: Tuple[Tuple[str, Optional[int]], ...] = (
+    ("", None),
+    ("_web", 2048),
+    ("_thumb", 256),
+)
+# Пирамидальный TIFF для просмотра с масштабированием: размер плитки
+TIFF_TILE_SIZE = 256
+
+# Настройки превью
+PYRAMID_MIN_SIZE = 256
+PIXMAP_CACHE_SIZE = 16
+
+# Кэш масок подсветки и контура (упакованы по 1 биту на пиксель)
+MASK_CACHE_BYTES = 256 * 1024 * 1024
+
+# Кэш готовых результатов на диске
+RESULT_CACHE_DIR = Path.home() / ".cache" / "image_merger" / "results"
+RESULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+# Трассировка этапов: путь к файлу Chrome trace, куда записать события
+TRACE_ENV_VAR = "IMAGE_MERGER_TRACE"
+
+# Фоновое сохранение: сколько файлов кодируется одновременно
+SAVE_QUEUE_WORKERS = 4
+
+# Бюджет памяти для декодированных слоев и промежуточных результатов,
+# которые можно восстановить; сверх него вытесняются давно не использованные
+LAYER_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024
+# Длинная сторона превью, которое слой хранит постоянно
+LAYER_PREVIEW_SIZE = 2048
+
+# Наблюдение за каталогом: файл считается дописанным, если не менялся
+# WATCH_SETTLE_TIME секунд; период обхода, если inotify недоступен
+WATCH_SETTLE_TIME = 0.25
+WATCH_POLL_INTERVAL = 0.2
+
+# Индекс троек: каталог сохраненных индексов; каталоги, измененные
+# позже чем за столько наносекунд до обхода, перечитываются в следующий раз
+TRIPLET_INDEX_DIR = Path.home() / ".cache" / "image_merger" / "index"
+TRIPLET_INDEX_RACY_NS = 2_000_000_000
+
+# Реализация этапов объединения: opencv, lut, numpy или auto (выбор по
+# замеру на этой машине); переменная окружения и файл с результатами замера
+BACKEND_ENV_VAR = "IMAGE_MERGER_BACKEND"
+# Имена реализаций (ключи Backends.REGISTRY) для разбора аргументов без
+# загрузки модуля обработки
+BACKEND_NAMES = ("opencv", "lut", "numpy")
+BACKEND_CACHE_FILE = Path.home() / ".cache" / "image_merger" / "backends.json"
+# Реализация в режиме auto, пока замера нет (эталон)
+BACKEND_DEFAULT = "opencv"
+# Сколько случайных цветов добавляется в выборку для сверки с эталоном
+BACKEND_VERIFY_RANDOM_COLORS = 1 << 18
+# Классы размеров изображения для автовыбора: имя, наибольшее число
+# пикселей (None - без ограничения) и размер синтетической тройки для замера
+BACKEND_SIZE_CLASSES = (
+    ("small", 500_000, (640, 480)),
+    ("large", None, (2048, 1536)),
+)
+# Сколько секунд после последнего объединения фоновый замер ждет, прежде
+# чем продолжить (замер не должен отнимать процессор у объединений)
+BACKEND_CALIBRATION_IDLE = 1.0
+
+# Настройка параметров: через сколько миллисекунд после последнего
+# изменения запускается объединение в полном размере; сколько масок
+# уменьшенных слоев хранится для разных параметров
+PARAMS_IDLE_TIME = 400
+PROXY_MASK_CACHE_ENTRIES = 8
+
+# Модули, которые графическое приложение загружает в фоне после показа
+# окна (numpy, OpenCV и PIL загружаются вместе с ними)
+PRELOAD_MODULES = (
+    "src.core.image_manager",
+    "src.utils.image_converter",
+)
+
+# Сервис объединения: адрес по умолчанию; сколько запросов может ждать
+# свободного процесса сверх числа процессов (остальные получают 429);
+# наибольшее время обработки запроса в секундах; наибольший размер тела
+# запроса и заголовков в байтах
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_QUEUE_SIZE = 8
+SERVICE_TIMEOUT = 120.0
+SERVICE_MAX_BODY = 1024 * 1024 * 1024
+SERVICE_MAX_HEADER = 64 * 1024
+
+# Конвейер пакетной обработки: потоки чтения и записи файлов; сколько
+# троек на процесс может находиться в конвейере (читаться заранее или
+# ждать записи)
+PIPELINE_IO_THREADS = 4
+PIPELINE_DEPTH = 2
+
+# Объединение одной тройки несколькими процессами: наименьшая часть
+# изображения в пикселях, которую стоит отдавать отдельному процессу
+PARALLEL_PART_PIXELS = 2_000_000
@@ -0,0 +1,30 @@
+"""Хэши содержимого файлов изображений."""
+
+import hashlib
+from pathlib import Path
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Вычисляет хэш содержимого.
+    
+    Args:
+        data: Байты файла
+        
+    Returns:
+        Шестнадцатеричная строка хэша
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    """
+    Вычисляет хэш содержимого файла.
+    
+    Args:
+        path: Путь к файлу
+        
+    Returns:
+        Шестнадцатеричная строка хэша
+    """
+    return hash_bytes(Path(path).read_bytes())
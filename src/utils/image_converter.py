@@ -1,9 +1,12 @@
 """Конвертер изображений между различными форматами."""
 
-from PyQt6 import QtGui
+import numpy as np
+from PyQt6 import QtGui, sip
 from PIL import Image
 from PIL.ImageQt import ImageQt
 
+from src.utils.image_pyramid import PreviewImage
+
 
 class ImageConverter:
     """Класс для конвертации изображений между PIL и Qt форматами."""
@@ -37,3 +40,65 @@ class ImageConverter:
         pixmap = QtGui.QPixmap.fromImage(qimage)
         pixmap.setDevicePixelRatio(device_pixel_ratio)
         return pixmap
+    
+    @staticmethod
+    def ndarray_to_qimage(array: np.ndarray, channel_order: str = "RGB") -> QtGui.QImage:
+        """
+        Создает Qt QImage поверх буфера массива numpy без копирования.
+        
+        QImage не владеет памятью, поэтому массив сохраняется в атрибуте
+        изображения и живет, пока живет само QImage.
+        
+        Args:
+            array: Массив (высота, ширина, 3) типа uint8
+            channel_order: Порядок каналов массива (RGB или BGR)
+            
+        Returns:
+            Qt QImage, разделяющий память с массивом
+            
+        Raises:
+            ValueError: Если массив не трехканальный uint8
+        """
+        if array.dtype != np.uint8 or array.ndim != 3 or array.shape[2] != 3:
+            raise ValueError("Ожидается массив (высота, ширина, 3) типа uint8")
+        
+        # Строки могут идти с любым шагом не меньше длины строки, но пиксели
+        # внутри строки должны идти подряд
+        if array.strides[1:] != (3, 1) or array.strides[0] < array.shape[1] * 3:
+            array = np.ascontiguousarray(array)
+        
+        image_format = (
+            QtGui.QImage.Format.Format_BGR888 if channel_order == "BGR"
+            else QtGui.QImage.Format.Format_RGB888
+        )
+        height, width = array.shape[:2]
+        # Буфер передается адресом: PyQt принимает массив как буфер только
+        # при непрерывных строках
+        qimage = QtGui.QImage(
+            sip.voidptr(array.ctypes.data), width, height, array.strides[0], image_format
+        )
+        qimage._buffer = array
+        return qimage
+    
+    @staticmethod
+    def to_qpixmap(image: PreviewImage, device_pixel_ratio: float = 1.0) -> QtGui.QPixmap:
+        """
+        Конвертирует PIL изображение или массив RGB в Qt QPixmap.
+        
+        Массив передается в QPixmap напрямую через ndarray_to_qimage,
+        минуя PIL и ImageQt.
+        
+        Args:
+            image: PIL изображение или массив RGB
+            device_pixel_ratio: Коэффициент пикселей устройства
+            
+        Returns:
+            Qt QPixmap
+        """
+        if not isinstance(image, np.ndarray):
+            return ImageConverter.pil_to_qpixmap(image, device_pixel_ratio)
+        
+        qimage = ImageConverter.ndarray_to_qimage(image)
+        pixmap = QtGui.QPixmap.fromImage(qimage)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        return pixmap
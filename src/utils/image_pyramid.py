@@ -0,0 +1,117 @@
+"""Пирамида уменьшенных копий изображения для быстрого превью."""
+
+import weakref
+from typing import Dict, List, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.utils.constants import PYRAMID_MIN_SIZE
+
+# Превью строится как из PIL изображений (слои), так и из массивов
+# numpy (результат обработки, который не переводится в PIL)
+PreviewImage = Union[Image.Image, np.ndarray]
+
+
+class ImagePyramid:
+    """
+    Класс с уровнями изображения, уменьшенными вдвое друг относительно друга.
+    
+    Пирамида строится один раз на изображение и хранится, пока живо само
+    изображение: исходный уровень держится слабой ссылкой, поэтому
+    пирамида не продлевает жизнь изображению.
+    """
+    
+    _registry: Dict[int, "ImagePyramid"] = {}
+    
+    def __init__(self, image: PreviewImage, min_size: int = PYRAMID_MIN_SIZE):
+        """
+        Инициализация пирамиды.
+        
+        Args:
+            image: Исходное изображение
+            min_size: Минимальная сторона самого маленького уровня
+        """
+        self._source = weakref.ref(image)
+        self._reduced: List[PreviewImage] = []
+        
+        level = image
+        while min(self.image_size(level)) // 2 >= min_size:
+            level = self._reduce(level)
+            self._reduced.append(level)
+    
+    @staticmethod
+    def image_size(image: PreviewImage) -> Tuple[int, int]:
+        """
+        Возвращает размер изображения любого поддерживаемого типа.
+        
+        Args:
+            image: PIL изображение или массив (высота, ширина, каналы)
+            
+        Returns:
+            Кортеж (ширина, высота)
+        """
+        if isinstance(image, np.ndarray):
+            return image.shape[1], image.shape[0]
+        return image.size
+    
+    @staticmethod
+    def _reduce(image: PreviewImage) -> PreviewImage:
+        """Уменьшает изображение вдвое усреднением блоков 2x2."""
+        if isinstance(image, np.ndarray):
+            width, height = ImagePyramid.image_size(image)
+            return cv2.resize(image, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+        return image.reduce(2)
+    
+    @staticmethod
+    def resize(image: PreviewImage, size: Tuple[int, int]) -> PreviewImage:
+        """
+        Масштабирует уровень пирамиды до точного размера превью.
+        
+        Args:
+            image: Уровень пирамиды
+            size: Размер превью (ширина, высота)
+            
+        Returns:
+            Изображение того же типа
+        """
+        if isinstance(image, np.ndarray):
+            return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return image.resize(size, Image.LANCZOS)
+    
+    @classmethod
+    def for_image(cls, image: PreviewImage) -> "ImagePyramid":
+        """
+        Возвращает пирамиду изображения, строя ее при первом обращении.
+        
+        Args:
+            image: Исходное изображение
+            
+        Returns:
+            Пирамида изображения
+        """
+        key = id(image)
+        pyramid = cls._registry.get(key)
+        if pyramid is None or pyramid._source() is not image:
+            pyramid = cls(image)
+            cls._registry[key] = pyramid
+            weakref.finalize(image, cls._registry.pop, key, None)
+        return pyramid
+    
+    def level_for(self, size: Tuple[int, int]) -> PreviewImage:
+        """
+        Возвращает ближайший уровень, не меньший запрошенного размера.
+        
+        Args:
+            size: Целевой размер (ширина, высота)
+            
+        Returns:
+            Изображение уровня пирамиды
+        """
+        width, height = size
+        for level in reversed(self._reduced):
+            level_w, level_h = self.image_size(level)
+            if level_w >= width and level_h >= height:
+                return level
+        return self._source()
@@ -0,0 +1,216 @@
+"""Трассировка этапов обработки с экспортом в формат Chrome trace."""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.constants import TRACE_ENV_VAR
+
+
+class _NullSpan:
+    """Пустой интервал, который возвращается при выключенной трассировке."""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> "_NullSpan":
+        return self
+    
+    def __exit__(self, *exc) -> bool:
+        return False
+    
+    def set(self, **args: Any) -> None:
+        """Ничего не делает."""
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Интервал трассировки, записываемый при выходе из блока with."""
+    
+    __slots__ = ("name", "args", "start")
+    
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+        self.start = 0
+    
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, *exc) -> bool:
+        Tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+    
+    def set(self, **args: Any) -> None:
+        """
+        Добавляет аргументы, известные только в конце этапа.
+        
+        Args:
+            **args: Например, bytes - размер записанного файла
+        """
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Класс для записи длительности этапов обработки.
+    
+    При выключенной трассировке span() возвращает общий пустой объект,
+    поэтому расходы сводятся к одной проверке флага. Включенная
+    трассировка копит события в памяти и при завершении процесса
+    записывает их в JSON формата Chrome trace (chrome://tracing,
+    ui.perfetto.dev) и печатает сводную таблицу в stderr.
+    """
+    
+    enabled = False
+    output: Optional[Path] = None
+    _events: List[Dict[str, Any]] = []
+    _lock = threading.Lock()
+    _exit_registered = False
+    
+    @staticmethod
+    def span(name: str, **args: Any):
+        """
+        Создает интервал трассировки для блока with.
+        
+        Args:
+            name: Имя этапа
+            **args: Параметры этапа (pixels - число пикселей, bytes - объем данных)
+        
+        Returns:
+            Контекстный менеджер интервала
+        """
+        if not Tracer.enabled:
+            return _NULL_SPAN
+        return _Span(name, args)
+    
+    @staticmethod
+    def record(name: str, start_ns: int, end_ns: int, args: Dict[str, Any]) -> None:
+        """
+        Записывает завершенный этап.
+        
+        Args:
+            name: Имя этапа
+            start_ns: Начало по perf_counter_ns
+            end_ns: Конец по perf_counter_ns
+            args: Параметры этапа
+        """
+        event = {
+            "name": name,
+            "cat": "image_merger",
+            "ph": "X",
+            "ts": start_ns / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with Tracer._lock:
+            Tracer._events.append(event)
+    
+    @staticmethod
+    def enable(output: Optional[Path] = None) -> None:
+        """
+        Включает трассировку.
+        
+        Args:
+            output: Файл для экспорта при завершении процесса (опционально)
+        """
+        Tracer.enabled = True
+        if output is not None:
+            Tracer.output = Path(output)
+            if not Tracer._exit_registered:
+                atexit.register(Tracer.finish)
+                Tracer._exit_registered = True
+    
+    @staticmethod
+    def enable_from_env() -> None:
+        """Включает трассировку, если задана переменная окружения TRACE_ENV_VAR."""
+        output = os.environ.get(TRACE_ENV_VAR)
+        if output:
+            Tracer.enable(Path(output))
+    
+    @staticmethod
+    def drain() -> List[Dict[str, Any]]:
+        """
+        Забирает накопленные события (например, чтобы передать их из
+        процесса-исполнителя в родительский).
+        
+        Returns:
+            Список событий
+        """
+        with Tracer._lock:
+            events, Tracer._events = Tracer._events, []
+        return events
+    
+    @staticmethod
+    def extend(events: List[Dict[str, Any]]) -> None:
+        """
+        Добавляет события, записанные в другом процессе.
+        
+        Args:
+            events: События из drain()
+        """
+        with Tracer._lock:
+            Tracer._events.extend(events)
+    
+    @staticmethod
+    def export_chrome(path: Path) -> None:
+        """
+        Записывает события в JSON формата Chrome trace.
+        
+        Args:
+            path: Путь к файлу
+        """
+        with Tracer._lock:
+            events = list(Tracer._events)
+        data = {"traceEvents": events, "displayTimeUnit": "ms"}
+        Path(path).write_text(json.dumps(data), encoding="utf-8")
+    
+    @staticmethod
+    def summary() -> str:
+        """
+        Сводит события в таблицу по этапам.
+        
+        Returns:
+            Таблица: количество вызовов, суммарное и среднее время,
+            пропускная способность по пикселям и объем данных
+        """
+        totals: Dict[str, List[float]] = {}
+        with Tracer._lock:
+            for event in Tracer._events:
+                stats = totals.setdefault(event["name"], [0, 0.0, 0, 0])
+                stats[0] += 1
+                stats[1] += event["dur"] / 1000
+                stats[2] += event["args"].get("pixels", 0)
+                stats[3] += event["args"].get("bytes", 0)
+        
+        lines = [f"{'Этап':<26} {'Вызовы':>7} {'Всего, мс':>11} {'Среднее, мс':>12} {'MP/с':>8} {'МБ':>8}"]
+        for name, (count, total_ms, pixels, size) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            rate = f"{pixels / 1e3 / total_ms:.1f}" if pixels and total_ms else "-"
+            megabytes = f"{size / 1024 / 1024:.1f}" if size else "-"
+            lines.append(
+                f"{name:<26} {count:>7} {total_ms:>11.1f} {total_ms / count:>12.2f} {rate:>8} {megabytes:>8}"
+            )
+        return "\n".join(lines)
+    
+    @staticmethod
+    def finish() -> None:
+        """Экспортирует события в файл output и печатает сводку в stderr."""
+        if Tracer.output is None:
+            return
+        
+        try:
+            Tracer.export_chrome(Tracer.output)
+        except OSError as e:
+            print(f"Не удалось записать трассировку {Tracer.output}: {e}", file=sys.stderr)
+            return
+        print(f"Трассировка записана в {Tracer.output}", file=sys.stderr)
+        print(Tracer.summary(), file=sys.stderr)
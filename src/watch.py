@@ -0,0 +1,245 @@
+"""Наблюдение за каталогом экспорта и автоматическое объединение троек.
+
+Пример запуска:
+    python -m src.watch exports/ -o merged/ --workers 4 --format PNG
+
+Трассировка этапов: --trace trace.json (или переменная окружения
+IMAGE_MERGER_TRACE=trace.json); файл и сводка пишутся при остановке.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+# Обеспечиваем доступность пакета src при прямом запуске этого файла
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.batch import merge_triplet, start_workers
+from src.core.backends import Backends
+from src.core.export_profile import ExportProfile
+from src.core.folder_watcher import FolderWatcher
+from src.core.naming import NamingRule
+from src.core.triplet_index import Triplet, TripletIndex
+from src.utils.constants import BACKEND_DEFAULT, BACKEND_ENV_VAR, EXPORT_LEVELS, IMAGE_KINDS, WATCH_SETTLE_TIME
+from src.utils.tracing import Tracer
+
+
+def _init_worker() -> None:
+    """Настраивает процесс-исполнитель: Ctrl+C обрабатывает только родитель."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def run_watch(
+    watcher: FolderWatcher,
+    index: TripletIndex,
+    output_dir: Path,
+    format_name: str,
+    workers: Optional[int] = None,
+    banded: bool = False,
+    existing: bool = False,
+    profile: Optional[ExportProfile] = None
+) -> int:
+    """
+    Объединяет тройки по мере их появления, пока не прерван (Ctrl+C).
+    
+    Тройка отправляется в пул процессов, как только готовы color и
+    outline. Если позже дописывается highlight или файл тройки
+    перезаписывается, результат пересчитывается; пока тройка
+    обрабатывается, повторный запуск откладывается до ее завершения.
+    
+    Args:
+        watcher: Наблюдение за каталогом
+        index: Индекс троек того же каталога, дополняемый по событиям
+        output_dir: Каталог для результатов
+        format_name: Формат файла (PNG или JPEG)
+        workers: Количество процессов (по умолчанию - число ядер)
+        banded: Всегда использовать полосовую обработку
+        existing: Сначала объединить тройки, уже лежащие в каталоге
+        profile: Профиль экспорта (None - только файл полного размера)
+    
+    Returns:
+        Количество троек, которые не удалось обработать
+    """
+    suffix = '.png' if format_name == 'PNG' else '.jpg'
+    running: Dict[str, Tuple[Future, Triplet, float]] = {}
+    queued: Dict[str, Triplet] = {}
+    done = failed = 0
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        # Процессы запускаются заранее, чтобы первая тройка не ждала их старта
+        start_workers(executor, workers or os.cpu_count() or 1)
+        
+        def submit(triplet: Triplet, ready_at: float) -> None:
+            future = executor.submit(
+                merge_triplet, triplet, output_dir / f"{triplet.name}{suffix}", format_name, banded,
+                trace=Tracer.enabled, profile=profile
+            )
+            running[triplet.name] = (future, triplet, ready_at)
+        
+        def schedule(triplet: Triplet) -> None:
+            if triplet.name in running:
+                queued[triplet.name] = triplet
+            else:
+                submit(triplet, time.monotonic())
+        
+        if existing:
+            for triplet in index:
+                if triplet.is_complete():
+                    submit(triplet, time.monotonic())
+        
+        print(f"Наблюдение за {watcher.root} ({watcher.backend}), Ctrl+C для остановки", flush=True)
+        try:
+            while True:
+                ready, removed = watcher.poll(0.1)
+                for path in removed:
+                    index.remove_file(path)
+                for path in ready:
+                    triplet = index.add_file(path)
+                    if triplet is not None:
+                        schedule(triplet)
+                
+                for name, (future, triplet, ready_at) in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[name]
+                    try:
+                        stats = future.result()
+                    except Exception as e:
+                        failed += 1
+                        print(f"ОШИБКА {name}: {e}", file=sys.stderr, flush=True)
+                    else:
+                        done += 1
+                        if stats.trace_events:
+                            Tracer.extend(stats.trace_events)
+                        latency = time.monotonic() - ready_at + watcher.settle
+                        print(
+                            f"{name}: {stats.pixels / 1e6:.1f} MP за {stats.seconds:.2f} с, "
+                            f"от окончания записи {latency:.2f} с -> {stats.output}",
+                            flush=True
+                        )
+                    if name in queued:
+                        submit(queued.pop(name), time.monotonic())
+        except KeyboardInterrupt:
+            print(f"\nОстановлено: объединено {done}, ошибок {failed}", flush=True)
+        finally:
+            watcher.close()
+    
+    return failed
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    
+    Args:
+        argv: Аргументы (по умолчанию - sys.argv)
+    
+    Returns:
+        Разобранные аргументы
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.watch",
+        description="Автоматическое объединение изображений из Corel XVL по мере экспорта"
+    )
+    parser.add_argument("input", type=Path, help="Каталог, куда экспортируются изображения")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Каталог для результатов")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count(),
+        help="Количество процессов (по умолчанию - число ядер)"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=("JPEG", "PNG"), default="JPEG",
+        type=str.upper, help="Формат результата"
+    )
+    parser.add_argument(
+        "--banded", action="store_true",
+        help="Обрабатывать полосами все изображения, а не только большие"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Записывать также уменьшенные копии (профиль экспорта: "
+             + ", ".join(f"{suffix} {side}px" for suffix, side in EXPORT_LEVELS if side) + ")"
+    )
+    parser.add_argument(
+        "--pyramid", action="store_true",
+        help="Записывать также тайловый пирамидальный TIFF (.tif) для просмотра с масштабированием"
+    )
+    parser.add_argument(
+        "--existing", action="store_true",
+        help="Сначала объединить тройки, которые уже лежат в каталоге"
+    )
+    parser.add_argument(
+        "--settle", type=float, default=WATCH_SETTLE_TIME, metavar="SECONDS",
+        help="Сколько файл не должен меняться, чтобы считаться дописанным"
+    )
+    parser.add_argument(
+        "--polling", action="store_true",
+        help="Обходить каталог периодически вместо inotify (например, для сетевых дисков)"
+    )
+    parser.add_argument(
+        "--trace", type=Path, metavar="FILE",
+        help="Записать трассировку этапов в FILE (Chrome trace JSON) и напечатать сводку при остановке"
+    )
+    parser.add_argument(
+        "--backend", choices=("auto", *Backends.REGISTRY),
+        help=f"Реализация обработки (по умолчанию auto - самая быстрая по замеру); "
+             f"то же задает переменная {BACKEND_ENV_VAR}"
+    )
+    parser.add_argument(
+        "--calibrate", action="store_true",
+        help=f"Замерить реализации перед началом работы и сохранить выбор для auto "
+             f"(без замера auto использует {BACKEND_DEFAULT})"
+    )
+    for kind in IMAGE_KINDS:
+        parser.add_argument(
+            f"--{kind}", metavar="PATTERN",
+            help=f"Шаблон имени файла {kind} без расширения, например {{name}}_{kind}"
+        )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Главная функция наблюдения."""
+    args = parse_args(argv)
+    Tracer.enable_from_env()
+    if args.trace:
+        Tracer.enable(args.trace)
+    if args.backend:
+        Backends.configure(args.backend)
+    
+    patterns = {kind: getattr(args, kind) for kind in IMAGE_KINDS if getattr(args, kind)}
+    try:
+        rule = NamingRule(patterns)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    
+    if not args.input.is_dir():
+        print(f"Каталог не найден: {args.input}", file=sys.stderr)
+        return 2
+    
+    args.output.mkdir(parents=True, exist_ok=True)
+    # Замер выполняется здесь, процессы-исполнители берут выбор из файла
+    if args.calibrate:
+        Backends.calibrate()
+    print(f"Реализация обработки: {Backends.describe()}", flush=True)
+    watcher = FolderWatcher(args.input, args.output, args.settle, use_inotify=not args.polling)
+    # Уже лежащие файлы попадают в индекс, чтобы позже дописанный слой
+    # нашел свою тройку
+    index = TripletIndex.open(args.input, rule, exclude=args.output)
+    failed = run_watch(
+        watcher, index, args.output, args.format, args.workers, args.banded, args.existing,
+        ExportProfile.from_options(args.profile, args.pyramid)
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
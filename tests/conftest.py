@@ -0,0 +1,72 @@
+"""Общие вспомогательные функции тестов."""
+
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Обеспечиваем доступность пакета src при запуске pytest из любого каталога
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def make_triplet(width: int, height: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Создает синтетическую тройку в формате RGB.
+    
+    Цветной слой - шум, контур - черная сетка на белом фоне, подсветка -
+    красный прямоугольник на белом фоне. Каждый десятый пиксель контура
+    и подсветки - случайного цвета, чтобы маски проверялись и около
+    пороговых значений.
+    
+    Args:
+        width: Ширина изображения
+        height: Высота изображения
+        seed: Зерно генератора случайных чисел
+    
+    Returns:
+        Кортеж (color, outline, highlight)
+    """
+    rng = np.random.default_rng(seed)
+    color = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    
+    outline = np.full((height, width, 3), 255, dtype=np.uint8)
+    outline[::7] = 0
+    outline[:, ::11] = 0
+    
+    highlight = np.full((height, width, 3), 255, dtype=np.uint8)
+    highlight[height // 4:height * 3 // 4, width // 4:width * 3 // 4] = (255, 0, 0)
+    
+    for layer in (outline, highlight):
+        noisy = rng.random((height, width)) < 0.1
+        layer[noisy] = rng.integers(0, 256, (int(noisy.sum()), 3), dtype=np.uint8)
+    return color, outline, highlight
+
+
+def save_triplet(directory: Path, name: str, width: int, height: int, seed: int = 0) -> Dict[str, Path]:
+    """
+    Сохраняет синтетическую тройку в PNG с именами по умолчанию.
+    
+    Args:
+        directory: Каталог для файлов
+        name: Имя тройки
+        width: Ширина изображения
+        height: Высота изображения
+        seed: Зерно генератора случайных чисел
+    
+    Returns:
+        Пути к слоям по типам
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = {
+        'color': directory / f"{name}.png",
+        'outline': directory / f"{name}_outline.png",
+        'highlight': directory / f"{name}_highlight.png",
+    }
+    for path, layer in zip(paths.values(), make_triplet(width, height, seed)):
+        Image.fromarray(layer).save(path)
+    return paths
+
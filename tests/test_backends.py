@@ -0,0 +1,152 @@
+"""Тесты реализаций обработки и их выбора (Backends)."""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from conftest import make_triplet
+from src.core import backends
+from src.core.backends import Backends, NumpyBackend
+from src.core.image_processor import ImageProcessor
+from src.utils.constants import BACKEND_DEFAULT, BACKEND_ENV_VAR
+
+
+@pytest.fixture
+def backend_state(tmp_path, monkeypatch):
+    """Чистое состояние Backends с файлом замера во временном каталоге."""
+    monkeypatch.setattr(backends, "BACKEND_CACHE_FILE", tmp_path / "backends.json")
+    monkeypatch.setattr(Backends, "_choice", {})
+    monkeypatch.setattr(Backends, "_verified", {})
+    monkeypatch.setattr(Backends, "_loaded", False)
+    monkeypatch.setattr(Backends, "_calibration_thread", None)
+    monkeypatch.delenv(BACKEND_ENV_VAR, raising=False)
+    return tmp_path / "backends.json"
+
+
+def reference_merge(color, outline, highlight):
+    """Результат последовательных apply_highlight и apply_outline."""
+    return ImageProcessor.apply_outline(
+        ImageProcessor.apply_highlight(color, highlight, "RGB"), outline, "RGB"
+    )
+
+
+@pytest.mark.parametrize("name", sorted(Backends.REGISTRY))
+@pytest.mark.parametrize("size", [(64, 48), (800, 700)])
+def test_backend_matches_reference(name, size, backend_state, monkeypatch):
+    color, outline, highlight = make_triplet(*size)
+    monkeypatch.setenv(BACKEND_ENV_VAR, "opencv")
+    expected = reference_merge(color.copy(), outline, highlight)
+    
+    monkeypatch.setenv(BACKEND_ENV_VAR, name)
+    # Таблицы lut иначе строятся только после 2^24 пикселей
+    Backends.get(name).prepare()
+    assert Backends.for_pixels(size[0] * size[1]).name == name
+    assert np.array_equal(ImageProcessor.process_images(color, outline, highlight, "RGB"), expected)
+    assert np.array_equal(
+        ImageProcessor.highlight_mask(highlight, "RGB"),
+        Backends.get("opencv").highlight_mask(highlight, "RGB")
+    )
+    assert np.array_equal(
+        ImageProcessor.outline_mask(outline, "RGB"),
+        Backends.get("opencv").outline_mask(outline, "RGB")
+    )
+
+
+def test_numpy_verify_detects_table_error():
+    backend = NumpyBackend()
+    assert backend.verify()
+    backend._sdiv[200] += 1
+    assert not backend.verify()
+
+
+def test_auto_without_calibration_uses_default(backend_state, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("замер при объединении")
+    
+    monkeypatch.setattr(Backends, "calibrate", fail)
+    assert Backends.for_pixels(100).name == BACKEND_DEFAULT
+    assert Backends.for_pixels(50_000_000).name == BACKEND_DEFAULT
+    assert not Backends.is_calibrated()
+    assert "--calibrate" in Backends.describe()
+
+
+def test_calibration_is_saved_and_used(backend_state, monkeypatch):
+    thread = Backends.calibrate_in_background()
+    assert thread is not None
+    thread.join(60)
+    assert not thread.is_alive()
+    assert backend_state.exists()
+    assert Backends.calibrate_in_background() is thread
+    
+    # Новый процесс берет выбор из файла без замера
+    chosen = dict(Backends._choice)
+    monkeypatch.setattr(Backends, "_choice", {})
+    monkeypatch.setattr(Backends, "_loaded", False)
+    monkeypatch.setattr(Backends, "calibrate", None)
+    assert Backends.is_calibrated()
+    assert Backends._choice == chosen
+    assert Backends.for_pixels(100).name == chosen["small"]
+
+
+def test_pinned_backend_skips_background_calibration(backend_state, monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV_VAR, "opencv")
+    assert Backends.calibrate_in_background() is None
+
+
+class Recorder:
+    """Реализация, которая считает полосы и может начать объединение на одной из них."""
+    
+    def __init__(self, interrupt_at=None):
+        self.bands = 0
+        self.interrupt_at = interrupt_at
+    
+    def prepare(self):
+        pass
+    
+    def tone_ops(self):
+        return (lambda src, dst: None), (lambda src, dst: None)
+    
+    def highlight_mask(self, highlight, order, dst):
+        self.bands += 1
+        if self.bands == self.interrupt_at:
+            with Backends.foreground():
+                pass
+    
+    def outline_mask(self, outline, order, dst):
+        pass
+
+
+@pytest.fixture
+def banded(monkeypatch):
+    """Тройка из трех полос по 10 строк."""
+    monkeypatch.setattr(backends, "MERGE_BAND_BYTES", 10 * 10 * 3)
+    monkeypatch.setattr(backends, "BACKEND_CALIBRATION_IDLE", 0)
+    return make_triplet(10, 30)
+
+
+@pytest.mark.parametrize("interruptible, bands", [(False, 6), (True, 7)])
+def test_pass_interrupted_by_merge_is_repeated(banded, interruptible, bands):
+    # Объединение начинается на второй полосе второго прохода
+    backend = Recorder(interrupt_at=4)
+    Backends._time_backend(backend, *banded, repeat=1, interruptible=interruptible)
+    assert backend.bands == bands
+
+
+def test_background_calibration_waits_for_merges(banded, monkeypatch):
+    monkeypatch.setattr(backends, "BACKEND_CALIBRATION_IDLE", 0.2)
+    backend = Recorder()
+    thread = threading.Thread(
+        target=Backends._time_backend, args=(backend, *banded, 1, True)
+    )
+    with Backends.foreground():
+        thread.start()
+        time.sleep(0.3)
+        assert backend.bands == 0
+    ended = time.monotonic()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert backend.bands == 6
+    # Замер продолжился не раньше, чем через BACKEND_CALIBRATION_IDLE
+    assert time.monotonic() - ended >= 0.2
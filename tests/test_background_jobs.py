@@ -0,0 +1,125 @@
+"""Тесты фоновых задач с отменой по поколениям (JobRunner)."""
+
+import threading
+
+import numpy as np
+import pytest
+from PyQt6.QtCore import QCoreApplication, QThreadPool
+
+from conftest import make_triplet, save_triplet
+from src.core.image_manager import ImageManager
+from src.core.image_processor import ImageProcessor
+from src.core.layer_store import LayerHandle
+from src.ui.background_jobs import JobCancelled, JobRunner
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    """Приложение Qt, в потоке которого доставляются сигналы задач."""
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def jobs(qapp):
+    """JobRunner с отдельным пулом из двух потоков и списком полученных результатов."""
+    pool = QThreadPool()
+    pool.setMaxThreadCount(2)
+    runner = JobRunner(pool=pool)
+    runner.results = []
+    runner.finished.connect(lambda tag, result: runner.results.append((tag, result)))
+    yield runner
+    pool.waitForDone()
+
+
+def deliver() -> None:
+    """Доставляет сигналы задач, завершившихся в потоках пула."""
+    QCoreApplication.processEvents()
+
+
+def test_cancel_finished_job(jobs):
+    jobs.submit('merge', lambda cancelled: 1)
+    jobs.pool.waitForDone()
+    # Задача выполнена, а ее сигналы еще не доставлены
+    assert jobs.is_pending('merge')
+    jobs.cancel('merge')
+    deliver()
+    assert jobs.results == []
+    assert not jobs.is_pending('merge')
+    assert not jobs._jobs
+    
+    jobs.submit('merge', lambda cancelled: 2)
+    jobs.pool.waitForDone()
+    deliver()
+    assert jobs.results == [('merge', 2)]
+    assert not jobs._jobs
+
+
+def test_cancel_queued_job(jobs):
+    jobs.pool.setMaxThreadCount(1)
+    started, resume = threading.Event(), threading.Event()
+    
+    def block(cancelled):
+        started.set()
+        resume.wait(10)
+        return 'block'
+    
+    jobs.submit('block', block)
+    assert started.wait(10)
+    jobs.submit('merge', lambda cancelled: 'merge')
+    jobs.cancel('merge')
+    # Снятая с очереди задача освобождается сразу
+    assert len(jobs._jobs) == 1
+    resume.set()
+    jobs.pool.waitForDone()
+    deliver()
+    assert jobs.results == [('block', 'block')]
+    assert not jobs._jobs
+
+
+def test_replace_layer_during_merge(jobs, tmp_path):
+    first = save_triplet(tmp_path, "a", 300, 200, seed=1)
+    second = save_triplet(tmp_path, "b", 300, 200, seed=2)
+    manager = ImageManager()
+    for kind, path in first.items():
+        manager.set_layer(kind, LayerHandle.open(path))
+    
+    started, resume = threading.Event(), threading.Event()
+    checks = {True: 0, False: 0}
+    
+    def submit_merge(block: bool) -> None:
+        # Как MainWindow._update_result, но первая задача ждет на первой проверке
+        layers = manager.snapshot()
+        params = manager.params
+        
+        def merge(cancelled):
+            def checkpoint():
+                checks[block] += 1
+                if block:
+                    started.set()
+                    resume.wait(10)
+                if cancelled():
+                    raise JobCancelled()
+            
+            result = manager.merge_images(layers, params, checkpoint)
+            checkpoint()
+            return result
+        
+        jobs.submit('merge', merge)
+    
+    submit_merge(block=True)
+    assert started.wait(10)
+    manager.set_layer('color', LayerHandle.open(second['color']))
+    submit_merge(block=False)
+    resume.set()
+    jobs.pool.waitForDone()
+    deliver()
+    
+    # Замененная задача прервалась на первой же проверке
+    assert checks[True] == 1
+    assert checks[False] > 1
+    [(tag, result)] = jobs.results
+    color = make_triplet(300, 200, seed=2)[0]
+    _, outline, highlight = make_triplet(300, 200, seed=1)
+    assert tag == 'merge'
+    assert np.array_equal(result, ImageProcessor.process_images(color, outline, highlight, "RGB"))
+    assert not jobs._jobs
@@ -0,0 +1,167 @@
+"""Тесты полосовой обработки (BandedMerger) и чтения слоев полосами (StripReader)."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import make_triplet, save_triplet
+from src.core import image_manager
+from src.core.banded_merger import BandedMerger
+from src.core.image_manager import ImageManager
+from src.core.image_processor import ImageProcessor
+from src.core.image_writer import ImageWriter, PngStripWriter
+from src.core.result_cache import ResultCache
+from src.core.strip_reader import StripReader
+
+# Высота полосы, при которой изображение делится на много неровных полос
+ROWS = 7
+
+
+def decode(path):
+    """Декодирует файл в массив RGB."""
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+def reference(paths):
+    """Результат apply_highlight и apply_outline для декодированных слоев."""
+    color = decode(paths['color']).copy()
+    if paths.get('highlight') is not None:
+        color = ImageProcessor.apply_highlight(color, decode(paths['highlight']), "RGB")
+    return ImageProcessor.apply_outline(color, decode(paths['outline']), "RGB")
+
+
+@pytest.fixture(params=["highlight", "no-highlight"])
+def paths(request, tmp_path):
+    """Тройка PNG с подсветкой и без нее."""
+    paths = save_triplet(tmp_path, "v", 61, 50)
+    if request.param == "no-highlight":
+        del paths['highlight']
+    return paths
+
+
+def test_merge_to_image_matches_reference(paths):
+    with BandedMerger.merge_to_image(paths, rows=ROWS) as image:
+        assert np.array_equal(np.asarray(image), reference(paths))
+
+
+def test_merge_to_png_matches_reference(paths, tmp_path):
+    output = tmp_path / "result.png"
+    assert BandedMerger.merge_to_file(paths, output, "PNG", rows=ROWS) == (61, 50)
+    assert np.array_equal(decode(output), reference(paths))
+
+
+def test_merge_to_jpeg_matches_reference(paths, tmp_path):
+    output = tmp_path / "result.jpg"
+    BandedMerger.merge_to_file(paths, output, "JPEG", rows=ROWS)
+    expected = tmp_path / "expected.jpg"
+    ImageWriter.save(Image.fromarray(reference(paths)), expected, "JPEG")
+    assert np.array_equal(decode(output), decode(expected))
+
+
+def test_size_mismatch(tmp_path):
+    paths = save_triplet(tmp_path, "v", 61, 50)
+    Image.new("RGB", (61, 49), "white").save(paths['outline'])
+    with pytest.raises(ValueError, match="не совпадает"):
+        BandedMerger.merge_to_file(paths, tmp_path / "result.png", "PNG", rows=ROWS)
+
+
+@pytest.mark.parametrize("kind", ["color", "outline", "highlight"])
+def test_jpeg_layer_is_refused(kind, tmp_path):
+    paths = save_triplet(tmp_path, "v", 61, 50)
+    assert BandedMerger.can_stream(paths)
+    jpeg = paths[kind].with_suffix(".jpg")
+    with Image.open(paths[kind]) as image:
+        ImageWriter.save(image, jpeg, "JPEG")
+    paths[kind] = jpeg
+    assert not BandedMerger.can_stream(paths)
+    with pytest.raises(ValueError, match="нельзя читать полосами"):
+        BandedMerger.merge_to_file(paths, tmp_path / "result.png", "PNG", rows=ROWS)
+
+
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA"])
+@pytest.mark.parametrize("compress_level", [0, 6])
+def test_png_is_streamed(mode, compress_level, tmp_path):
+    color, _, _ = make_triplet(203, 97)
+    path = tmp_path / "layer.png"
+    Image.fromarray(color).convert(mode).save(path, compress_level=compress_level)
+    assert StripReader.can_stream(path)
+    with StripReader(path) as reader:
+        strips = [reader.read(top, min(top + ROWS, 97)) for top in range(0, 97, ROWS)]
+    assert np.array_equal(np.concatenate(strips), decode(path))
+
+
+def test_strip_writer_output_is_streamed(tmp_path):
+    # Все строки с фильтром Paeth, который зависит от предыдущей полосы
+    color, _, _ = make_triplet(64, 40)
+    path = tmp_path / "layer.png"
+    with PngStripWriter(path, 64, 40) as writer:
+        writer.write(color[:13])
+        writer.write(color[13:])
+    with StripReader(path) as reader:
+        assert np.array_equal(np.concatenate([reader.read(0, 20), reader.read(20, 40)]), color)
+
+
+def test_png_bytes_are_streamed(tmp_path):
+    path = save_triplet(tmp_path, "v", 30, 30)['color']
+    data = path.read_bytes()
+    path.unlink()
+    assert StripReader.can_stream(data)
+    with StripReader(data, (30, 30)) as reader:
+        assert np.array_equal(np.concatenate([reader.read(0, 16), reader.read(16, 30)]), make_triplet(30, 30)[0])
+
+
+def test_streamed_strips_must_be_sequential(tmp_path):
+    path = save_triplet(tmp_path, "v", 30, 30)['color']
+    with StripReader(path) as reader:
+        reader.read(0, 10)
+        with pytest.raises(ValueError):
+            reader.read(20, 30)
+
+
+@pytest.mark.parametrize("suffix, mode", [(".jpg", "RGB"), (".png", "P"), (".png", "I;16")])
+def test_other_layers_are_not_streamed(suffix, mode, tmp_path):
+    path = tmp_path / f"layer{suffix}"
+    image = Image.fromarray(make_triplet(40, 30)[0])
+    if mode == "P":
+        image = image.convert("P", palette=Image.Palette.ADAPTIVE, colors=16)
+    elif mode == "I;16":
+        image = Image.fromarray(np.asarray(image.convert("L")).astype(np.uint16) * 257)
+    image.save(path)
+    assert not StripReader.can_stream(path)
+    with pytest.raises(ValueError):
+        StripReader(path)
+
+
+def test_truncated_png(tmp_path):
+    path = save_triplet(tmp_path, "v", 100, 100)['color']
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(OSError):
+        with StripReader(path) as reader:
+            for top in range(0, 100, ROWS):
+                reader.read(top, min(top + ROWS, 100))
+
+
+def test_banded_export_uses_loaded_layers(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_manager, "BANDED_MIN_PIXELS", 1)
+    cache = ResultCache(tmp_path / "cache")
+    paths = save_triplet(tmp_path / "input", "v", 61, 50)
+    loaded = reference(paths)
+    manager = ImageManager(cache)
+    for kind, path in paths.items():
+        assert manager.load_image(kind, path)
+    assert manager.use_banded_export()
+    
+    # Файлы изменились после загрузки: сохраняется загруженное, и в кэш
+    # оно попадает под хэшами загруженных байтов
+    save_triplet(tmp_path / "input", "v", 61, 50, seed=1)
+    manager.export_banded(tmp_path / "loaded.png", "PNG")
+    assert np.array_equal(decode(tmp_path / "loaded.png"), loaded)
+    
+    changed = ImageManager(cache)
+    for kind, path in paths.items():
+        assert changed.load_image(kind, path)
+    changed.export_banded(tmp_path / "changed.png", "PNG")
+    assert np.array_equal(decode(tmp_path / "changed.png"), reference(paths))
+    assert not np.array_equal(loaded, reference(paths))
@@ -0,0 +1,131 @@
+"""Тесты пакетной обработки (python -m src.batch) с несколькими процессами."""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import PROJECT_ROOT, save_triplet
+from src.core.image_processor import ImageProcessor
+
+# Запуск дольше этого считается зависанием
+BATCH_TIMEOUT = 120
+
+
+def run_batch_cli(args: Sequence[str], log: Path) -> None:
+    """
+    Запускает пакетную обработку в отдельном процессе с ограничением времени.
+    
+    Вывод пишется в файл, а не в канал: процессы-исполнители зависшего
+    запуска держали бы канал открытым. При превышении времени вся группа
+    процессов завершается и тест проваливается.
+    
+    Args:
+        args: Аргументы python -m src.batch
+        log: Файл для вывода
+    """
+    with open(log, "wb") as output:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.batch", "--no-index", *args],
+            cwd=PROJECT_ROOT,
+            stdout=output,
+            stderr=subprocess.STDOUT,
+            start_new_session=os.name == "posix"
+        )
+        try:
+            code = process.wait(BATCH_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.wait()
+            pytest.fail(f"Пакетная обработка зависла:\n{log.read_text(encoding='utf-8', errors='replace')}")
+    assert code == 0, log.read_text(encoding="utf-8", errors="replace")
+
+
+def assert_same_pixels(left: Path, right: Path) -> None:
+    """Проверяет, что изображения совпадают попиксельно."""
+    with Image.open(left) as a, Image.open(right) as b:
+        assert a.size == b.size
+        assert np.array_equal(np.asarray(a), np.asarray(b)), f"{left.name} отличается"
+
+
+@pytest.fixture(scope="module")
+def three_triplets(tmp_path_factory) -> Path:
+    """Каталог с тремя небольшими тройками, как в отчете о зависании."""
+    root = tmp_path_factory.mktemp("input")
+    for seed, name in enumerate(("a", "b", "c")):
+        save_triplet(root, name, 160, 120, seed)
+    return root
+
+
+@pytest.fixture(scope="module")
+def sequential_results(three_triplets, tmp_path_factory):
+    """Результаты обработки тех же троек без конвейера по форматам - эталон для сравнения."""
+    
+    def results(format_name: str) -> Path:
+        output = tmp_path_factory.mktemp(f"sequential-{format_name}")
+        run_batch_cli(
+            [str(three_triplets), "-o", str(output), "-f", format_name, "-w", "1", "--no-pipeline"],
+            output / "batch.log"
+        )
+        return output
+    
+    return {format_name: results(format_name) for format_name in ("PNG", "JPEG")}
+
+
+@pytest.mark.parametrize("run", range(2))
+@pytest.mark.parametrize("format_name, workers", [("PNG", 2), ("JPEG", 4)])
+def test_pipeline_with_several_workers(
+    three_triplets, sequential_results, tmp_path, format_name, workers, run
+):
+    # Процессы пула не должны запускаться из потоков чтения (fork при
+    # захваченной блокировке PIL приводил к зависанию исполнителей)
+    output = tmp_path / "out"
+    run_batch_cli(
+        [str(three_triplets), "-o", str(output), "-f", format_name, "-w", str(workers)],
+        tmp_path / "batch.log"
+    )
+    suffix = ".png" if format_name == "PNG" else ".jpg"
+    for name in ("a", "b", "c"):
+        assert_same_pixels(output / f"{name}{suffix}", sequential_results[format_name] / f"{name}{suffix}")
+
+
+
+@pytest.fixture(scope="module")
+def big_triplet(tmp_path_factory) -> Path:
+    """Каталог с одной тройкой, которая делится не меньше чем на две части."""
+    root = tmp_path_factory.mktemp("big-input")
+    save_triplet(root, "big", 2048, 2048)
+    return root
+
+
+@pytest.mark.parametrize("run", range(3))
+def test_split_triplet_with_several_workers(big_triplet, tmp_path, run):
+    # Одна тройка и два процесса: тройка объединяется частями
+    # (ParallelMerger), которые отправляются в пул из потоков
+    output = tmp_path / "out"
+    trace = tmp_path / "trace.json"
+    run_batch_cli(
+        [str(big_triplet), "-o", str(output), "-f", "PNG", "-w", "2", "--trace", str(trace)],
+        tmp_path / "batch.log"
+    )
+    events = json.loads(trace.read_text(encoding="utf-8"))["traceEvents"]
+    assert [event["args"]["parts"] for event in events if event["name"] == "merge.parallel"] == [2]
+    
+    with Image.open(big_triplet / "big.png") as color, \
+            Image.open(big_triplet / "big_outline.png") as outline, \
+            Image.open(big_triplet / "big_highlight.png") as highlight:
+        expected = ImageProcessor.process_images(
+            np.asarray(color), np.asarray(outline), np.asarray(highlight), "RGB"
+        )
+    with Image.open(output / "big.png") as result:
+        assert np.array_equal(np.asarray(result), expected)
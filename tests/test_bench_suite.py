@@ -0,0 +1,73 @@
+"""Тесты набора бенчмарков (benchmarks/bench_suite.py): данные, отчет и сравнение с базой."""
+
+import json
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import PROJECT_ROOT
+
+sys.path.insert(0, str(PROJECT_ROOT / "benchmarks"))
+import bench_suite
+
+
+def test_xvl_triplet():
+    color, outline, highlight = bench_suite.make_xvl_triplet(400, 300, coverage=0.1)
+    for layer in (color, outline, highlight):
+        assert layer.shape == (300, 400, 3)
+        assert layer.dtype == np.uint8
+    
+    # Заливка только цветами палитры, контур только черный и белый
+    assert set(map(tuple, np.unique(color.reshape(-1, 3), axis=0))) <= set(map(tuple, bench_suite.PALETTE))
+    assert set(np.unique(outline)) == {0, 255}
+    # Контур проходит по границам граней
+    edges = np.any(color[1:] != color[:-1], axis=2)
+    assert np.all(outline[1:][edges] == 0)
+    
+    red = np.all(highlight == bench_suite.HIGHLIGHT_RGB, axis=2).mean()
+    assert 0.03 < red <= 0.1
+
+
+def test_compare_counts_regressions(capsys):
+    baseline = {"1MP": {"fast": {"median": 1.0}, "slow": {"median": 1.0}}}
+    current = {
+        "1MP": {"fast": {"median": 1.05}, "slow": {"median": 1.5}, "new": {"median": 9.0}},
+        "12MP": {"fast": {"median": 9.0}},
+    }
+    assert bench_suite.compare(current, baseline, tolerance=0.1) == 1
+    output = capsys.readouterr().out
+    assert "slow" in output and "РЕГРЕССИЯ" in output
+    # Этапы без базы не сравниваются
+    assert "new" not in output
+    assert bench_suite.compare(current, baseline, tolerance=0.6) == 0
+
+
+def test_report_and_baseline(tmp_path, monkeypatch):
+    # Этапы Qt не выбраны, приложение Qt не нужно
+    monkeypatch.setattr(bench_suite, "qt_available", lambda: False)
+    report = tmp_path / "current.json"
+    args = ["--sizes", "1", "--repeat", "1", "--cases", "apply_outline,process_images"]
+    assert bench_suite.main([*args, "-o", str(report)]) == 0
+    
+    data = json.loads(report.read_text(encoding="utf-8"))
+    assert set(data["results"]["1MP"]) == {"apply_outline", "process_images"}
+    assert data["settings"]["repeat"] == 1
+    assert "numpy" in data["environment"]
+    
+    slower = json.loads(report.read_text(encoding="utf-8"))
+    faster = json.loads(report.read_text(encoding="utf-8"))
+    for name in data["results"]["1MP"]:
+        slower["results"]["1MP"][name]["median"] *= 1000
+        faster["results"]["1MP"][name]["median"] /= 1000
+    (tmp_path / "slower.json").write_text(json.dumps(slower), encoding="utf-8")
+    (tmp_path / "faster.json").write_text(json.dumps(faster), encoding="utf-8")
+    assert bench_suite.main([*args, "--baseline", str(tmp_path / "slower.json")]) == 0
+    assert bench_suite.main([*args, "--baseline", str(tmp_path / "faster.json")]) == 1
+
+
+@pytest.mark.parametrize("sizes", ["3", "1,x"])
+def test_unknown_sizes(sizes):
+    with pytest.raises(SystemExit) as error:
+        bench_suite.main(["--sizes", sizes])
+    assert error.value.code == 2
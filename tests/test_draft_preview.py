@@ -0,0 +1,82 @@
+"""Тесты чернового превью: уменьшенное декодирование и объединение черновиков (ImageManager)."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import make_triplet, save_triplet
+from src.core.image_manager import ImageManager
+from src.core.image_processor import ImageProcessor
+from src.core.processing_params import ProcessingParams
+
+
+@pytest.fixture
+def jpeg(tmp_path):
+    """JPEG 1600x1200."""
+    path = tmp_path / "color.jpg"
+    Image.fromarray(make_triplet(1600, 1200)[0]).save(path, quality=90)
+    return path
+
+
+@pytest.mark.parametrize("size, expected", [
+    ((400, 300), (400, 300)),
+    ((500, 300), (800, 600)),
+    ((150, 100), (200, 150)),
+    ((100, 10), (200, 150)),
+])
+def test_jpeg_draft_is_not_smaller_than_requested(jpeg, size, expected):
+    draft = ImageManager.decode_draft(jpeg, size)
+    assert draft.size == expected
+    assert draft.mode == "RGB"
+
+
+def test_no_draft_without_reduction(jpeg, tmp_path):
+    assert ImageManager.decode_draft(jpeg, (1600, 1200)) is None
+    assert ImageManager.decode_draft(jpeg, (1000, 1000)) is None
+    # PNG не декодируется уменьшенным
+    png = save_triplet(tmp_path, "v", 1600, 1200)['color']
+    assert ImageManager.decode_draft(png, (400, 300)) is None
+
+
+def test_grayscale_draft_is_rgb(tmp_path):
+    path = tmp_path / "outline.jpg"
+    Image.fromarray(make_triplet(800, 600)[1]).convert("L").save(path)
+    draft = ImageManager.decode_draft(path, (200, 150))
+    assert (draft.size, draft.mode) == ((200, 150), "RGB")
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(OSError):
+        ImageManager.decode_draft(tmp_path / "missing.jpg", (100, 100))
+
+
+def test_merge_draft_resizes_layers_to_draft():
+    color, outline, highlight = make_triplet(400, 300)
+    # Черновик цветного слоя и уже декодированные целиком контур и подсветка
+    images = {
+        'color': Image.fromarray(color).reduce(2),
+        'outline': Image.fromarray(outline),
+        'highlight': Image.fromarray(highlight),
+    }
+    params = ProcessingParams(fade_weight=0.3)
+    result = ImageManager.merge_draft(images, (200, 150), params)
+    
+    nearest = {
+        kind: np.asarray(img.resize((200, 150), Image.Resampling.NEAREST))
+        for kind, img in images.items()
+    }
+    assert result.shape == (150, 200, 3)
+    assert np.array_equal(result, ImageProcessor.process_images(
+        nearest['color'], nearest['outline'], nearest['highlight'], "RGB", params
+    ))
+    # Ближайший сосед не размывает линии контура
+    assert set(np.unique(nearest['outline'])) <= set(np.unique(outline))
+
+
+def test_merge_draft_without_highlight():
+    color, outline, _ = make_triplet(200, 150)
+    images = {'color': Image.fromarray(color), 'outline': Image.fromarray(outline)}
+    assert np.array_equal(
+        ImageManager.merge_draft(images, (200, 150)),
+        ImageProcessor.process_images(color, outline, None, "RGB")
+    )
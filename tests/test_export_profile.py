@@ -0,0 +1,84 @@
+"""Тесты профиля экспорта (ExportProfile) и записи его файлов (ProfileExporter)."""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import make_triplet
+from src.core.export_profile import ExportLevel, ExportProfile, ProfileExporter
+from src.utils.constants import EXPORT_LEVELS, TIFF_TILE_SIZE
+
+# Уровни перечислены не по убыванию размера
+LEVELS = (ExportLevel("_thumb", 50), ExportLevel(""), ExportLevel("_web", 200))
+
+
+@pytest.mark.parametrize("size, max_side, expected", [
+    ((600, 300), None, (600, 300)),
+    ((600, 300), 600, (600, 300)),
+    ((600, 300), 1000, (600, 300)),
+    ((600, 300), 200, (200, 100)),
+    ((300, 601), 200, (100, 200)),
+    ((5000, 3), 100, (100, 1)),
+])
+def test_fit_size(size, max_side, expected):
+    assert ProfileExporter.fit_size(size, max_side) == expected
+
+
+def test_paths_and_variants():
+    profile = ExportProfile()
+    assert [level.suffix for level in profile.levels] == [suffix for suffix, _ in EXPORT_LEVELS]
+    
+    profile = ExportProfile(LEVELS, pyramid=True)
+    assert profile.paths(Path("out/v.jpg")) == [
+        Path("out/v_thumb.jpg"), Path("out/v.jpg"), Path("out/v_web.jpg"), Path("out/v.tif")
+    ]
+    assert profile.variants() == ["max_side=50", None, "max_side=200", f"pyramid_tiff={TIFF_TILE_SIZE}"]
+
+
+def test_from_options():
+    assert ExportProfile.from_options(levels=False, pyramid=False) is None
+    assert ExportProfile.from_options(levels=False, pyramid=True) == ExportProfile.single(pyramid=True)
+    assert ExportProfile.from_options(levels=True, pyramid=False) == ExportProfile()
+
+
+def test_export_level_sizes(tmp_path):
+    image = make_triplet(600, 300)[0]
+    profile = ExportProfile(LEVELS, pyramid=True)
+    paths = profile.paths(tmp_path / "v.png")
+    ProfileExporter.export(Image.fromarray(image), paths, "PNG", profile, workers=2)
+    
+    levels = {}
+    for level, path in zip(LEVELS, paths):
+        with Image.open(path) as result:
+            levels[level.suffix] = np.asarray(result)
+    assert levels[""].shape == (300, 600, 3)
+    assert np.array_equal(levels[""], image)
+    assert levels["_web"].shape == (100, 200, 3)
+    assert levels["_thumb"].shape == (25, 50, 3)
+    # Каждый уровень уменьшен из предыдущего, большего
+    web = cv2.resize(image, (200, 100), interpolation=cv2.INTER_AREA)
+    assert np.array_equal(levels["_web"], web)
+    assert np.array_equal(levels["_thumb"], cv2.resize(web, (50, 25), interpolation=cv2.INTER_AREA))
+    
+    with Image.open(paths[-1]) as tiff:
+        sizes = []
+        for page in range(tiff.n_frames):
+            tiff.seek(page)
+            sizes.append(tiff.size)
+    # Уровни уменьшаются вдвое, пока не поместятся в одну плитку
+    assert sizes == [(600, 300), (300, 150), (150, 75)]
+    assert not list(tmp_path.glob(".*"))
+
+
+def test_small_image_is_not_enlarged(tmp_path):
+    image = make_triplet(40, 30)[0]
+    profile = ExportProfile(LEVELS)
+    paths = profile.paths(tmp_path / "v.jpg")
+    ProfileExporter.export(image, paths, "JPEG", profile)
+    for path in paths:
+        with Image.open(path) as result:
+            assert result.size == (40, 30)
+            assert result.format == "JPEG"
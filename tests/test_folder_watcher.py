@@ -0,0 +1,148 @@
+"""Тесты наблюдения за каталогом (FolderWatcher): ожидание окончания записи файлов."""
+
+import time
+
+import pytest
+
+from src.core import folder_watcher
+from src.core.folder_watcher import FolderWatcher
+
+SETTLE = 0.25
+
+
+class Clock:
+    """Управляемые часы вместо модуля time в folder_watcher."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self) -> float:
+        return self.now
+    
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class Events:
+    """Источник изменений с заданными событиями вместо inotify и обхода."""
+    
+    name = "events"
+    
+    def __init__(self, clock: Clock):
+        self.clock = clock
+        self.overflowed = False
+        self.changed = set()
+        self.removed = set()
+        self.timeouts = []
+    
+    def wait(self, timeout: float):
+        self.timeouts.append(timeout)
+        self.clock.sleep(timeout)
+        changed, removed = self.changed, self.removed
+        self.changed, self.removed = set(), set()
+        return changed, removed
+    
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    """Наблюдение за tmp_path с управляемыми часами и событиями."""
+    clock = Clock()
+    monkeypatch.setattr(folder_watcher, "time", clock)
+    watcher = FolderWatcher(tmp_path, settle=SETTLE, use_inotify=False)
+    events = Events(clock)
+    watcher._source = events
+    return watcher, events
+
+
+def test_file_is_ready_after_settle(watched, tmp_path):
+    watcher, events = watched
+    path = tmp_path / "v.png"
+    path.write_bytes(b"data")
+    events.changed = {path, tmp_path / "notes.txt", tmp_path / ".v.png.part"}
+    
+    assert watcher.poll(0.1) == ([], [])
+    # Ожидание не дольше, чем до успокоения файла
+    assert watcher.poll(10) == ([path], [])
+    assert events.timeouts[-1] == pytest.approx(SETTLE)
+    assert watcher.poll(0.1) == ([], [])
+
+
+def test_new_event_restarts_settle(watched, tmp_path):
+    watcher, events = watched
+    path = tmp_path / "v.png"
+    path.write_bytes(b"data")
+    events.changed = {path}
+    watcher.poll(0.2)
+    
+    path.write_bytes(b"more data")
+    events.changed = {path}
+    assert watcher.poll(0.2) == ([], [])
+    # С последнего события прошло меньше settle
+    assert watcher.poll(0.2) == ([], [])
+    assert watcher.poll(10) == ([path], [])
+
+
+def test_file_growing_without_events_is_not_ready(watched, tmp_path):
+    watcher, events = watched
+    path = tmp_path / "v.png"
+    path.write_bytes(b"")
+    events.changed = {path}
+    watcher.poll(0)
+    
+    # Пустой файл еще не начали писать
+    assert watcher.poll(SETTLE) == ([], [])
+    # Размер изменился без события: таймер начинается заново
+    path.write_bytes(b"data")
+    assert watcher.poll(SETTLE) == ([], [])
+    assert watcher.poll(SETTLE) == ([path], [])
+
+
+def test_removed_file_is_forgotten(watched, tmp_path):
+    watcher, events = watched
+    path = tmp_path / "v.png"
+    path.write_bytes(b"data")
+    events.changed = {path}
+    watcher.poll(0)
+    
+    path.unlink()
+    events.removed = {path, tmp_path / "notes.txt"}
+    assert watcher.poll(0) == ([], [path])
+    assert watcher.poll(SETTLE) == ([], [])
+
+
+def test_overflow_rescans_tree(watched, tmp_path):
+    watcher, events = watched
+    (tmp_path / "sub").mkdir()
+    path = tmp_path / "sub" / "v.png"
+    path.write_bytes(b"data")
+    # События потеряны: готовность определяется по обходу дерева
+    events.overflowed = True
+    watcher.poll(0)
+    assert not events.overflowed
+    assert watcher.poll(SETTLE) == ([path], [])
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_real_backends(tmp_path, use_inotify):
+    out = tmp_path / "out"
+    out.mkdir()
+    watcher = FolderWatcher(tmp_path, exclude=out, settle=0.05, use_inotify=use_inotify)
+    try:
+        if not use_inotify:
+            assert watcher.backend == "polling"
+        (tmp_path / "sub").mkdir()
+        path = tmp_path / "sub" / "v.png"
+        path.write_bytes(b"data")
+        (out / "merged.png").write_bytes(b"data")
+        
+        ready = []
+        deadline = time.monotonic() + 10
+        while not ready and time.monotonic() < deadline:
+            ready, _ = watcher.poll(0.1)
+        assert ready == [path]
+        assert watcher.existing_files() == [path]
+    finally:
+        watcher.close()
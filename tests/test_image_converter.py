@@ -0,0 +1,76 @@
+"""Тесты преобразования массивов в QImage без копирования (ImageConverter)."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import make_triplet
+from src.utils.image_converter import ImageConverter
+
+
+def pixels(qimage) -> np.ndarray:
+    """Читает пиксели QImage в массив RGB."""
+    return np.array([
+        [qimage.pixelColor(x, y).getRgb()[:3] for x in range(qimage.width())]
+        for y in range(qimage.height())
+    ], dtype=np.uint8)
+
+
+def test_qimage_shares_array_memory():
+    array = make_triplet(13, 7)[0]
+    qimage = ImageConverter.ndarray_to_qimage(array)
+    assert (qimage.width(), qimage.height()) == (13, 7)
+    assert int(qimage.constBits()) == array.ctypes.data
+    assert np.array_equal(pixels(qimage), array)
+    
+    array[3, 5] = (1, 2, 3)
+    assert qimage.pixelColor(5, 3).getRgb()[:3] == (1, 2, 3)
+
+
+def test_bgr_array_is_not_flipped():
+    array = make_triplet(13, 7)[0]
+    bgr = np.ascontiguousarray(array[..., ::-1])
+    qimage = ImageConverter.ndarray_to_qimage(bgr, "BGR")
+    assert int(qimage.constBits()) == bgr.ctypes.data
+    assert np.array_equal(pixels(qimage), array)
+
+
+def test_cropped_rows_are_not_copied():
+    array = make_triplet(40, 30)[0]
+    view = array[5:20, 10:30]
+    qimage = ImageConverter.ndarray_to_qimage(view)
+    # Шаг строк берется из массива, копия не нужна
+    assert qimage.bytesPerLine() == array.strides[0]
+    assert int(qimage.constBits()) == view.ctypes.data
+    assert np.array_equal(pixels(qimage), view)
+
+
+@pytest.mark.parametrize("step", [(slice(None), slice(None, None, 2)), (slice(None, None, -1),)])
+def test_strided_pixels_are_copied(step):
+    array = make_triplet(40, 30)[0]
+    view = array[step]
+    qimage = ImageConverter.ndarray_to_qimage(view)
+    assert np.array_equal(pixels(qimage), view)
+    # Копия живет вместе с QImage, а не с временным массивом
+    del array, view
+    assert qimage._buffer.flags.c_contiguous
+
+
+def test_qimage_keeps_buffer_alive():
+    qimage = ImageConverter.ndarray_to_qimage(make_triplet(13, 7)[0])
+    assert np.array_equal(pixels(qimage), make_triplet(13, 7)[0])
+
+
+@pytest.mark.parametrize("array", [
+    np.zeros((4, 4), np.uint8),
+    np.zeros((4, 4, 4), np.uint8),
+    np.zeros((4, 4, 3), np.uint16),
+])
+def test_unsupported_arrays(array):
+    with pytest.raises(ValueError):
+        ImageConverter.ndarray_to_qimage(array)
+
+
+def test_pil_image_matches_array():
+    array = make_triplet(13, 7)[0]
+    assert np.array_equal(pixels(ImageConverter.pil_to_qimage(Image.fromarray(array))), array)
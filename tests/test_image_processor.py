@@ -0,0 +1,116 @@
+"""Тесты ImageProcessor: совмещенное объединение, порядок каналов и пакеты троек."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import make_triplet
+from src.core import image_processor
+from src.core.backends import Backends
+from src.core.image_processor import ImageProcessor
+from src.core.processing_params import ProcessingParams
+from src.utils.constants import BACKEND_ENV_VAR
+
+# Подсветка у тройки: пакет из троек с подсветкой и без нее вперемешку
+WITH_HIGHLIGHT = [True, False, False, True, False]
+
+
+@pytest.mark.parametrize("name", sorted(Backends.REGISTRY))
+@pytest.mark.parametrize("channel_order", ["RGB", "BGR"])
+@pytest.mark.parametrize("params", [None, ProcessingParams(fade_weight=0.3, black_threshold=90)])
+def test_mixed_batch_matches_process_images(name, channel_order, params, monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV_VAR, name)
+    # Тройки больше полосы MERGE_BAND_BYTES: полосы пересекают границы троек
+    triplets = [make_triplet(301, 257, seed) for seed in range(len(WITH_HIGHLIGHT))]
+    colors, outlines, highlights = (np.stack(layers) for layers in zip(*triplets))
+    
+    result = ImageProcessor.process_batch(
+        colors, outlines, highlights, channel_order, WITH_HIGHLIGHT, params=params
+    )
+    
+    for index, (color, outline, highlight) in enumerate(triplets):
+        expected = ImageProcessor.process_images(
+            color, outline, highlight if WITH_HIGHLIGHT[index] else None, channel_order, params
+        )
+        assert result[index].tobytes() == expected.tobytes(), f"тройка {index}"
+
+
+def test_batch_without_any_highlight():
+    triplets = [make_triplet(64, 48, seed) for seed in range(3)]
+    colors, outlines, highlights = (np.stack(layers) for layers in zip(*triplets))
+    result = ImageProcessor.process_batch(colors, outlines, highlights, "RGB", [False] * 3)
+    for index, (color, outline, _) in enumerate(triplets):
+        assert np.array_equal(result[index], ImageProcessor.process_images(color, outline, None, "RGB"))
+
+
+@pytest.mark.parametrize("band_bytes", [1, 1000, 1 << 30])
+def test_merge_masked_matches_sequential_steps(band_bytes, monkeypatch):
+    # От одной строки до всего изображения в одной полосе
+    monkeypatch.setattr(image_processor, "MERGE_BAND_BYTES", band_bytes)
+    color, outline, highlight = make_triplet(97, 61)
+    red_mask = ImageProcessor.highlight_mask(highlight, "RGB")
+    black_mask = ImageProcessor.outline_mask(outline, "RGB")
+    highlighted_expected = ImageProcessor.apply_highlight(color.copy(), highlight, "RGB")
+    expected = ImageProcessor.apply_outline(highlighted_expected.copy(), outline, "RGB")
+    
+    out = np.empty_like(color)
+    highlighted = np.empty_like(color)
+    result = ImageProcessor.merge_masked(color, red_mask, black_mask, out, highlighted)
+    assert result is out
+    assert np.array_equal(result, expected)
+    assert np.array_equal(highlighted, highlighted_expected)
+    # Исходное изображение не меняется
+    assert np.array_equal(color, make_triplet(97, 61)[0])
+
+
+def test_merge_masked_without_masks():
+    color, outline, _ = make_triplet(40, 30)
+    black_mask = ImageProcessor.outline_mask(outline, "RGB")
+    assert np.array_equal(
+        ImageProcessor.merge_masked(color, None, black_mask),
+        ImageProcessor.apply_outline(color.copy(), outline, "RGB")
+    )
+    assert np.array_equal(ImageProcessor.merge_masked(color, None, None), color)
+
+
+def test_merge_masked_rejects_mismatched_buffers():
+    color = make_triplet(40, 30)[0]
+    with pytest.raises(ValueError, match="не совпадает"):
+        ImageProcessor.merge_masked(color, np.zeros((30, 41), np.uint8), None)
+    with pytest.raises(ValueError, match="Выходной буфер"):
+        ImageProcessor.merge_masked(color, None, None, out=np.empty((30, 40, 4), np.uint8)[..., :3])
+    with pytest.raises(ValueError, match="Выходной буфер"):
+        ImageProcessor.merge_masked(color, None, None, highlighted_out=np.empty((31, 40, 3), np.uint8))
+
+
+@pytest.mark.parametrize("name", sorted(Backends.REGISTRY))
+def test_rgb_processing_matches_bgr(name, monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV_VAR, name)
+    color, outline, highlight = make_triplet(97, 61)
+    bgr = [np.ascontiguousarray(layer[..., ::-1]) for layer in (color, outline, highlight)]
+    
+    # Маски не зависят от порядка каналов, результат отличается только им
+    assert np.array_equal(
+        ImageProcessor.highlight_mask(highlight, "RGB"), ImageProcessor.highlight_mask(bgr[2], "BGR")
+    )
+    assert np.array_equal(
+        ImageProcessor.outline_mask(outline, "RGB"), ImageProcessor.outline_mask(bgr[1], "BGR")
+    )
+    assert np.array_equal(
+        ImageProcessor.process_images(color, outline, highlight, "RGB"),
+        ImageProcessor.process_images(*bgr, "BGR")[..., ::-1]
+    )
+
+
+def test_channel_conversions():
+    color = make_triplet(40, 30)[0]
+    image = Image.fromarray(color)
+    rgb = ImageProcessor.pil_to_rgb(image)
+    assert np.array_equal(rgb, color)
+    assert rgb.flags.c_contiguous
+    
+    bgr = ImageProcessor.pil_to_cv2(image)
+    assert bgr.flags.c_contiguous
+    assert np.array_equal(bgr, color[..., ::-1])
+    assert np.array_equal(ImageProcessor.cv2_to_rgb(bgr), color)
+    assert np.array_equal(np.asarray(ImageProcessor.cv2_to_pil(bgr)), color)
@@ -0,0 +1,92 @@
+"""Тесты пирамиды превью (ImagePyramid) и кэша готовых превью (PixmapCache)."""
+
+import gc
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import make_triplet
+from src.ui.pixmap_cache import PixmapCache
+from src.utils.image_pyramid import ImagePyramid
+
+
+@pytest.fixture(params=["pil", "numpy"])
+def image(request):
+    """Изображение 1100x700 в виде PIL или массива RGB."""
+    array = make_triplet(1100, 700)[0]
+    return Image.fromarray(array) if request.param == "pil" else array
+
+
+def test_levels_are_halved(image):
+    pyramid = ImagePyramid(image, min_size=100)
+    sizes = [ImagePyramid.image_size(level) for level in pyramid._reduced]
+    # Уменьшение прекращается, когда меньшая сторона уровня станет меньше min_size
+    assert sizes == [(550, 350), (275, 175)]
+    assert type(pyramid._reduced[0]) is type(image)
+
+
+@pytest.mark.parametrize("size, expected", [
+    ((1100, 700), (1100, 700)),
+    ((600, 300), (1100, 700)),
+    ((550, 300), (550, 350)),
+    ((200, 175), (275, 175)),
+    ((10, 10), (275, 175)),
+    ((2000, 2000), (1100, 700)),
+])
+def test_level_for_is_not_smaller_than_requested(image, size, expected):
+    level = ImagePyramid(image, min_size=100).level_for(size)
+    assert ImagePyramid.image_size(level) == expected
+
+
+def test_level_matches_reduction(image):
+    level = ImagePyramid(image, min_size=100).level_for((500, 300))
+    array = np.asarray(image)
+    expected = cv2.resize(array, (550, 350), interpolation=cv2.INTER_AREA) \
+        if isinstance(image, np.ndarray) else np.asarray(Image.fromarray(array).reduce(2))
+    assert np.array_equal(np.asarray(level), expected)
+
+
+@pytest.mark.parametrize("kind", ["pil", "numpy"])
+def test_pyramid_is_shared_while_image_lives(kind):
+    array = make_triplet(1100, 700)[0]
+    image = Image.fromarray(array) if kind == "pil" else array
+    pyramid = ImagePyramid.for_image(image)
+    assert ImagePyramid.for_image(image) is pyramid
+    assert pyramid.level_for((1100, 700)) is image
+    
+    key = id(image)
+    del image, array, pyramid
+    gc.collect()
+    # Пирамида не продлевает жизнь изображению и удаляется вместе с ним
+    assert key not in ImagePyramid._registry
+
+
+def test_pixmap_cache_lru():
+    cache = PixmapCache(max_entries=2)
+    image = Image.new("RGB", (4, 4))
+    keys = [PixmapCache.make_key(image, (width, 4), 1.0) for width in (1, 2, 3)]
+    cache.put(image, keys[0], "first")
+    cache.put(image, keys[1], "second")
+    assert cache.get(keys[0]) == "first"
+    cache.put(image, keys[2], "third")
+    
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "first"
+    assert cache.get(keys[2]) == "third"
+    # Другой коэффициент пикселей устройства - другое превью
+    assert cache.get(PixmapCache.make_key(image, (1, 4), 2.0)) is None
+
+
+def test_pixmap_cache_forgets_destroyed_image():
+    cache = PixmapCache()
+    image, other = Image.new("RGB", (4, 4)), Image.new("RGB", (4, 4))
+    cache.put(image, PixmapCache.make_key(image, (4, 4), 1.0), "image")
+    cache.put(other, PixmapCache.make_key(other, (4, 4), 1.0), "other")
+    
+    del image
+    gc.collect()
+    # Записи удаленного изображения не достанутся новому объекту с тем же id()
+    assert list(cache._entries.values()) == ["other"]
+    assert cache.get(PixmapCache.make_key(other, (4, 4), 1.0)) == "other"
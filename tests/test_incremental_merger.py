@@ -0,0 +1,107 @@
+"""Тесты инкрементального объединения (IncrementalMerger): пересчет только нужных этапов."""
+
+import numpy as np
+import pytest
+
+from conftest import save_triplet
+from src.core.image_processor import ImageProcessor
+from src.core.incremental_merger import IncrementalMerger
+from src.core.layer_store import LayerHandle
+from src.core.processing_params import ProcessingParams
+
+SIZE = (90, 70)
+
+
+@pytest.fixture
+def layers(tmp_path):
+    """Слои двух разных троек: текущие по типам и запасные."""
+    first = save_triplet(tmp_path, "a", *SIZE, seed=1)
+    second = save_triplet(tmp_path, "b", *SIZE, seed=2)
+    return (
+        {kind: LayerHandle.open(path) for kind, path in first.items()},
+        {kind: LayerHandle.open(path) for kind, path in second.items()},
+    )
+
+
+def expected(layers, params=None):
+    """Полный пересчет для текущих слоев."""
+    pixels = {kind: np.asarray(layer.image()) for kind, layer in layers.items()}
+    return ImageProcessor.process_images(
+        pixels['color'], pixels['outline'], pixels.get('highlight'), "RGB", params
+    )
+
+
+@pytest.mark.parametrize("kind, stages", [
+    ('outline', ('outline',)),
+    ('color', ('highlight', 'outline')),
+    ('highlight', ('highlight', 'outline')),
+])
+def test_changed_layer_recomputes_downstream_stages(layers, kind, stages):
+    current, spare = layers
+    merger = IncrementalMerger()
+    merger.merge(current)
+    assert merger.last_stages == ('highlight', 'outline')
+    
+    current = {**current, kind: spare[kind]}
+    result = merger.merge(current)
+    assert merger.last_stages == stages
+    assert np.array_equal(result, expected(current))
+
+
+@pytest.mark.parametrize("params, stages", [
+    (ProcessingParams(black_threshold=90), ('outline',)),
+    (ProcessingParams(darken_factor=0.5), ('outline',)),
+    (ProcessingParams(fade_weight=0.3), ('highlight', 'outline')),
+])
+def test_changed_params_recompute_downstream_stages(layers, params, stages):
+    current, _ = layers
+    merger = IncrementalMerger()
+    merger.merge(current)
+    result = merger.merge(current, params)
+    assert merger.last_stages == stages
+    assert np.array_equal(result, expected(current, params))
+
+
+def test_released_stage_is_recomputed(layers):
+    current, _ = layers
+    merger = IncrementalMerger()
+    first = merger.merge(current)
+    merger.release()
+    assert np.array_equal(merger.merge(current), first)
+    assert merger.last_stages == ('highlight', 'outline')
+
+
+def test_without_highlight_nothing_is_saved(layers):
+    current, _ = layers
+    current = {'color': current['color'], 'outline': current['outline']}
+    merger = IncrementalMerger()
+    merger.merge(current)
+    assert merger._highlighted is None
+    assert np.array_equal(merger.merge(current), expected(current))
+    assert merger.last_stages == ('outline',)
+
+
+def test_interrupted_merge_keeps_saved_stage(layers):
+    current, spare = layers
+    merger = IncrementalMerger()
+    merger.merge(current)
+    saved = merger._highlighted
+    
+    def interrupt():
+        raise RuntimeError("прервано")
+    
+    with pytest.raises(RuntimeError):
+        merger.merge({**current, 'color': spare['color']}, checkpoint=interrupt)
+    assert merger._highlighted is saved
+    merger.merge({**current, 'outline': spare['outline']})
+    assert merger.last_stages == ('outline',)
+
+
+def test_result_does_not_alias_saved_stage(layers):
+    current, _ = layers
+    merger = IncrementalMerger()
+    merger.merge(current)
+    result = merger.merge(current)
+    # Результат можно менять, не портя сохраненный этап
+    result[:] = 0
+    assert np.array_equal(merger.merge(current), expected(current))
@@ -0,0 +1,187 @@
+"""Тесты ленивых слоев (LayerHandle) и общего бюджета памяти (MemoryBudget)."""
+
+import numpy as np
+import pytest
+
+from conftest import make_triplet, save_triplet
+from src.core.incremental_merger import IncrementalMerger
+from src.core.layer_store import LayerHandle, MemoryBudget
+from src.core.mask_cache import MaskCache
+from src.utils.constants import LAYER_PREVIEW_SIZE
+
+# Больше LAYER_PREVIEW_SIZE: такие слои вытесняются из памяти
+BIG = (LAYER_PREVIEW_SIZE + 100, 64)
+
+
+@pytest.fixture
+def budget():
+    """Отдельный бюджет с запасом для нескольких больших слоев."""
+    return MemoryBudget(64 * 1024 * 1024)
+
+
+def test_open_does_not_decode(tmp_path, budget):
+    path = save_triplet(tmp_path, "v", *BIG)['color']
+    layer = LayerHandle.open(path, budget)
+    assert layer.size == BIG
+    assert not layer.is_loaded()
+    # До декодирования учитываются только сжатые байты
+    assert budget.usage()[0] == path.stat().st_size
+    
+    assert np.array_equal(np.asarray(layer.image()), make_triplet(*BIG)[0])
+    assert layer.is_loaded()
+    assert budget.usage()[0] == path.stat().st_size + layer.nbytes
+
+
+def test_preview_decodes_on_demand(tmp_path, budget):
+    path = save_triplet(tmp_path, "v", *BIG)['color']
+    layer = LayerHandle.open(path, budget)
+    assert max(layer.preview().size) <= LAYER_PREVIEW_SIZE
+    assert layer.is_loaded()
+    
+    layer.release()
+    assert not layer.is_loaded()
+    assert budget.usage()[0] == path.stat().st_size
+    # Превью не вытесняется вместе с пикселями
+    assert max(layer.preview().size) <= LAYER_PREVIEW_SIZE
+    assert not layer.is_loaded()
+
+
+def test_corrupt_pixels_fail_on_decode(tmp_path, budget):
+    path = save_triplet(tmp_path, "v", 80, 60)['color']
+    data = path.read_bytes()
+    layer = LayerHandle.from_bytes(path, data[:len(data) // 2], budget)
+    assert layer.size == (80, 60)
+    with pytest.raises(OSError):
+        layer.image()
+
+
+def test_not_an_image(tmp_path, budget):
+    path = tmp_path / "layer.png"
+    path.write_bytes(b"not an image")
+    with pytest.raises(OSError):
+        LayerHandle.open(path, budget)
+
+
+def test_pinned_bytes_are_released_with_layer(tmp_path, budget):
+    path = save_triplet(tmp_path, "v", *BIG)['color']
+    layer = LayerHandle.open(path, budget)
+    layer.image()
+    del layer
+    assert budget.usage()[0] == 0
+
+
+def test_mask_layers_are_released_after_merge(tmp_path):
+    paths = save_triplet(tmp_path, "v", *BIG, seed=5)
+    layers = {kind: LayerHandle.open(path) for kind, path in paths.items()}
+    MaskCache.shared().clear()
+    
+    IncrementalMerger().merge(layers)
+    assert layers['color'].is_loaded()
+    assert not layers['outline'].is_loaded()
+    assert not layers['highlight'].is_loaded()
+    
+    # Маски берутся из кэша, слои контура и подсветки не декодируются
+    merger = IncrementalMerger()
+    merger.merge(layers)
+    assert not layers['outline'].is_loaded()
+    assert not layers['highlight'].is_loaded()
+
+
+@pytest.mark.parametrize("with_highlight", [True, False])
+def test_merge_counts_highlight_stage_once(tmp_path, with_highlight):
+    paths = save_triplet(tmp_path, "v", *BIG, seed=6)
+    if not with_highlight:
+        del paths['highlight']
+    layers = {kind: LayerHandle.open(path) for kind, path in paths.items()}
+    budget = MemoryBudget.shared()
+    before = budget.usage()[0]
+    
+    merger = IncrementalMerger()
+    merger.merge(layers)
+    merger.merge(layers)
+    # Без подсветки этап подсветки - пиксели цветного слоя, они уже учтены слоем
+    stage = layers['color'].nbytes if with_highlight else 0
+    assert budget.usage()[0] - before == layers['color'].nbytes + stage
+
+
+class Owner:
+    """Владелец данных, запоминающий вызовы release()."""
+    
+    def __init__(self):
+        self.released = 0
+    
+    def release(self):
+        self.released += 1
+
+
+def test_budget_evicts_least_recently_used():
+    budget = MemoryBudget(250)
+    first, second, third = Owner(), Owner(), Owner()
+    budget.touch(first, 100)
+    budget.touch(second, 100)
+    # Повторное использование переносит владельца в конец очереди
+    budget.touch(first, 100)
+    budget.touch(third, 100)
+    assert (first.released, second.released, third.released) == (0, 1, 0)
+    assert budget.usage() == (200, 250)
+    assert budget.evictions == 1
+    
+    # Новый объем владельца заменяет прежний, а не добавляется к нему
+    budget.touch(third, 200)
+    assert first.released == 1
+    assert budget.usage()[0] == 200
+    budget.forget(third)
+    assert budget.usage()[0] == 0
+
+
+def test_budget_keeps_owner_being_touched():
+    budget = MemoryBudget(100)
+    owner = Owner()
+    # Единственный владелец сверх бюджета не освобождается сам собой
+    budget.touch(owner, 300)
+    assert owner.released == 0
+    assert budget.usage()[0] == 300
+
+
+def test_pinned_bytes_evict_but_are_not_evicted():
+    budget = MemoryBudget(250)
+    decoded, pinned = Owner(), Owner()
+    budget.touch(decoded, 100)
+    budget.pin(pinned, 200)
+    assert decoded.released == 1
+    assert pinned.released == 0
+    assert budget.usage()[0] == 200
+    # Повторный pin заменяет объем
+    budget.pin(pinned, 50)
+    assert budget.usage()[0] == 50
+    del pinned
+    assert budget.usage()[0] == 0
+
+
+def test_evicted_layer_is_redecoded(tmp_path):
+    paths = save_triplet(tmp_path, "v", *BIG, seed=7)
+    sizes = sum(path.stat().st_size for path in paths.values())
+    # Бюджет вмещает сжатые байты и только одно декодированное изображение
+    budget = MemoryBudget(sizes + BIG[0] * BIG[1] * 3)
+    layers = [LayerHandle.open(path, budget) for path in paths.values()]
+    expected = make_triplet(*BIG, seed=7)
+    
+    for _ in range(2):
+        for layer, pixels in zip(layers, expected):
+            assert np.array_equal(np.asarray(layer.image()), pixels)
+            assert layer.is_loaded()
+        # Остается только последний использованный слой
+        assert [layer.is_loaded() for layer in layers] == [False, False, True]
+    assert budget.evictions == 5
+    assert budget.usage()[0] == sizes + layers[2].nbytes
+
+
+def test_small_layer_is_not_evicted(tmp_path):
+    path = save_triplet(tmp_path, "v", 40, 30)['color']
+    budget = MemoryBudget(1)
+    layer = LayerHandle.open(path, budget)
+    layer.image()
+    # Маленький слой совпадает со своим превью и в бюджет не входит
+    budget.touch(Owner(), 100)
+    assert layer.is_loaded()
+    assert budget.usage()[0] == path.stat().st_size
@@ -0,0 +1,99 @@
+"""Тесты кэша масок (MaskCache): ключи, упаковка и вытеснение по LRU."""
+
+import numpy as np
+
+from conftest import make_triplet
+from src.core.image_processor import ImageProcessor
+from src.core.mask_cache import MaskCache
+from src.core.processing_params import ProcessingParams
+
+
+def mask(seed: int, shape=(30, 41)) -> np.ndarray:
+    """Случайная маска со значениями 0 и 255."""
+    rng = np.random.default_rng(seed)
+    return np.where(rng.random(shape) < 0.5, 255, 0).astype(np.uint8)
+
+
+def test_key_depends_on_mask_params_only():
+    base = MaskCache.make_key('outline', "h")
+    assert base == MaskCache.make_key('outline', "h", ProcessingParams())
+    # Вес осветления не влияет на маски
+    assert base == MaskCache.make_key('outline', "h", ProcessingParams(fade_weight=0.3))
+    assert MaskCache.make_key('highlight', "h", ProcessingParams(fade_weight=0.3)) == \
+        MaskCache.make_key('highlight', "h")
+    
+    assert base != MaskCache.make_key('outline', "h", ProcessingParams(black_threshold=90))
+    assert base != MaskCache.make_key('outline', "other")
+    assert base != MaskCache.make_key('highlight', "h")
+
+
+def test_put_and_get_unpack_mask():
+    cache = MaskCache()
+    _, outline, _ = make_triplet(41, 30)
+    expected = ImageProcessor.outline_mask(outline, "RGB")
+    key = MaskCache.make_key('outline', "h")
+    
+    assert cache.get(key) is None
+    cache.put(key, expected)
+    assert cache.contains(key)
+    # Маска хранится по биту на пиксель
+    assert cache.used_bytes == (41 * 30 + 7) // 8
+    assert np.array_equal(cache.get(key), expected)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_or_compute():
+    cache = MaskCache()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return mask(0)
+    
+    first = cache.get_or_compute('outline', "h", compute)
+    second = cache.get_or_compute('outline', "h", compute)
+    assert np.array_equal(first, second)
+    assert len(calls) == 1
+    # Другие параметры маски - другая запись
+    cache.get_or_compute('outline', "h", compute, ProcessingParams(black_threshold=90))
+    assert len(calls) == 2
+    # Без хэша маска строится каждый раз и не запоминается
+    cache.get_or_compute('outline', None, compute)
+    cache.get_or_compute('outline', None, compute)
+    assert len(calls) == 4
+
+
+def test_lru_eviction():
+    entry_bytes = (30 * 41 + 7) // 8
+    cache = MaskCache(max_bytes=2 * entry_bytes)
+    keys = [MaskCache.make_key('outline', str(i)) for i in range(3)]
+    cache.put(keys[0], mask(0))
+    cache.put(keys[1], mask(1))
+    # Обращение переносит маску в конец очереди вытеснения, contains - нет
+    assert cache.get(keys[0]) is not None
+    assert cache.contains(keys[1])
+    cache.put(keys[2], mask(2))
+    
+    assert cache.contains(keys[0])
+    assert not cache.contains(keys[1])
+    assert cache.contains(keys[2])
+    assert cache.used_bytes == 2 * entry_bytes
+
+
+def test_replace_and_oversized_entries():
+    entry_bytes = (30 * 41 + 7) // 8
+    cache = MaskCache(max_bytes=entry_bytes)
+    key = MaskCache.make_key('outline', "h")
+    cache.put(key, mask(0))
+    cache.put(key, mask(1))
+    assert cache.used_bytes == entry_bytes
+    assert np.array_equal(cache.get(key), mask(1))
+    
+    # Маска больше всего бюджета не вытесняет остальные
+    cache.put(MaskCache.make_key('outline', "big"), mask(2, (100, 100)))
+    assert cache.contains(key)
+    assert not cache.contains(MaskCache.make_key('outline', "big"))
+    
+    cache.clear()
+    assert not cache.contains(key)
+    assert cache.used_bytes == 0
@@ -0,0 +1,236 @@
+"""Тесты HTTP-сервиса объединения (MergeService): разбор запросов и ограничение нагрузки."""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from io import BytesIO
+from typing import Dict, Mapping, Tuple
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import make_triplet, save_triplet
+from src.core import merge_service
+from src.core.image_processor import ImageProcessor
+from src.core.merge_service import HttpError, MergeService
+
+BOUNDARY = "xvl-boundary"
+
+
+def multipart(files: Mapping[str, bytes]) -> bytes:
+    """Собирает тело multipart/form-data с файлами в полях по именам."""
+    body = BytesIO()
+    for name, content in files.items():
+        body.write(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{name}.png"\r\nContent-Type: image/png\r\n\r\n'.encode()
+        )
+        body.write(content)
+        body.write(b"\r\n")
+    body.write(f"--{BOUNDARY}--\r\n".encode())
+    return body.getvalue()
+
+
+def png_bytes(array: np.ndarray) -> bytes:
+    """Кодирует массив RGB в PNG."""
+    buffer = BytesIO()
+    Image.fromarray(array).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@asynccontextmanager
+async def running(service: MergeService):
+    """
+    Запускает сервис на свободном порту с пулом потоков вместо процессов.
+    
+    Yields:
+        Порт сервиса
+    """
+    service._loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(service.workers) as executor:
+        service._executor = executor
+        server = await asyncio.start_server(service._handle_connection, "127.0.0.1", 0)
+        try:
+            yield server.sockets[0].getsockname()[1]
+        finally:
+            server.close()
+            await server.wait_closed()
+
+
+async def request(
+    port: int,
+    target: str,
+    body: bytes = b"",
+    content_type: str = f"multipart/form-data; boundary={BOUNDARY}",
+    method: str = "POST"
+) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Отправляет запрос и читает ответ до закрытия соединения.
+    
+    Returns:
+        Кортеж (код статуса, заголовки в нижнем регистре, тело)
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = (
+        f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return int(lines[0].split()[1]), headers, payload
+
+
+@pytest.fixture
+def blocked_merge(monkeypatch):
+    """Подменяет объединение ожиданием события, чтобы запрос оставался в работе."""
+    release = threading.Event()
+    
+    def merge(*args, **kwargs):
+        release.wait(10)
+        return merge_service.MergeResult(b"done", (1, 1), {})
+    
+    monkeypatch.setattr(merge_service.EncodedMerger, "merge", merge)
+    yield release
+    release.set()
+
+
+def test_parse_multipart():
+    color, outline, highlight = (png_bytes(layer) for layer in make_triplet(20, 10))
+    body = multipart({'color': color, 'comment': b"skip", 'outline': outline, 'highlight': highlight})
+    layers = MergeService._parse_multipart(body, f'multipart/form-data; boundary="{BOUNDARY}"')
+    assert layers == {'color': color, 'outline': outline, 'highlight': highlight}
+
+
+@pytest.mark.parametrize("content_type, body, message", [
+    ("multipart/form-data", b"", "boundary"),
+    (f"multipart/form-data; boundary={BOUNDARY}", b"no parts", "границы"),
+    (f"multipart/form-data; boundary={BOUNDARY}", f"--{BOUNDARY}\r\nname".encode(), "оборвано"),
+])
+def test_parse_multipart_errors(content_type, body, message):
+    with pytest.raises(HttpError, match=message) as error:
+        MergeService._parse_multipart(body, content_type)
+    assert error.value.status == 400
+
+
+def test_parse_json_paths_inside_root(tmp_path):
+    root = tmp_path.resolve()
+    body = json.dumps({'color': "in/v.png", 'outline': str(root / "in/v_outline.png"), 'output': "out/v.jpg"})
+    layers, query, output = MergeService._parse_json(body.encode(), {}, root)
+    assert layers == {'color': str(root / "in/v.png"), 'outline': str(root / "in/v_outline.png")}
+    assert output == str(root / "out/v.jpg")
+    assert query == {}
+
+
+@pytest.mark.parametrize("name, value", [
+    ('color', "../v.png"),
+    ('outline', "/etc/passwd"),
+    ('output', "../../merged.jpg"),
+    ('output', "link/merged.jpg"),
+])
+def test_parse_json_rejects_paths_outside_root(tmp_path, name, value):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "link").symlink_to(tmp_path)
+    request = {'color': "v.png", 'outline': "v_outline.png", name: value}
+    with pytest.raises(HttpError) as error:
+        MergeService._parse_json(json.dumps(request).encode(), {}, root.resolve())
+    assert error.value.status == 403
+
+
+def test_parse_json_without_root():
+    with pytest.raises(HttpError) as error:
+        MergeService._parse_json(b'{"color": "v.png", "outline": "v_outline.png"}', {}, None)
+    assert error.value.status == 403
+
+
+def test_multipart_merge(tmp_path):
+    color, outline, highlight = make_triplet(40, 30)
+    body = multipart({kind: png_bytes(layer) for kind, layer in
+                      (('color', color), ('outline', outline), ('highlight', highlight))})
+    
+    async def scenario():
+        async with running(MergeService(workers=1)) as port:
+            return await request(port, "/merge?format=PNG", body)
+    
+    status, headers, payload = asyncio.run(scenario())
+    assert status == 200
+    assert headers['content-type'] == "image/png"
+    assert headers['x-image-size'] == "40x30"
+    assert "merge;dur=" in headers['server-timing']
+    with Image.open(BytesIO(payload)) as result:
+        expected = ImageProcessor.process_images(color, outline, highlight, "RGB")
+        assert np.array_equal(np.asarray(result), expected)
+
+
+def test_json_merge_inside_root(tmp_path):
+    paths = save_triplet(tmp_path / "in", "v", 40, 30)
+    request_body = json.dumps({
+        'color': "in/v.png", 'outline': "in/v_outline.png", 'output': "out/v.png"
+    }).encode()
+    
+    async def scenario():
+        async with running(MergeService(workers=1, root=tmp_path)) as port:
+            return await request(port, "/merge", request_body, "application/json")
+    
+    status, _, payload = asyncio.run(scenario())
+    assert status == 200, payload
+    assert json.loads(payload)['output'] == str(tmp_path.resolve() / "out/v.png")
+    with Image.open(paths['color']) as color, Image.open(paths['outline']) as outline, \
+            Image.open(tmp_path / "out/v.png") as result:
+        expected = ImageProcessor.process_images(np.asarray(color), np.asarray(outline), None, "RGB")
+        assert np.array_equal(np.asarray(result), expected)
+
+
+def test_full_queue_gets_429(blocked_merge):
+    body = multipart({'color': b"c", 'outline': b"o"})
+    
+    async def scenario():
+        service = MergeService(workers=1, queue_size=1)
+        async with running(service) as port:
+            first = [asyncio.create_task(request(port, "/merge", body)) for _ in range(2)]
+            while service.active < 2:
+                await asyncio.sleep(0.01)
+            rejected = await request(port, "/merge", body)
+            status = await request(port, "/status", method="GET")
+            blocked_merge.set()
+            accepted = await asyncio.gather(*first)
+            return rejected, status, accepted, service
+    
+    rejected, status, accepted, service = asyncio.run(scenario())
+    assert rejected[0] == 429
+    assert rejected[1]['retry-after'] == "1"
+    assert json.loads(status[2])['rejected'] == 1
+    assert [response[0] for response in accepted] == [200, 200]
+    assert service.active == 0
+
+
+def test_slow_merge_gets_504(blocked_merge):
+    body = multipart({'color': b"c", 'outline': b"o"})
+    
+    async def scenario():
+        service = MergeService(workers=1, queue_size=0, timeout=0.2)
+        async with running(service) as port:
+            response = await request(port, "/merge", body)
+            # Место занято, пока процесс не закончит работу, а не до ответа 504
+            busy = service.active
+            blocked_merge.set()
+            while service.active:
+                await asyncio.sleep(0.01)
+            return response, busy, service
+    
+    response, busy, service = asyncio.run(scenario())
+    assert response[0] == 504
+    assert busy == 1
+    assert service.status()['failed'] == 1
@@ -0,0 +1,99 @@
+"""Тесты объединения на уменьшенных слоях (ProxyMerger)."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import save_triplet
+from src.core import layer_store
+from src.core.image_processor import ImageProcessor
+from src.core.layer_store import LayerHandle
+from src.core.processing_params import ProcessingParams
+from src.core.proxy_merger import ProxyMerger
+
+# Размер превью слоя в тестах, чтобы не строить слои больше LAYER_PREVIEW_SIZE
+PREVIEW_SIZE = 400
+# Превью слоя вдвое меньше самого слоя
+SIZE = (PREVIEW_SIZE * 2, PREVIEW_SIZE * 3 // 2)
+
+
+@pytest.fixture
+def layers(tmp_path, monkeypatch):
+    """Слои тройки по типам."""
+    monkeypatch.setattr(layer_store, "LAYER_PREVIEW_SIZE", PREVIEW_SIZE)
+    paths = save_triplet(tmp_path, "v", *SIZE, seed=3)
+    return {kind: LayerHandle.open(path) for kind, path in paths.items()}
+
+
+def expected(layers, size, params=None):
+    """Объединение слоев, уменьшенных так же, как в ProxyMerger."""
+    arrays = {}
+    for kind, layer in layers.items():
+        if kind == 'color':
+            img = layer.preview().resize(size, Image.Resampling.BILINEAR)
+        else:
+            nearest = layer.image().resize(layer.preview().size, Image.Resampling.NEAREST)
+            img = nearest.resize(size, Image.Resampling.NEAREST)
+        arrays[kind] = np.asarray(img)
+    return ImageProcessor.process_images(
+        arrays['color'], arrays['outline'], arrays.get('highlight'), "RGB", params
+    )
+
+
+@pytest.mark.parametrize("image_size, viewport, size", [
+    ((2000, 1000), (400, 400), (400, 200)),
+    ((1000, 2000), (400, 400), (200, 400)),
+    ((300, 200), (1000, 1000), (300, 200)),
+    ((5000, 10), (100, 100), (100, 1)),
+])
+def test_proxy_size(image_size, viewport, size):
+    assert ProxyMerger.proxy_size(image_size, viewport) == size
+
+
+@pytest.mark.parametrize("with_highlight", [True, False])
+def test_merge_matches_reduced_layers(layers, with_highlight):
+    if not with_highlight:
+        del layers['highlight']
+    params = ProcessingParams(fade_weight=0.3, black_threshold=90)
+    result = ProxyMerger().merge(layers, (300, 300), params)
+    assert result.shape == (225, 300, 3)
+    assert np.array_equal(result, expected(layers, (300, 225), params))
+
+
+def test_masks_are_kept_when_tone_changes(layers):
+    merger = ProxyMerger()
+    merger.merge(layers, (300, 300))
+    masks = dict(merger._masks)
+    
+    merger.merge(layers, (300, 300), ProcessingParams(fade_weight=0.3, darken_factor=0.5))
+    assert all(merger._masks[key] is mask for key, mask in masks.items())
+    assert len(merger._masks) == 2
+    
+    params = ProcessingParams(black_threshold=90)
+    result = merger.merge(layers, (300, 300), params)
+    assert len(merger._masks) == 3
+    assert np.array_equal(result, expected(layers, (300, 225), params))
+
+
+def test_replaced_layer_and_viewport_are_prepared_again(layers, tmp_path):
+    merger = ProxyMerger()
+    merger.merge(layers, (300, 300))
+    
+    other = save_triplet(tmp_path / "other", "v", *SIZE, seed=4)
+    layers = {**layers, 'outline': LayerHandle.open(other['outline'])}
+    assert np.array_equal(merger.merge(layers, (300, 300)), expected(layers, (300, 225)))
+    assert np.array_equal(merger.merge(layers, (200, 400)), expected(layers, (200, 150)))
+
+
+def test_full_image_is_read_once(layers):
+    merger = ProxyMerger()
+    merger.merge(layers, (300, 300))
+    for layer in layers.values():
+        layer.release()
+    
+    # Новый размер области превью строится из сохраненных уменьшенных копий
+    merger.merge(layers, (200, 200))
+    assert not any(layer.is_loaded() for layer in layers.values())
+    
+    merger.reset()
+    assert not merger._arrays and not merger._masks
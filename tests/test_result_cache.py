@@ -0,0 +1,108 @@
+"""Тесты дискового кэша результатов (ResultCache): ключи, выдача и вытеснение."""
+
+import os
+
+import pytest
+
+from src.core.processing_params import ProcessingParams
+from src.core.result_cache import ResultCache
+
+HASHES = {'color': "c", 'outline': "o", 'highlight': "h"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Кэш во временном каталоге."""
+    return ResultCache(tmp_path / "cache")
+
+
+def write(path, size: int, fill: bytes = b"x"):
+    """Создает файл заданного размера."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(fill * size)
+    return path
+
+
+def test_key_requires_color_and_outline():
+    assert ResultCache.make_key({'color': "c"}, "PNG") is None
+    assert ResultCache.make_key({'outline': "o"}, "PNG") is None
+    assert ResultCache.make_key({'color': "c", 'outline': "o"}, "PNG") is not None
+
+
+@pytest.mark.parametrize("changed", [
+    ({**HASHES, 'color': "c2"}, "PNG", None, None),
+    ({**HASHES, 'highlight': "h2"}, "PNG", None, None),
+    ({'color': "c", 'outline': "o"}, "PNG", None, None),
+    (HASHES, "JPEG", None, None),
+    (HASHES, "PNG", ProcessingParams(fade_weight=0.3), None),
+    (HASHES, "PNG", ProcessingParams(black_threshold=90), None),
+    (HASHES, "PNG", None, "1024"),
+])
+def test_key_changes_with_any_input(changed):
+    base = ResultCache.make_key(HASHES, "PNG")
+    assert ResultCache.make_key(*changed) != base
+
+
+def test_default_params_keep_key():
+    # Ключ без параметров совпадает с ключом параметров по умолчанию,
+    # и порядок хэшей не важен
+    reordered = dict(reversed(list(HASHES.items())))
+    assert ResultCache.make_key(HASHES, "PNG") == ResultCache.make_key(reordered, "PNG", ProcessingParams())
+
+
+def test_fetch_and_store(cache, tmp_path):
+    key = ResultCache.make_key(HASHES, "PNG")
+    dest = tmp_path / "out" / "result.png"
+    assert not cache.fetch(key, dest)
+    assert not cache.fetch(None, dest)
+    assert not dest.exists()
+    
+    cache.store(key, write(tmp_path / "result.png", 100, b"r"))
+    cache.store(None, tmp_path / "result.png")
+    assert cache.fetch(key, dest)
+    assert dest.read_bytes() == b"r" * 100
+    assert (cache.hits, cache.misses, cache.bytes_saved) == (1, 2, 100)
+    assert cache.size() == 100
+    assert "1 попаданий, 2 промахов" in cache.report()
+
+
+def test_linked_result_survives_replacing_entry(tmp_path):
+    cache = ResultCache(tmp_path / "cache", link=True)
+    key = ResultCache.make_key(HASHES, "PNG")
+    cache.store(key, write(tmp_path / "first.png", 10, b"1"))
+    dest = tmp_path / "result.png"
+    assert cache.fetch(key, dest)
+    assert dest.read_bytes() == b"1" * 10
+    
+    # Запись заменяется, а не перезаписывается: выданный файл не меняется
+    cache.store(key, write(tmp_path / "second.png", 10, b"2"))
+    assert dest.read_bytes() == b"1" * 10
+    assert cache.fetch(key, dest)
+    assert dest.read_bytes() == b"2" * 10
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=250)
+    keys = [ResultCache.make_key({**HASHES, 'color': str(i)}, "PNG") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.store(key, write(tmp_path / f"{i}.png", 100))
+        entry = cache._entry_path(key)
+        os.utime(entry, (1000 + i, 1000 + i))
+    
+    # Выдача обновляет отметку использования первой записи
+    assert cache.fetch(keys[0], tmp_path / "result.png")
+    assert cache.evict() == 1
+    assert cache.size() == 200
+    assert cache.fetch(keys[0], tmp_path / "result.png")
+    assert not cache.fetch(keys[1], tmp_path / "result.png")
+    assert cache.fetch(keys[2], tmp_path / "result.png")
+    assert cache.evict() == 0
+
+
+def test_temporary_files_are_ignored(cache, tmp_path):
+    key = ResultCache.make_key(HASHES, "PNG")
+    cache.store(key, write(tmp_path / "result.png", 100))
+    # Недописанный файл параллельного процесса не считается записью
+    write(cache._entry_path(key).parent / ".tmp-partial", 50)
+    assert cache.size() == 100
+    assert cache.evict() == 0
@@ -0,0 +1,95 @@
+"""Тесты фоновой очереди сохранения (SaveQueue)."""
+
+import threading
+import time
+
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from src.ui.save_queue import SaveQueue
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    """Приложение Qt, в потоке которого доставляются сигналы очереди."""
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def queue(qapp):
+    """Очередь с записью всех сигналов."""
+    queue = SaveQueue(workers=2)
+    queue.events = []
+    queue.saved.connect(lambda path: queue.events.append(('saved', path.name)))
+    queue.failed.connect(lambda path, message: queue.events.append(('failed', path.name, message)))
+    queue.progress.connect(lambda done, total: queue.events.append(('progress', done, total)))
+    yield queue
+    queue.wait()
+
+
+def finish(queue: SaveQueue) -> None:
+    """Ждет сохранений и доставляет их сигналы."""
+    assert queue.wait(10000)
+    deadline = time.monotonic() + 10
+    while queue.pending() and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+
+
+def write(data: bytes):
+    """Функция сохранения, записывающая данные."""
+    return lambda target: target.write_bytes(data)
+
+
+def test_files_are_saved_in_background(queue, tmp_path):
+    started, resume = threading.Event(), threading.Event()
+    
+    def slow(target):
+        started.set()
+        resume.wait(10)
+        target.write_bytes(b"slow")
+    
+    queue.submit(tmp_path / "a.png", slow)
+    queue.submit(tmp_path / "b.png", write(b"b"))
+    assert started.wait(10)
+    # submit не ждет записи
+    assert queue.pending() == 2
+    resume.set()
+    finish(queue)
+    
+    assert (tmp_path / "a.png").read_bytes() == b"slow"
+    assert (tmp_path / "b.png").read_bytes() == b"b"
+    assert sorted(event for event in queue.events if event[0] == 'saved') == [
+        ('saved', "a.png"), ('saved', "b.png")
+    ]
+    progress = [event for event in queue.events if event[0] == 'progress']
+    assert progress[:2] == [('progress', 0, 1), ('progress', 0, 2)]
+    assert progress[-1] == ('progress', 2, 2)
+    assert queue.pending() == 0
+    assert not queue._jobs
+
+
+def test_failed_save_keeps_previous_file(queue, tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"old")
+    
+    def fail(target):
+        target.write_bytes(b"partial")
+        raise OSError("диск заполнен")
+    
+    queue.submit(path, fail)
+    finish(queue)
+    assert path.read_bytes() == b"old"
+    assert ('failed', "a.png", "диск заполнен") in queue.events
+    # Временный файл удален
+    assert [p.name for p in tmp_path.iterdir()] == ["a.png"]
+
+
+def test_progress_restarts_after_queue_is_empty(queue, tmp_path):
+    queue.submit(tmp_path / "a.png", write(b"a"))
+    finish(queue)
+    queue.events.clear()
+    queue.submit(tmp_path / "b.png", write(b"b"))
+    finish(queue)
+    assert [event for event in queue.events if event[0] == 'progress'] == [
+        ('progress', 0, 1), ('progress', 1, 1)
+    ]
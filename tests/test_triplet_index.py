@@ -0,0 +1,135 @@
+"""Тесты индекса троек (TripletIndex): инкрементальное обновление и сохранение."""
+
+import os
+import time
+
+import pytest
+
+from conftest import save_triplet
+from src.core.triplet_index import TripletIndex
+
+
+def age(*directories) -> None:
+    """Сдвигает время изменения каталогов в прошлое, за пределы TRIPLET_INDEX_RACY_NS."""
+    past = time.time() - 60
+    for directory in directories:
+        os.utime(directory, (past, past))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Дерево с тройками в корне и подкаталоге и выходным каталогом."""
+    root = tmp_path / "export"
+    save_triplet(root, "a", 4, 4)
+    save_triplet(root / "sub", "b", 4, 4)
+    save_triplet(root / "out", "merged", 4, 4)
+    age(root, root / "sub", root / "out")
+    return root
+
+
+def names(index):
+    """Имена троек индекса."""
+    return [triplet.name for triplet in index]
+
+
+def test_refresh_finds_triplets(tree):
+    index = TripletIndex(tree, exclude=tree / "out")
+    assert index.refresh() == 2
+    assert names(index) == ["a", "sub/b"]
+    assert index.get("sub/b").paths == {
+        'color': tree / "sub/b.png",
+        'outline': tree / "sub/b_outline.png",
+        'highlight': tree / "sub/b_highlight.png",
+    }
+    assert index.find(tree / "a_outline.png").name == "a"
+    assert index.find(tree / "out/merged.png") is None
+    
+    flat = TripletIndex(tree, recursive=False)
+    flat.refresh()
+    assert names(flat) == ["a"]
+
+
+def test_unchanged_directories_are_not_rescanned(tree):
+    index = TripletIndex(tree, exclude=tree / "out")
+    index.refresh()
+    assert index.refresh() == 0
+    
+    # Новый файл меняет время изменения только своего каталога
+    (tree / "sub/c.png").write_bytes(b"")
+    (tree / "sub/c_outline.png").write_bytes(b"")
+    age(tree / "sub")
+    assert index.refresh() == 1
+    assert names(index) == ["a", "sub/b", "sub/c"]
+    assert index.refresh() == 0
+
+
+def test_removed_files_and_directories(tree):
+    index = TripletIndex(tree, exclude=tree / "out")
+    index.refresh()
+    
+    (tree / "a_highlight.png").unlink()
+    age(tree)
+    assert index.refresh() == 1
+    assert set(index.get("a").paths) == {'color', 'outline'}
+    
+    for path in (tree / "sub").iterdir():
+        path.unlink()
+    (tree / "sub").rmdir()
+    age(tree)
+    index.refresh()
+    assert names(index) == ["a"]
+    assert index.get("sub/b") is None
+
+
+def test_recently_changed_directory_is_rescanned(tree):
+    index = TripletIndex(tree, exclude=tree / "out")
+    # Каталог изменен только что: следующее изменение в пределах точности
+    # времени файловой системы может не изменить его mtime
+    os.utime(tree / "sub")
+    index.refresh()
+    assert index.refresh() == 1
+    (tree / "sub/b_highlight.png").unlink()
+    assert index.refresh() == 1
+    assert set(index.get("sub/b").paths) == {'color', 'outline'}
+
+
+def test_saved_index_is_reused(tree, tmp_path):
+    index_path = tmp_path / "index.json"
+    index = TripletIndex(tree, exclude=tree / "out", index_path=index_path)
+    index.refresh()
+    index.save()
+    
+    loaded = TripletIndex(tree, exclude=tree / "out", index_path=index_path)
+    assert loaded.load()
+    assert loaded.refresh() == 0
+    assert names(loaded) == ["a", "sub/b"]
+    
+    # Индекс с другим исключаемым каталогом не подходит
+    other = TripletIndex(tree, index_path=index_path)
+    assert not other.load()
+    other.refresh()
+    assert names(other) == ["a", "out/merged", "sub/b"]
+    
+    index_path.write_text("{broken", encoding="utf-8")
+    assert not TripletIndex(tree, index_path=index_path).load()
+
+
+def test_add_and_remove_file_events(tree):
+    index = TripletIndex(tree, exclude=tree / "out")
+    index.refresh()
+    
+    color = tree / "sub/c.png"
+    color.write_bytes(b"")
+    assert index.add_file(color) is None
+    outline = tree / "sub/c_outline.png"
+    outline.write_bytes(b"")
+    triplet = index.add_file(outline)
+    assert triplet.name == "sub/c"
+    assert triplet.paths == {'color': color, 'outline': outline}
+    assert index.add_file(tree / "sub/notes.txt") is None
+    
+    index.remove_file(color)
+    assert set(index.get("sub/c").paths) == {'outline'}
+    index.remove_file(outline)
+    assert index.get("sub/c") is None
+    assert len(index) == 2